@@ -7,8 +7,16 @@ import backend.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'NashCRM.settings')
 
+django_asgi_app = get_asgi_application()
+
+# ⚙️ Фонові задачі виконує окремий процес python manage.py run_jobs —
+# попереджаємо в лозі, якщо черга не розбирається
+from backend.services.job_queue import start_worker_watchdog  # noqa: E402
+
+start_worker_watchdog()
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
         URLRouter(backend.routing.websocket_urlpatterns)
     ),
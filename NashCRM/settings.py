@@ -38,9 +38,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,  # По 20 записів - швидко завантажується
 
-    # 🚀 ШВИДКІ РЕНДЕРИ
+    # 🚀 ШВИДКІ РЕНДЕРИ (orjson, з fallback на стандартний JSONRenderer всередині)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'backend.utils.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -194,6 +194,10 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # 🚀 МІНІМАЛЬНЕ ЛОГУВАННЯ для швидкодії
+# Логи backend.* — JSON-рядками в logs/app.jsonl через чергу (запит не чекає на диск).
+# CRM_LOG_LEVEL=DEBUG вмикає детальну діагностику сигналів / валідації / імпорту пошти.
+CRM_LOG_LEVEL = os.environ.get('CRM_LOG_LEVEL', 'INFO')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -202,12 +206,20 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'level': 'ERROR',  # Тільки помилки!
         },
+        'json_file': {
+            'class': 'backend.utils.log_queue.QueuedJsonFileHandler',
+            'filename': BASE_DIR / 'logs' / 'app.jsonl',
+        },
     },
     'root': {
         'handlers': ['console'],
         'level': 'ERROR',
     },
     'loggers': {
+        'backend': {
+            'handlers': ['json_file'],
+            'level': CRM_LOG_LEVEL,
+        },
         'django.db.backends': {
             'handlers': ['console'],
             'level': 'ERROR',
@@ -429,4 +441,30 @@ CSRF_TRUSTED_ORIGINS = [
 # 🚀 ШВИДКІ НАЛАШТУВАННЯ
 AUTOSAVE_INTERVAL = 30
 DATA_FRESHNESS_CHECK = False  # Відключаємо для швидкодії
-FINANCIAL_ALERTS = True
\ No newline at end of file
+FINANCIAL_ALERTS = True
+
+# 👥 ПРИЗНАЧЕННЯ МЕНЕДЖЕРІВ (backend/services/manager_availability.py)
+# first_free | round_robin | least_loaded | weighted
+LEAD_ASSIGNMENT_STRATEGY = 'first_free'
+# Вага ролі CustomUser.interface_type для стратегії weighted (0 — не отримує лідів);
+# менеджери з продажу — 'accountant', як у ManagerViewSet
+LEAD_ROLE_WEIGHTS = {
+    'accountant': 1.0,
+    'manager': 1.0,
+}
+# 🧭 Як часто (сек) інші процеси перевіряють, чи змінились правила маршрутизації
+ROUTING_RULES_CHECK_INTERVAL = 5
+
+# ⚙️ ФОНОВІ ЗАДАЧІ (backend/services/job_queue.py, воркер: python manage.py run_jobs)
+JOB_QUEUE = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 10,      # сек, подвоюється з кожною спробою
+    'BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': 300,     # running-задача довше цього — воркер вважається мертвим
+    'KEEP_DONE_HOURS': 72,
+    'WORKER_ALERT_AFTER': 300,  # задачі чекають довше — попередження "чи запущено run_jobs?"
+}
+
+# ⏱️ Вікно злиття перерахунку метрик клієнта (сек): не частіше раза за вікно
+# (backend/services/metrics_coalescer.py)
+CLIENT_METRICS_WINDOW = 5
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'NashCRM.settings')
 
 application = get_wsgi_application()
+
+# ⚙️ Фонові задачі виконує окремий процес python manage.py run_jobs —
+# попереджаємо в лозі, якщо черга не розбирається
+from backend.services.job_queue import start_worker_watchdog  # noqa: E402
+
+start_worker_watchdog()
@@ -8,7 +8,10 @@ from unfold.admin import ModelAdmin
 
 from NashCRM import settings
 
-from .models import CustomUser, Lead, Client,  LeadPaymentOperation, EmailIntegrationSettings
+from .models import CustomUser, Lead, Client,  LeadPaymentOperation, EmailIntegrationSettings, ManagerLoad, \
+    LeadRoutingRule, BackgroundJob, DeadLetterJob, ProcessedEmail
+from .services.bulk_mode import bulk_mode
+from .services.search_service import fts_available, build_match_query, match_ids_sql, phone_digits
 
 
 
@@ -43,8 +46,22 @@ class CustomUserAdmin(ModelAdmin):
     search_fields = ('user__username',)
 
 
+class FullTextSearchAdminMixin:
+    """🔍 Пошук в адмінці через FTS5 індекс замість LIKE '%x%' по кожному полю"""
+
+    search_index_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        match = build_match_query(search_term)
+        if not search_term or phone_digits(search_term) or not match or not fts_available():
+            # Телефони та не-SQLite — стандартний пошук по search_fields
+            return super().get_search_results(request, queryset, search_term)
+
+        return queryset.filter(pk__in=match_ids_sql(self.search_index_kind, match)), False
+
+
 @admin.register(Lead)
-class LeadAdmin(ModelAdmin):
+class LeadAdmin(FullTextSearchAdminMixin, ModelAdmin):
     form = LeadAdminForm
 
     list_display = (
@@ -55,6 +72,7 @@ class LeadAdmin(ModelAdmin):
     )
     list_filter = ('status', 'source')
     search_fields = ('full_name', 'phone', 'email')
+    search_index_kind = 'lead'
     actions = ['fetch_google_address']
 
     # ========== 🧮 Фінансові суми ==========
@@ -72,6 +90,12 @@ class LeadAdmin(ModelAdmin):
 
     # ========== 📍 Google Maps екшен ==========
     def fetch_google_address(self, request, queryset):
+        with bulk_mode(label='admin'):
+            self._fetch_google_address(request, queryset)
+        self.message_user(request, "✅ Адреси підтягнуто з Google Maps")
+    fetch_google_address.short_description = "🌍 Підтягнути адресу з Google Maps"
+
+    def _fetch_google_address(self, request, queryset):
         for lead in queryset:
             if not lead.full_address:
                 continue
@@ -98,9 +122,6 @@ class LeadAdmin(ModelAdmin):
             except Exception as e:
                 messages.warning(request, f"❌ Помилка для {lead.full_name}: {e}")
 
-        self.message_user(request, "✅ Адреси підтягнуто з Google Maps")
-    fetch_google_address.short_description = "🌍 Підтягнути адресу з Google Maps"
-
     # ========== 🧭 Кастомна сторінка мапи ==========
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
@@ -115,7 +136,7 @@ class LeadAdmin(ModelAdmin):
 
 
 @admin.register(Client)
-class ClientAdmin(ModelAdmin):
+class ClientAdmin(FullTextSearchAdminMixin, ModelAdmin):
     list_display = (
         'full_name',
         'phone',
@@ -128,8 +149,55 @@ class ClientAdmin(ModelAdmin):
     )
     list_filter = ('status', 'type')
     search_fields = ('full_name', 'phone', 'email', 'company_name')
+    search_index_kind = 'client'
+
 
 
+@admin.register(ManagerLoad)
+class ManagerLoadAdmin(ModelAdmin):
+    """📊 Тільки перегляд — лічильники підтримуються сигналами (rebuild_manager_load для перерахунку)"""
+    list_display = ('manager', 'active_count', 'queued_count', 'weight', 'last_assigned_at', 'updated_at')
+    list_filter = ('weight',)
+    search_fields = ('manager__username',)
+    readonly_fields = ('manager', 'active_count', 'queued_count', 'weight', 'last_assigned_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(LeadRoutingRule)
+class LeadRoutingRuleAdmin(ModelAdmin):
+    """🧭 Зміни застосовуються без перезапуску — таблиця рішень перекомпільовується"""
+    list_display = ('name', 'priority', 'is_active', 'source', 'city', 'min_price', 'max_price', 'strategy', 'max_load')
+    list_editable = ('priority', 'is_active')
+    list_filter = ('is_active', 'source', 'strategy')
+    search_fields = ('name', 'source', 'city')
+    filter_horizontal = ('managers',)
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(ModelAdmin):
+    """⚙️ Черга фонових задач (виконує python manage.py run_jobs)"""
+    list_display = ('id', 'job_type', 'status', 'attempts', 'run_after', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'job_type')
+    search_fields = ('job_type', 'dedupe_key', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'started_at', 'finished_at', 'last_error')
+
+
+@admin.register(DeadLetterJob)
+class DeadLetterJobAdmin(ModelAdmin):
+    list_display = ('job_type', 'original_job_id', 'attempts', 'failed_at')
+    list_filter = ('job_type',)
+    search_fields = ('job_type', 'last_error')
+    readonly_fields = ('job_type', 'payload', 'attempts', 'last_error', 'original_job_id', 'created_at', 'failed_at')
+    actions = ['requeue']
+
+    @admin.action(description="🔁 Повернути в чергу")
+    def requeue(self, request, queryset):
+        from backend.services.job_queue import requeue_dead_letters
+        count = requeue_dead_letters(queryset)
+        self.message_user(request, f"Повернуто в чергу: {count}", messages.SUCCESS)
+
 
 @admin.register(LeadPaymentOperation)
 class LeadPaymentOperationAdmin(ModelAdmin):
@@ -141,6 +209,16 @@ class LeadPaymentOperationAdmin(ModelAdmin):
 
 @admin.register(EmailIntegrationSettings)
 class EmailIntegrationSettingsAdmin(ModelAdmin):
-    list_display = ("name", "email", "imap_host", "allowed_sender", "allowed_subject_keyword")
+    list_display = ("name", "email", "imap_host", "allowed_sender", "allowed_subject_keyword", "last_uid", "last_synced_at")
+    readonly_fields = ("uid_validity", "last_uid", "last_synced_at", "last_error")
+
+
+@admin.register(ProcessedEmail)
+class ProcessedEmailAdmin(ModelAdmin):
+    """📨 Журнал листів, які розглянув імпорт (за Message-ID)"""
+    list_display = ("message_id", "account", "uid", "outcome", "lead", "attempts", "processed_at")
+    list_filter = ("outcome", "account")
+    search_fields = ("message_id", "error")
+    readonly_fields = ("account", "message_id", "uid", "outcome", "lead", "attempts", "error", "processed_at")
 
 
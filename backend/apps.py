@@ -19,6 +19,11 @@ class BackendConfig(AppConfig):
         except Exception as e:
             print(f"⚠️ Інша помилка при імпорті сигналів: {e}")
 
+        # 🔍 FTS5 тригери губляться, коли SQLite перебудовує таблицю в міграції
+        from django.db.models.signals import post_migrate
+        from backend.services.search_service import restore_search_triggers
+        post_migrate.connect(restore_search_triggers, sender=self)
+
         # Email інтеграція тільки для основного процесу
         if os.environ.get('RUN_MAIN') == 'true':  # щоб не запускалось двічі
             def run_fetch():
@@ -32,4 +37,16 @@ class BackendConfig(AppConfig):
             thread.start()
             print("📧 Email інтеграція запущена")
 
+            # ⚙️ Воркер фонових задач для dev-сервера (в продакшені — окремий python manage.py run_jobs)
+            def run_jobs():
+                try:
+                    call_command('run_jobs')
+                except Exception as e:
+                    print(f"❌ Помилка воркера фонових задач: {e}")
+
+            jobs_thread = threading.Thread(target=run_jobs)
+            jobs_thread.daemon = True
+            jobs_thread.start()
+            print("⚙️ Воркер фонових задач запущено")
+
         print("🚀 Backend ERP/CRM успішно ініціалізовано")
\ No newline at end of file
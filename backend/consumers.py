@@ -13,3 +13,8 @@ class LeadConsumer(AsyncWebsocketConsumer):
 
     async def send_new_lead(self, event):
         await self.send(text_data=json.dumps(event["data"]))
+
+    async def send_new_leads(self, event):
+        # Пакет з bulk_mode — клієнт отримує звичайні кадри по одному ліду
+        for lead in event["data"]:
+            await self.send(text_data=json.dumps(lead))
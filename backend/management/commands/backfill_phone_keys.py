@@ -0,0 +1,62 @@
+# backend/management/commands/backfill_phone_keys.py
+"""
+Команда для заповнення канонічних ключів телефону (phone_key / phone_key_rev)
+Використання: python manage.py backfill_phone_keys --batch-size 2000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.models import Lead, Client
+from backend.utils.phones import backfill_phone_keys
+from whatsapp.models import WhatsAppMessage
+
+
+class Command(BaseCommand):
+    help = 'Заповнює phone_key / phone_key_rev для лідів, клієнтів та WhatsApp повідомлень'
+
+    TARGETS = {
+        'leads': (Lead, 'phone'),
+        'clients': (Client, 'phone'),
+        'whatsapp': (WhatsAppMessage, 'phone_number'),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Кількість записів за один bulk_update (за замовчуванням: 2000)'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Обробляти тільки записи з порожнім phone_key'
+        )
+        parser.add_argument(
+            '--model',
+            choices=list(self.TARGETS),
+            action='append',
+            help='Обмежити конкретними моделями (можна вказати кілька разів)'
+        )
+
+    def handle(self, *args, **options):
+        targets = options['model'] or list(self.TARGETS)
+
+        for name in targets:
+            model, phone_field = self.TARGETS[name]
+            start_time = time.time()
+
+            scanned, updated = backfill_phone_keys(
+                model, phone_field,
+                batch_size=options['batch_size'],
+                only_missing=options['only_missing']
+            )
+
+            self.stdout.write(
+                f"📞 {name}: переглянуто {scanned}, оновлено {updated} "
+                f"за {time.time() - start_time:.2f} сек"
+            )
+
+        self.stdout.write(self.style.SUCCESS("✅ Ключі телефонів оновлено"))
@@ -0,0 +1,311 @@
+# backend/management/commands/benchmark_email_classifier.py
+"""
+Бенчмарк і перевірка точності класифікатора листів-лідів
+Використання: python manage.py benchmark_email_classifier --emails 100000
+              python manage.py benchmark_email_classifier --eml-dir /backup/inbox
+
+Корпус — синтетичні листи з розміткою (build_corpus): ліди у форматах
+**поле:**, *поле:*, поле:, заявки лише з ключовим словом у темі,
+розсилки (довгі, з маркетинговими словами), сповіщення noreply,
+особисте листування. З --eml-dir — архів .eml (без розмітки: лише
+порівняння з попередньою реалізацією).
+
+Для кожного листа — рішення "лід / не лід" і, для лідів, extract_lead_data.
+Порівнюються попередня реалізація (цикли по ключових словах, дев'ять
+re.search, extract_field з компіляцією шаблонів на кожен виклик) і
+email_classifier: швидкість, збіг рішень і даних, точність за розміткою.
+"""
+
+import email
+import email.policy
+import logging
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from email.header import decode_header, make_header
+from email.utils import parseaddr
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from backend.services.email_classifier import classify
+from backend.services.mail_lead_importer import extract_lead_data, parse_email_body
+from backend.utils.phones import canonical_phone
+
+
+@dataclass
+class CorpusEmail:
+    kind: str
+    subject: str
+    sender: str
+    text: str
+    is_lead: bool = None        # None — без розмітки (архів .eml)
+    lead_id: str = None         # очікуваний delivery_number, якщо лист має повну структуру
+
+
+FIRST_NAMES = ['Іван', 'Олена', 'Андрій', 'Марія', 'Тарас', 'Оксана', 'Petro', 'Anna']
+LAST_NAMES = ['Петренко', 'Коваль', 'Шевчук', 'Бондар', 'Мельник', 'Ткаченко']
+FILLER = (
+    "Ми підготували для вас добірку новинок сезону та найкращих пропозицій тижня. "
+    "Дякуємо, що залишаєтесь з нами. Our team curated the best picks of the week for you. "
+)
+
+
+def _lead_fields(rng, number):
+    lead_id = f'LEAD-{number:07d}'
+    fields = [
+        ('form_id', str(rng.randint(100, 999))),
+        ('Lead Id', lead_id),
+        ('Name', f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'),
+        ('Phone Number', f'+38067{rng.randint(0, 9_999_999):07d}'),
+        ('Create Time', '2025-06-25 10:30:00'),
+        ('Form Name', 'Заявка на доставку'),
+        ('Campaign Name', f'Кампанія {rng.randint(1, 50)}'),
+        ('Campaign Id', str(rng.randint(10 ** 9, 10 ** 10))),
+        ('Ad Name', 'Відео 15с'),
+        ('Ad Id', str(rng.randint(10 ** 9, 10 ** 10))),
+    ]
+    return lead_id, fields
+
+
+def _corpus_email(rng, number):
+    kind = rng.choices(
+        ['lead_bold', 'lead_star', 'lead_plain', 'subject_only', 'newsletter', 'notification', 'personal',
+         'marketing_form'],
+        weights=[30, 5, 5, 5, 25, 15, 10, 5],
+    )[0]
+    lead_id, fields = _lead_fields(rng, number)
+    neutral_subject = rng.choice(['MyTikTok: нові дані', 'TikTok Ads', 'Re: доставка', 'Звіт'])
+
+    if kind == 'lead_bold':
+        text = 'New lead from TikTok\n' + '\n'.join(f'**{label}:** {value}' for label, value in fields)
+        return CorpusEmail(kind, neutral_subject, 'forms@tiktok.com', text, True, lead_id)
+    if kind == 'lead_star':
+        text = '\n'.join(f'*{label}:* {value}' for label, value in fields)
+        return CorpusEmail(kind, neutral_subject, 'leads@site.ua', text, True, lead_id)
+    if kind == 'lead_plain':
+        text = '\n'.join(f'{label}: {value}' for label, value in fields[:4])
+        return CorpusEmail(kind, 'Нові дані з сайту', 'site@site.ua', text, True, lead_id)
+    if kind == 'subject_only':
+        text = f"Ім'я: {fields[2][1]}\nТелефон: {fields[3][1]}\nКоментар: передзвоніть після 18:00"
+        return CorpusEmail(kind, rng.choice(['Заявка з сайту', 'New Lead', 'Contact form']), 'site@site.ua', text, True)
+    if kind == 'newsletter':
+        text = FILLER * rng.randint(20, 80) + rng.choice([
+            '\nЗнижки до 50%: discount тільки сьогодні!', '\nSale ends soon.',
+            '\nPremium video unlocked for you.', '\nMarket analysis and trading ideas inside.',
+        ]) + '\nUnsubscribe from future emails.'
+        return CorpusEmail(kind, 'Новинки тижня', rng.choice(['news@shop.ua', 'hello@brand.com']), text, False)
+    if kind == 'notification':
+        text = f"Ваше замовлення №{number} відправлено. Трекінг-номер буде доступний завтра."
+        return CorpusEmail(kind, 'Статус замовлення', rng.choice(['noreply@nova.ua', 'notifications@bank.ua']),
+                           text, False)
+    if kind == 'personal':
+        text = "Привіт! Зустрінемось завтра о 10:00 в офісі, обговоримо план на місяць."
+        return CorpusEmail(kind, 'Зустріч', 'colleague@company.ua', text, False)
+    # Розсилка з полями форми — ознак ліда менше трьох
+    text = f"Name: {fields[2][1]}\nEmail: client@example.com\n" + FILLER * 10 + "\nUnsubscribe"
+    return CorpusEmail(kind, 'Ваш профіль оновлено', 'info@brand.com', text, False)
+
+
+def build_corpus(size, seed=42):
+    """Синтетичні листи з розміткою is_lead / lead_id"""
+    rng = random.Random(seed)
+    return [_corpus_email(rng, number) for number in range(size)]
+
+
+def load_eml_dir(path, limit=None):
+    corpus = []
+    for file_path in sorted(Path(path).rglob('*.eml'))[:limit]:
+        msg = email.message_from_bytes(file_path.read_bytes(), policy=email.policy.compat32)
+        try:
+            text = parse_email_body(msg)
+        except (LookupError, AttributeError):
+            text = ''
+        corpus.append(CorpusEmail(
+            file_path.name, str(make_header(decode_header(msg.get('Subject', '')))),
+            parseaddr(msg.get('From', ''))[1], text,
+        ))
+    return corpus
+
+
+# 🕰️ ПОПЕРЕДНЯ РЕАЛІЗАЦІЯ (еталон для порівняння, без логування)
+
+def legacy_is_lead_email(text, subject="", sender=""):
+    lead_subject_keywords = [
+        'new lead', 'form submission', 'contact form', 'заявка', 'форма',
+        'lead id', 'form id', 'заявление', 'запрос', 'inquiry'
+    ]
+    subject_lower = subject.lower()
+    for keyword in lead_subject_keywords:
+        if keyword in subject_lower:
+            return True
+
+    lead_patterns = [
+        r'\*\*form_id:\*\*', r'\*form_id:\*', r'form_id\s*:', r'\*\*Lead Id:\*\*', r'Lead Id\s*:',
+        r'\*\*Name:\*\*', r'Name\s*:', r'\*\*Phone Number:\*\*', r'Phone Number\s*:',
+    ]
+    pattern_matches = 0
+    for pattern in lead_patterns:
+        if re.search(pattern, text, re.IGNORECASE):
+            pattern_matches += 1
+    if pattern_matches >= 3:
+        return True
+
+    marketing_keywords = [
+        'unsubscribe', 'відписатися', 'premium video', 'newsletter',
+        'Elliott Wave', 'investment', 'trading', 'market analysis',
+        'promotional', 'discount', 'sale', 'offer expires'
+    ]
+    text_lower = text.lower()
+    if [keyword for keyword in marketing_keywords if keyword.lower() in text_lower]:
+        return False
+
+    suspicious_senders = [
+        'noreply', 'no-reply', 'newsletter', 'marketing', 'promo',
+        'elliottwave', 'notifications', 'updates'
+    ]
+    sender_lower = sender.lower()
+    for suspicious in suspicious_senders:
+        if suspicious in sender_lower:
+            return False
+    return False
+
+
+def legacy_extract_lead_data(text):
+    def extract_field(label, text):
+        pattern = rf'\*\*{re.escape(label)}:\*\*\s*([^*]+?)(?=\*\*|$)'
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+        pattern = rf'\*{re.escape(label)}:\*\s*([^*\n]+?)(?=\*|$|\n)'
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+        pattern = rf'{re.escape(label)}:\s*([^*\n]+?)(?=\n|\*\*|\*|$)'
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+        return ""
+
+    if [field for field in ["form_id", "Lead Id", "Name", "Phone Number"] if not extract_field(field, text)]:
+        return None
+
+    lead_id = extract_field("Lead Id", text)
+    form_id = extract_field("form_id", text) or extract_field("Form ID", text)
+    name = extract_field("Name", text)
+    phone_raw = extract_field("Phone Number", text)
+    create_time = extract_field("Create Time", text)
+    ad_id = extract_field("Ad Id", text)
+    ad_name = extract_field("Ad Name", text)
+    adgroup_id = extract_field("Adgroup Id", text)
+    adgroup_name = extract_field("Adgroup Name", text)
+    campaign_id = extract_field("Campaign Id", text)
+    campaign_name = extract_field("Campaign Name", text)
+    form_name = extract_field("Form Name", text)
+
+    phone = canonical_phone(phone_raw)
+    if not phone:
+        return None
+
+    description_parts = [
+        f"Lead ID: {lead_id}",
+        f"Form ID: {form_id}",
+        f"Create Time: {create_time}",
+        f"Form Name: {form_name}",
+        f"Campaign: {campaign_name} (ID: {campaign_id})",
+        f"Ad Group: {adgroup_name} (ID: {adgroup_id})",
+        f"Ad: {ad_name} (ID: {ad_id})",
+        f"Original Phone: {phone_raw}",
+        "--- Повний текст листа ---",
+        text
+    ]
+    return {
+        "full_name": name,
+        "phone": phone,
+        "email": "",
+        "description": "\n".join(filter(None, description_parts)),
+        "source": "email",
+        "price": 0,
+        "delivery_number": lead_id,
+    }
+
+
+def _legacy(item):
+    is_lead = legacy_is_lead_email(item.text, item.subject, item.sender)
+    return is_lead, legacy_extract_lead_data(item.text) if is_lead else None
+
+
+def _compiled(item):
+    decision = classify(item.text, item.subject, item.sender)
+    return decision.is_lead, extract_lead_data(item.text) if decision else None
+
+
+class Command(BaseCommand):
+    help = 'Порівнює швидкість і точність класифікації листів-лідів: попередня реалізація vs email_classifier'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emails', type=int, default=100_000,
+                            help='Кількість синтетичних листів (за замовчуванням: 100000)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--eml-dir', type=str, default=None,
+                            help='Каталог з архівом .eml замість синтетичного корпусу')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Кількість повторів, береться найкращий (за замовчуванням: 3)')
+
+    def handle(self, *args, **options):
+        if options['eml_dir']:
+            corpus = load_eml_dir(options['eml_dir'], limit=options['emails'])
+            source = options['eml_dir']
+        else:
+            corpus = build_corpus(options['emails'], options['seed'])
+            source = 'синтетичний корпус'
+        if not corpus:
+            self.stderr.write("❌ Немає листів для перевірки")
+            return
+
+        size_mb = sum(len(item.text.encode()) for item in corpus) / 1024 / 1024
+        self.stdout.write(f"📨 {len(corpus)} листів ({size_mb:.1f} МБ тексту), {source}")
+        self.stdout.write(f"   {'Реалізація':<22}{'сек':>8}{'листів/с':>12}{'мкс/лист':>10}")
+
+        # Логування вимкнене: порівнюється лише класифікація і розбір
+        logging.disable(logging.CRITICAL)
+        try:
+            results = {}
+            for title, run in (("попередня", _legacy), ("email_classifier", _compiled)):
+                best = None
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    outcome = [run(item) for item in corpus]
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                results[title] = (best, outcome)
+                self.stdout.write(
+                    f"   {title:<22}{best:>8.2f}{len(corpus) / best:>12.0f}{best / len(corpus) * 1e6:>10.1f}"
+                )
+        finally:
+            logging.disable(logging.NOTSET)
+
+        (legacy_time, legacy), (compiled_time, compiled) = results.values()
+        mismatches = [item for item, old, new in zip(corpus, legacy, compiled) if old != new]
+        self.stdout.write(f"\n⚡ Прискорення: x{legacy_time / compiled_time:.1f}")
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"❌ Розбіжностей з попередньою реалізацією: {len(mismatches)}"))
+            for item in mismatches[:5]:
+                self.stdout.write(f"   {item.kind}: {item.subject!r} від {item.sender}")
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Рішення і витягнуті дані збігаються з попередньою реалізацією"))
+
+        reasons = Counter(classify(item.text, item.subject, item.sender).reason for item in corpus)
+        self.stdout.write("📋 Причини рішень: " + ', '.join(f"{reason} {count}" for reason, count in reasons.most_common()))
+
+        labeled = [(item, outcome) for item, outcome in zip(corpus, compiled) if item.is_lead is not None]
+        if labeled:
+            wrong = [item for item, (is_lead, data) in labeled if is_lead != item.is_lead or
+                     (item.lead_id and (data or {}).get('delivery_number') != item.lead_id)]
+            errors = Counter(item.kind for item in wrong)
+            self.stdout.write(
+                f"🎯 Точність за розміткою: {(len(labeled) - len(wrong)) / len(labeled) * 100:.2f}%"
+                + (f" (помилки: {dict(errors)})" if errors else "")
+            )
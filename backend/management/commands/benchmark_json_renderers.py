@@ -0,0 +1,136 @@
+# backend/management/commands/benchmark_json_renderers.py
+"""
+Мікро-бенчмарк кодування APIResponse-конвертів: стандартний JSONRenderer vs ORJSONRenderer
+Використання: python manage.py benchmark_json_renderers --rows 20000 --repeat 5
+
+Конверти синтетичні і повторюють форму найбільших відповідей:
+all_payments (список платежів) та LeadsReportView (списки боржників).
+"""
+
+import json
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from backend.utils.api_responses import APIResponse
+from backend.utils.renderers import ORJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = 'Порівнює швидкість JSON рендерерів на великих APIResponse-конвертах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=20000,
+            help='Кількість рядків у конверті (за замовчуванням: 20000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Кількість повторів (за замовчуванням: 5)'
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("⚠️ orjson не встановлено — ORJSONRenderer працює через fallback"))
+
+        envelopes = {
+            'all_payments': self._payments_envelope(rows),
+            'leads_report (боржники)': self._debtors_envelope(rows),
+        }
+
+        for title, data in envelopes.items():
+            self.stdout.write(f"\n📦 {title}: {rows} рядків")
+            baseline = None
+
+            for renderer in (JSONRenderer(), ORJSONRenderer()):
+                timings = []
+                payload = b''
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    payload = renderer.render(data)
+                    timings.append(time.perf_counter() - started)
+
+                median = statistics.median(timings)
+                baseline = baseline or median
+                self.stdout.write(
+                    f"   {renderer.__class__.__name__:<16} {median * 1000:8.1f} мс  "
+                    f"{len(payload) / 1024 / 1024:6.2f} МБ  "
+                    f"{len(payload) / 1024 / 1024 / median:7.1f} МБ/с  (x{baseline / median:.1f})"
+                )
+
+            # Перевіряємо, що обидва рендерери дають ту саму структуру
+            same_shape = self._keys(json.loads(JSONRenderer().render(data))) == \
+                self._keys(json.loads(ORJSONRenderer().render(data)))
+            self.stdout.write(f"   {'✅' if same_shape else '❌'} структура відповіді однакова")
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Бенчмарк завершено"))
+
+    @staticmethod
+    def _keys(envelope):
+        first = envelope['data'][0] if envelope['data'] else {}
+        return sorted(envelope['meta']), sorted(first)
+
+    @staticmethod
+    def _payments_envelope(rows):
+        now = timezone.now()
+        payments = [
+            {
+                "id": i,
+                "lead_id": i // 2,
+                "type": 'received' if i % 2 else 'expected',
+                "amount": Decimal('1250.50'),
+                "comment": "Оплата від водія",
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ]
+        return APIResponse.success(
+            data=payments,
+            meta={
+                "summary": {
+                    "total_payments": rows,
+                    "total_expected": Decimal('1250.50') * (rows // 2),
+                    "total_received": Decimal('1250.50') * (rows - rows // 2),
+                },
+                "generated_at": now,
+            }
+        ).data
+
+    @staticmethod
+    def _debtors_envelope(rows):
+        now = timezone.now()
+        debtors = [
+            {
+                "lead_id": i,
+                "full_name": f"Клієнт {i}",
+                "phone": f"38050{i:07d}",
+                "manager": "manager_1",
+                "price": Decimal('3400.00'),
+                "received": Decimal('1200.00'),
+                "debt": Decimal('2200.00'),
+                "status": "on_the_way",
+                "created_at": now - timedelta(days=i % 90),
+                "status_updated_at": now - timedelta(hours=i % 48),
+            }
+            for i in range(rows)
+        ]
+        return APIResponse.success(
+            data=debtors,
+            meta={
+                "report_period": {"date_from": now.date(), "date_to": now.date()},
+                "total_debt": Decimal('2200.00') * rows,
+                "generated_at": now,
+            }
+        ).data
@@ -0,0 +1,131 @@
+# backend/management/commands/benchmark_lead_routing.py
+"""
+Бенчмарк правил маршрутизації лідів
+Використання: python manage.py benchmark_lead_routing --leads 100000 --rules 200
+
+Правила, менеджери та синтетичні ліди генеруються всередині транзакції,
+яка відкочується в кінці — БД не змінюється.
+"""
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.models import LeadRoutingRule, ManagerLoad
+from backend.services.lead_routing import get_routing_table, reset_routing_table, route_lead, to_price
+from backend.services.manager_availability import STRATEGIES
+
+SOURCES = ['instagram', 'facebook', 'google', 'email', 'сайт', 'телефон', 'tiktok', 'olx', 'prom', 'rozetka']
+CITIES = ['Київ', 'Львів', 'Одеса', 'Харків', 'Дніпро', 'Вінниця', 'Полтава', 'Житомир', 'Черкаси', 'Суми']
+
+
+class Command(BaseCommand):
+    help = 'Вимірює швидкість маршрутизації синтетичних лідів за правилами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leads', type=int, default=100_000,
+                            help='Кількість синтетичних лідів (за замовчуванням: 100000)')
+        parser.add_argument('--rules', type=int, default=200,
+                            help='Кількість правил (за замовчуванням: 200)')
+        parser.add_argument('--managers', type=int, default=50,
+                            help='Кількість менеджерів (за замовчуванням: 50)')
+        parser.add_argument('--pick-sample', type=int, default=2000,
+                            help='Скільки лідів прогнати з вибором менеджера в БД (за замовчуванням: 2000)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            self._seed(rng, options['rules'], options['managers'])
+            self.stdout.write(f"🧪 Згенеровано {options['rules']} правил і {options['managers']} менеджерів (буде відкочено)")
+
+            reset_routing_table()
+            started = time.perf_counter()
+            table = get_routing_table()
+            compile_time = time.perf_counter() - started
+
+            leads = [
+                {
+                    'source': rng.choice(SOURCES + ['невідоме']),
+                    'city': rng.choice(CITIES + ['']),
+                    'price': rng.randint(0, 50_000),
+                }
+                for _ in range(options['leads'])
+            ]
+
+            # ⚡ Тільки таблиця рішень — без запитів до БД
+            timings = []
+            matched = 0
+            started = time.perf_counter()
+            for lead in leads:
+                lead_started = time.perf_counter()
+                rules = table.match(lead['source'], lead['city'], to_price(lead['price']))
+                timings.append(time.perf_counter() - lead_started)
+                matched += bool(rules)
+            match_total = time.perf_counter() - started
+
+            # 🎯 Повна маршрутизація: правила + вибір менеджера по ManagerLoad
+            sample = leads[:options['pick_sample']]
+            routed = 0
+            started = time.perf_counter()
+            for lead in sample:
+                manager, _ = route_lead(lead)
+                routed += manager is not None
+            route_total = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+        reset_routing_table()
+
+        timings.sort()
+        percentile = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))] * 1_000_000
+
+        self.stdout.write(f"\n📊 Компіляція: {compile_time * 1000:.1f} мс, "
+                          f"{table.rules_count} правил → {len(table.table)} комірок таблиці")
+        self.stdout.write(f"⚡ Таблиця рішень: {len(leads)} лідів за {match_total:.2f} сек "
+                          f"({len(leads) / match_total:,.0f} лідів/сек)")
+        self.stdout.write(f"   медіана {statistics.median(timings) * 1_000_000:.1f} мкс, "
+                          f"p95 {percentile(0.95):.1f} мкс, p99 {percentile(0.99):.1f} мкс, "
+                          f"знайдено правило: {matched / len(leads) * 100:.0f}%")
+        if sample:
+            self.stdout.write(f"🎯 З вибором менеджера: {len(sample)} лідів за {route_total:.2f} сек "
+                              f"({route_total / len(sample) * 1_000_000:.0f} мкс/лід, призначено {routed})")
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Бенчмарк завершено"))
+
+    def _seed(self, rng, rules_count, managers_count):
+        """🧪 Менеджери з ManagerLoad + правила через bulk_create"""
+        managers = User.objects.bulk_create([
+            User(username=f'routing_bench_{i}') for i in range(managers_count)
+        ])
+        ManagerLoad.objects.bulk_create([
+            ManagerLoad(manager=manager, active_count=rng.randint(0, 3), queued_count=rng.randint(0, 10))
+            for manager in managers
+        ])
+
+        rules = []
+        for i in range(rules_count):
+            low = rng.choice([None, 0, 1000, 5000, 10_000, 20_000])
+            rules.append(LeadRoutingRule(
+                name=f'Бенчмарк правило {i}',
+                priority=rng.randint(1, 1000),
+                source=rng.choice(SOURCES + [''] * 3),
+                city=rng.choice(CITIES + [''] * 5),
+                min_price=Decimal(low) if low is not None else None,
+                max_price=Decimal(low + rng.choice([5000, 10_000, 30_000])) if low is not None else None,
+                strategy=rng.choice(list(STRATEGIES) + [''] * 2),
+                max_load=rng.choice([None, None, 5, 10]),
+            ))
+        rules = LeadRoutingRule.objects.bulk_create(rules)
+
+        through = LeadRoutingRule.managers.through
+        through.objects.bulk_create([
+            through(leadroutingrule_id=rule.id, user_id=manager.id)
+            for rule in rules
+            for manager in rng.sample(managers, rng.randint(0, min(5, len(managers))))
+        ])
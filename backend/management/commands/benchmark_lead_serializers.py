@@ -0,0 +1,115 @@
+# backend/management/commands/benchmark_lead_serializers.py
+"""
+Бенчмарк серіалізації сторінки лідів: повний LeadSerializer vs компактний LeadListSerializer
+Використання: python manage.py benchmark_lead_serializers --count 500 --repeat 5
+
+Дані генеруються всередині транзакції, яка відкочується в кінці — БД не змінюється.
+"""
+
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from backend.models import Lead, LeadPaymentOperation
+from backend.serializers import LeadSerializer, LeadListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Порівнює час серіалізації та розмір відповіді для сторінки лідів'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=500,
+            help='Кількість лідів на сторінці (за замовчуванням: 500)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Кількість повторів кожного варіанту (за замовчуванням: 5)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        repeat = options['repeat']
+
+        with transaction.atomic():
+            lead_ids = self._seed(count)
+            self.stdout.write(f"🧪 Згенеровано {count} тестових лідів (буде відкочено)")
+
+            variants = [
+                ("LeadSerializer (повний)", LeadSerializer, ''),
+                ("LeadSerializer ?fields=8 колонок", LeadSerializer,
+                 'fields=id,full_name,phone,status,price,assigned_to_username,order_number,created_at'),
+                ("LeadListSerializer (компактний)", LeadListSerializer, ''),
+                ("LeadListSerializer + payment_info", LeadListSerializer,
+                 'fields=id,full_name,phone,status,price,payment_info'),
+            ]
+
+            results = []
+            for title, serializer_class, query in variants:
+                timings, size = self._measure(serializer_class, query, lead_ids, repeat)
+                results.append((title, statistics.median(timings), size))
+
+            transaction.set_rollback(True)
+
+        baseline_time, baseline_size = results[0][1], results[0][2]
+        self.stdout.write(f"\n📊 Сторінка з {count} лідів, медіана з {repeat} прогонів:")
+        for title, median, size in results:
+            self.stdout.write(
+                f"   {title:<38} {median * 1000:8.1f} мс  {size / 1024:8.1f} КБ  "
+                f"(x{baseline_time / median:.1f} швидше, {size / baseline_size * 100:.0f}% розміру)"
+            )
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Бенчмарк завершено"))
+
+    def _seed(self, count):
+        """🧪 Ліди + по два платежі через bulk_create (без сигналів)"""
+        leads = Lead.objects.bulk_create([
+            Lead(
+                full_name=f"Бенчмарк Лід {i}",
+                phone=f"38050{i:07d}",
+                email=f"bench{i}@example.com",
+                price=Decimal('1500.00'),
+                status='on_the_way' if i % 2 else 'in_work',
+                order_number=f"BENCH-{i}",
+                description="Тестовий опис замовлення " * 5,
+                city="Київ",
+            )
+            for i in range(count)
+        ])
+        LeadPaymentOperation.objects.bulk_create([
+            LeadPaymentOperation(lead=lead, operation_type=op_type, amount=Decimal('750.00'))
+            for lead in leads
+            for op_type in ('expected', 'received')
+        ])
+        return [lead.pk for lead in leads]
+
+    def _measure(self, serializer_class, query, lead_ids, repeat):
+        """⏱️ Запит + серіалізація + рендер JSON, як у LeadViewSet.list"""
+        request = Request(APIRequestFactory().get(f'/api/leads/?{query}'))
+        renderer = JSONRenderer()
+        timings = []
+        size = 0
+
+        for _ in range(repeat):
+            queryset = Lead.objects.filter(pk__in=lead_ids).select_related('assigned_to').prefetch_related(
+                Prefetch('payment_operations', queryset=LeadPaymentOperation.objects.order_by('-created_at'))
+            ).order_by('-created_at')
+
+            started = time.perf_counter()
+            data = serializer_class(list(queryset), many=True, context={'request': request}).data
+            payload = renderer.render(data)
+            timings.append(time.perf_counter() - started)
+            size = len(payload)
+
+        return timings, size
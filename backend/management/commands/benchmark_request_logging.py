@@ -0,0 +1,218 @@
+# backend/management/commands/benchmark_request_logging.py
+"""
+Бенчмарк накладних витрат діагностичного виводу на запит
+Використання: python manage.py benchmark_request_logging --requests 200
+
+Запускається на тимчасовій SQLite-базі (як load_test_intake). Кожна ітерація —
+три запити через API: створення ліда (ExternalLeadView), платіж, зміна статусу.
+stdout перенаправляється в файл з построковою буферизацією (як під gunicorn),
+логування працює як налаштовано в settings.LOGGING.
+
+Прогони:
+    1. як налаштовано
+    2. без діагностики: stdout → порожній потік, logging.disable()
+Різниця між ними — ціна print()/логування на запит.
+
+Мікробенчмарк (--calls): ціна одного виклику print() у файл, вимкненого
+logger.debug(), logger.info() через чергу (QueuedJsonFileHandler) і
+синхронного FileHandler — в одному потоці та з --threads потоками.
+"""
+
+import contextlib
+import io
+import logging
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from backend.models import CustomUser, Lead
+from backend.utils.log_queue import JsonLineFormatter, QueuedJsonFileHandler
+
+
+class _CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.NOTSET)
+        self.count = 0
+
+    def handle(self, record):
+        self.count += 1
+        return True
+
+    def emit(self, record):
+        pass
+
+
+class _NullStream(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+class Command(BaseCommand):
+    help = 'Вимірює час запиту з діагностичним виводом і без нього'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Кількість ітерацій (по 3 запити) на прогін (за замовчуванням: 200)')
+        parser.add_argument('--calls', type=int, default=20000,
+                            help='Викликів на варіант у мікробенчмарку (за замовчуванням: 20000)')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Потоків у паралельному мікробенчмарку (за замовчуванням: 8)')
+
+    def handle(self, *args, **options):
+        db_path = os.path.join(tempfile.mkdtemp(prefix='nashcrm_logbench_'), 'logbench.sqlite3')
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = db_path
+        old_name = connection.settings_dict['NAME']
+
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self._run(options['requests'])
+            self._micro(options['calls'], options['threads'])
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _run(self, iterations):
+        admin = User.objects.create_superuser('logbench_admin', 'logbench@example.com', 'x')
+        CustomUser.objects.create(user=admin, interface_type='admin')
+        manager = User.objects.create_user('logbench_manager')
+        CustomUser.objects.create(user=manager, interface_type='accountant')
+
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        # Прогрів (імпорти, кеш правил маршрутизації)
+        self._measure(client, 'warmup', 5, quiet=True)
+
+        # Прогони чергуються по ітераціях — ріст БД однаково впливає на обидва
+        stdout_path = os.path.join(os.path.dirname(settings.DATABASES['default']['TEST']['NAME']), 'stdout.log')
+        configured, silent = [], []
+        counter = _CountingHandler()
+        with open(stdout_path, 'w', buffering=1, encoding='utf-8') as stdout_file:
+            logging.getLogger().addHandler(counter)
+            try:
+                for i in range(iterations):
+                    with contextlib.redirect_stdout(stdout_file):
+                        configured += self._measure(client, f'configured-{i}', 1)
+                    silent += self._measure(client, f'silent-{i}', 1, quiet=True)
+            finally:
+                logging.getLogger().removeHandler(counter)
+            stdout_bytes = os.path.getsize(stdout_path)
+
+        results = [
+            ("як налаштовано", configured, stdout_bytes, counter.count),
+            ("без діагностики", silent, 0, 0),
+        ]
+
+        requests_count = iterations * 3
+        baseline = statistics.fmean(results[-1][1])
+        self.stdout.write(f"\n📊 {iterations} ітерацій × 3 запити (мс на запит)")
+        self.stdout.write(f"   {'Прогін':<18}{'mean':>8}{'p50':>8}{'p95':>8}{'stdout Б/запит':>16}{'логів/запит':>13}")
+        for title, values, stdout_bytes, records in results:
+            values = sorted(values)
+            self.stdout.write(
+                f"   {title:<18}{statistics.fmean(values) * 1000:>8.2f}{statistics.median(values) * 1000:>8.2f}"
+                f"{values[int(len(values) * 0.95)] * 1000:>8.2f}{stdout_bytes / requests_count:>16.0f}"
+                f"{records / requests_count:>13.1f}"
+            )
+        overhead = statistics.fmean(results[0][1]) - baseline
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Накладні витрати діагностики: {overhead * 1000:.2f} мс на запит "
+            f"({overhead / baseline * 100:.1f}%)"
+        ))
+
+    def _measure(self, client, prefix, iterations, quiet=False):
+        timings = []
+        silence = contextlib.ExitStack()
+        if quiet:
+            silence.enter_context(contextlib.redirect_stdout(_NullStream()))
+            logging.disable(logging.CRITICAL)
+            silence.callback(logging.disable, logging.NOTSET)
+
+        with silence:
+            for i in range(iterations):
+                order_number = f'LOGBENCH-{prefix}-{i}'
+                phone = f'+38067{abs(hash(order_number)) % 10 ** 7:07d}'
+
+                started = time.perf_counter()
+                client.post('/api/external/leads/', {
+                    'full_name': f'Бенчмарк {i}', 'phone': phone, 'source': 'сайт',
+                    'price': 1000, 'order_number': order_number,
+                }, format='json')
+                timings.append(time.perf_counter() - started)
+
+                lead_id = Lead.objects.filter(order_number=order_number).values_list('id', flat=True).first()
+                if not lead_id:
+                    continue
+
+                started = time.perf_counter()
+                client.post(f'/api/payments/leads/{lead_id}/', {
+                    'operation_type': 'received', 'amount': 100, 'comment': 'logbench',
+                }, format='json')
+                timings.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                client.patch(f'/api/leads/{lead_id}/', {'status': 'declined'}, format='json')
+                timings.append(time.perf_counter() - started)
+
+        return timings
+
+    # 🔬 МІКРОБЕНЧМАРК ОДНОГО ВИКЛИКУ
+
+    def _micro(self, calls, threads):
+        directory = os.path.dirname(settings.DATABASES['default']['TEST']['NAME'])
+        lead = {'id': 12345, 'status': 'in_work', 'phone': '380671234567'}
+
+        stdout_file = open(os.path.join(directory, 'micro_stdout.log'), 'w', buffering=1, encoding='utf-8')
+        queued = QueuedJsonFileHandler(os.path.join(directory, 'micro_queued.jsonl'))
+        direct = logging.FileHandler(os.path.join(directory, 'micro_direct.jsonl'), encoding='utf-8')
+        direct.setFormatter(JsonLineFormatter())
+
+        def make_logger(name, handler, level):
+            log = logging.getLogger(f'logbench.{name}')
+            log.handlers[:] = [handler] if handler else []
+            log.setLevel(level)
+            log.propagate = False
+            return log
+
+        disabled = make_logger('disabled', None, logging.INFO)
+        queued_logger = make_logger('queued', queued, logging.INFO)
+        direct_logger = make_logger('direct', direct, logging.INFO)
+
+        variants = [
+            ("print() у файл", lambda: print(f"🔄 Лід #{lead['id']}: {lead['status']} ({lead['phone']})", file=stdout_file)),
+            ("logger.debug вимкнено", lambda: disabled.debug("🔄 Лід #%s: %s (%s)", lead['id'], lead['status'], lead['phone'])),
+            ("logger.info у чергу", lambda: queued_logger.info("🔄 Лід #%s: %s (%s)", lead['id'], lead['status'], lead['phone'])),
+            ("FileHandler синхронно", lambda: direct_logger.info("🔄 Лід #%s: %s (%s)", lead['id'], lead['status'], lead['phone'])),
+        ]
+
+        def run(call, count):
+            started = time.perf_counter()
+            for _ in range(count):
+                call()
+            return time.perf_counter() - started
+
+        self.stdout.write(f"\n🔬 Один виклик, мкс ({calls} викликів; паралельно — {threads} потоків)")
+        self.stdout.write(f"   {'Варіант':<24}{'1 потік':>10}{f'{threads} потоків':>14}")
+        try:
+            for title, call in variants:
+                single = run(call, calls) / calls
+                per_thread = max(calls // threads, 1)
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    elapsed = list(pool.map(lambda _: run(call, per_thread), range(threads)))
+                parallel = statistics.fmean(elapsed) / per_thread
+                self.stdout.write(f"   {title:<24}{single * 1e6:>10.2f}{parallel * 1e6:>14.2f}")
+        finally:
+            queued.close()
+            direct.close()
+            stdout_file.close()
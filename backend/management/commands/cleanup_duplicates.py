@@ -1,74 +1,102 @@
 # backend/management/commands/cleanup_duplicates.py
 """
-Команда для очищення дублікатів клієнтів
-Використання: python manage.py cleanup_duplicates
+Команда для злиття дублікатів клієнтів (однаковий канонічний номер телефону)
+Використання: python manage.py cleanup_duplicates --dry-run
+              python manage.py cleanup_duplicates --batch-size 1000
+
+Задачі та взаємодії дублікатів переносяться на найстаршого клієнта,
+метрики перераховуються, дублікати видаляються пачками в транзакціях.
+Спочатку завжди виводиться звіт (план злиття).
 """
 
+import time
+
 from django.core.management.base import BaseCommand
-from django.db.models import Count
+
 from backend.models import Client
+from backend.services.bulk_mode import bulk_mode
+from backend.services.client_merge_service import merge_duplicate_clients
 
 
 class Command(BaseCommand):
-    help = 'Очищення дублікатів клієнтів'
+    help = 'Злиття дублікатів клієнтів'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--dry-run',
             action='store_true',
-            help='Тільки показати дублікати, не видаляти',
+            help='Тільки показати план злиття, нічого не змінювати',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Кількість груп дублікатів в одній транзакції (за замовчуванням: 1000)'
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=10,
+            help='Скільки груп показати детально у звіті (за замовчуванням: 10)'
         )
 
+    # Видалення дублікатів — один bump версій даних замість одного на кожен рядок
+    @bulk_mode(notify=False, label='cleanup_duplicates')
     def handle(self, *args, **options):
-        self.stdout.write("🧹 ОЧИЩЕННЯ ДУБЛІКАТІВ КЛІЄНТІВ")
+        self.stdout.write("🧹 ЗЛИТТЯ ДУБЛІКАТІВ КЛІЄНТІВ")
         self.stdout.write("=" * 40)
 
-        # Знаходимо дублікати
-        duplicate_clients = Client.objects.values('phone').annotate(
-            count=Count('id')
-        ).filter(count__gt=1).order_by('-count')
+        # 📋 Звіт завжди перший — навіть без --dry-run
+        plan = merge_duplicate_clients(
+            batch_size=options['batch_size'],
+            dry_run=True,
+            sample_size=options['samples']
+        )
 
-        if not duplicate_clients:
+        if not plan.groups:
             self.stdout.write("✅ Дублікатів не знайдено!")
             return
 
-        total_duplicates = 0
-        for dup in duplicate_clients:
-            phone = dup['phone']
-            count = dup['count']
+        for phone_key, survivor, duplicates in plan.samples:
+            self.stdout.write(f"\n📞 Номер: {phone_key} ({len(duplicates) + 1} записів)")
+            self.stdout.write(f"   ✅ Залишаємо: #{survivor.id} - {survivor.full_name} (створено: {survivor.created_at})")
+            for duplicate in duplicates:
+                self.stdout.write(f"   🔗 Зливаємо: #{duplicate.id} - {duplicate.full_name} ({duplicate.phone})")
 
-            self.stdout.write(f"\n📞 Номер: {phone} ({count} дублікатів)")
+        self.stdout.write(f"\n📊 ПЛАН ЗЛИТТЯ:")
+        self.stdout.write(f"   📞 Груп дублікатів: {plan.groups}")
+        self.stdout.write(f"   🗑️ Клієнтів до видалення: {plan.duplicates}")
+        self.stdout.write(f"   📋 Задач до перенесення: {plan.tasks_moved}")
+        self.stdout.write(f"   💬 Взаємодій до перенесення: {plan.interactions_moved}")
 
-            # Отримуємо всіх клієнтів з цим номером
-            clients = Client.objects.filter(phone=phone).order_by('created_at')
+        if options['dry_run']:
+            self.stdout.write("\nЗапустіть без --dry-run для фактичного злиття")
+            return
 
-            # Залишаємо першого (найстаршого), видаляємо решту
-            keeper = clients.first()
-            duplicates_to_delete = clients.exclude(id=keeper.id)
+        start_time = time.time()
 
-            self.stdout.write(f"   ✅ Залишаємо: #{keeper.id} - {keeper.full_name} (створено: {keeper.created_at})")
+        def progress(batch, total):
+            self.stdout.write(
+                f"   ⏳ Пачка #{total.batches}: злито {batch.duplicates} дублікатів "
+                f"(всього {total.duplicates}/{plan.duplicates}, {time.time() - start_time:.1f} сек)"
+            )
 
-            for duplicate in duplicates_to_delete:
-                if options['dry_run']:
-                    self.stdout.write(f"   🗑️ [DRY RUN] Видалили б: #{duplicate.id} - {duplicate.full_name}")
-                else:
-                    self.stdout.write(f"   🗑️ Видаляємо: #{duplicate.id} - {duplicate.full_name}")
-                    duplicate.delete()
-                total_duplicates += 1
+        self.stdout.write("\n🔗 ЗЛИТТЯ:")
+        result = merge_duplicate_clients(batch_size=options['batch_size'], progress=progress)
 
-        if options['dry_run']:
-            self.stdout.write(f"\n📊 [DRY RUN] Знайдено {total_duplicates} дублікатів для видалення")
-            self.stdout.write("Запустіть без --dry-run для фактичного видалення")
-        else:
-            self.stdout.write(f"\n✅ Видалено {total_duplicates} дублікатів")
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Злито {result.duplicates} дублікатів у {result.groups} клієнтів "
+            f"(задач: {result.tasks_moved}, взаємодій: {result.interactions_moved}) "
+            f"за {time.time() - start_time:.1f} сек"
+        ))
 
         self.stdout.write("\n🔍 ПОТОЧНА СТАТИСТИКА:")
         total_clients = Client.objects.count()
-        unique_phones = Client.objects.values('phone').distinct().count()
+        unique_phones = Client.objects.values('phone_key').distinct().count()
         self.stdout.write(f"   👥 Всього клієнтів: {total_clients}")
         self.stdout.write(f"   📞 Унікальних номерів: {unique_phones}")
 
         if total_clients != unique_phones:
             self.stdout.write("⚠️ Все ще є дублікати! Запустіть команду знову.")
         else:
-            self.stdout.write("✅ Дублікатів немає!")
\ No newline at end of file
+            self.stdout.write("✅ Дублікатів немає!")
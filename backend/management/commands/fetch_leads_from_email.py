@@ -1,8 +1,23 @@
-from django.core.management.base import BaseCommand
-from backend.services.mail_lead_importer import fetch_emails_and_create_leads
-from backend.models import EmailIntegrationSettings  # або звідки в тебе ця модель
+# backend/management/commands/fetch_leads_from_email.py
+"""
+Імпорт лідів з пошти (IMAP) — усі акаунти EmailIntegrationSettings паралельно
+Використання: python manage.py fetch_leads_from_email
+              python manage.py fetch_leads_from_email --loop --workers 4
+              python manage.py fetch_leads_from_email --idle   # push через IMAP IDLE, лід за ~1 с
+              python manage.py fetch_leads_from_email --account default --resync --since 2025-01-01
+              python manage.py fetch_leads_from_email --status
+"""
+
+import signal
+import threading
 from datetime import datetime, date
-import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.models import EmailIntegrationSettings
+from backend.services.mail_poller import MailPoller, account_lag
+
 
 class Command(BaseCommand):
     help = "Імпортує ліди з пошти через IMAP (по колу)"
@@ -11,52 +26,108 @@ class Command(BaseCommand):
         parser.add_argument(
             '--since',
             type=str,
-            help='Дата з якої починати парсити (у форматі YYYY-MM-DD)'
+            help='Дата з якої починати парсити при першій синхронізації або --resync (у форматі YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--resync',
+            action='store_true',
+            help='Ігнорувати збережений останній UID і переглянути листи з --since (вже оброблені пропускаються)'
         )
         parser.add_argument(
             '--loop',
             action='store_true',
             help='Запускати в нескінченному циклі'
         )
+        parser.add_argument(
+            '--idle',
+            action='store_true',
+            help='IMAP IDLE: тримати з\'єднання і забирати листи одразу після надходження '
+                 '(передбачає --loop; сервери без IDLE — звичайне опитування)'
+        )
         parser.add_argument(
             '--interval',
             type=int,
             default=None,
-            help='Інтервал між запусками (сек). Якщо не вказано — береться з моделі EmailIntegrationSettings'
+            help='Інтервал між запусками (сек). Якщо не вказано — check_interval кожного акаунта'
+        )
+        parser.add_argument(
+            '--account',
+            action='append',
+            default=None,
+            help='Тільки цей акаунт (name); можна кілька разів. За замовчуванням — усі'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Скільки акаунтів опитувати одночасно (за замовчуванням: 4)'
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Показати стан синхронізації акаунтів (lag, останній UID, помилка) і вийти'
         )
 
     def handle(self, *args, **options):
-        since = options.get("since") or date.today().strftime("%Y-%m-%d")
-        loop = options.get("loop")
-        cli_interval = options.get("interval")
-
-        if since:
-            try:
-                since_date = datetime.strptime(since, "%Y-%m-%d")
-            except ValueError:
-                self.stderr.write("❌ Невірний формат дати. Має бути: YYYY-MM-DD")
-                return
-        else:
-            since_date = datetime.now()
+        if options['status']:
+            self.show_status(options['account'])
+            return
 
+        since = options.get("since") or date.today().strftime("%Y-%m-%d")
         try:
-            settings = EmailIntegrationSettings.objects.get(name="default")
-            interval = cli_interval if cli_interval is not None else settings.check_interval
-        except EmailIntegrationSettings.DoesNotExist:
-            interval = cli_interval if cli_interval is not None else 30
-            self.stderr.write("⚠️ EmailIntegrationSettings з name='default' не знайдено. Використовую інтервал по замовчуванню.")
+            since_date = datetime.strptime(since, "%Y-%m-%d")
+        except ValueError:
+            self.stderr.write("❌ Невірний формат дати. Має бути: YYYY-MM-DD")
+            return
 
-        def fetch():
+        poller = MailPoller(
+            accounts=options['account'],
+            workers=options['workers'],
+            interval=options['interval'],
+            start_date=since_date,
+            resync=options['resync'],
+            idle=options['idle'],
+        )
+
+        if not (options['loop'] or options['idle']):
             self.stdout.write(f"📥 Парсимо пошту з {since_date.strftime('%Y-%m-%d')}...")
-            try:
-                fetch_emails_and_create_leads(start_date=since_date, settings_obj=settings)
-                self.stdout.write(self.style.SUCCESS("✅ Ліди з пошти створено!"))
-            except Exception as e:
-                self.stderr.write(f"❌ Помилка: {str(e)}")
-
-        if loop:
-            while True:
-                fetch()
-                time.sleep(interval)
-        else:
-            fetch()
+            results = poller.poll_once()
+            if not results:
+                self.stderr.write("⚠️ Немає налаштованих email акаунтів (EmailIntegrationSettings)")
+            for name, stats in results.items():
+                if stats is None:
+                    self.stderr.write(f"❌ {name}: {poller.status_for(name)['last_error']}")
+                    continue
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {name}: нових листів {stats.found}, створено лідів {stats.created} "
+                    f"({stats.bytes_fetched / 1024:.1f} КБ, {stats.messages_per_sec:.1f} листів/с)"
+                ))
+            return
+
+        stopping = []
+        # Під runserver команда працює в окремому потоці — там сигнали не встановлюються
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+        mode = "IMAP IDLE" if options['idle'] else "опитування"
+        self.stdout.write(f"📬 Пошта: {mode} запущено (Ctrl+C — зупинка)")
+        try:
+            poller.run(stop=lambda: bool(stopping))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write("🛑 Опитування пошти зупинено")
+
+    def show_status(self, names):
+        accounts = EmailIntegrationSettings.objects.order_by('name')
+        if names:
+            accounts = accounts.filter(name__in=names)
+
+        now = timezone.now()
+        self.stdout.write(f"   {'Акаунт':<20}{'Інтервал':>10}{'Lag, с':>10}{'Останній UID':>14}  Помилка")
+        for settings_obj in accounts:
+            lag = account_lag(settings_obj, now)
+            self.stdout.write(
+                f"   {settings_obj.name:<20}{settings_obj.check_interval:>10}"
+                f"{'—' if lag is None else f'{lag:.0f}':>10}{settings_obj.last_uid:>14}  "
+                f"{settings_obj.last_error or '—'}"
+            )
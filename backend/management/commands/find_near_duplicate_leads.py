@@ -0,0 +1,75 @@
+# backend/management/commands/find_near_duplicate_leads.py
+"""
+Звіт про майже-дублікати лідів: той самий телефон + схоже ім'я у вікні часу
+Використання: python manage.py find_near_duplicate_leads --window 30 --threshold 0.85 --days 90
+
+Нічого не змінює — тільки показує групи для ручної перевірки.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.models import Lead
+from backend.services.dedupe_service import (
+    iter_near_duplicate_groups, NEAR_DUPLICATE_WINDOW_MINUTES, NAME_SIMILARITY_THRESHOLD
+)
+
+
+class Command(BaseCommand):
+    help = 'Шукає майже-дублікати лідів (телефон + схоже ім\'я) без попарного порівняння'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=NEAR_DUPLICATE_WINDOW_MINUTES,
+            help=f'Вікно часу в хвилинах (за замовчуванням: {NEAR_DUPLICATE_WINDOW_MINUTES})'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=NAME_SIMILARITY_THRESHOLD,
+            help=f'Мінімальна схожість імен 0..1 (за замовчуванням: {NAME_SIMILARITY_THRESHOLD})'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Перевіряти тільки ліди за останні N днів'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Скільки груп показати детально (за замовчуванням: 50)'
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+
+        queryset = Lead.objects.all()
+        if options['days']:
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+
+        groups_count = leads_count = 0
+        for group in iter_near_duplicate_groups(queryset, options['window'], options['threshold']):
+            groups_count += 1
+            leads_count += len(group)
+
+            if groups_count <= options['limit']:
+                leads = Lead.objects.filter(id__in=group).order_by('created_at')
+                self.stdout.write(f"\n🔎 Група #{groups_count} ({len(group)} лідів):")
+                for lead in leads:
+                    self.stdout.write(
+                        f"   #{lead.id} {lead.full_name} — {lead.phone} — "
+                        f"{lead.created_at:%Y-%m-%d %H:%M} — {lead.status}"
+                    )
+
+        self.stdout.write(
+            f"\n📊 Груп: {groups_count}, лідів у групах: {leads_count} "
+            f"(за {time.time() - start_time:.2f} сек)"
+        )
+        self.stdout.write(self.style.SUCCESS("✅ Перевірку завершено"))
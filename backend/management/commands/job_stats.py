@@ -0,0 +1,55 @@
+# backend/management/commands/job_stats.py
+"""
+Метрики фонових задач по типах: черга, затримка, час виконання, пропускна здатність,
+і стан черги перерахунку метрик клієнтів (metrics_coalescer)
+Використання: python manage.py job_stats --minutes 60
+"""
+
+from django.core.management.base import BaseCommand
+
+from backend.services.job_queue import job_metrics, overdue_jobs, queue_settings
+from backend.services.metrics_coalescer import coalescer_metrics
+
+
+def _seconds(value):
+    return f"{value:.2f}" if value is not None else '—'
+
+
+class Command(BaseCommand):
+    help = 'Показує метрики фонових задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=60,
+                            help='Вікно для виконаних задач, хв (за замовчуванням: 60)')
+
+    def handle(self, *args, **options):
+        dirty = coalescer_metrics()
+        self.stdout.write(
+            f"⏱️ Перерахунок метрик клієнтів (вікно {dirty['window']} с): в черзі {dirty['depth']}, "
+            f"вікно минуло {dirty['due']}, найстаріша позначка {dirty['lag']:.1f} с\n"
+        )
+
+        alert_after = queue_settings()['WORKER_ALERT_AFTER']
+        overdue = overdue_jobs(alert_after) if alert_after else 0
+        if overdue:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {overdue} задач чекають понад {alert_after} с — чи запущено python manage.py run_jobs?\n"
+            ))
+
+        metrics = job_metrics(options['minutes'])
+        if not metrics:
+            self.stdout.write("📭 Задач за цей період немає")
+            return
+
+        self.stdout.write(f"📊 ФОНОВІ ЗАДАЧІ за {options['minutes']} хв (час у секундах)")
+        self.stdout.write(
+            f"   {'Тип':<32}{'Вик.':>6}{'/хв':>7}{'Черга':>7}{'Зараз':>7}{'Повт.':>7}{'Dead':>6}"
+            f"{'wait p50':>10}{'wait p95':>10}{'run p50':>9}{'run p95':>9}"
+        )
+        for job_type, item in sorted(metrics.items()):
+            self.stdout.write(
+                f"   {job_type:<32}{item['done']:>6}{item['throughput_per_min']:>7}{item['pending']:>7}"
+                f"{item['running']:>7}{item['retried']:>7}{item['dead']:>6}"
+                f"{_seconds(item['wait_p50']):>10}{_seconds(item['wait_p95']):>10}"
+                f"{_seconds(item['run_p50']):>9}{_seconds(item['run_p95']):>9}"
+            )
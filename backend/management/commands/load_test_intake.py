@@ -0,0 +1,261 @@
+# backend/management/commands/load_test_intake.py
+"""
+Навантажувальний тест прийому лідів
+Використання: python manage.py load_test_intake --leads 300 --workers 8 --managers 5
+
+Запускається на окремій тимчасовій SQLite-базі (ті самі OPTIONS, що й у
+settings.DATABASES: WAL, timeout) — робоча БД не змінюється.
+
+Кожен потік проходить повний шлях через API (APIClient у процесі):
+    POST /api/external/leads/            → ExternalLeadView → create_lead_with_logic → сигнали
+    POST /api/payments/leads/<id>/       → очікуваний + отриманий платіж
+    PATCH /api/leads/<id>/               → in_work → declined / awaiting_prepayment
+
+Звіт: пропускна здатність, p50/p95/p99 по кожній операції, помилки
+блокування SQLite ("database is locked") та порушення інваріантів черги.
+"""
+
+import contextlib
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.models import Count, Q
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from backend.models import CustomUser, Lead, ManagerLoad
+
+LOCK_MARKERS = ('database is locked', 'database table is locked')
+
+
+class Command(BaseCommand):
+    help = 'Паралельне створення лідів, платежі та зміни статусів з метриками затримок і блокувань'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leads', type=int, default=300,
+                            help='Кількість лідів (за замовчуванням: 300)')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Кількість паралельних потоків (за замовчуванням: 8)')
+        parser.add_argument('--managers', type=int, default=5,
+                            help='Кількість менеджерів (за замовчуванням: 5)')
+        parser.add_argument('--no-payments', action='store_true',
+                            help='Не додавати платежі')
+        parser.add_argument('--no-transitions', action='store_true',
+                            help='Не змінювати статуси')
+        parser.add_argument('--show-app-output', action='store_true',
+                            help='Не приглушувати логи застосунку (backend, django.request)')
+        parser.add_argument('--transaction-mode', choices=['DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'], default=None,
+                            help='Режим транзакцій SQLite для тимчасової БД (за замовчуванням — як у settings)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.error_samples = {}
+        self.live_violations = []
+        self.stats_lock = threading.Lock()
+
+        db_path = os.path.join(tempfile.mkdtemp(prefix='nashcrm_load_'), 'load_test.sqlite3')
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = db_path
+        if options['transaction_mode']:
+            settings.DATABASES['default']['OPTIONS']['transaction_mode'] = options['transaction_mode']
+        old_name = connection.settings_dict['NAME']
+
+        self.stdout.write(f"🧪 Тимчасова БД: {db_path}")
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self._run()
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    # 🏃 ПРОГІН
+
+    def _run(self):
+        options = self.options
+        admin = self._seed(options['managers'])
+        self.stdout.write(
+            f"🚀 {options['leads']} лідів, {options['workers']} потоків, {options['managers']} менеджерів, "
+            f"timeout SQLite: {connection.settings_dict['OPTIONS'].get('timeout')} сек, "
+            f"transaction_mode: {connection.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED')}"
+        )
+
+        stop_monitor = threading.Event()
+        monitor = threading.Thread(target=self._monitor, args=(stop_monitor,), daemon=True)
+
+        app_output = contextlib.ExitStack()
+        if not options['show_app_output']:
+            # Застосунок пише через logging (stderr), не print — приглушуємо логери;
+            # "Internal Server Error" від django.request на кожен збій — рахуємо самі
+            for name in ('backend', 'django.request'):
+                app_logger = logging.getLogger(name)
+                app_output.callback(app_logger.setLevel, app_logger.level)
+                app_logger.setLevel(logging.CRITICAL)
+
+        started = time.perf_counter()
+        with app_output:
+            monitor.start()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                list(pool.map(lambda number: self._scenario(admin, number), range(options['leads'])))
+            stop_monitor.set()
+            monitor.join()
+        elapsed = time.perf_counter() - started
+
+        self._report(elapsed)
+
+    def _scenario(self, admin, number):
+        """📥 Один лід: створення → платежі → зміна статусу"""
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=admin)
+        rng = random.Random(number)
+        price = rng.choice([500, 1500, 3200, 9900])
+
+        try:
+            self._call('create', client.post, '/api/external/leads/', {
+                'full_name': f'Навантаження {number}',
+                'phone': f'+38063{number:07d}',
+                'source': rng.choice(['instagram', 'facebook', 'сайт']),
+                'price': price,
+                'order_number': f'LOAD-{number}',
+            })
+            lead_id = Lead.objects.filter(order_number=f'LOAD-{number}').values_list('id', flat=True).first()
+            if not lead_id:
+                return
+
+            if not self.options['no_payments']:
+                for operation_type in ('expected', 'received'):
+                    self._call('payment', client.post, f'/api/payments/leads/{lead_id}/', {
+                        'operation_type': operation_type, 'amount': price, 'comment': 'load test',
+                    })
+
+            if not self.options['no_transitions']:
+                status = Lead.objects.filter(pk=lead_id).values_list('status', flat=True).first()
+                if status == 'in_work':
+                    target = 'declined' if rng.random() < 0.5 else 'awaiting_prepayment'
+                    self._call('transition', client.patch, f'/api/leads/{lead_id}/', {'status': target})
+        finally:
+            connection.close()
+
+    def _call(self, operation, method, url, data):
+        started = time.perf_counter()
+        response = method(url, data, format='json')
+        elapsed = time.perf_counter() - started
+
+        body = ''
+        if response.status_code >= 400:
+            exc_info = getattr(response, 'exc_info', None)
+            body = str(exc_info[1]) if exc_info else response.content.decode(errors='ignore')
+
+        with self.stats_lock:
+            self.timings[operation].append(elapsed)
+            if any(marker in body for marker in LOCK_MARKERS):
+                self.lock_errors[operation] += 1
+            elif response.status_code >= 500:
+                self.errors[operation] += 1
+                self.error_samples.setdefault(operation, body.strip().splitlines()[-1][:200] if body.strip() else '')
+            elif response.status_code >= 400:
+                # Відмова бізнес-логіки (напр. недозволений перехід) — не збій
+                self.rejected[operation] += 1
+        return response
+
+    # 🔍 ІНВАРІАНТИ ЧЕРГИ
+
+    def _monitor(self, stop):
+        """Під час прогону: в жодного менеджера не більше одного ліда в роботі"""
+        try:
+            while not stop.wait(0.05):
+                for manager_id, total in self._double_in_work():
+                    self.live_violations.append(f"менеджер #{manager_id}: {total} лідів в роботі одночасно")
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _double_in_work():
+        return list(
+            Lead.objects.filter(status='in_work', assigned_to__isnull=False)
+            .values('assigned_to').annotate(total=Count('id')).filter(total__gt=1)
+            .values_list('assigned_to', 'total')
+        )
+
+    def _final_violations(self):
+        violations = [f"менеджер #{manager_id}: {total} лідів в роботі" for manager_id, total in self._double_in_work()]
+
+        actual = {
+            row['assigned_to']: row
+            for row in Lead.objects.filter(assigned_to__isnull=False).values('assigned_to').annotate(
+                active=Count('id', filter=Q(status='in_work')),
+                queued=Count('id', filter=Q(status='queued')),
+            )
+        }
+        for load in ManagerLoad.objects.all():
+            row = actual.get(load.pk, {})
+            expected = (row.get('active', 0), row.get('queued', 0))
+            if (load.active_count, load.queued_count) != expected:
+                violations.append(
+                    f"ManagerLoad #{load.pk}: лічильники {load.active_count}/{load.queued_count}, "
+                    f"фактично {expected[0]}/{expected[1]}"
+                )
+            if expected[1] and not expected[0]:
+                violations.append(f"менеджер #{load.pk}: {expected[1]} лідів у черзі, але жодного в роботі")
+
+        return violations
+
+    # 🧪 ДАНІ ТА ЗВІТ
+
+    def _seed(self, managers_count):
+        admin = User.objects.create_superuser('load_admin', 'load_admin@example.com', 'load')
+        CustomUser.objects.create(user=admin, interface_type='admin')
+        for i in range(managers_count):
+            manager = User.objects.create_user(f'load_manager_{i}')
+            CustomUser.objects.create(user=manager, interface_type='accountant')
+        return admin
+
+    def _report(self, elapsed):
+        total_calls = sum(len(values) for values in self.timings.values())
+        created = Lead.objects.count()
+
+        self.stdout.write(f"\n📊 РЕЗУЛЬТАТИ ({elapsed:.2f} сек)")
+        self.stdout.write(f"   Лідів створено: {created}, запитів: {total_calls} "
+                          f"({total_calls / elapsed:.1f} запитів/сек, {created / elapsed:.1f} лідів/сек)")
+
+        self.stdout.write(f"\n   {'Операція':<12}{'К-сть':>7}{'p50 мс':>9}{'p95 мс':>9}{'p99 мс':>9}"
+                          f"{'Блок.':>7}{'500':>6}{'4xx':>6}")
+        for operation, values in self.timings.items():
+            values = sorted(values)
+            percentile = lambda p: values[min(len(values) - 1, int(len(values) * p))] * 1000
+            self.stdout.write(
+                f"   {operation:<12}{len(values):>7}{statistics.median(values) * 1000:>9.1f}"
+                f"{percentile(0.95):>9.1f}{percentile(0.99):>9.1f}"
+                f"{self.lock_errors[operation]:>7}{self.errors[operation]:>6}{self.rejected[operation]:>6}"
+            )
+
+        for operation, sample in self.error_samples.items():
+            self.stdout.write(f"   ⚠️ {operation}: перша помилка 500 — {sample}")
+
+        lock_total = sum(self.lock_errors.values())
+        self.stdout.write(f"\n🔒 Помилок блокування SQLite: {lock_total}")
+
+        violations = sorted(set(self.live_violations)) + self._final_violations()
+        if violations:
+            self.stdout.write(self.style.ERROR(f"❌ Порушень інваріантів черги: {len(violations)}"))
+            for violation in violations[:20]:
+                self.stdout.write(f"   - {violation}")
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Інваріанти черги дотримано"))
@@ -0,0 +1,32 @@
+# backend/management/commands/rebuild_manager_load.py
+"""
+Команда для повного перерахунку індексу доступності менеджерів (ManagerLoad)
+Використання: python manage.py rebuild_manager_load
+
+Потрібна після масових змін лідів через QuerySet.update() (без сигналів)
+або зміни settings.LEAD_ROLE_WEIGHTS.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.models import ManagerLoad
+from backend.services.manager_availability import rebuild_manager_load, get_strategy
+
+
+class Command(BaseCommand):
+    help = 'Перераховує лічильники в роботі / у черзі та ваги ролей менеджерів'
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        total = rebuild_manager_load()
+
+        self.stdout.write(f"👥 Оновлено {total} рядків індексу за {time.time() - start_time:.2f} сек")
+        for load in ManagerLoad.objects.filter(weight__gt=0).select_related('manager').order_by('manager_id'):
+            self.stdout.write(
+                f"   {load.manager.username:<20} в роботі: {load.active_count:<4} "
+                f"у черзі: {load.queued_count:<4} вага: {load.weight}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Індекс перебудовано (стратегія: {get_strategy().name})"))
@@ -0,0 +1,30 @@
+# backend/management/commands/rebuild_search_index.py
+"""
+Команда для повної переіндексації FTS5 пошуку по лідах та клієнтах
+Використання: python manage.py rebuild_search_index
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from backend.services.search_service import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перебудовує FTS5 індекс пошуку (таблиці, тригери та дані)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ FTS5 доступний тільки для SQLite (поточна БД: {connection.vendor}) — пошук працює через icontains"
+            ))
+            return
+
+        start_time = time.time()
+        install_search_index(connection, rebuild=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Індекс пошуку перебудовано за {time.time() - start_time:.2f} секунд"
+        ))
@@ -0,0 +1,50 @@
+# backend/management/commands/release_duplicate_lead_keys.py
+"""
+Команда для звільнення повторюваних order_number / delivery_number лідів
+Використання: python manage.py release_duplicate_lead_keys --dry-run
+              python manage.py release_duplicate_lead_keys
+
+Потрібна перед міграцією 0008 (унікальні індекси), якщо вона зупинилась
+зі звітом про дублікати. Найстаріший лід зберігає значення, решта
+отримують суфікс "~<id>". Спочатку завжди виводиться звіт.
+"""
+
+from django.core.management.base import BaseCommand
+
+from backend.services.dedupe_service import duplicate_key_groups, release_duplicate_keys
+
+
+class Command(BaseCommand):
+    help = 'Звільнення повторюваних order_number / delivery_number лідів'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Тільки показати звіт, нічого не змінювати',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🧹 ПОВТОРЮВАНІ НОМЕРИ ЗАМОВЛЕНЬ / ТТН")
+        self.stdout.write("=" * 40)
+
+        groups = duplicate_key_groups()
+        if not any(groups.values()):
+            self.stdout.write("✅ Дублікатів не знайдено!")
+            return
+
+        for field, values in groups.items():
+            for value, ids in values.items():
+                self.stdout.write(f"\n🔑 {field} = {value!r} ({len(ids)} лідів)")
+                self.stdout.write(f"   ✅ Залишаємо: #{ids[0]}")
+                for lead_id in ids[1:]:
+                    self.stdout.write(f"   ✏️ Перейменовуємо: #{lead_id} → {value}~{lead_id}")
+
+        if options['dry_run']:
+            self.stdout.write("\nЗапустіть без --dry-run, щоб перейменувати")
+            return
+
+        changed = release_duplicate_keys(groups)
+        for field, total in changed.items():
+            self.stdout.write(f"   🧹 {field}: перейменовано {total}")
+        self.stdout.write(self.style.SUCCESS("\n✅ Готово — тепер можна запускати migrate"))
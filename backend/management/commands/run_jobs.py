@@ -0,0 +1,72 @@
+# backend/management/commands/run_jobs.py
+"""
+Воркер фонових задач (CRM-автоматизація з signals.py)
+Використання: python manage.py run_jobs
+              python manage.py run_jobs --once --batch 100
+              python manage.py run_jobs --types client.update_metrics
+
+Можна запускати кілька воркерів паралельно — задачі захоплюються
+умовним UPDATE, одну задачу виконує рівно один воркер.
+"""
+
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from backend.services import crm_jobs  # noqa: F401 — реєстрація обробників
+from backend.services.job_queue import JOB_HANDLERS, default_worker_id, run_pending_jobs, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Виконує фонові задачі з черги BackgroundJob'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Один прохід по готових задачах і вихід')
+        parser.add_argument('--batch', type=int, default=10,
+                            help='Скільки задач захоплювати за раз (за замовчуванням: 10)')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Пауза, коли черга порожня, сек (за замовчуванням: 1)')
+        parser.add_argument('--max-jobs', type=int, default=None,
+                            help='Зупинитись після N задач')
+        parser.add_argument('--types', nargs='*', default=None,
+                            help=f"Тільки ці типи задач ({', '.join(sorted(JOB_HANDLERS))})")
+        parser.add_argument('--worker-id', default=None,
+                            help='Ім\'я воркера (за замовчуванням: host:pid)')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+
+        if options['once']:
+            total = {'done': 0, 'retry': 0, 'dead': 0}
+            while True:
+                results = run_pending_jobs(worker_id, options['batch'], options['types'])
+                for key, value in results.items():
+                    total[key] += value
+                if not sum(results.values()):
+                    break
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Виконано {total['done']}, на повтор {total['retry']}, в dead-letter {total['dead']}"
+            ))
+            return
+
+        stopping = []
+        # Під runserver команда працює в окремому потоці — там сигнали не встановлюються
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+        self.stdout.write(f"⚙️ Воркер {worker_id} запущено (Ctrl+C — зупинка)")
+        try:
+            processed = run_worker(
+                worker_id=worker_id,
+                batch=options['batch'],
+                idle_sleep=options['sleep'],
+                max_jobs=options['max_jobs'],
+                job_types=options['types'],
+                stop=lambda: bool(stopping),
+                log=self.stdout.write,
+            )
+        except KeyboardInterrupt:
+            processed = None
+        self.stdout.write(f"🛑 Воркер {worker_id} зупинено" + (f" (задач: {processed})" if processed is not None else ""))
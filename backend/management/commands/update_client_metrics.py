@@ -7,6 +7,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from backend.models import Client
+from backend.services.bulk_mode import bulk_mode, bump_data_version
 import time
 
 
@@ -26,6 +27,7 @@ class Command(BaseCommand):
             help='Оновлювати тільки клієнтів з покупками (АКБ)'
         )
 
+    @bulk_mode(notify=False, label='update_client_metrics')
     def handle(self, *args, **options):
         batch_size = options['batch_size']
         only_akb = options['only_akb']
@@ -46,38 +48,47 @@ class Command(BaseCommand):
         updated_count = 0
         errors_count = 0
 
-        # Обробляємо батчами
-        for i in range(0, total_count, batch_size):
-            batch = clients[i:i + batch_size]
+        # Обробляємо батчами: Client.bulk_update_metrics — кілька GROUP BY
+        # і один bulk_update на батч замість ~6 запитів на кожного клієнта
+        # (по id, а не OFFSET: --only-akb фільтрує за полем, яке ми ж і змінюємо)
+        last_id = 0
+        while True:
+            batch = list(clients.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            before = {client.id: (client.temperature, client.akb_segment) for client in batch}
+
+            try:
+                Client.bulk_update_metrics(batch)
+            except Exception as e:
+                errors_count += len(batch)
+                self.stderr.write(f"❌ Помилка для батчу клієнтів #{batch[0].id}–#{batch[-1].id}: {str(e)}")
+                continue
 
             for client in batch:
-                try:
-                    old_temperature = client.temperature
-                    old_segment = client.akb_segment
+                old_temperature, old_segment = before[client.id]
 
-                    client.update_client_metrics()
+                # Логуємо важливі зміни
+                if client.temperature != old_temperature:
+                    self.stdout.write(
+                        f"🌡️ {client.full_name}: {old_temperature} → {client.temperature}"
+                    )
 
-                    # Логуємо важливі зміни
-                    if client.temperature != old_temperature:
-                        self.stdout.write(
-                            f"🌡️ {client.full_name}: {old_temperature} → {client.temperature}"
-                        )
+                if client.akb_segment != old_segment:
+                    self.stdout.write(
+                        f"💰 {client.full_name}: {old_segment} → {client.akb_segment}"
+                    )
 
-                    if client.akb_segment != old_segment:
-                        self.stdout.write(
-                            f"💰 {client.full_name}: {old_segment} → {client.akb_segment}"
-                        )
-
-                    updated_count += 1
-
-                except Exception as e:
-                    errors_count += 1
-                    self.stderr.write(f"❌ Помилка для клієнта {client.id}: {str(e)}")
+            updated_count += len(batch)
 
             # Показуємо прогрес
-            progress = ((i + batch_size) / total_count) * 100
+            progress = ((updated_count + errors_count) / total_count) * 100
             self.stdout.write(f"⏳ Прогрес: {min(progress, 100):.1f}% ({updated_count}/{total_count})")
 
+        # Метрики змінено через bulk_update — кешована статистика клієнтів застаріла
+        bump_data_version('clients')
+
         # Підсумок
         elapsed_time = time.time() - start_time
         self.stdout.write(
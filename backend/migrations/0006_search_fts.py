@@ -0,0 +1,24 @@
+# 🔍 FTS5 індекси для повнотекстового пошуку по лідах та клієнтах (тільки SQLite)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from backend.services.search_service import install_search_index
+    install_search_index(schema_editor.connection, rebuild=True)
+
+
+def drop_search_index(apps, schema_editor):
+    from backend.services.search_service import remove_search_index
+    remove_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0005_alter_customuser_interface_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+from backend.utils.phones import backfill_phone_keys
+
+
+def fill_phone_keys(apps, schema_editor):
+    backfill_phone_keys(apps.get_model('backend', 'Lead'), 'phone')
+    backfill_phone_keys(apps.get_model('backend', 'Client'), 'phone')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0006_search_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='phone_key_rev',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key_rev',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_phone_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_keys(apps, schema_editor):
+    """
+    🛑 Перевірка перед унікальними індексами order_number / delivery_number
+
+    Міграція дані не змінює: якщо повторювані значення є, вона зупиняється
+    зі звітом. Звільнити їх — python manage.py release_duplicate_lead_keys
+    (спершу з --dry-run), потім повторити migrate.
+    """
+    Lead = apps.get_model('backend', 'Lead')
+
+    report = []
+    for field in ('order_number', 'delivery_number'):
+        duplicates = (
+            Lead.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            .values(field).annotate(total=Count('id')).filter(total__gt=1)
+            .order_by(field)
+        )
+        for row in duplicates:
+            ids = Lead.objects.filter(**{field: row[field]}).order_by('created_at', 'id').values_list('id', flat=True)
+            report.append(f"   {field}={row[field]!r}: ліди {', '.join(f'#{lead_id}' for lead_id in ids)}")
+
+    if report:
+        raise RuntimeError(
+            "Повторювані order_number / delivery_number не дають створити унікальні індекси:\n"
+            + "\n".join(report)
+            + "\nЗапустіть python manage.py release_duplicate_lead_keys --dry-run і повторіть migrate."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0007_phone_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['phone_key', 'created_at'], name='backend_lea_phone_k_009058_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lead',
+            constraint=models.UniqueConstraint(condition=models.Q(('order_number__isnull', False), models.Q(('order_number', ''), _negated=True)), fields=('order_number',), name='uniq_lead_order_number'),
+        ),
+        migrations.AddConstraint(
+            model_name='lead',
+            constraint=models.UniqueConstraint(condition=models.Q(('delivery_number', ''), _negated=True), fields=('delivery_number',), name='uniq_lead_delivery_number'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_manager_load(apps, schema_editor):
+    """Початкове заповнення індексу доступності з поточних лідів"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Lead = apps.get_model('backend', 'Lead')
+    CustomUser = apps.get_model('backend', 'CustomUser')
+    ManagerLoad = apps.get_model('backend', 'ManagerLoad')
+
+    weights = {'accountant': 1.0, 'manager': 1.0, **getattr(settings, 'LEAD_ROLE_WEIGHTS', {})}
+    roles = dict(CustomUser.objects.values_list('user_id', 'interface_type'))
+    counts = {
+        row['assigned_to']: row
+        for row in Lead.objects.filter(assigned_to__isnull=False).values('assigned_to').annotate(
+            active=Count('id', filter=Q(status='in_work')),
+            queued=Count('id', filter=Q(status='queued')),
+        )
+    }
+
+    ManagerLoad.objects.bulk_create([
+        ManagerLoad(
+            manager_id=user_id,
+            active_count=counts.get(user_id, {}).get('active', 0),
+            queued_count=counts.get(user_id, {}).get('queued', 0),
+            weight=float(weights.get(roles.get(user_id), 0.0)),
+        )
+        for user_id in User.objects.values_list('id', flat=True)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('backend', '0008_lead_dedupe_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ManagerLoad',
+            fields=[
+                ('manager', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lead_load', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Менеджер')),
+                ('active_count', models.PositiveIntegerField(default=0, verbose_name='Лідів в роботі')),
+                ('queued_count', models.PositiveIntegerField(default=0, verbose_name='Лідів у черзі')),
+                ('weight', models.FloatField(default=1.0, verbose_name='Вага (з ролі)')),
+                ('last_assigned_at', models.DateTimeField(blank=True, null=True, verbose_name='Останнє призначення')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Навантаження менеджера',
+                'verbose_name_plural': 'Навантаження менеджерів',
+                'indexes': [models.Index(fields=['weight', 'active_count', 'manager'], name='backend_man_weight_180305_idx'), models.Index(fields=['active_count', 'last_assigned_at'], name='backend_man_active__a34f62_idx')],
+            },
+        ),
+        migrations.RunPython(fill_manager_load, migrations.RunPython.noop),
+    ]
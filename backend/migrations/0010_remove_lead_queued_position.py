@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0009_manager_load'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='lead',
+            name='queued_position',
+        ),
+    ]
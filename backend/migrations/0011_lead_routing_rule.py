@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0010_remove_lead_queued_position'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadRoutingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Назва')),
+                ('priority', models.PositiveIntegerField(default=100, verbose_name='Пріоритет (менше — раніше)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активне')),
+                ('source', models.CharField(blank=True, max_length=100, verbose_name='Джерело')),
+                ('city', models.CharField(blank=True, max_length=100, verbose_name='Місто')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Ціна від')),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Ціна до (не включно)')),
+                ('strategy', models.CharField(blank=True, max_length=30, verbose_name='Стратегія (порожньо — LEAD_ASSIGNMENT_STRATEGY)')),
+                ('max_load', models.PositiveIntegerField(blank=True, null=True, verbose_name='Макс. лідів в роботі + у черзі')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('managers', models.ManyToManyField(blank=True, related_name='routing_rules', to=settings.AUTH_USER_MODEL, verbose_name='Менеджери (порожньо — всі доступні)')),
+            ],
+            options={
+                'verbose_name': 'Правило маршрутизації',
+                'verbose_name_plural': 'Правила маршрутизації',
+                'ordering': ['priority', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0011_lead_routing_rule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetterJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(max_length=100, verbose_name='Тип')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Дані')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Спроб')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Остання помилка')),
+                ('original_job_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID задачі')),
+                ('created_at', models.DateTimeField(verbose_name='Створено')),
+                ('failed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Відмова')),
+            ],
+            options={
+                'verbose_name': 'Невиконана задача',
+                'verbose_name_plural': 'Невиконані задачі',
+                'ordering': ['-failed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(max_length=100, verbose_name='Тип')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Дані')),
+                ('dedupe_key', models.CharField(blank=True, default='', max_length=200, verbose_name='Ключ злиття')),
+                ('status', models.CharField(choices=[('pending', 'Очікує'), ('running', 'Виконується'), ('done', 'Виконано')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Спроб')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='Макс. спроб')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Не раніше')),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100, verbose_name='Воркер')),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Остання помилка')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Створено')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Почато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Фонова задача',
+                'verbose_name_plural': 'Фонові задачі',
+                'indexes': [models.Index(fields=['status', 'run_after'], name='backend_bac_status_a39212_idx'), models.Index(fields=['job_type', 'dedupe_key', 'status'], name='backend_bac_job_typ_5577e7_idx'), models.Index(fields=['status', 'finished_at'], name='backend_bac_status_1ac3ce_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0012_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_key', models.CharField(max_length=20, unique=True, verbose_name='Ключ телефону')),
+                ('marked_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Позначено')),
+            ],
+            options={
+                'verbose_name': 'Клієнт до перерахунку',
+                'verbose_name_plural': 'Клієнти до перерахунку',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0013_dirty_clients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailintegrationsettings',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Остання синхронізація'),
+        ),
+        migrations.AddField(
+            model_name='emailintegrationsettings',
+            name='last_uid',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Останній UID'),
+        ),
+        migrations.AddField(
+            model_name='emailintegrationsettings',
+            name='uid_validity',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='UIDVALIDITY'),
+        ),
+        migrations.CreateModel(
+            name='ProcessedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.CharField(max_length=255, unique=True, verbose_name='Message-ID')),
+                ('uid', models.BigIntegerField(blank=True, null=True, verbose_name='UID')),
+                ('outcome', models.CharField(choices=[('lead', 'Створено лід'), ('duplicate', 'Лід уже існує'), ('filtered', 'Не лід'), ('invalid', 'Невірна структура'), ('error', 'Помилка')], max_length=20, verbose_name='Результат')),
+                ('attempts', models.PositiveSmallIntegerField(default=1, verbose_name='Спроб')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Помилка')),
+                ('processed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Оброблено')),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='processed_emails', to='backend.emailintegrationsettings', verbose_name='Акаунт')),
+                ('lead', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='backend.lead', verbose_name='Лід')),
+            ],
+            options={
+                'verbose_name': 'Оброблений лист',
+                'verbose_name_plural': 'Оброблені листи',
+                'ordering': ['-processed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0014_email_uid_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailintegrationsettings',
+            name='last_error',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Остання помилка'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:30
+
+from django.conf import settings
+from django.db import migrations
+
+
+def set_role_weights(apps, schema_editor):
+    """
+    Менеджери з продажу (interface_type='accountant') знову отримують ліди
+
+    0009 дала вагу лише ролі 'manager', тож на наявних даних ніхто не
+    проходив фільтр weight > 0 і нові ліди лишались без менеджера.
+    """
+    CustomUser = apps.get_model('backend', 'CustomUser')
+    ManagerLoad = apps.get_model('backend', 'ManagerLoad')
+
+    weights = {'accountant': 1.0, 'manager': 1.0, **getattr(settings, 'LEAD_ROLE_WEIGHTS', {})}
+    for role, weight in weights.items():
+        user_ids = CustomUser.objects.filter(interface_type=role).values('user_id')
+        ManagerLoad.objects.filter(manager_id__in=user_ids).update(weight=float(weight))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0015_email_last_error'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_role_weights, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,69 @@
 import os
-import re
 from datetime import timedelta, datetime
 from decimal import Decimal
 
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models import Sum
+from django.db.models import Sum, Q, Count, Min, Max
 
 from django.utils.timezone import now
 
+from backend.utils.phones import canonical_phone, phone_keys, PhoneKeyManager
+from backend.services.bulk_mode import bump_data_version
+
+class FieldTrackerMixin:
+    """
+    🔍 Відстеження змін полів без повторного SELECT
+
+    Значення, з якими екземпляр прочитано з БД, запам'ятовуються у from_db
+    і оновлюються після save() / refresh_from_db(), тому has_changed() /
+    previous() нічого не запитують. Лише відкладене поле (only/defer)
+    дочитується одним запитом при першому зверненні.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return instance
+
+    def _tracked_attname(self, field_name):
+        return self._meta.get_field(field_name).attname
+
+    def previous(self, field_name):
+        """Значення поля на момент читання з БД (None для нового об'єкта)"""
+        if self._state.adding:
+            return None
+        attname = self._tracked_attname(field_name)
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        if attname not in loaded and self.pk is not None:
+            loaded.update(type(self)._base_manager.filter(pk=self.pk).values(attname).first() or {})
+        return loaded.get(attname)
+
+    def has_changed(self, field_name):
+        """Чи відрізняється поточне значення від збереженого (новий об'єкт — завжди так)"""
+        if self._state.adding:
+            return True
+        return self.previous(field_name) != getattr(self, self._tracked_attname(field_name))
+
+    def _reset_tracking(self, field_names=None):
+        deferred = self.get_deferred_fields()
+        fields = self._meta.concrete_fields if field_names is None else \
+            [self._meta.get_field(name) for name in field_names]
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        loaded.update({field.attname: getattr(self, field.attname) for field in fields if field.attname not in deferred})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._reset_tracking(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._reset_tracking(fields)
+
+
 def lead_file_upload_path(instance, filename):
     ext = filename.split('.')[-1]
     filename = f"{now().strftime('%Y%m%d%H%M%S%f')}.{ext}"
@@ -39,6 +94,72 @@ class CustomUser(models.Model):
             models.Index(fields=['interface_type']),
             models.Index(fields=['user', 'interface_type']),
         ]
+class ManagerLoad(models.Model):
+    """
+    📊 Індекс доступності менеджера: лічильники активних лідів і черги
+
+    Підтримується сигналами при зміні статусу / менеджера ліда
+    (backend/services/manager_availability.py), тому вибір вільного
+    менеджера — один запит по індексу, без exists() на кожного користувача.
+    """
+    manager = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='lead_load', verbose_name="Менеджер")
+    active_count = models.PositiveIntegerField(default=0, verbose_name="Лідів в роботі")
+    queued_count = models.PositiveIntegerField(default=0, verbose_name="Лідів у черзі")
+    weight = models.FloatField(default=1.0, verbose_name="Вага (з ролі)")
+    last_assigned_at = models.DateTimeField(null=True, blank=True, verbose_name="Останнє призначення")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
+
+    def __str__(self):
+        return f"{self.manager.username}: в роботі {self.active_count}, у черзі {self.queued_count}"
+
+    class Meta:
+        verbose_name = "Навантаження менеджера"
+        verbose_name_plural = "Навантаження менеджерів"
+        indexes = [
+            models.Index(fields=['weight', 'active_count', 'manager']),
+            models.Index(fields=['active_count', 'last_assigned_at']),
+        ]
+
+
+class LeadRoutingRule(models.Model):
+    """
+    🧭 Правило маршрутизації нового ліда
+
+    Порожнє поле умови — "будь-яке значення". Правила перевіряються за
+    пріоритетом (менше — раніше); перше правило, для якого знайшовся
+    менеджер, перемагає. Компілюються в таблицю рішень у пам'яті
+    (backend/services/lead_routing.py), тому в БД при створенні ліда не ходимо.
+    """
+    name = models.CharField(max_length=100, verbose_name="Назва")
+    priority = models.PositiveIntegerField(default=100, verbose_name="Пріоритет (менше — раніше)")
+    is_active = models.BooleanField(default=True, verbose_name="Активне")
+
+    source = models.CharField(max_length=100, blank=True, verbose_name="Джерело")
+    city = models.CharField(max_length=100, blank=True, verbose_name="Місто")
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Ціна від")
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                    verbose_name="Ціна до (не включно)")
+
+    managers = models.ManyToManyField(User, blank=True, related_name='routing_rules',
+                                      verbose_name="Менеджери (порожньо — всі доступні)")
+    strategy = models.CharField(max_length=30, blank=True,
+                                verbose_name="Стратегія (порожньо — LEAD_ASSIGNMENT_STRATEGY)")
+    max_load = models.PositiveIntegerField(null=True, blank=True,
+                                           verbose_name="Макс. лідів в роботі + у черзі")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.priority}: {self.name}"
+
+    class Meta:
+        verbose_name = "Правило маршрутизації"
+        verbose_name_plural = "Правила маршрутизації"
+        ordering = ['priority', 'id']
+
+
 class LeadFile(models.Model):
     lead = models.ForeignKey("Lead", related_name="uploaded_files", on_delete=models.CASCADE)
     file = models.FileField(upload_to=lead_file_upload_path)
@@ -53,7 +174,7 @@ class LeadFile(models.Model):
 
 
 
-class Lead(models.Model):
+class Lead(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = [
         ('queued', 'У черзі'),
         ('in_work', 'Обробляється менеджером'),
@@ -80,7 +201,6 @@ class Lead(models.Model):
     delivery_number = models.CharField(max_length=100, blank=True, verbose_name="ТТН")
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='queued', verbose_name="Статус")
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Призначено")
-    queued_position = models.PositiveIntegerField(null=True, blank=True, verbose_name="Позиція в черзі")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Створено")
     status_updated_at = models.DateTimeField(null=True, blank=True)
     actual_cash = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -90,9 +210,28 @@ class Lead(models.Model):
     postal_code = models.CharField(max_length=20, blank=True, null=True)
     street = models.CharField(max_length=255, blank=True, null=True)
 
+    # 📞 Канонічний ключ телефону для індексованих пошуків (див. backend/utils/phones.py)
+    phone_key = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True)
+    phone_key_rev = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True)
+
+    objects = PhoneKeyManager()
+
     def __str__(self):
         return f"{self.full_name} — {self.price} грн ({self.get_status_display()})"
 
+    def save(self, *args, **kwargs):
+        self.phone_key, self.phone_key_rev = phone_keys(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'phone_key', 'phone_key_rev'}
+
+        # 🔄 Час зміни статусу — за знімком з from_db, без SELECT старого рядка
+        if not self._state.adding and self.has_changed('status'):
+            self.status_updated_at = now()
+            if update_fields is not None and 'status' in update_fields:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'status_updated_at'}
+        super().save(*args, **kwargs)
+
     @property
     def manager_reward(self):
         return round(self.price * 0.03, 2) if self.price else 0
@@ -123,10 +262,25 @@ class Lead(models.Model):
             models.Index(fields=['phone', 'status']),
             models.Index(fields=['created_at', 'assigned_to']),
             models.Index(fields=['status', 'price']),
+            # 🔎 Блок для пошуку майже-дублікатів (backend/services/dedupe_service.py)
+            models.Index(fields=['phone_key', 'created_at']),
+        ]
+        constraints = [
+            # 🛡️ Унікальні тільки непорожні номери — порожні значення не конфліктують
+            models.UniqueConstraint(
+                fields=['order_number'],
+                condition=Q(order_number__isnull=False) & ~Q(order_number=''),
+                name='uniq_lead_order_number',
+            ),
+            models.UniqueConstraint(
+                fields=['delivery_number'],
+                condition=~Q(delivery_number=''),
+                name='uniq_lead_delivery_number',
+            ),
         ]
 
 
-class Client(models.Model):
+class Client(FieldTrackerMixin, models.Model):
     CLIENT_TYPE_CHOICES = [
         ('individual', 'Фізична особа'),
         ('company', 'Компанія'),
@@ -215,34 +369,74 @@ class Client(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Створено")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
 
-    def save(self, *args, **kwargs):
+    # 📞 Канонічний ключ телефону для індексованих пошуків (див. backend/utils/phones.py)
+    phone_key = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True)
+    phone_key_rev = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True)
+
+    objects = PhoneKeyManager()
+
+    # Поля, від яких залежать метрики: ліди й оплати клієнта шукаються за телефоном.
+    # Нотатки, менеджер, рейтинг тощо на метрики не впливають — перерахунок не потрібен.
+    METRIC_SOURCE_FIELDS = ('phone',)
+
+    def metrics_stale(self, update_fields=None):
+        """Чи потрібен перерахунок метрик при збереженні (новий клієнт або змінився телефон)"""
+        if self._state.adding:
+            return True
+        fields = self.METRIC_SOURCE_FIELDS if update_fields is None else \
+            [name for name in self.METRIC_SOURCE_FIELDS if name in update_fields]
+        return any(self.has_changed(name) for name in fields)
+
+    def save(self, *args, recompute_metrics=None, **kwargs):
+        """
+        recompute_metrics:
+            None    — перерахунок, лише якщо змінились METRIC_SOURCE_FIELDS
+            True    — завжди перерахувати
+            False   — не перераховувати
+            'defer' — позначка DirtyClient, пакетний перерахунок після вікна злиття
+                      (backend/services/metrics_coalescer.py)
+        """
         self.phone = self.normalize_phone(self.phone)
+        self.phone_key, self.phone_key_rev = phone_keys(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'phone_key', 'phone_key_rev'}
+        if recompute_metrics is None:
+            recompute_metrics = self.metrics_stale(update_fields)
         super().save(*args, **kwargs)
-        # Після збереження автоматично оновлюємо метрики
+        if not recompute_metrics:
+            return
+
+        # В bulk_mode — один перерахунок на всіх клієнтів при виході
+        from backend.services.bulk_mode import current_changes
+        changes = current_changes()
+        if changes is not None:
+            changes.client_ids.add(self.pk)
+            return
+        if recompute_metrics == 'defer':
+            from backend.services.crm_jobs import enqueue_client_metrics
+            enqueue_client_metrics(self.phone)
+            return
         self.update_client_metrics()
 
     @staticmethod
     def normalize_phone(phone: str) -> str:
-        digits = re.sub(r'\D', '', phone)
-        if digits.startswith("0"):
-            digits = "38" + digits
-        elif not digits.startswith("38") and len(digits) == 10:
-            digits = "38" + digits
-        return digits
+        return canonical_phone(phone)
 
     def update_client_metrics(self):
         """🔥 АВТОМАТИЧНЕ ОНОВЛЕННЯ ВСІХ МЕТРИК КЛІЄНТА"""
-
+        # Ключ рахуємо з phone — не залежимо від того, чи вже заповнене поле phone_key
+        phone_key = canonical_phone(self.phone)
 
         # Рахуємо статистику по завершених лідах
         completed_leads = Lead.objects.filter(
-            phone=self.phone,
+            phone_key=phone_key,
             status='completed'
         )
 
         # Фінансові метрики
         payments = LeadPaymentOperation.objects.filter(
-            lead__phone=self.phone,
+            lead__phone_key=phone_key,
             operation_type='received'
         )
 
@@ -284,12 +478,68 @@ class Client(models.Model):
             rfm_monetary=self.rfm_monetary,
             rfm_score=self.rfm_score,
         )
+        self._reset_tracking(self.METRIC_FIELDS)
+        bump_data_version('clients')
 
-    def calculate_temperature(self) -> str:
+    METRIC_FIELDS = (
+        'total_spent', 'total_orders', 'avg_check', 'first_purchase_date', 'last_purchase_date',
+        'temperature', 'akb_segment', 'rfm_recency', 'rfm_frequency', 'rfm_monetary', 'rfm_score',
+    )
+
+    @classmethod
+    def bulk_update_metrics(cls, clients, batch_size=500):
+        """
+        📈 update_client_metrics() для багатьох клієнтів одразу
+
+        Три GROUP BY по phone_key (покупки, оплати, кількість лідів) і один
+        bulk_update замість ~6 запитів на кожного клієнта. Поля клієнтів
+        оновлюються на місці; повертає список клієнтів.
+        """
+        clients = list(clients)
+        keys = {canonical_phone(client.phone) for client in clients}
+        keys.discard('')
+
+        purchases, spent, leads_count = {}, {}, {}
+        key_list = list(keys)
+        for i in range(0, len(key_list), batch_size):
+            chunk = key_list[i:i + batch_size]
+            purchases.update(
+                (row['phone_key'], row)
+                for row in Lead.objects.filter(phone_key__in=chunk, status='completed')
+                .values('phone_key').annotate(orders=Count('id'), first=Min('created_at'), last=Max('created_at'))
+            )
+            spent.update(
+                LeadPaymentOperation.objects.filter(lead__phone_key__in=chunk, operation_type='received')
+                .values('lead__phone_key').annotate(total=Sum('amount')).values_list('lead__phone_key', 'total')
+            )
+            leads_count.update(
+                Lead.objects.filter(phone_key__in=chunk).values('phone_key').annotate(total=Count('id'))
+                .values_list('phone_key', 'total')
+            )
+
+        for client in clients:
+            phone_key = canonical_phone(client.phone)
+            row = purchases.get(phone_key, {})
+            client.total_spent = spent.get(phone_key) or Decimal('0')
+            client.total_orders = row.get('orders', 0)
+            client.avg_check = client.total_spent / client.total_orders if client.total_orders else Decimal('0')
+            client.first_purchase_date = row.get('first')
+            client.last_purchase_date = row.get('last')
+            client.temperature = client.calculate_temperature(leads_count=leads_count.get(phone_key, 0))
+            client.akb_segment = client.calculate_akb_segment()
+            client.calculate_rfm_metrics()
+
+        cls.objects.bulk_update(clients, cls.METRIC_FIELDS, batch_size=batch_size)
+        for client in clients:
+            client._reset_tracking(cls.METRIC_FIELDS)
+        return clients
+
+    def calculate_temperature(self, leads_count=None) -> str:
         """🌡️ АВТОМАТИЧНЕ ВИЗНАЧЕННЯ ТЕМПЕРАТУРИ ЛІДА"""
         if self.total_orders == 0:
             # Перевіряємо чи були спроби контакту
-            leads_count = Lead.objects.filter(phone=self.phone).count()
+            if leads_count is None:
+                leads_count = Lead.objects.filter(phone_key=canonical_phone(self.phone)).count()
             if leads_count == 0:
                 return 'cold'  # Новий контакт
             elif leads_count == 1:
@@ -498,6 +748,15 @@ class EmailIntegrationSettings(models.Model):
     allowed_subject_keyword = models.CharField(max_length=100, blank=True, verbose_name="Ключове слово в темі")
     check_interval = models.PositiveIntegerField(default=30, verbose_name="Інтервал перевірки (сек)")
 
+    # 📍 Водяний знак інкрементальної синхронізації (backend/services/mail_lead_importer.py):
+    # UID у папці зростають, тому наступний прохід забирає лише UID > last_uid.
+    # Якщо сервер змінив UIDVALIDITY — UID перенумеровано, синхронізація з нуля.
+    uid_validity = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name="UIDVALIDITY")
+    last_uid = models.BigIntegerField(default=0, editable=False, verbose_name="Останній UID")
+    last_synced_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Остання синхронізація")
+    # Помилка останнього проходу опитувача (backend/services/mail_poller.py); порожньо — все гаразд
+    last_error = models.TextField(blank=True, default='', editable=False, verbose_name="Остання помилка")
+
     def __str__(self):
         return f"{self.name} ({self.email})"
 
@@ -580,3 +839,120 @@ class ClientTask(models.Model):
         verbose_name = "Задача по клієнту"
         verbose_name_plural = "Задачі по клієнтах"
         ordering = ['due_date', '-priority']
+
+
+# ⚙️ ФОНОВІ ЗАДАЧІ (backend/services/job_queue.py)
+class BackgroundJob(models.Model):
+    """
+    Задача для фонового воркера (python manage.py run_jobs)
+
+    Створюється в тій самій транзакції, що й зміна, яка її породила, —
+    якщо транзакцію відкочено, задачі теж немає; якщо процес впав після
+    коміту, задача лишається в таблиці й буде виконана.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Очікує'),
+        ('running', 'Виконується'),
+        ('done', 'Виконано'),
+    ]
+
+    job_type = models.CharField(max_length=100, verbose_name="Тип")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Дані")
+    # Ключ злиття: поки задача з тим самим (тип, ключ) очікує — нова не створюється
+    dedupe_key = models.CharField(max_length=200, blank=True, default='', verbose_name="Ключ злиття")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Статус")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Спроб")
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name="Макс. спроб")
+    run_after = models.DateTimeField(default=now, verbose_name="Не раніше")
+    locked_by = models.CharField(max_length=100, blank=True, default='', verbose_name="Воркер")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='', verbose_name="Остання помилка")
+    created_at = models.DateTimeField(default=now, verbose_name="Створено")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Почато")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершено")
+
+    def __str__(self):
+        return f"#{self.pk} {self.job_type} ({self.status})"
+
+    class Meta:
+        verbose_name = "Фонова задача"
+        verbose_name_plural = "Фонові задачі"
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['job_type', 'dedupe_key', 'status']),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+
+
+class DeadLetterJob(models.Model):
+    """☠️ Задача, що вичерпала спроби — для розбору та повторного запуску з адмінки"""
+    job_type = models.CharField(max_length=100, verbose_name="Тип")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Дані")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Спроб")
+    last_error = models.TextField(blank=True, default='', verbose_name="Остання помилка")
+    original_job_id = models.BigIntegerField(null=True, blank=True, verbose_name="ID задачі")
+    created_at = models.DateTimeField(verbose_name="Створено")
+    failed_at = models.DateTimeField(default=now, db_index=True, verbose_name="Відмова")
+
+    def __str__(self):
+        return f"☠️ {self.job_type} (#{self.original_job_id})"
+
+    class Meta:
+        verbose_name = "Невиконана задача"
+        verbose_name_plural = "Невиконані задачі"
+        ordering = ['-failed_at']
+
+
+# ⏱️ КЛІЄНТИ, ЩО ЧЕКАЮТЬ ПЕРЕРАХУНКУ МЕТРИК (backend/services/metrics_coalescer.py)
+class DirtyClient(models.Model):
+    """
+    Позначка "метрики клієнта застаріли"
+
+    Один рядок на phone_key: повторні позначки до перерахунку ігноруються,
+    marked_at — час першої, від нього рахується вікно злиття.
+    """
+    phone_key = models.CharField(max_length=20, unique=True, verbose_name="Ключ телефону")
+    marked_at = models.DateTimeField(default=now, db_index=True, verbose_name="Позначено")
+
+    def __str__(self):
+        return f"{self.phone_key} ({self.marked_at:%H:%M:%S})"
+
+    class Meta:
+        verbose_name = "Клієнт до перерахунку"
+        verbose_name_plural = "Клієнти до перерахунку"
+
+
+# 📨 ЖУРНАЛ ОБРОБЛЕНИХ ЛИСТІВ (backend/services/mail_lead_importer.py)
+class ProcessedEmail(models.Model):
+    """
+    Лист, який імпорт уже розглянув — за Message-ID
+
+    Повторна обробка того самого листа (перезапуск, зміна UIDVALIDITY,
+    той самий лист у двох акаунтах) пропускається без розбору тіла.
+    Помилкові листи повторюються, поки не вичерпано MAX_EMAIL_ATTEMPTS.
+    """
+    OUTCOME_CHOICES = [
+        ('lead', 'Створено лід'),
+        ('duplicate', 'Лід уже існує'),
+        ('filtered', 'Не лід'),
+        ('invalid', 'Невірна структура'),
+        ('error', 'Помилка'),
+    ]
+
+    account = models.ForeignKey(EmailIntegrationSettings, on_delete=models.CASCADE,
+                                related_name='processed_emails', verbose_name="Акаунт")
+    message_id = models.CharField(max_length=255, unique=True, verbose_name="Message-ID")
+    uid = models.BigIntegerField(null=True, blank=True, verbose_name="UID")
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, verbose_name="Результат")
+    lead = models.ForeignKey(Lead, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Лід")
+    attempts = models.PositiveSmallIntegerField(default=1, verbose_name="Спроб")
+    error = models.TextField(blank=True, default='', verbose_name="Помилка")
+    processed_at = models.DateTimeField(default=now, db_index=True, verbose_name="Оброблено")
+
+    def __str__(self):
+        return f"{self.message_id} ({self.get_outcome_display()})"
+
+    class Meta:
+        verbose_name = "Оброблений лист"
+        verbose_name_plural = "Оброблені листи"
+        ordering = ['-processed_at']
@@ -1,5 +1,7 @@
 # backend/serializers.py - ОНОВЛЕНИЙ LeadSerializer
 
+import logging
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
 from rest_framework import serializers
@@ -7,7 +9,12 @@ from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from .models import Lead, Client, CustomUser, LeadFile, ClientInteraction, ClientTask
+from .services.dedupe_service import find_duplicate_lead
+from .services.lead_queue import queue_position, queue_positions
 from .validators.lead_status_validator import LeadStatusValidator, validate_lead_status_change
+from .utils.phones import canonical_phone
+
+logger = logging.getLogger('backend.serializers')
 
 
 class LeadFileSerializer(serializers.ModelSerializer):
@@ -16,7 +23,77 @@ class LeadFileSerializer(serializers.ModelSerializer):
         fields = ['id', 'file', 'uploaded_at']
 
 
-class LeadSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    🎯 Sparse fieldsets: ?fields=a,b,c та ?exclude=x,y
+
+    Працює тільки для читання (GET) — при записі серіалізатор завжди
+    має повний набір полів. Meta.default_fields (якщо задано) — набір полів
+    за замовчуванням; решту полів клієнт може явно запросити через ?fields=.
+    Віртуальні поля, які додаються в to_representation, перевіряються
+    через wants_field().
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        exclude = kwargs.pop('exclude', None)
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if request is not None and request.method == 'GET':
+            params = getattr(request, 'query_params', request.GET)
+            if fields is None:
+                fields = self._split_fields(params.get('fields'))
+            if exclude is None:
+                exclude = self._split_fields(params.get('exclude'))
+
+        default_fields = getattr(self.Meta, 'default_fields', None)
+        if fields:
+            # id завжди потрібен клієнту для ключів у списках
+            self._allowed_fields = set(fields) | {'id'}
+        elif default_fields:
+            self._allowed_fields = set(default_fields)
+        else:
+            self._allowed_fields = None
+        self._excluded_fields = set(exclude or [])
+
+        for name in list(self.fields):
+            if not self.wants_field(name):
+                self.fields.pop(name)
+
+    @staticmethod
+    def _split_fields(value):
+        if not value:
+            return None
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def wants_field(self, name):
+        """✅ Чи потрібне поле у відповіді з урахуванням ?fields / ?exclude"""
+        if name in self._excluded_fields:
+            return False
+        if self._allowed_fields is None:
+            return True
+        return name in self._allowed_fields
+
+
+def duplicate_order_number_error(value, existing):
+    """🛡️ Стандартизована помилка DUPLICATE_ORDER_NUMBER (обробляється у views)"""
+    return {
+        'type': 'DUPLICATE_ORDER_NUMBER',
+        'message': f'Номер замовлення {value} вже використовується',
+        'details': {
+            'order_number': value,
+            'existing_lead': {
+                'id': existing.id,
+                'full_name': existing.full_name,
+                'phone': existing.phone,
+                'created_at': existing.created_at
+            }
+        }
+    }
+
+
+class LeadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     assigned_to_username = serializers.CharField(source='assigned_to.username', read_only=True)
     files = serializers.SerializerMethodField(read_only=True)
 
@@ -24,10 +101,14 @@ class LeadSerializer(serializers.ModelSerializer):
     available_statuses = serializers.SerializerMethodField(read_only=True)
     payment_info = serializers.SerializerMethodField(read_only=True)
     next_action = serializers.SerializerMethodField(read_only=True)
+    # 🔢 Позиція в черзі рахується при читанні (порядок created_at, id)
+    queued_position = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Lead
         fields = '__all__'
+        # Унікальність order_number перевіряє validate_order_number (зі стандартизованою помилкою)
+        extra_kwargs = {'order_number': {'validators': []}}
 
     def get_files(self, obj):
         """Отримуємо файли ліда"""
@@ -59,6 +140,17 @@ class LeadSerializer(serializers.ModelSerializer):
                     if hasattr(field, 'allow_blank') and field_name not in ['id']:
                         field.allow_blank = True
 
+    def get_queued_position(self, obj):
+        if obj.status != 'queued':
+            return None
+        if not hasattr(self, '_queue_positions'):
+            # Для списку — одна вибірка черг на всю сторінку
+            page = self.parent.instance if isinstance(self.parent, serializers.ListSerializer) else [obj]
+            self._queue_positions = queue_positions(list(page))
+        if obj.pk not in self._queue_positions:
+            return queue_position(obj)
+        return self._queue_positions[obj.pk]
+
     def get_available_statuses(self, obj):
         """Доступні статуси для переходу"""
         if obj and obj.status:
@@ -96,7 +188,7 @@ class LeadSerializer(serializers.ModelSerializer):
         if current_status == value:
             return value
 
-        print(f"🔍 ВАЛІДАЦІЯ СТАТУСУ: {current_status} → {value}")
+        logger.debug("🔍 ВАЛІДАЦІЯ СТАТУСУ: %s → %s", current_status, value)
 
         # Використовуємо валідатор
         can_transition, reason = LeadStatusValidator.can_transition(
@@ -104,7 +196,7 @@ class LeadSerializer(serializers.ModelSerializer):
         )
 
         if not can_transition:
-            print(f"❌ ВАЛІДАЦІЯ НЕ ПРОЙШЛА: {reason}")
+            logger.warning("❌ ВАЛІДАЦІЯ НЕ ПРОЙШЛА: %s", reason)
 
             # 🔥 ЗБЕРІГАЄМО ДЕТАЛЬНУ ІНФОРМАЦІЮ ДЛЯ VIEW
             self._status_transition_error = {
@@ -118,7 +210,7 @@ class LeadSerializer(serializers.ModelSerializer):
             # Кидаємо спеціальний маркер
             raise serializers.ValidationError("STATUS_TRANSITION_ERROR")
 
-        print(f"✅ ВАЛІДАЦІЯ СТАТУСУ ПРОЙШЛА")
+        logger.debug("✅ ВАЛІДАЦІЯ СТАТУСУ ПРОЙШЛА")
         return value
 
     def validate_phone(self, value):
@@ -126,56 +218,25 @@ class LeadSerializer(serializers.ModelSerializer):
         if value:
             # Просто нормалізуємо телефон
             normalized_phone = Client.normalize_phone(value)
-            print(f"📞 Нормалізація телефону: {value} → {normalized_phone}")
+            logger.debug("📞 Нормалізація телефону: %s → %s", value, normalized_phone)
             return normalized_phone
         return value
 
     def validate_order_number(self, value):
         """🔥 ВИПРАВЛЕНА ВАЛІДАЦІЯ НОМЕРА ЗАМОВЛЕННЯ - тільки дублікати номерів"""
         if value:
-            print(f"🔢 Перевірка номера замовлення: {value}")
-
-            # Для оновлення - виключаємо поточний лід
-            if self.instance:
-                existing = Lead.objects.filter(
-                    order_number=value
-                ).exclude(id=self.instance.id).first()
-
-                if existing:
-                    print(f"❌ Номер замовлення {value} вже використовується в ліді #{existing.id}")
-                    raise serializers.ValidationError({
-                        'type': 'DUPLICATE_ORDER_NUMBER',
-                        'message': f'Номер замовлення {value} вже використовується',
-                        'details': {
-                            'order_number': value,
-                            'existing_lead': {
-                                'id': existing.id,
-                                'full_name': existing.full_name,
-                                'phone': existing.phone,
-                                'created_at': existing.created_at
-                            }
-                        }
-                    })
-            else:
-                # Для створення
-                existing = Lead.objects.filter(order_number=value).first()
-                if existing:
-                    print(f"❌ Номер замовлення {value} вже використовується в ліді #{existing.id}")
-                    raise serializers.ValidationError({
-                        'type': 'DUPLICATE_ORDER_NUMBER',
-                        'message': f'Номер замовлення {value} вже використовується',
-                        'details': {
-                            'order_number': value,
-                            'existing_lead': {
-                                'id': existing.id,
-                                'full_name': existing.full_name,
-                                'phone': existing.phone,
-                                'created_at': existing.created_at
-                            }
-                        }
-                    })
-
-            print(f"✅ Номер замовлення {value} вільний")
+            logger.debug("🔢 Перевірка номера замовлення: %s", value)
+
+            # Для оновлення - виключаємо поточний лід (пошук по унікальному індексу)
+            _, existing = find_duplicate_lead(
+                order_number=value,
+                exclude_id=self.instance.id if self.instance else None
+            )
+            if existing:
+                logger.warning("❌ Номер замовлення %s вже використовується в ліді #%s", value, existing.id)
+                raise serializers.ValidationError(duplicate_order_number_error(value, existing))
+
+            logger.debug("✅ Номер замовлення %s вільний", value)
 
         return value
 
@@ -197,13 +258,12 @@ class LeadSerializer(serializers.ModelSerializer):
 
         # Якщо це часткове оновлення
         if self.instance and self.partial:
-            print(f"📝 ЧАСТКОВЕ ОНОВЛЕННЯ ліда #{self.instance.id}")
-            print(f"   Поля для оновлення: {list(attrs.keys())}")
+            logger.debug("📝 ЧАСТКОВЕ ОНОВЛЕННЯ ліда #%s, поля: %s", self.instance.id, list(attrs))
 
             # Перевіряємо тільки передані поля
             if 'status' in attrs:
                 new_status = attrs['status']
-                print(f"   Зміна статусу на: {new_status}")
+                logger.debug("   Зміна статусу на: %s", new_status)
 
                 # Спеціальна перевірка для completed
                 if new_status == 'completed':
@@ -229,7 +289,7 @@ class LeadSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """🔥 ВИПРАВЛЕНИЙ МЕТОД CREATE - автоматичне знаходження клієнта"""
-        print(f"📝 СТВОРЕННЯ ЛІДА: {validated_data}")
+        logger.debug("📝 СТВОРЕННЯ ЛІДА: %s", validated_data)
 
         phone = validated_data.get('phone')
         full_name = validated_data.get('full_name')
@@ -248,19 +308,19 @@ class LeadSerializer(serializers.ModelSerializer):
             )
 
             if created:
-                print(f"✅ Створено нового клієнта: {client.full_name} ({client.phone})")
+                logger.debug("✅ Створено нового клієнта: %s (%s)", client.full_name, client.phone)
             else:
-                print(f"✅ Знайдено існуючого клієнта: {client.full_name} ({client.phone})")
+                logger.debug("✅ Знайдено існуючого клієнта: %s (%s)", client.full_name, client.phone)
 
                 # Оновлюємо ім'я клієнта якщо воно порожнє або відрізняється
                 if full_name and (not client.full_name or client.full_name == 'Клієнт'):
                     client.full_name = full_name
                     client.save()
-                    print(f"   Оновлено ім'я клієнта на: {full_name}")
+                    logger.debug("   Оновлено ім'я клієнта на: %s", full_name)
 
         # Створюємо лід
         lead = super().create(validated_data)
-        print(f"✅ Лід #{lead.id} створено успішно")
+        logger.debug("✅ Лід #%s створено успішно", lead.id)
 
         return lead
 
@@ -273,10 +333,10 @@ class LeadSerializer(serializers.ModelSerializer):
         new_status = validated_data.get('status', old_status)
         new_price = validated_data.get('price', old_price)
 
-        print(f"📝 СЕРІАЛІЗАТОР UPDATE: Лід #{instance.pk}")
-        print(f"   Статус: {old_status} → {new_status}")
-        print(f"   Ціна: {old_price} → {new_price}")
-        print(f"   Оновлювані поля: {list(validated_data.keys())}")
+        logger.debug(
+            "📝 СЕРІАЛІЗАТОР UPDATE: Лід #%s, статус %s → %s, ціна %s → %s, поля: %s",
+            instance.pk, old_status, new_status, old_price, new_price, list(validated_data)
+        )
 
         # Виконуємо стандартне оновлення
         updated_instance = super().update(instance, validated_data)
@@ -293,9 +353,9 @@ class LeadSerializer(serializers.ModelSerializer):
             changes.append(f"менеджер: {old_assigned} → {new_assigned}")
 
         if changes:
-            print(f"✅ ЗМІНИ В ЛІДІ #{updated_instance.pk}: {', '.join(changes)}")
+            logger.debug("✅ ЗМІНИ В ЛІДІ #%s: %s", updated_instance.pk, ', '.join(changes))
         else:
-            print(f"ℹ️  Лід #{updated_instance.pk} оновлено без ключових змін")
+            logger.debug("ℹ️  Лід #%s оновлено без ключових змін", updated_instance.pk)
 
         return updated_instance
 
@@ -304,9 +364,9 @@ class LeadSerializer(serializers.ModelSerializer):
         data = super().to_representation(instance)
 
         # Додаємо інформацію про клієнта
-        if instance.phone:
+        if instance.phone and self.wants_field('client_info'):
             try:
-                client = Client.objects.filter(phone=instance.phone).first()
+                client = Client.objects.filter(phone_key=canonical_phone(instance.phone)).first()
                 if client:
                     data['client_info'] = {
                         'id': client.id,
@@ -322,6 +382,31 @@ class LeadSerializer(serializers.ModelSerializer):
         return data
 
 
+class LeadListSerializer(LeadSerializer):
+    """
+    📋 Компактний серіалізатор для канбану та таблиць
+
+    За замовчуванням тільки ~10 колонок без обчислюваних полів
+    (files, available_statuses, payment_info, next_action, client_info) —
+    їх можна явно запросити через ?fields=...,payment_info
+    """
+
+    class Meta(LeadSerializer.Meta):
+        fields = [
+            'id', 'full_name', 'phone', 'status', 'price',
+            'assigned_to', 'assigned_to_username', 'order_number',
+            'created_at', 'status_updated_at',
+
+            # Обчислювані — тільки на вимогу
+            'files', 'available_statuses', 'payment_info', 'next_action',
+        ]
+        default_fields = [
+            'id', 'full_name', 'phone', 'status', 'price',
+            'assigned_to', 'assigned_to_username', 'order_number',
+            'created_at', 'status_updated_at',
+        ]
+
+
 
 # Всі інші серіалізатори залишаються без змін...
 class ClientSerializer(serializers.ModelSerializer):
@@ -408,12 +493,13 @@ class ExternalLeadSerializer(serializers.ModelSerializer):
             'assigned_to',
             'order_number',
         ]
+        extra_kwargs = {'order_number': {'validators': []}}
 
     def validate_phone(self, value):
         """🔥 ТІЛЬКИ НОРМАЛІЗАЦІЯ телефону - БЕЗ перевірки дублікатів"""
         if value:
             normalized = Client.normalize_phone(value)
-            print(f"📞 API: Нормалізація {value} → {normalized}")
+            logger.debug("📞 API: Нормалізація %s → %s", value, normalized)
             return normalized
         return value
 
@@ -422,24 +508,12 @@ class ExternalLeadSerializer(serializers.ModelSerializer):
         if not value:
             return value
 
-        existing = Lead.objects.filter(order_number=value).first()
+        _, existing = find_duplicate_lead(order_number=value)
         if existing:
-            print(f"❌ API: Номер замовлення {value} вже є в ліді #{existing.id}")
-            raise serializers.ValidationError({
-                'type': 'DUPLICATE_ORDER_NUMBER',
-                'message': f'Номер замовлення {value} вже використовується',
-                'details': {
-                    'order_number': value,
-                    'existing_lead': {
-                        'id': existing.id,
-                        'full_name': existing.full_name,
-                        'phone': existing.phone,
-                        'created_at': existing.created_at
-                    }
-                }
-            })
+            logger.warning("❌ API: Номер замовлення %s вже є в ліді #%s", value, existing.id)
+            raise serializers.ValidationError(duplicate_order_number_error(value, existing))
 
-        print(f"✅ API: Номер замовлення {value} вільний")
+        logger.debug("✅ API: Номер замовлення %s вільний", value)
         return value
 
     def create(self, validated_data):
@@ -461,9 +535,9 @@ class ExternalLeadSerializer(serializers.ModelSerializer):
             )
 
             if created:
-                print(f"✅ API: Створено клієнта {client.full_name}")
+                logger.debug("✅ API: Створено клієнта %s", client.full_name)
             else:
-                print(f"✅ API: Знайдено клієнта {client.full_name}")
+                logger.debug("✅ API: Знайдено клієнта %s", client.full_name)
 
                 # Оновлюємо ім'я якщо потрібно
                 if full_name and (not client.full_name or client.full_name == 'Клієнт'):
@@ -738,7 +812,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
                 stats["performance_score"] = min(weekly_total * 5, 100)
 
             except Exception as e:
-                print(f"❌ Помилка статистики для {user.username}: {e}")
+                logger.exception("❌ Помилка статистики для %s: %s", user.username, e)
 
         return stats
 
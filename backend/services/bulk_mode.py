@@ -0,0 +1,190 @@
+# backend/services/bulk_mode.py
+"""
+📦 Режим масових операцій
+
+    with bulk_mode():
+        for row in rows:
+            Lead.objects.create(...)
+
+    @bulk_mode()
+    def handle(self, *args, **options): ...
+
+Всередині bulk_mode сигнали не виконують дорогі побічні дії на кожен
+рядок (cache.clear(), перерахунок метрик клієнта, bump версій даних,
+WebSocket-сповіщення), а лише записують id зачеплених лідів, клієнтів
+і менеджерів. При виході — один пакетний перерахунок:
+
+- метрики клієнтів — Client.bulk_update_metrics (кілька GROUP BY)
+- лічильники ManagerLoad зачеплених менеджерів — точний перерахунок
+- кеш — один cache.clear() і один bump кожної версії даних
+- одне сповіщення на менеджера зі списком нових лідів
+
+Те, що потрібно для коректності кожного рядка (лічильники ManagerLoad
+в транзакції, черга лідів, фонові задачі), працює як і раніше.
+Вкладені bulk_mode зливаються в зовнішній. Якщо вихід стався всередині
+транзакції — перерахунок виконується після її коміту.
+"""
+
+import logging
+import threading
+from contextlib import ContextDecorator
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+logger = logging.getLogger('backend.bulk_mode')
+
+_local = threading.local()
+
+
+@dataclass
+class BulkChanges:
+    """Що зачепили сигнали за час bulk_mode"""
+    lead_ids: set = field(default_factory=set)
+    client_ids: set = field(default_factory=set)
+    phone_keys: set = field(default_factory=set)
+    manager_ids: set = field(default_factory=set)
+    created_lead_ids: list = field(default_factory=list)
+    data_scopes: set = field(default_factory=set)
+    cache_dirty: bool = False
+
+    def __bool__(self):
+        return bool(
+            self.lead_ids or self.client_ids or self.phone_keys or self.manager_ids
+            or self.created_lead_ids or self.data_scopes or self.cache_dirty
+        )
+
+
+@dataclass
+class BulkResult:
+    clients: int = 0
+    managers: int = 0
+    notified: int = 0
+    scopes: tuple = ()
+
+
+def current_changes():
+    """BulkChanges активного bulk_mode цього потоку або None"""
+    return getattr(_local, 'changes', None)
+
+
+class bulk_mode(ContextDecorator):
+    """Контекстний менеджер і декоратор; notify=False — без WebSocket-сповіщень"""
+
+    def __init__(self, notify=True, label=''):
+        self.notify = notify
+        self.label = label
+        self.result = None
+
+    def _recreate_cm(self):
+        # Декоратор: кожен виклик — окремий екземпляр (рекурсія, потоки)
+        return type(self)(notify=self.notify, label=self.label)
+
+    def __enter__(self):
+        self._outer = current_changes()
+        if self._outer is None:
+            _local.changes = BulkChanges()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._outer is not None:
+            return False
+
+        changes, _local.changes = _local.changes, None
+        if not changes:
+            return False
+
+        # Рядки, збережені до помилки, вже в БД (або відкотяться разом з транзакцією)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._flush(changes))
+        else:
+            self._flush(changes)
+        return False
+
+    def _flush(self, changes):
+        try:
+            self.result = flush_changes(changes, notify=self.notify)
+        except Exception as e:
+            logger.exception("❌ Помилка пакетного перерахунку bulk_mode %s: %s", self.label, e)
+            return
+
+        result = self.result
+        logger.info(
+            "📦 bulk_mode %s: клієнтів перераховано %s, менеджерів %s, сповіщено про %s лідів",
+            self.label, result.clients, result.managers, result.notified
+        )
+
+
+def flush_changes(changes, notify=True):
+    """🔁 Один пакетний перерахунок за зібраними змінами"""
+    from django.core.cache import cache
+    from backend.models import Client, Lead
+    from backend.services.cache_service import CacheService
+    from backend.services.manager_availability import refresh_manager_load
+    from backend.ws_notify import notify_leads_created
+
+    result = BulkResult()
+
+    # 👤 Метрики клієнтів (ліди та платежі знаходять клієнта за phone_key)
+    phone_keys = set(changes.phone_keys)
+    if changes.lead_ids:
+        phone_keys |= set(Lead.objects.filter(id__in=changes.lead_ids).values_list('phone_key', flat=True))
+    phone_keys.discard('')
+    clients = Client.objects.filter(id__in=changes.client_ids) if changes.client_ids else Client.objects.none()
+    if phone_keys:
+        clients = clients | Client.objects.filter(phone_key__in=phone_keys)
+    result.clients = len(Client.bulk_update_metrics(clients))
+
+    # 👥 Лічильники ManagerLoad — точний перерахунок зачеплених менеджерів
+    for manager_id in changes.manager_ids:
+        refresh_manager_load(manager_id)
+    result.managers = len(changes.manager_ids)
+
+    # 🗑️ Кеш
+    if changes.cache_dirty:
+        cache.clear()
+    scopes = set(changes.data_scopes) | ({'clients'} if result.clients else set())
+    if scopes:
+        CacheService.bump_data_version(*sorted(scopes))
+    result.scopes = tuple(sorted(scopes))
+
+    # 🔔 Одне сповіщення на менеджера
+    if notify and changes.created_lead_ids:
+        leads = Lead.objects.filter(id__in=changes.created_lead_ids, assigned_to__isnull=False)
+        result.notified = notify_leads_created(leads)
+
+    return result
+
+
+# 🔌 ДЛЯ СИГНАЛІВ — діють одразу або відкладаються до виходу з bulk_mode
+
+def clear_cache():
+    changes = current_changes()
+    if changes is not None:
+        changes.cache_dirty = True
+        return
+    from django.core.cache import cache
+    cache.clear()
+
+
+def bump_data_version(*scopes):
+    """
+    Нова версія даних — після коміту поточної транзакції: bump до коміту
+    дав би паралельному читачу закешувати старі дані під новою версією
+    """
+    changes = current_changes()
+    if changes is not None:
+        changes.data_scopes.update(scopes)
+        return
+    from backend.services.cache_service import CacheService
+    transaction.on_commit(lambda: CacheService.bump_data_version(*scopes))
+
+
+def record_lead(lead, *manager_ids):
+    """Лід (і менеджери) зачеплені — для перерахунку при виході; False поза bulk_mode"""
+    changes = current_changes()
+    if changes is None:
+        return False
+    changes.lead_ids.add(lead.pk)
+    changes.manager_ids.update(manager_id for manager_id in manager_ids if manager_id)
+    return True
@@ -11,6 +11,7 @@ from typing import Optional, List, Dict, Any
 import logging
 import json
 import hashlib
+import time
 
 logger = logging.getLogger('backend.cache_service')
 
@@ -287,6 +288,62 @@ class CacheService:
             logger.error(f"Помилка отримання статистики кешу: {e}")
             return {'error': str(e)}
 
+    # 🔢 ВЕРСІЇ ДАНИХ — для ключів кешу, які "старіють" самі при будь-якій зміні
+
+    DATA_VERSION_TIMEOUT = None  # версія живе безстроково
+
+    @classmethod
+    def _data_version_key(cls, scope: str) -> str:
+        return cls.get_cache_key('ver', scope)
+
+    @classmethod
+    def get_data_version(cls, scope: str) -> int:
+        """
+        Поточна версія даних для scope ('leads', 'clients', 'payments')
+
+        Якщо версію витіснено з кешу (або кеш очищено) — стартуємо з
+        часової мітки, щоб не повторити жодну з попередніх версій.
+        """
+        key = cls._data_version_key(scope)
+        version = cache.get(key)
+        if version is None:
+            version = time.time_ns()
+            cache.add(key, version, cls.DATA_VERSION_TIMEOUT)
+            version = cache.get(key, version)
+        return version
+
+    @classmethod
+    def bump_data_version(cls, *scopes: str) -> None:
+        """🔄 Інвалідує всі ключі, побудовані на версії scope"""
+        for scope in scopes:
+            key = cls._data_version_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Ключа немає — нова версія з часової мітки
+                cache.set(key, time.time_ns(), cls.DATA_VERSION_TIMEOUT)
+
+    @classmethod
+    def get_versioned_data(cls, scope: str, key: str, compute, timeout: Optional[int] = None,
+                           refresh: bool = False) -> tuple:
+        """
+        📊 Кеш результату compute() з ключем, прив'язаним до версії даних
+
+        Повертає (data, cache_hit). refresh=True — завжди перераховує
+        і перезаписує кеш (режим "exact").
+        """
+        final_timeout = timeout or cls.CACHE_CATEGORIES['operational']['timeout']
+        cache_key = cls.get_cache_key('ops', scope, key, v=cls.get_data_version(scope))
+
+        if not refresh:
+            data = cache.get(cache_key)
+            if data is not None:
+                return data, True
+
+        data = compute()
+        cache.set(cache_key, data, final_timeout)
+        return data, False
+
     @classmethod
     def warm_up_cache(cls) -> None:
         """
@@ -0,0 +1,217 @@
+# backend/services/client_merge_service.py
+"""
+🔗 Злиття дублікатів клієнтів
+
+Дублікати — клієнти з однаковим канонічним phone_key (різні записи
+одного номера: '+380...', '0...', '380...'). Виживає найстаріший клієнт.
+Злиття йде пачками груп; на кожну пачку — кілька set-based запитів:
+
+- ClientTask / ClientInteraction переводяться на клієнта-переможця
+  одним UPDATE ... SET client_id = CASE ... END на чанк (без каскадного видалення)
+- порожні поля переможця заповнюються з дублікатів, метрики (разом
+  з температурою, сегментом АКБ і RFM) — Client.bulk_update_metrics
+  по лідах з тим самим phone_key
+- дублікати видаляються чанками, все в межах однієї транзакції на пачку
+"""
+
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from backend.models import Client, ClientInteraction, ClientTask
+from backend.services.bulk_mode import bump_data_version
+
+# Скільки id максимум в одному UPDATE ... CASE / DELETE ... IN
+UPDATE_CHUNK_SIZE = 500
+
+# Поля, які переможець бере з дубліката, якщо в нього самого порожньо
+FILL_BLANK_FIELDS = ('email', 'company_name', 'assigned_to_id', 'lead_source', 'country', 'city')
+
+SURVIVOR_UPDATE_FIELDS = ('phone', 'full_name', 'notes', 'last_contact_date', *FILL_BLANK_FIELDS)
+
+MERGE_LOAD_FIELDS = (
+    'id', 'phone', 'phone_key', 'full_name', 'notes', 'created_at', 'last_contact_date',
+    *FILL_BLANK_FIELDS,
+)
+
+
+@dataclass
+class MergeStats:
+    """📊 Підсумок злиття (або плану злиття в dry-run)"""
+    groups: int = 0
+    duplicates: int = 0
+    tasks_moved: int = 0
+    interactions_moved: int = 0
+    batches: int = 0
+    samples: list = field(default_factory=list)
+
+    def add(self, other):
+        self.groups += other.groups
+        self.duplicates += other.duplicates
+        self.tasks_moved += other.tasks_moved
+        self.interactions_moved += other.interactions_moved
+        self.batches += other.batches
+
+
+def _chunks(items, size=UPDATE_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def iter_duplicate_phone_key_batches(batch_size=1000):
+    """
+    📦 phone_key, під якими більше одного клієнта — пачками по batch_size
+
+    Список ключів читається наперед: пачки видаляють клієнтів,
+    а курсор по тій самій таблиці під час запису на SQLite ненадійний.
+    """
+    keys = list(
+        Client.objects.exclude(phone_key='')
+        .values('phone_key').annotate(total=Count('id')).filter(total__gt=1)
+        .order_by('phone_key').values_list('phone_key', flat=True)
+    )
+    for start in range(0, len(keys), batch_size):
+        yield keys[start:start + batch_size]
+
+
+def plan_merge(phone_keys):
+    """
+    🗺️ План злиття для пачки phone_key
+
+    Повертає {phone_key: [переможець, дублікат, ...]} — клієнти (тільки
+    потрібні поля) відсортовані від найстаршого.
+    """
+    groups = {}
+    clients = (
+        Client.objects.filter(phone_key__in=phone_keys)
+        .only(*MERGE_LOAD_FIELDS)
+        .order_by('phone_key', 'created_at', 'id')
+    )
+    for client in clients:
+        groups.setdefault(client.phone_key, []).append(client)
+    return {key: members for key, members in groups.items() if len(members) > 1}
+
+
+def _repoint(model, mapping):
+    """
+    🔀 client_id дублікатів → переможець
+
+    Один UPDATE ... SET client_id = CASE client_id WHEN ... END на чанк.
+    SQL збирається напряму: ORM-овий Case/When на тисячах гілок
+    будується в Python довше, ніж виконується сам запит.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field('client').column)
+
+    moved = 0
+    with connection.cursor() as cursor:
+        for chunk in _chunks(list(mapping)):
+            whens = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+            placeholders = ', '.join(['%s'] * len(chunk))
+            params = [value for dup_id in chunk for value in (dup_id, mapping[dup_id])] + chunk
+            cursor.execute(
+                f"UPDATE {table} SET {column} = CASE {column} {whens} END WHERE {column} IN ({placeholders})",
+                params
+            )
+            moved += cursor.rowcount
+    return moved
+
+
+def _save_survivors(survivors, field_names):
+    """💾 UPDATE переможців одним executemany (замість повільного bulk_update з CASE)"""
+    fields = [Client._meta.get_field(name) for name in field_names]
+    assignments = ', '.join(f"{connection.ops.quote_name(f.column)} = %s" for f in fields)
+    sql = f"UPDATE {connection.ops.quote_name(Client._meta.db_table)} SET {assignments} WHERE id = %s"
+
+    rows = [
+        [f.get_db_prep_save(getattr(client, f.attname), connection) for f in fields] + [client.id]
+        for client in survivors
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _merge_fields(survivor, duplicates):
+    """✍️ Заповнює порожні поля переможця та об'єднує нотатки"""
+    for duplicate in duplicates:
+        for name in FILL_BLANK_FIELDS:
+            if not getattr(survivor, name) and getattr(duplicate, name):
+                setattr(survivor, name, getattr(duplicate, name))
+
+        if duplicate.notes and duplicate.notes not in survivor.notes:
+            survivor.notes = f"{survivor.notes}\n{duplicate.notes}".strip()
+
+        if duplicate.last_contact_date and (
+            not survivor.last_contact_date or duplicate.last_contact_date > survivor.last_contact_date
+        ):
+            survivor.last_contact_date = duplicate.last_contact_date
+
+        if not survivor.full_name or survivor.full_name == 'Клієнт':
+            survivor.full_name = duplicate.full_name
+
+
+def merge_batch(groups, dry_run=False, sample_size=0):
+    """
+    🔗 Зливає пачку груп з plan_merge в одній транзакції
+
+    dry_run=True — тільки рахує, що буде зроблено (нічого не змінює).
+    """
+    stats = MergeStats(groups=len(groups), batches=1)
+    mapping = {}
+    for members in groups.values():
+        survivor = members[0]
+        for duplicate in members[1:]:
+            mapping[duplicate.id] = survivor.id
+    stats.duplicates = len(mapping)
+
+    for key, members in list(groups.items())[:sample_size]:
+        stats.samples.append((key, members[0], members[1:]))
+
+    if dry_run:
+        duplicate_ids = list(mapping)
+        for chunk in _chunks(duplicate_ids):
+            stats.tasks_moved += ClientTask.objects.filter(client_id__in=chunk).count()
+            stats.interactions_moved += ClientInteraction.objects.filter(client_id__in=chunk).count()
+        return stats
+
+    survivors = [members[0] for members in groups.values()]
+
+    with transaction.atomic():
+        stats.tasks_moved = _repoint(ClientTask, mapping)
+        stats.interactions_moved = _repoint(ClientInteraction, mapping)
+
+        for members in groups.values():
+            _merge_fields(members[0], members[1:])
+
+        for chunk in _chunks(list(mapping)):
+            Client.objects.filter(id__in=chunk).delete()
+
+        # Номер переможця — в канонічну форму (дублікати вже видалені, unique не заважає)
+        for client in survivors:
+            client.phone = client.phone_key
+
+        _save_survivors(survivors, SURVIVOR_UPDATE_FIELDS)
+        # Ліди прив'язані через phone_key — після злиття всі ліди групи належать переможцю
+        Client.bulk_update_metrics(survivors)
+        # Сирий UPDATE не викликає сигналів — версія даних клієнтів після коміту пачки
+        bump_data_version('clients')
+
+    return stats
+
+
+def merge_duplicate_clients(batch_size=1000, dry_run=False, sample_size=0, progress=None):
+    """
+    🧹 Повне злиття дублікатів: пачка phone_key → план → merge_batch
+
+    progress(stats_batch, stats_total) викликається після кожної пачки.
+    """
+    total = MergeStats()
+    for keys in iter_duplicate_phone_key_batches(batch_size):
+        batch_stats = merge_batch(plan_merge(keys), dry_run=dry_run,
+                                  sample_size=max(sample_size - len(total.samples), 0))
+        total.add(batch_stats)
+        total.samples.extend(batch_stats.samples)
+        if progress:
+            progress(batch_stats, total)
+    return total
@@ -0,0 +1,242 @@
+# backend/services/crm_jobs.py
+"""
+🤖 CRM-автоматизація як фонові задачі
+
+Сигнали ставлять задачі в чергу в тій самій транзакції (enqueue_* нижче),
+виконує їх воркер run_jobs — запит користувача на них не чекає.
+Обробник, який не знайшов клієнта (його створюють одразу після коміту),
+кидає виняток — задача повториться з затримкою.
+"""
+
+import logging
+
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.models import Client, ClientInteraction, ClientTask, Lead
+from backend.services.bulk_mode import bump_data_version, current_changes
+from backend.services.job_queue import enqueue, job
+from backend.services.metrics_coalescer import flush_dirty, mark_dirty, window_seconds
+from backend.utils.phones import canonical_phone
+
+logger = logging.getLogger('backend.crm_jobs')
+
+UPDATE_CLIENT_METRICS = 'client.update_metrics'
+FLUSH_CLIENT_METRICS = 'client.flush_metrics'
+INITIAL_INTERACTION = 'lead.initial_interaction'
+REPEAT_LEAD_TEMPERATURE = 'lead.repeat_temperature'
+CLOSE_TASKS_ON_PURCHASE = 'client.close_tasks_on_purchase'
+FOLLOW_UP_TASK = 'interaction.follow_up_task'
+CHURN_WARNING = 'client.churn_warning'
+
+
+class ClientNotReady(Exception):
+    """Клієнта ще немає — задачу буде повторено"""
+
+
+def _client_for_phone(phone):
+    phone_key = canonical_phone(phone)
+    client = Client.objects.filter(phone_key=phone_key).first() if phone_key else None
+    if client is None:
+        raise ClientNotReady(f"Клієнт з телефоном {phone} ще не створений")
+    return client
+
+
+def _lead_key(lead_id):
+    return f'lead:{lead_id}'
+
+
+# 📥 ПОСТАНОВКА В ЧЕРГУ (викликається з сигналів, всередині транзакції)
+
+def enqueue_lead_created(lead):
+    if not lead.phone:
+        return
+    # Задачі по ліду — dedupe по ліду: другий лід того ж клієнта, поки перший
+    # ще в черзі, має отримати власну задачу (2-й / 3-й лід змінює температуру)
+    enqueue(INITIAL_INTERACTION, {'lead_id': lead.pk}, dedupe_key=_lead_key(lead.pk))
+    enqueue(REPEAT_LEAD_TEMPERATURE, {'lead_id': lead.pk}, dedupe_key=_lead_key(lead.pk))
+    enqueue_client_metrics(lead.phone)
+
+
+def enqueue_client_metrics(phone):
+    phone_key = canonical_phone(phone)
+    changes = current_changes()
+    if changes is not None:
+        # bulk_mode — один пакетний перерахунок при виході
+        changes.phone_keys.add(phone_key)
+        return
+    # Позначка + одна відкладена задача на всіх: перерахунок раз на вікно
+    if mark_dirty(phone_key):
+        enqueue(FLUSH_CLIENT_METRICS, dedupe_key='dirty_clients', delay=window_seconds())
+
+
+def enqueue_payment_received(payment):
+    phone = payment.lead.phone
+    enqueue_client_metrics(phone)
+    enqueue(CLOSE_TASKS_ON_PURCHASE, {'lead_id': payment.lead_id}, dedupe_key=_lead_key(payment.lead_id))
+
+
+# ⚙️ ОБРОБНИКИ
+
+@job(UPDATE_CLIENT_METRICS)
+def update_client_metrics(payload):
+    """📊 Перерахунок метрик одного клієнта (задачі, поставлені до появи client.flush_metrics)"""
+    client = Client.objects.filter(phone_key=payload['phone_key']).first()
+    if client is None:
+        raise ClientNotReady(f"Клієнт {payload['phone_key']} ще не створений")
+
+    old_total = float(client.total_spent)
+    client.update_client_metrics()
+    logger.debug("📊 Оновлено метрики клієнта: %s", client.full_name)
+
+    # Перевіряємо чи клієнт перейшов в новий сегмент
+    if client.akb_segment == 'vip' and old_total < 50000:
+        logger.info("🎉 %s став VIP клієнтом!", client.full_name)
+
+
+@job(FLUSH_CLIENT_METRICS)
+def flush_client_metrics(payload):
+    """⏱️ Пакетний перерахунок клієнтів, чиє вікно злиття минуло"""
+    result = flush_dirty()
+    # Хтось позначений нещодавно або не вліз у пачку — наступний прохід
+    if result.next_due_in is not None:
+        enqueue(FLUSH_CLIENT_METRICS, dedupe_key='dirty_clients', delay=result.next_due_in)
+
+
+@job(INITIAL_INTERACTION)
+def create_initial_interaction(payload):
+    """📝 Початкова взаємодія — тільки для першого ліда клієнта"""
+    lead = Lead.objects.select_related('assigned_to').filter(pk=payload['lead_id']).first()
+    if lead is None:
+        return
+    client = _client_for_phone(lead.phone)
+
+    author = lead.assigned_to or client.assigned_to
+    # created_by обов'язковий — без менеджера взаємодію не створюємо
+    if author is None or ClientInteraction.objects.filter(client=client).exists():
+        return
+
+    ClientInteraction.objects.create(
+        client=client,
+        interaction_type='other',
+        direction='incoming',
+        subject=f"Створено лід: {lead.full_name}",
+        description=f"Новий лід від {lead.source or 'невідомого джерела'}. "
+                    f"Опис: {lead.description or 'Без опису'}",
+        outcome='follow_up',
+        created_by=author
+    )
+    logger.debug("📝 Створено початкову взаємодію для %s", client.full_name)
+
+
+@job(REPEAT_LEAD_TEMPERATURE)
+def update_client_temperature_on_repeated_leads(payload):
+    """🌡️ Повторні ліди: 2-й — теплий, 3+ — гарячий з терміновою задачею"""
+    lead = Lead.objects.select_related('assigned_to').filter(pk=payload['lead_id']).first()
+    if lead is None:
+        return
+    client = _client_for_phone(lead.phone)
+    leads_count = Lead.objects.filter(phone_key=client.phone_key).count()
+
+    # Якщо це 2-й лід - переводимо в теплі
+    if leads_count == 2 and client.temperature == 'cold':
+        Client.objects.filter(id=client.id).update(temperature='warm')
+        bump_data_version('clients')
+        logger.debug("🌡️ %s: cold → warm (2-й лід)", client.full_name)
+
+    # Якщо це 3-й лід - переводимо в гарячі
+    elif leads_count >= 3 and client.temperature in ['cold', 'warm']:
+        Client.objects.filter(id=client.id).update(temperature='hot')
+        bump_data_version('clients')
+        logger.debug("🔥 %s: → hot (3+ лідів)", client.full_name)
+
+        # Створюємо терміновую задачу для менеджера
+        ClientTask.objects.create(
+            client=client,
+            title=f"🔥 ГАРЯЧИЙ КЛІЄНТ: {client.full_name}",
+            description=f"Клієнт створив {leads_count} лідів! Терміново зв'язатися!",
+            assigned_to=client.assigned_to or lead.assigned_to,
+            priority='urgent',
+            due_date=timezone.now() + timezone.timedelta(hours=2)
+        )
+
+
+@job(CLOSE_TASKS_ON_PURCHASE)
+def auto_complete_tasks_on_purchase(payload):
+    """✅ Закриття активних задач "контакт / follow-up / реактивація" після покупки"""
+    lead = Lead.objects.filter(pk=payload['lead_id']).first()
+    if lead is None:
+        return
+    client = _client_for_phone(lead.phone)
+
+    completed_count = ClientTask.objects.filter(
+        client=client,
+        status__in=['pending', 'in_progress']
+    ).filter(
+        Q(title__icontains='контакт') |
+        Q(title__icontains='follow-up') |
+        Q(title__icontains='реактивація') |
+        Q(title__icontains='гарячий')
+    ).update(status='completed', completed_at=timezone.now())
+
+    if completed_count > 0:
+        logger.debug(
+            "✅ Автоматично закрито %s задач для %s після покупки", completed_count, client.full_name
+        )
+
+
+@job(FOLLOW_UP_TASK)
+def create_follow_up_task(payload):
+    """📅 Задача follow-up по взаємодії (якщо на цю дату ще немає)"""
+    interaction = ClientInteraction.objects.select_related('client', 'created_by').filter(
+        pk=payload['interaction_id']
+    ).first()
+    if interaction is None or not interaction.follow_up_date:
+        return
+
+    existing_task = ClientTask.objects.filter(
+        client=interaction.client,
+        due_date__date=interaction.follow_up_date.date(),
+        status__in=['pending', 'in_progress']
+    ).exists()
+    if existing_task:
+        return
+
+    ClientTask.objects.create(
+        client=interaction.client,
+        title=f"Follow-up по взаємодії: {interaction.subject}",
+        description=f"Наступний контакт по взаємодії від {interaction.created_at.strftime('%d.%m.%Y')}",
+        assigned_to=interaction.client.assigned_to or interaction.created_by,
+        priority='medium',
+        due_date=interaction.follow_up_date
+    )
+    logger.debug("📅 Створено задачу follow-up для %s", interaction.client.full_name)
+
+
+@job(CHURN_WARNING)
+def create_churn_warning(payload):
+    """⚠️ Задача про ризик відтоку (одна активна на клієнта)"""
+    client = Client.objects.filter(pk=payload['client_id']).first()
+    if client is None or not client.assigned_to_id:
+        return
+
+    existing_task = ClientTask.objects.filter(
+        client=client,
+        title__icontains='ризик відтоку',
+        status__in=['pending', 'in_progress']
+    ).exists()
+
+    if not existing_task and client.total_orders > 0:
+        priority = 'high' if client.total_spent > 10000 else 'medium'
+
+        ClientTask.objects.create(
+            client=client,
+            title=f"⚠️ Ризик відтоку: {client.full_name}",
+            description=f"Клієнт не купував {client.rfm_recency} днів. "
+                        f"Загальна сума покупок: {client.total_spent} грн. "
+                        f"Потрібна реактивація!",
+            assigned_to=client.assigned_to,
+            priority=priority,
+            due_date=timezone.now() + timezone.timedelta(days=1)
+        )
+        logger.info("⚠️ Створено попередження про ризик відтоку: %s", client.full_name)
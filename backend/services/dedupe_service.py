@@ -0,0 +1,235 @@
+# backend/services/dedupe_service.py
+"""
+🛡️ Дедуплікація лідів
+
+1. Точні дублікати — order_number / delivery_number. Захищені унікальними
+   частковими індексами (тільки непорожні значення), тому перевірка — це
+   index lookup, а гонку двох вебхуків вирішує сама БД: create_lead_once
+   ловить IntegrityError і повертає лід-переможець.
+2. Майже-дублікати — той самий phone_key + схоже ім'я у вікні часу.
+   Кандидати відбираються за ключем блокування (phone_key, created_at),
+   порівнюються тільки ліди всередині блоку — без попарного скану таблиці.
+"""
+
+import logging
+import re
+from collections import deque
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from backend.models import Lead
+from backend.utils.phones import canonical_phone
+
+logger = logging.getLogger('backend.dedupe_service')
+
+# 🔑 Поля з унікальним частковим індексом (див. Lead.Meta.constraints)
+DUPLICATE_KEY_FIELDS = ('order_number', 'delivery_number')
+
+NEAR_DUPLICATE_WINDOW_MINUTES = 30
+NAME_SIMILARITY_THRESHOLD = 0.85
+
+# Скільки кандидатів з одного блоку максимум порівнюємо для одного ліда
+MAX_BLOCK_CANDIDATES = 50
+
+_NAME_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# 🔑 ТОЧНІ ДУБЛІКАТИ
+
+def _lookup_keys(order_number=None, delivery_number=None):
+    keys = {'order_number': order_number, 'delivery_number': delivery_number}
+    return {field: value for field, value in keys.items() if value}
+
+
+def find_duplicate_lead(order_number=None, delivery_number=None, exclude_id=None):
+    """
+    🔍 Лід з тим самим order_number або delivery_number
+
+    Повертає (поле, лід) або (None, None). Кожна перевірка — index lookup.
+    """
+    for field, value in _lookup_keys(order_number, delivery_number).items():
+        queryset = Lead.objects.filter(**{field: value})
+        if exclude_id:
+            queryset = queryset.exclude(id=exclude_id)
+        existing = queryset.select_related('assigned_to').first()
+        if existing:
+            return field, existing
+    return None, None
+
+
+def create_lead_once(create, order_number=None, delivery_number=None):
+    """
+    ⚛️ Атомарне "створи або поверни існуючий"
+
+    create — функція без аргументів, що створює та повертає Lead
+    (serializer.save, lambda для create_lead_with_logic тощо).
+    Виконується в savepoint: якщо паралельний запит встиг вставити лід
+    з тим самим ключем, унікальний індекс кидає IntegrityError — відкочуємо
+    savepoint і повертаємо лід-переможець.
+
+    Повертає (lead, created, duplicate_field).
+    """
+    field, existing = find_duplicate_lead(order_number, delivery_number)
+    if existing:
+        return existing, False, field
+
+    try:
+        with transaction.atomic():
+            return create(), True, None
+    except IntegrityError:
+        field, existing = find_duplicate_lead(order_number, delivery_number)
+        if existing is None:
+            # IntegrityError не від наших ключів — це справжня помилка
+            raise
+        logger.info("Гонка при створенні ліда: %s=%s вже є в ліді #%s", field, getattr(existing, field), existing.id)
+        return existing, False, field
+
+
+def duplicate_key_groups():
+    """
+    📋 Повторювані order_number / delivery_number, що не пускають унікальні індекси
+
+    {поле: {значення: [id, ...]}}, id — від найстарішого ліда.
+    """
+    groups = {}
+    for field in DUPLICATE_KEY_FIELDS:
+        values = (
+            Lead.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            .values(field).annotate(total=Count('id')).filter(total__gt=1)
+            .values_list(field, flat=True)
+        )
+        groups[field] = {
+            value: list(Lead.objects.filter(**{field: value}).order_by('created_at', 'id').values_list('id', flat=True))
+            for value in values
+        }
+    return groups
+
+
+def release_duplicate_keys(groups):
+    """
+    🧹 Звільняє повторювані значення: найстаріший лід зберігає значення,
+    решта отримують суфікс "~<id>" (дані не губляться і лишаються в пошуку)
+
+    Повертає {поле: кількість перейменованих лідів}.
+    """
+    changed = {}
+    with transaction.atomic():
+        for field, values in groups.items():
+            max_length = Lead._meta.get_field(field).max_length
+            leads = []
+            for value, ids in values.items():
+                for lead in Lead.objects.filter(id__in=ids[1:]):
+                    suffix = f"~{lead.id}"
+                    setattr(lead, field, value[:max_length - len(suffix)] + suffix)
+                    leads.append(lead)
+            Lead.objects.bulk_update(leads, [field], batch_size=500)
+            changed[field] = len(leads)
+    return changed
+
+
+# 🔎 МАЙЖЕ-ДУБЛІКАТИ
+
+def name_key(full_name):
+    """🔤 Нормалізоване ім'я: нижній регістр, без пунктуації, слова в алфавітному порядку"""
+    return ' '.join(sorted(_NAME_TOKEN_RE.findall((full_name or '').lower())))
+
+
+def _token_coverage(tokens, other_tokens):
+    """Середня найкраща схожість кожного слова з tokens серед other_tokens"""
+    return sum(
+        max(SequenceMatcher(None, token, other).ratio() for other in other_tokens)
+        for token in tokens
+    ) / len(tokens)
+
+
+def _key_similarity(first, second):
+    """Порівняння слово-до-слова: 'Петренко Іван' ≈ 'Иван Петренко', але 'Іван' ≠ 'Іван Петренко'"""
+    if not first or not second:
+        return 0.0
+    if first == second:
+        return 1.0
+    first_tokens, second_tokens = first.split(), second.split()
+    return min(_token_coverage(first_tokens, second_tokens), _token_coverage(second_tokens, first_tokens))
+
+
+def name_similarity(first, second):
+    """📏 Схожість імен 0..1 (порядок слів і регістр не важливі)"""
+    return _key_similarity(name_key(first), name_key(second))
+
+
+def find_near_duplicate_leads(phone, full_name, window_minutes=NEAR_DUPLICATE_WINDOW_MINUTES,
+                              threshold=NAME_SIMILARITY_THRESHOLD, exclude_id=None, now=None):
+    """
+    🔎 Схожі ліди для нового звернення
+
+    Блок — ліди з тим самим phone_key за останні window_minutes
+    (index range scan по (phone_key, created_at)); ім'я порівнюється
+    тільки з цими кандидатами. Повертає [(lead, similarity)] за спаданням схожості.
+    """
+    key = canonical_phone(phone)
+    if not key:
+        return []
+
+    since = (now or timezone.now()) - timedelta(minutes=window_minutes)
+    candidates = Lead.objects.filter(phone_key=key, created_at__gte=since).order_by('-created_at')
+    if exclude_id:
+        candidates = candidates.exclude(id=exclude_id)
+
+    matches = []
+    for lead in candidates[:MAX_BLOCK_CANDIDATES]:
+        similarity = name_similarity(full_name, lead.full_name)
+        if similarity >= threshold:
+            matches.append((lead, round(similarity, 3)))
+
+    matches.sort(key=lambda match: match[1], reverse=True)
+    return matches
+
+
+def iter_near_duplicate_groups(queryset=None, window_minutes=NEAR_DUPLICATE_WINDOW_MINUTES,
+                               threshold=NAME_SIMILARITY_THRESHOLD, chunk_size=5000):
+    """
+    🧮 Групи майже-дублікатів по всій таблиці (sorted neighbourhood)
+
+    Один прохід по лідах, відсортованих за (phone_key, created_at):
+    кожен лід порівнюється лише з лідами того ж блоку в ковзному вікні,
+    тож складність ~O(n · розмір вікна), а не O(n²).
+    Генерує списки id (від найстаршого), у кожному щонайменше два ліди.
+    """
+    queryset = Lead.objects.all() if queryset is None else queryset
+    rows = (
+        queryset.exclude(phone_key='')
+        .order_by('phone_key', 'created_at', 'id')
+        .values_list('id', 'phone_key', 'full_name', 'created_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    window = timedelta(minutes=window_minutes)
+
+    current_key = None
+    recent = deque()        # (name_key, created_at, група) у межах вікна
+    groups = []
+
+    for lead_id, phone_key, full_name, created_at in rows:
+        if phone_key != current_key:
+            yield from (group for group in groups if len(group) > 1)
+            current_key, recent, groups = phone_key, deque(), []
+
+        while recent and created_at - recent[0][1] > window:
+            recent.popleft()
+
+        key = name_key(full_name)
+        group = next(
+            (item_group for item_key, _, item_group in reversed(recent)
+             if _key_similarity(key, item_key) >= threshold),
+            None
+        )
+        if group is None:
+            group = []
+            groups.append(group)
+        group.append(lead_id)
+        recent.append((key, created_at, group))
+
+    yield from (group for group in groups if len(group) > 1)
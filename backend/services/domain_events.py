@@ -0,0 +1,194 @@
+# backend/services/domain_events.py
+"""
+📨 Доменні події з пакетною обробкою при коміті
+
+Замість окремого on_commit у кожному сигналі (кожен зі своїм
+Client.objects.get(phone=...)) сигнали публікують події:
+
+    publish(LeadCreated(lead_id=lead.pk))
+
+Події транзакції збираються, дублікати відкидаються, і після коміту
+всі обробники отримують один пакет (EventBatch), у якому ліди та
+клієнти пакета завантажуються разом — по одному запиту на всіх.
+
+Відкат savepoint'а відкидає і його події: кожна подія доставляється
+власним on_commit (Django сам прибирає їх при відкаті), а обробка пакета
+завжди стоїть останньою серед колбеків коміту.
+
+Стан тримається окремо для кожного потоку (як і з'єднання з БД),
+тому, на відміну від глобального set(), паралельні запити не заважають
+один одному. Події, опубліковані обробниками під час обробки пакета,
+додаються в той самий пакет.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from backend.models import Client, Lead
+from backend.utils.phones import canonical_phone
+
+logger = logging.getLogger('backend.domain_events')
+
+
+# 📋 ПОДІЇ
+
+@dataclass(frozen=True)
+class LeadCreated:
+    lead_id: int
+
+
+@dataclass(frozen=True)
+class StatusChanged:
+    lead_id: int
+    old_status: str
+    new_status: str
+
+
+@dataclass(frozen=True)
+class PaymentReceived:
+    lead_id: int
+    payment_id: int
+    amount: Decimal
+
+
+# 📦 ПАКЕТ
+
+class EventBatch:
+    """
+    Події одного коміту + спільні ліди й клієнти
+
+    lead() / client_for() при першому зверненні завантажують одразу
+    всі ліди / всіх клієнтів пакета.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self._leads = None
+        self._clients = None
+
+    def of_type(self, *event_types):
+        return [event for event in self.events if isinstance(event, event_types)]
+
+    def lead(self, lead_id):
+        if self._leads is None or lead_id not in self._leads:
+            ids = {event.lead_id for event in self.events} | {lead_id}
+            self._leads = {**(self._leads or {}), **Lead.objects.select_related('assigned_to').in_bulk(ids)}
+        return self._leads.get(lead_id)
+
+    def leads(self, *event_types):
+        """Ліди подій (без повторів) у порядку подій"""
+        ids = dict.fromkeys(event.lead_id for event in (self.of_type(*event_types) if event_types else self.events))
+        return [lead for lead in (self.lead(lead_id) for lead_id in ids) if lead is not None]
+
+    def _load_clients(self, extra_keys=()):
+        keys = {canonical_phone(lead.phone) for lead in self.leads()} | set(extra_keys)
+        keys.discard('')
+        known = self._clients or {}
+        missing = keys - set(known)
+        loaded = {client.phone_key: client for client in Client.objects.filter(phone_key__in=missing)} if missing else {}
+        self._clients = {**dict.fromkeys(missing), **known, **loaded}
+
+    def client_for(self, lead):
+        """👤 Клієнт ліда за канонічним номером (один запит на весь пакет)"""
+        phone_key = canonical_phone(lead.phone)
+        if not phone_key:
+            return None
+        if self._clients is None or phone_key not in self._clients:
+            self._load_clients([phone_key])
+        return self._clients.get(phone_key)
+
+    def remember_client(self, client):
+        """Клієнт, створений обробником, — доступний наступним обробникам"""
+        if self._clients is None:
+            self._load_clients()
+        self._clients[client.phone_key] = client
+
+
+# 🚌 ШИНА
+
+class EventBus:
+    def __init__(self):
+        self._handlers = []
+        self._local = threading.local()
+
+    def subscribe(self, *event_types):
+        """
+        Декоратор обробника: handler(events, batch)
+
+        events — події потрібних типів з пакета (без дублікатів), batch — EventBatch.
+        Обробники викликаються в порядку реєстрації.
+        """
+        def decorator(handler):
+            self._handlers.append((event_types, handler))
+            return handler
+        return decorator
+
+    def _state(self, using):
+        states = self._local.__dict__.setdefault('states', {})
+        if using not in states:
+            states[using] = {'delivered': [], 'flush': None, 'flushing': None}
+        return states[using]
+
+    def publish(self, event, using=DEFAULT_DB_ALIAS):
+        state = self._state(using)
+
+        if state['flushing'] is not None:
+            # Подію опубліковано обробником — в той самий пакет
+            state['flushing'].append(event)
+            return
+
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            self._run([event])
+            return
+
+        transaction.on_commit(lambda: state['delivered'].append(event), using=using)
+
+        # Обробка пакета — завжди останній колбек коміту (після всіх доставок)
+        callbacks = connection.run_on_commit
+        for index, entry in enumerate(callbacks):
+            if entry[1] is state['flush']:
+                callbacks.append(callbacks.pop(index))
+                break
+        else:
+            state['flush'] = lambda: self._flush(using)
+            transaction.on_commit(state['flush'], using=using)
+
+    def _flush(self, using):
+        state = self._state(using)
+        events, state['delivered'], state['flush'] = state['delivered'], [], None
+        self._run(events, using)
+
+    def _run(self, events, using=DEFAULT_DB_ALIAS):
+        state = self._state(using)
+        state['flushing'] = pending = list(events)
+        seen = set()
+        try:
+            while pending:
+                batch_events = [event for event in dict.fromkeys(pending) if event not in seen]
+                pending.clear()
+                seen.update(batch_events)
+                if batch_events:
+                    self._dispatch(EventBatch(batch_events))
+        finally:
+            state['flushing'] = None
+
+    def _dispatch(self, batch):
+        for event_types, handler in self._handlers:
+            events = batch.of_type(*event_types)
+            if not events:
+                continue
+            try:
+                handler(events, batch)
+            except Exception as e:
+                logger.exception("❌ Помилка обробника подій %s: %s", handler.__name__, e)
+
+
+bus = EventBus()
+publish = bus.publish
+subscribe = bus.subscribe
+
@@ -0,0 +1,218 @@
+# backend/services/email_classifier.py
+"""
+📨 Скомпільований класифікатор листів-лідів і витяг полів
+
+Усі шаблони збираються один раз при імпорті модуля, а текст листа
+переводиться в нижній регістр один раз:
+
+- ключові слова теми й відправника — по одній альтернації на список;
+  маркетингові слова — підрядки в text.lower() (на довгих розсилках
+  str.__contains__ у C швидший за альтернацію re)
+- ознаки структури ліда (form_id / Lead Id / Name / Phone Number у
+  форматах **поле:**, *поле:*, поле:) — підрядки й шаблони з літеральним
+  префіксом замість дев'яти re.search з IGNORECASE
+- поля ліда — скомпільовані FieldExtractor (по три шаблони на поле)
+
+    decision = classify(text, subject, sender)
+    if decision:                    # decision.is_lead
+        data = extract_fields(text)
+    logger.debug("%s: %s", decision.reason, decision.matches)
+
+Рішення ті самі, що й у попередньої реалізації is_lead_email /
+extract_lead_data (перевіряє python manage.py benchmark_email_classifier).
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+LEAD_SUBJECT_KEYWORDS = (
+    'new lead', 'form submission', 'contact form', 'заявка', 'форма',
+    'lead id', 'form id', 'заявление', 'запрос', 'inquiry',
+)
+MARKETING_KEYWORDS = (
+    'unsubscribe', 'відписатися', 'premium video', 'newsletter',
+    'elliott wave', 'investment', 'trading', 'market analysis',
+    'promotional', 'discount', 'sale', 'offer expires',
+)
+SUSPICIOUS_SENDERS = (
+    'noreply', 'no-reply', 'newsletter', 'marketing', 'promo',
+    'elliottwave', 'notifications', 'updates',
+)
+
+# Поля, за якими впізнається структура ліда: поле → формати, що рахуються
+MARKER_FORMATS = {
+    'form_id': ('**', '*', ''),
+    'lead id': ('**', ''),
+    'name': ('**', ''),
+    'phone number': ('**', ''),
+}
+MIN_MARKERS = 3  # скільки різних ознак (поле + формат) достатньо для ліда
+
+REQUIRED_FIELDS = ('form_id', 'Lead Id', 'Name', 'Phone Number')
+OPTIONAL_FIELDS = (
+    'Form ID', 'Create Time', 'Ad Id', 'Ad Name', 'Adgroup Id', 'Adgroup Name',
+    'Campaign Id', 'Campaign Name', 'Form Name',
+)
+
+
+_SUBJECT_RE = re.compile('|'.join(re.escape(word) for word in LEAD_SUBJECT_KEYWORDS))
+_SENDER_RE = re.compile('|'.join(re.escape(word) for word in SUSPICIOUS_SENDERS))
+
+# Ознаки шукаються в text.lower(): "**name:**" — підрядок, "name  :" — шаблон з
+# літеральним префіксом (швидкий пошук у re без IGNORECASE)
+_STARRED_MARKERS = tuple(
+    (label, stars, f'{stars}{label}:{stars}') for label, formats in MARKER_FORMATS.items() for stars in formats if stars
+)
+_SPACED_MARKERS = tuple((label, re.compile(re.escape(label) + r'\s+:')) for label in MARKER_FORMATS)
+
+# Єдині символи, для яких IGNORECASE і lower() розходяться на літерах полів (турецькі i)
+_CASEFOLD_TRAPS = ('\u0130', '\u0131')
+_MARKER_GROUPS = {f'm{number}': label for number, label in enumerate(MARKER_FORMATS)}
+_MARKER_RE = re.compile(
+    r'(?:%s)(?P<space>\s*):' % '|'.join(
+        f'(?P<{group}>{re.escape(label)})' for group, label in _MARKER_GROUPS.items()
+    ),
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    """
+    Рішення класифікатора
+
+    reason: 'subject' — ключове слово в темі, 'fields' — структура ліда,
+    'marketing' — маркетинговий текст, 'sender' — розсилка за адресою,
+    'unknown' — нічого не підійшло (не лід). matches — що саме знайдено.
+    """
+    is_lead: bool
+    reason: str
+    matches: tuple = ()
+
+    def __bool__(self):
+        return self.is_lead
+
+
+def lead_markers(text, lowered=None):
+    """
+    Ознаки структури ліда: {('name', '**'), ('name', ''), ...}
+
+    Формат '**' — "**поле:**", '*' — "*поле:*", '' — "поле:" (пробіли перед
+    двокрапкою дозволені лише в останньому). "**поле:**" містить і "*поле:*",
+    і "поле:" — кожна з цих ознак рахується, як і раніше.
+    """
+    if any(trap in text for trap in _CASEFOLD_TRAPS):
+        return _lead_markers_ignorecase(text)
+
+    lowered = text.lower() if lowered is None else lowered
+    found = {(label, stars) for label, stars, marker in _STARRED_MARKERS if marker in lowered}
+    for label, spaced in _SPACED_MARKERS:
+        if (label, '*') in found or (label, '**') in found or label + ':' in lowered or spaced.search(lowered):
+            found.add((label, ''))
+    return found
+
+
+def _lead_markers_ignorecase(text):
+    """Те саме одним проходом re.IGNORECASE — точно як re.search(..., re.I), але повільніше"""
+    found = set()
+    for match in _MARKER_RE.finditer(text):
+        label = next(label for group, label in _MARKER_GROUPS.items() if match.group(group))
+        found.add((label, ''))
+        if match.group('space'):
+            continue
+        start, end = match.start(), match.end()
+        for stars in MARKER_FORMATS[label]:
+            if stars and text.startswith(stars, end) and text[max(start - len(stars), 0):start] == stars:
+                found.add((label, stars))
+    return found
+
+
+def classify(text, subject='', sender=''):
+    """🔍 Чи є лист лідом — з причиною рішення"""
+    keyword = _SUBJECT_RE.search(subject.lower())
+    if keyword:
+        return Decision(True, 'subject', (keyword.group(),))
+
+    lowered = text.lower()
+    markers = lead_markers(text, lowered)
+    if len(markers) >= MIN_MARKERS:
+        return Decision(True, 'fields', tuple(sorted(f'{stars}{label}:{stars}' for label, stars in markers)))
+
+    # Підрядки в C (str.__contains__) швидші за альтернацію re на довгих розсилках
+    marketing = tuple(word for word in MARKETING_KEYWORDS if word in lowered)
+    if marketing:
+        return Decision(False, 'marketing', marketing)
+
+    suspicious = _SENDER_RE.search(sender.lower())
+    if suspicious:
+        return Decision(False, 'sender', (suspicious.group(),))
+
+    return Decision(False, 'unknown')
+
+
+# 🧾 ВИТЯГ ПОЛІВ
+
+class FieldExtractor:
+    """
+    Три скомпільовані шаблони поля: **поле:** значення, *поле:* значення, поле: значення
+
+    Шукає в text.lower() шаблонами без IGNORECASE (так re бере швидкий пошук
+    за літеральним префіксом), а значення вирізає з оригінального тексту.
+    """
+
+    __slots__ = ('label', 'patterns', 'patterns_ignorecase')
+
+    def __init__(self, label):
+        self.label = label
+        self.patterns = self._compile(re.escape(label.lower()), 0)
+        self.patterns_ignorecase = self._compile(re.escape(label), re.IGNORECASE)
+
+    @staticmethod
+    def _compile(label, flags):
+        return (
+            re.compile(rf'\*\*{label}:\*\*\s*([^*]+?)(?=\*\*|$)', flags),
+            re.compile(rf'\*{label}:\*\s*([^*\n]+?)(?=\*|$|\n)', flags),
+            re.compile(rf'{label}:\s*([^*\n]+?)(?=\n|\*\*|\*|$)', flags),
+        )
+
+    def __call__(self, text, lowered=None):
+        if lowered is None:
+            lowered = _lowered_for_search(text)
+        haystack, patterns = (lowered, self.patterns) if lowered is not None else (text, self.patterns_ignorecase)
+        # Без зірочок у тексті перші два формати знайти нічого не можуть
+        if '*' not in text:
+            patterns = patterns[2:]
+        for pattern in patterns:
+            match = pattern.search(haystack)
+            if match:
+                return text[match.start(1):match.end(1)].strip()
+        return ""
+
+
+def _lowered_for_search(text):
+    """text.lower(), якщо позиції в ньому збігаються з оригіналом і IGNORECASE ≡ lower(); інакше None"""
+    if any(trap in text for trap in _CASEFOLD_TRAPS):
+        return None
+    lowered = text.lower()
+    return lowered if len(lowered) == len(text) else None
+
+
+@lru_cache(maxsize=None)
+def field_extractor(label):
+    return FieldExtractor(label)
+
+
+def extract_field(label, text):
+    """Значення поля за назвою ("" — немає)"""
+    return field_extractor(label)(text)
+
+
+def extract_fields(text, labels=REQUIRED_FIELDS + OPTIONAL_FIELDS):
+    """{назва поля: значення} — кожне поле шукається один раз, text.lower() — теж"""
+    lowered = _lowered_for_search(text)
+    return {label: field_extractor(label)(text, lowered) for label in labels}
+
+
+for _label in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+    field_extractor(_label)
@@ -0,0 +1,299 @@
+# backend/services/export_service.py
+"""
+📤 Потоковий експорт лідів, клієнтів та платежів у CSV / XLSX
+
+Дані читаються з БД порціями через .values_list().iterator(chunk_size=...)
+і одразу віддаються клієнту через StreamingHttpResponse — в пам'яті ніколи
+не тримається більше однієї порції, тож експорт 1М платежів не роздуває воркер.
+
+XLSX так не вміє: книга спершу повністю пишеться в тимчасовий файл
+(пам'ять стала, але перший байт — лише після останнього рядка).
+"""
+
+import csv
+import logging
+import os
+import tempfile
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse, FileResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from backend.models import Lead, Client, LeadPaymentOperation
+from backend.utils.phones import phone_lookup_q
+
+logger = logging.getLogger('backend.export_service')
+
+# 🚀 Розмір порції для серверного курсора
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+class Echo:
+    """📝 Псевдо-буфер для csv.writer — повертає рядок замість запису у файл"""
+
+    def write(self, value):
+        return value
+
+
+# 🔥 ОПИСИ КОЛОНОК: (заголовок, поле для values_list)
+LEAD_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('full_name', 'full_name'),
+    ('phone', 'phone'),
+    ('email', 'email'),
+    ('source', 'source'),
+    ('status', 'status'),
+    ('price', 'price'),
+    ('advance', 'advance'),
+    ('delivery_cost', 'delivery_cost'),
+    ('actual_cash', 'actual_cash'),
+    ('order_number', 'order_number'),
+    ('delivery_number', 'delivery_number'),
+    ('assigned_to', 'assigned_to__username'),
+    ('city', 'city'),
+    ('full_address', 'full_address'),
+    ('created_at', 'created_at'),
+    ('status_updated_at', 'status_updated_at'),
+]
+
+# Поля збігаються з ClientExportSerializer
+CLIENT_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('full_name', 'full_name'),
+    ('phone', 'phone'),
+    ('email', 'email'),
+    ('company_name', 'company_name'),
+    ('temperature_display', 'temperature'),
+    ('akb_segment_display', 'akb_segment'),
+    ('total_spent', 'total_spent'),
+    ('avg_check', 'avg_check'),
+    ('total_orders', 'total_orders'),
+    ('first_purchase_date', 'first_purchase_date'),
+    ('last_purchase_date', 'last_purchase_date'),
+    ('rfm_score', 'rfm_score'),
+    ('assigned_to_name', 'assigned_to__username'),
+    ('created_at', 'created_at'),
+]
+
+PAYMENT_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('lead_id', 'lead_id'),
+    ('lead_name', 'lead__full_name'),
+    ('lead_phone', 'lead__phone'),
+    ('type', 'operation_type'),
+    ('amount', 'amount'),
+    ('comment', 'comment'),
+    ('created_at', 'created_at'),
+]
+
+# 🎯 Людські назви для choice-полів клієнта (як get_FOO_display у серіалізаторі)
+CLIENT_DISPLAY_MAPS = {
+    'temperature': dict(Client.TEMPERATURE_CHOICES),
+    'akb_segment': dict(Client.AKB_SEGMENT_CHOICES),
+}
+
+
+def _format_value(value):
+    """🔧 Приводимо значення до вигляду, придатного для CSV/XLSX"""
+    if value is None:
+        return ''
+    if isinstance(value, Decimal):
+        return format(value, 'f')
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(queryset, columns, display_maps=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    🔄 Генератор рядків експорту
+
+    Використовує values_list + iterator(chunk_size), тож не створює моделей
+    і не кешує результат QuerySet.
+    """
+    fields = [field for _, field in columns]
+    converters = [
+        (display_maps or {}).get(field)
+        for field in fields
+    ]
+
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield [
+            _format_value(mapping.get(value, value) if mapping else value)
+            for value, mapping in zip(row, converters)
+        ]
+
+
+def stream_csv(queryset, columns, filename, display_maps=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """📤 CSV через StreamingHttpResponse — рядок за рядком"""
+    writer = csv.writer(Echo())
+    header = [title for title, _ in columns]
+
+    def generate():
+        # BOM, щоб Excel коректно відкривав кирилицю
+        yield '﻿'
+        yield writer.writerow(header)
+        for row in iter_rows(queryset, columns, display_maps, chunk_size):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def xlsx_available():
+    """✅ Чи встановлено openpyxl (опційна залежність)"""
+    try:
+        import openpyxl  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class TemporaryFileResponse(FileResponse):
+    """📎 FileResponse, що видаляє свій тимчасовий файл після відповіді"""
+
+    def __init__(self, path, *args, **kwargs):
+        self.temporary_path = path
+        super().__init__(open(path, 'rb'), *args, **kwargs)
+
+    def close(self):
+        # Спершу закриваємо дескриптор — на Windows відкритий файл не видалити
+        super().close()
+        try:
+            os.unlink(self.temporary_path)
+        except FileNotFoundError:
+            pass
+
+
+def stream_xlsx(queryset, columns, filename, display_maps=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    📊 XLSX через write-only книгу openpyxl — з буферизацією
+
+    На відміну від CSV, книга спершу повністю пишеться в тимчасовий файл:
+    write-only режим тримає пам'ять сталою, але клієнт отримує перший байт
+    лише після останнього рядка. Далі файл віддається порціями і
+    видаляється в close() відповіді.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=filename[:31])
+    sheet.append([title for title, _ in columns])
+    for row in iter_rows(queryset, columns, display_maps, chunk_size):
+        sheet.append(row)
+
+    tmp = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+    tmp.close()
+    try:
+        workbook.save(tmp.name)
+        response = TemporaryFileResponse(
+            tmp.name,
+            as_attachment=True,
+            filename=f'{filename}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    except Exception:
+        os.unlink(tmp.name)
+        raise
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def export_response(queryset, columns, name, export_format='csv', display_maps=None):
+    """🎯 Єдина точка входу: обирає формат і формує ім'я файлу з датою"""
+    filename = f"{name}_{timezone.now():%Y%m%d_%H%M%S}"
+    logger.info("Експорт %s у форматі %s", name, export_format)
+
+    if export_format == 'xlsx':
+        return stream_xlsx(queryset, columns, filename, display_maps)
+    return stream_csv(queryset, columns, filename, display_maps)
+
+
+# 🔥 ГОТОВІ QUERYSET-И ДЛЯ ЕКСПОРТУ
+
+def _filter_dates(queryset, params):
+    """📅 Фільтр date_from / date_to (некоректні дати ігноруються)"""
+    try:
+        date_from = parse_date(params.get('date_from') or '')
+    except ValueError:
+        date_from = None
+    try:
+        date_to = parse_date(params.get('date_to') or '')
+    except ValueError:
+        date_to = None
+
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+    return queryset
+
+
+def leads_export_queryset(params):
+    """📋 Ліди з тими ж фільтрами, що і LeadViewSet"""
+    queryset = Lead.objects.all()
+
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    assigned_to = params.get('assigned_to')
+    if assigned_to:
+        queryset = queryset.filter(assigned_to_id=assigned_to)
+
+    queryset = _filter_dates(queryset, params)
+
+    phone = params.get('phone')
+    if phone:
+        phone_q = phone_lookup_q(phone)
+        queryset = queryset.filter(phone_q) if phone_q is not None else queryset.none()
+
+    return queryset.order_by('-created_at', '-id')
+
+
+def clients_export_queryset(params):
+    """👥 Клієнти з фільтрами по температурі / сегменту / менеджеру"""
+    queryset = Client.objects.all()
+
+    temperature = params.get('temperature')
+    if temperature:
+        queryset = queryset.filter(temperature=temperature)
+
+    akb_segment = params.get('akb_segment')
+    if akb_segment:
+        queryset = queryset.filter(akb_segment=akb_segment)
+
+    assigned_to = params.get('assigned_to')
+    if assigned_to:
+        queryset = queryset.filter(assigned_to_id=assigned_to)
+
+    return queryset.order_by('-created_at', '-id')
+
+
+def payments_export_queryset(params):
+    """💰 Платежі з тими ж фільтрами, що і all_payments"""
+    queryset = LeadPaymentOperation.objects.all()
+
+    lead_id = params.get('lead_id')
+    if lead_id:
+        queryset = queryset.filter(lead_id=lead_id)
+
+    client_id = params.get('client_id')
+    if client_id:
+        queryset = queryset.filter(
+            lead__phone_key__in=Client.objects.filter(id=client_id).values_list('phone_key', flat=True)
+        )
+
+    op_type = params.get('type')
+    if op_type:
+        queryset = queryset.filter(operation_type=op_type)
+
+    queryset = _filter_dates(queryset, params)
+
+    return queryset.order_by('-created_at', '-id')
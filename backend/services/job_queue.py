@@ -0,0 +1,347 @@
+# backend/services/job_queue.py
+"""
+⚙️ Черга фонових задач у БД
+
+    enqueue('client.update_metrics', {'phone_key': ...}, dedupe_key=...)
+
+- задача пишеться в поточну транзакцію (BackgroundJob) — атомарно зі зміною
+- воркери (python manage.py run_jobs) забирають задачі умовним UPDATE
+  (status='pending' → 'running'): з кількох воркерів рядок отримує один;
+  на PostgreSQL — SELECT ... FOR UPDATE SKIP LOCKED
+- помилка → повтор з експоненційною затримкою, після max_attempts —
+  в DeadLetterJob
+- задача "зависла" в running довше LOCK_TIMEOUT (воркер помер) —
+  повертається в pending
+- метрики по типах: очікування в черзі, час виконання, пропускна здатність
+
+Обробники реєструються декоратором @job('тип') (див. backend/services/crm_jobs.py).
+
+⚠️ Воркер — окремий процес. Під runserver його запускає apps.py, а в
+продакшені (gunicorn / daphne) без python manage.py run_jobs уся
+CRM-автоматизація (взаємодії, температура, метрики клієнтів) не
+виконується. Серверний процес запускає start_worker_watchdog() з
+wsgi.py / asgi.py: якщо задачі чекають довше WORKER_ALERT_AFTER секунд,
+у лог іде попередження.
+"""
+
+import logging
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from backend.models import BackgroundJob, DeadLetterJob
+
+logger = logging.getLogger('backend.job_queue')
+
+DEFAULT_SETTINGS = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 10,        # сек: 10, 20, 40, 80 ...
+    'BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': 300,       # сек, після яких running-задача вважається покинутою
+    'KEEP_DONE_HOURS': 72,     # скільки тримати виконані задачі (для метрик)
+    'WORKER_ALERT_AFTER': 300, # сек очікування, після яких вважаємо, що воркер не працює (0 — не перевіряти)
+}
+
+JOB_HANDLERS = {}
+
+
+def queue_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'JOB_QUEUE', {})}
+
+
+def job(job_type):
+    """🔌 Реєстрація обробника: handler(payload)"""
+    def decorator(handler):
+        JOB_HANDLERS[job_type] = handler
+        return handler
+    return decorator
+
+
+def enqueue(job_type, payload=None, dedupe_key='', delay=0, max_attempts=None):
+    """
+    📥 Ставить задачу в чергу (в поточній транзакції)
+
+    dedupe_key — якщо задача (job_type, dedupe_key) ще очікує, нова не
+    створюється: десять змін одного клієнта дають один перерахунок.
+    """
+    if dedupe_key and BackgroundJob.objects.filter(
+        job_type=job_type, dedupe_key=dedupe_key, status='pending'
+    ).exists():
+        return None
+
+    return BackgroundJob.objects.create(
+        job_type=job_type,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts or queue_settings()['MAX_ATTEMPTS'],
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# 🔒 ЗАХОПЛЕННЯ ЗАДАЧ
+
+def release_stale_jobs():
+    """🔓 Повертає в чергу задачі воркерів, що впали посеред виконання"""
+    cutoff = timezone.now() - timedelta(seconds=queue_settings()['LOCK_TIMEOUT'])
+    return BackgroundJob.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='pending', locked_by='', locked_at=None
+    )
+
+
+def claim_jobs(worker_id, limit=10, job_types=None):
+    """
+    🔒 Забирає до limit готових задач для воркера
+
+    Кожен рядок захоплюється умовним UPDATE ... WHERE status='pending':
+    якщо інший воркер встиг першим, rowcount = 0 і задача пропускається.
+    """
+    now = timezone.now()
+    ready = BackgroundJob.objects.filter(status='pending', run_after__lte=now)
+    if job_types:
+        ready = ready.filter(job_type__in=job_types)
+    ready = ready.order_by('run_after', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            BackgroundJob.objects.filter(id__in=ids).update(
+                status='running', locked_by=worker_id, locked_at=now, started_at=now
+            )
+        return list(BackgroundJob.objects.filter(id__in=ids).order_by('run_after', 'id'))
+
+    claimed = []
+    for job_id in ready.values_list('id', flat=True)[:limit * 2]:
+        if BackgroundJob.objects.filter(id=job_id, status='pending').update(
+            status='running', locked_by=worker_id, locked_at=now, started_at=now
+        ):
+            claimed.append(job_id)
+            if len(claimed) >= limit:
+                break
+    return list(BackgroundJob.objects.filter(id__in=claimed).order_by('run_after', 'id'))
+
+
+# ▶️ ВИКОНАННЯ
+
+def backoff_seconds(attempts):
+    """Експоненційна затримка з ±20% розкиду, щоб повтори не збігались"""
+    config = queue_settings()
+    delay = min(config['BACKOFF_BASE'] * 2 ** max(attempts - 1, 0), config['BACKOFF_MAX'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(job_obj):
+    """
+    ▶️ Виконує захоплену задачу
+
+    Повертає 'done', 'retry' або 'dead'. Обробник працює у власній транзакції:
+    якщо він впав, його зміни відкочуються разом з ним.
+    """
+    handler = JOB_HANDLERS.get(job_obj.job_type)
+    attempts = job_obj.attempts + 1
+
+    try:
+        if handler is None:
+            raise LookupError(f"Немає обробника для задачі '{job_obj.job_type}'")
+        with transaction.atomic():
+            handler(job_obj.payload)
+    except Exception as e:
+        error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        logger.warning("Задача #%s %s (спроба %s): %s", job_obj.pk, job_obj.job_type, attempts, error)
+
+        if attempts >= job_obj.max_attempts:
+            with transaction.atomic():
+                DeadLetterJob.objects.create(
+                    job_type=job_obj.job_type,
+                    payload=job_obj.payload,
+                    attempts=attempts,
+                    last_error=traceback.format_exc(),
+                    original_job_id=job_obj.pk,
+                    created_at=job_obj.created_at,
+                )
+                job_obj.delete()
+            return 'dead'
+
+        BackgroundJob.objects.filter(pk=job_obj.pk).update(
+            status='pending', attempts=attempts, last_error=error, locked_by='', locked_at=None,
+            run_after=timezone.now() + timedelta(seconds=backoff_seconds(attempts)),
+        )
+        return 'retry'
+
+    BackgroundJob.objects.filter(pk=job_obj.pk).update(
+        status='done', attempts=attempts, finished_at=timezone.now(), locked_by='', locked_at=None,
+    )
+    return 'done'
+
+
+def run_pending_jobs(worker_id=None, limit=10, job_types=None):
+    """🏃 Один прохід воркера: повертає {'done': n, 'retry': n, 'dead': n}"""
+    worker_id = worker_id or default_worker_id()
+    results = {'done': 0, 'retry': 0, 'dead': 0}
+    for job_obj in claim_jobs(worker_id, limit, job_types):
+        results[run_job(job_obj)] += 1
+    return results
+
+
+def purge_finished_jobs(hours=None):
+    """🧹 Видаляє виконані задачі, старші за KEEP_DONE_HOURS"""
+    hours = queue_settings()['KEEP_DONE_HOURS'] if hours is None else hours
+    cutoff = timezone.now() - timedelta(hours=hours)
+    deleted, _ = BackgroundJob.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def requeue_dead_letters(queryset):
+    """🔁 Повертає невиконані задачі в чергу (з нуля спроб)"""
+    count = 0
+    with transaction.atomic():
+        for dead in queryset:
+            BackgroundJob.objects.create(job_type=dead.job_type, payload=dead.payload)
+            dead.delete()
+            count += 1
+    return count
+
+
+# 📊 МЕТРИКИ
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+def job_metrics(minutes=60):
+    """
+    📊 Метрики по типах задач за останні minutes хвилин
+
+    wait — від створення до початку (скільки задача стояла в черзі),
+    run — виконання; в секундах. throughput — виконаних задач за хвилину.
+    """
+    since = timezone.now() - timedelta(minutes=minutes)
+    metrics = {}
+
+    def entry(job_type):
+        return metrics.setdefault(job_type, {
+            'done': 0, 'retried': 0, 'dead': 0, 'pending': 0, 'running': 0,
+            'wait': [], 'run': [],
+        })
+
+    rows = BackgroundJob.objects.filter(status='done', finished_at__gte=since).values_list(
+        'job_type', 'created_at', 'started_at', 'finished_at', 'attempts'
+    )
+    for job_type, created_at, started_at, finished_at, attempts in rows.iterator():
+        item = entry(job_type)
+        item['done'] += 1
+        item['retried'] += attempts > 1
+        if started_at:
+            item['wait'].append((started_at - created_at).total_seconds())
+            item['run'].append((finished_at - started_at).total_seconds())
+
+    for job_type, job_status in BackgroundJob.objects.filter(status__in=['pending', 'running']).values_list(
+        'job_type', 'status'
+    ).iterator():
+        entry(job_type)[job_status] += 1
+
+    for job_type in DeadLetterJob.objects.filter(failed_at__gte=since).values_list('job_type', flat=True):
+        entry(job_type)['dead'] += 1
+
+    for item in metrics.values():
+        wait, run = sorted(item.pop('wait')), sorted(item.pop('run'))
+        item['throughput_per_min'] = round(item['done'] / minutes, 2)
+        item['wait_p50'] = _percentile(wait, 0.5)
+        item['wait_p95'] = _percentile(wait, 0.95)
+        item['run_p50'] = _percentile(run, 0.5)
+        item['run_p95'] = _percentile(run, 0.95)
+        item['run_avg'] = statistics.fmean(run) if run else None
+
+    return metrics
+
+
+def overdue_jobs(seconds):
+    """Скільки задач мали виконатись понад seconds тому, але досі чекають"""
+    return BackgroundJob.objects.filter(
+        status='pending', run_after__lte=timezone.now() - timedelta(seconds=seconds)
+    ).count()
+
+
+def warn_if_no_worker(seconds=None):
+    """⚠️ Попередження в лог, якщо черга не розбирається; повертає кількість прострочених задач"""
+    seconds = queue_settings()['WORKER_ALERT_AFTER'] if seconds is None else seconds
+    count = overdue_jobs(seconds)
+    if count:
+        logger.warning(
+            "⚠️ %s фонових задач чекають понад %s с — чи запущено воркер (python manage.py run_jobs)?",
+            count, seconds,
+        )
+    return count
+
+
+_watchdog_started = False
+
+
+def start_worker_watchdog():
+    """
+    🐕 Фоновий потік серверного процесу: раз на WORKER_ALERT_AFTER секунд
+    перевіряє, чи хтось розбирає чергу (сам задачі не виконує)
+    """
+    global _watchdog_started
+    interval = queue_settings()['WORKER_ALERT_AFTER']
+    if _watchdog_started or not interval:
+        return
+    _watchdog_started = True
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                warn_if_no_worker(interval)
+            except Exception as e:
+                logger.debug("Перевірка воркера не вдалась: %s", e)
+            finally:
+                close_old_connections()
+
+    threading.Thread(target=watch, name='job-queue-watchdog', daemon=True).start()
+
+
+def run_worker(worker_id=None, batch=10, idle_sleep=1.0, max_jobs=None, job_types=None, stop=None, log=print):
+    """
+    🔁 Цикл воркера (для run_jobs)
+
+    stop — callable, що повертає True, коли треба зупинитись.
+    """
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    last_housekeeping = 0.0
+
+    while not (stop and stop()):
+        if time.monotonic() - last_housekeeping > 60:
+            released = release_stale_jobs()
+            purged = purge_finished_jobs()
+            if released or purged:
+                log(f"🔓 Повернуто покинутих задач: {released}, 🧹 видалено старих: {purged}")
+            last_housekeeping = time.monotonic()
+
+        results = run_pending_jobs(worker_id, batch, job_types)
+        handled = sum(results.values())
+        processed += handled
+        if handled:
+            log(f"⚙️ {worker_id}: виконано {results['done']}, повтор {results['retry']}, в dead-letter {results['dead']}")
+
+        if max_jobs is not None and processed >= max_jobs:
+            break
+        if not handled:
+            time.sleep(idle_sleep)
+
+        connection.close_if_unusable_or_obsolete()
+
+    return processed
@@ -1,29 +1,32 @@
 from backend.models import Lead, Client
 from django.contrib.auth.models import User
 from backend.ws_notify import notify_lead_created
+from backend.services.dedupe_service import create_lead_once
+from backend.services.manager_availability import pick_manager
+from backend.services.lead_queue import claim_next_lead, queue_position
+from backend.services.lead_routing import route_lead
+from backend.utils.phones import canonical_phone
 
 
-def get_free_manager() -> User | None:
-    # Всі менеджери
-    managers = User.objects.all()
+def get_free_manager(strategy=None) -> User | None:
+    """
+    👥 Менеджер для нового ліда / клієнта
 
-    for manager in managers:
-        active_lead = Lead.objects.filter(assigned_to=manager, status='in_work').exists()
-        if not active_lead:
-            return manager  # перший вільний
-
-    return None
+    Вибір через індекс доступності ManagerLoad (один запит замість
+    exists() на кожного користувача). strategy — назва стратегії,
+    за замовчуванням settings.LEAD_ASSIGNMENT_STRATEGY ('first_free').
+    """
+    return pick_manager(strategy)
 
 
 def create_lead_with_logic(data: dict) -> tuple[Lead, dict]:
-    from backend.models import Lead as LeadModel
-
     context = {}
 
     # 1. Клієнт
     client, created = Client.objects.get_or_create(
-        phone=data['phone'],
+        phone_key=canonical_phone(data['phone']),
         defaults={
+            'phone': data['phone'],
             'full_name': data.get('full_name', ''),
             'email': data.get('email', ''),
             'assigned_to': None
@@ -36,46 +39,59 @@ def create_lead_with_logic(data: dict) -> tuple[Lead, dict]:
     manager = client.assigned_to or data.get('assigned_to')
     context['manager_initial'] = manager.username if manager else None
 
+    if not manager:
+        # 🧭 Правила маршрутизації (джерело / місто / ціна / навантаження)
+        manager, rule = route_lead(data, city=client.city)
+        context['routing_rule'] = rule.name if rule else None
+
     if not manager:
         manager = get_free_manager()
         context['manager_auto_found'] = manager.username if manager else None
 
-    # 3. Статус і позиція в черзі
-    status = 'queued'
-    queued_position = None
+    # 3. Лід завжди стає в чергу, а в роботу його (або старший з черги)
+    #    переводить атомарний claim_next_lead — без гонки "перевірив → зберіг"
+    if not manager:
+        context['reason'] = 'Не знайдено вільного менеджера — лід без призначення'
+
+    # 4. Створення ліда — атомарно: паралельний запит з тим самим
+    #    order_number / delivery_number отримає вже створений лід
+    lead, created, duplicate_field = create_lead_once(
+        lambda: Lead.objects.create(
+            full_name=data.get('full_name', client.full_name),
+            phone=data['phone'],
+            email=data.get('email', client.email),
+            source=data.get('source', ''),
+            description=data.get('description', ''),
+            price=data.get('price', 0),
+            order_number=data.get('order_number') or None,
+            delivery_number=data.get('delivery_number') or '',
+            status='queued',
+            assigned_to=manager,
+        ),
+        order_number=data.get('order_number'),
+        delivery_number=data.get('delivery_number'),
+    )
+    context['created'] = created
+
+    if not created:
+        context['duplicate_field'] = duplicate_field
+        context['final_status'] = lead.status
+        context['assigned_to'] = lead.assigned_to.username if lead.assigned_to else None
+        context['queued_position'] = queue_position(lead)
+        context['reason'] = f'Лід з таким {duplicate_field} вже існує (#{lead.id})'
+        return lead, context
 
     if manager:
-        active = LeadModel.objects.filter(assigned_to=manager, status='in_work').exists()
-        if not active:
-            status = 'in_work'
+        claim_next_lead(manager)
+        # Лід міг взяти в роботу і цей виклик, і сигнал створення (поза транзакцією)
+        lead.refresh_from_db(fields=['status', 'status_updated_at'])
+        if lead.status == 'in_work':
             context['reason'] = 'Менеджер вільний — лід одразу в роботу'
         else:
-            status = 'queued'
-            last_position = LeadModel.objects.filter(
-                assigned_to=manager, status='queued'
-            ).count()
-            queued_position = last_position + 1
-            context['reason'] = f'Менеджер зайнятий — лід у черзі #{queued_position}'
-    else:
-        context['reason'] = 'Не знайдено вільного менеджера — лід без призначення'
+            context['reason'] = f'Менеджер зайнятий — лід у черзі #{queue_position(lead)}'
 
-    # 4. Створення ліда
-    lead = Lead.objects.create(
-        full_name=data.get('full_name', client.full_name),
-        phone=data['phone'],
-        email=data.get('email', client.email),
-        source=data.get('source', ''),
-        description=data.get('description', ''),
-        price=data.get('price', 0),
-        delivery_number=data.get('delivery_number', ''),
-        status=status,
-        assigned_to=manager,
-        queued_position=queued_position
-    )
-
-    context['final_status'] = status
+    context['final_status'] = lead.status
     context['assigned_to'] = manager.username if manager else None
-    context['queued_position'] = queued_position
-
+    context['queued_position'] = queue_position(lead)
 
-    return lead, context
\ No newline at end of file
+    return lead, context
@@ -1,32 +1,134 @@
-from backend.models import Lead
+# backend/services/lead_queue.py
+"""
+📥 Черга лідів менеджера
+
+Черга — ліди менеджера зі статусом queued у порядку (created_at, id).
+Позиція не зберігається, а рахується при читанні, тому два паралельні
+звернення ніколи не отримають однакову позицію.
+
+Взяття наступного ліда — один умовний UPDATE:
+
+    UPDATE lead SET status = 'in_work'
+    WHERE id = (найстаріший queued лід менеджера)
+      AND status = 'queued'
+      AND NOT EXISTS (лід менеджера в статусі in_work)
+
+БД виконує перевірку і зміну атомарно: з N паралельних спроб
+лід отримує рівно одна, і в менеджера не буває двох лідів in_work.
+"""
+
+import logging
+
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, Q, Subquery
+from django.utils import timezone
+
+from backend.models import Lead
+from backend.services.bulk_mode import bump_data_version, clear_cache, record_lead
+from backend.services.manager_availability import apply_lead_transition
+from backend.validators.lead_status_validator import LeadStatusValidator
+
+logger = logging.getLogger('backend.lead_queue')
+
+QUEUE_ORDERING = ('created_at', 'id')
+
+
+def queued_leads(manager_id):
+    """📋 Черга менеджера у стабільному порядку"""
+    return Lead.objects.filter(assigned_to_id=manager_id, status='queued').order_by(*QUEUE_ORDERING)
+
+
+def claim_next_lead(manager) -> Lead | None:
+    """
+    ⚛️ Атомарно переводить найстаріший queued лід менеджера в роботу
+
+    Повертає взятий лід або None (черга порожня / вже є лід в роботі /
+    паралельний запит встиг першим). Безпечно викликати з будь-якої
+    кількості потоків і процесів одночасно.
+    """
+    manager_id = manager.pk if isinstance(manager, User) else manager
+    if not manager_id:
+        return None
+
+    oldest = queued_leads(manager_id).values('pk')[:1]
+    has_active = Lead.objects.filter(assigned_to_id=manager_id, status='in_work')
+    now = timezone.now()
+
+    with transaction.atomic():
+        claimed = Lead.objects.filter(
+            pk=Subquery(oldest), assigned_to_id=manager_id, status='queued'
+        ).exclude(Exists(has_active)).update(status='in_work', status_updated_at=now)
+
+        if not claimed:
+            return None
+
+        lead = Lead.objects.filter(assigned_to_id=manager_id, status='in_work').order_by('-status_updated_at', '-id').first()
+
+        # UPDATE не викликає сигналів — робимо те саме, що lead_post_save при зміні статусу
+        from backend.signals import lead_status_changed
+
+        logger.info(
+            "🔄 ЗМІНА СТАТУСУ ліда #%s (%s): %s → %s", lead.pk, lead.phone,
+            LeadStatusValidator.STATUS_NAMES.get('queued'), LeadStatusValidator.STATUS_NAMES.get('in_work'),
+            extra={'lead_id': lead.pk, 'old_status': 'queued', 'new_status': 'in_work'}
+        )
+        apply_lead_transition(manager_id, 'queued', manager_id, 'in_work')
+        record_lead(lead, manager_id)
+        lead_status_changed(lead, 'queued')
+        clear_cache()
+        bump_data_version('leads', 'clients')
+
+    logger.debug("🚀 Лід #%s взято в роботу менеджером #%s", lead.pk, manager_id)
+    return lead
 
 
 def assign_next_lead(manager: User):
     """
     Дає менеджеру наступного ліда з черги
     """
-    # Перевірка, чи є вже активний лід
     active = Lead.objects.filter(assigned_to=manager, status='in_work').first()
     if active:
         return active  # вже є активний — новий не видаємо
 
-    next_lead = Lead.objects.filter(
-        assigned_to=manager,
-        status='queued'
-    ).order_by('created_at').first()
+    return claim_next_lead(manager)
+
 
-    if next_lead:
-        next_lead.status = 'in_work'
-        next_lead.save()
-        return next_lead
+def on_lead_released(manager_id):
+    """
+    Викликається, коли лід менеджера вийшов зі статусу in_work
+    (завершено, відмовлено, передано далі) — видаємо наступного з черги
+    """
+    if manager_id:
+        transaction.on_commit(lambda: claim_next_lead(manager_id))
 
-    return None
 
+def queue_position(lead: Lead) -> int | None:
+    """🔢 Позиція ліда в черзі (1 — наступний), рахується при читанні"""
+    if lead.status != 'queued' or not lead.assigned_to_id:
+        return None
+    ahead = Lead.objects.filter(assigned_to_id=lead.assigned_to_id, status='queued').filter(
+        Q(created_at__lt=lead.created_at) | Q(created_at=lead.created_at, id__lt=lead.id)
+    ).count()
+    return ahead + 1
 
-def on_lead_closed(lead: Lead):
+
+def queue_positions(leads) -> dict:
     """
-    Викликається, коли лід завершено (paid або declined)
+    🔢 Позиції в черзі для сторінки лідів одним запитом: {lead_id: позиція}
+
+    Читає черги тільки тих менеджерів, чиї queued ліди є на сторінці.
     """
-    if lead.status in ['paid', 'declined'] and lead.assigned_to:
-        assign_next_lead(lead.assigned_to)
+    manager_ids = {lead.assigned_to_id for lead in leads if lead.status == 'queued' and lead.assigned_to_id}
+    if not manager_ids:
+        return {}
+
+    positions, current_manager, position = {}, None, 0
+    rows = Lead.objects.filter(assigned_to_id__in=manager_ids, status='queued') \
+        .order_by('assigned_to_id', *QUEUE_ORDERING).values_list('id', 'assigned_to_id')
+    for lead_id, manager_id in rows:
+        if manager_id != current_manager:
+            current_manager, position = manager_id, 0
+        position += 1
+        positions[lead_id] = position
+    return positions
@@ -0,0 +1,171 @@
+# backend/services/lead_routing.py
+"""
+🧭 Маршрутизація нових лідів за правилами
+
+Правила (LeadRoutingRule) компілюються в таблицю рішень:
+
+    (джерело, місто) → кортеж правил, відсортованих за пріоритетом
+
+Для кожної пари конкретних значень з правил (плюс '' — "будь-яке")
+наперед зібрано всі правила, що під неї підходять, тому вибір — один
+dict lookup і прохід по кількох діапазонах цін, без запитів до БД.
+Менеджера правило вибирає через pick_manager() по лічильниках ManagerLoad.
+
+Гаряче перезавантаження:
+- у цьому процесі — сигнали змін правил скидають таблицю одразу
+- в інших процесах — раз на ROUTING_RULES_CHECK_INTERVAL секунд
+  звіряється відбиток (кількість, max(updated_at)) і таблиця перебудовується
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, F, Max
+
+from backend.models import LeadRoutingRule
+from backend.services.manager_availability import STRATEGIES, eligible_managers, pick_manager
+
+logger = logging.getLogger('backend.lead_routing')
+
+ANY = ''
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    id: int
+    name: str
+    min_price: Decimal | None
+    max_price: Decimal | None
+    manager_ids: tuple
+    strategy: str | None
+    max_load: int | None
+
+    def matches_price(self, price):
+        return (self.min_price is None or price >= self.min_price) and \
+            (self.max_price is None or price < self.max_price)
+
+
+class RoutingTable:
+    """📋 Скомпільована таблиця рішень"""
+
+    def __init__(self, rules=(), fingerprint=None):
+        self.fingerprint = fingerprint
+        self.rules_count = len(rules)
+        self.sources = {rule_source for rule_source, _, _ in rules if rule_source}
+        self.cities = {rule_city for _, rule_city, _ in rules if rule_city}
+        self.table = {}
+
+        for source in (*self.sources, ANY):
+            for city in (*self.cities, ANY):
+                self.table[(source, city)] = tuple(
+                    rule for rule_source, rule_city, rule in rules
+                    if rule_source in (source, ANY) and rule_city in (city, ANY)
+                )
+
+    def match(self, source, city, price):
+        """⚡ Правила для ліда в порядку пріоритету (без запитів до БД)"""
+        source = normalize(source)
+        city = normalize(city)
+        key = (source if source in self.sources else ANY, city if city in self.cities else ANY)
+        return [rule for rule in self.table.get(key, ()) if rule.matches_price(price)]
+
+
+def normalize(value):
+    return (value or '').strip().casefold()
+
+
+def to_price(value):
+    try:
+        return Decimal(str(value or 0))
+    except (InvalidOperation, ValueError):
+        return Decimal(0)
+
+
+# 🔄 ЗАВАНТАЖЕННЯ ТА ГАРЯЧЕ ПЕРЕЗАВАНТАЖЕННЯ
+
+_lock = threading.Lock()
+_table = None
+_checked_at = 0.0
+
+
+def _fingerprint():
+    return tuple(LeadRoutingRule.objects.aggregate(total=Count('id'), changed=Max('updated_at')).values())
+
+
+def compile_rules(fingerprint=None) -> RoutingTable:
+    """🛠️ Читає активні правила з БД і будує таблицю рішень"""
+    rules = []
+    queryset = LeadRoutingRule.objects.filter(is_active=True).prefetch_related('managers').order_by('priority', 'id')
+    for rule in queryset:
+        strategy = rule.strategy or None
+        if strategy and strategy not in STRATEGIES:
+            logger.warning("Правило #%s: невідома стратегія '%s' — використовую стандартну", rule.id, strategy)
+            strategy = None
+
+        rules.append((normalize(rule.source), normalize(rule.city), CompiledRule(
+            id=rule.id,
+            name=rule.name,
+            min_price=rule.min_price,
+            max_price=rule.max_price,
+            manager_ids=tuple(sorted(manager.id for manager in rule.managers.all())),
+            strategy=strategy,
+            max_load=rule.max_load,
+        )))
+    return RoutingTable(rules, fingerprint)
+
+
+def get_routing_table() -> RoutingTable:
+    """📋 Поточна таблиця (перебудовується, якщо правила змінились)"""
+    global _table, _checked_at
+
+    interval = getattr(settings, 'ROUTING_RULES_CHECK_INTERVAL', 5)
+    if _table is not None and time.monotonic() - _checked_at < interval:
+        return _table
+
+    with _lock:
+        if _table is None or time.monotonic() - _checked_at >= interval:
+            fingerprint = _fingerprint()
+            if _table is None or _table.fingerprint != fingerprint:
+                _table = compile_rules(fingerprint)
+                logger.info("🧭 Правила маршрутизації перекомпільовано: %s правил, %s комірок таблиці",
+                            _table.rules_count, len(_table.table))
+            _checked_at = time.monotonic()
+    return _table
+
+
+def reset_routing_table():
+    """🔄 Скидає таблицю — наступний виклик перекомпілює правила"""
+    global _table
+    with _lock:
+        _table = None
+
+
+# 🎯 ВИБІР МЕНЕДЖЕРА
+
+def rule_candidates(rule: CompiledRule):
+    """👥 Кандидати правила — звужений queryset ManagerLoad (без агрегатів по лідах)"""
+    candidates = eligible_managers()
+    if rule.manager_ids:
+        candidates = candidates.filter(manager_id__in=rule.manager_ids)
+    if rule.max_load is not None:
+        candidates = candidates.alias(load=F('active_count') + F('queued_count')).filter(load__lt=rule.max_load)
+    return candidates
+
+
+def route_lead(data: dict, city=None):
+    """
+    🧭 Менеджер для нового ліда за правилами
+
+    Повертає (менеджер, правило) або (None, None), якщо жодне правило
+    не підійшло чи у відповідних правил немає вільних менеджерів.
+    """
+    rules = get_routing_table().match(data.get('source'), city or data.get('city'), to_price(data.get('price')))
+    for rule in rules:
+        manager = pick_manager(rule.strategy, rule_candidates(rule))
+        if manager:
+            return manager, rule
+    return None, None
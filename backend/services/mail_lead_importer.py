@@ -1,25 +1,30 @@
 # backend/services/mail_lead_importer.py - ПОКРАЩЕНА ВЕРСІЯ
 
 import imaplib
+import logging
 import email
+import time
+from dataclasses import dataclass
 from email.header import decode_header
-import re
 from datetime import datetime
 from email.utils import parseaddr
 
-from backend.models import Client, Lead, EmailIntegrationSettings
+from django.db import transaction
+from django.utils import timezone
+
+from backend.models import Client, Lead, EmailIntegrationSettings, ProcessedEmail
 from backend.services.lead_creation_service import create_lead_with_logic
 from backend.ws_notify import notify_lead_created
+from backend.services.bulk_mode import bulk_mode
+from backend.services.email_classifier import (
+    OPTIONAL_FIELDS, REQUIRED_FIELDS, classify, extract_fields,
+)
+from backend.utils.phones import canonical_phone
+from backend.utils.imap import (
+    decode_part, fetch_item, open_imap, parse_fetch, response_size, text_part, uid_set,
+)
 
-
-def normalize_phone(phone: str) -> str:
-    """Нормалізує номер телефону до стандартного формату"""
-    digits = re.sub(r'\D', '', phone)
-    if digits.startswith("0"):
-        digits = "38" + digits
-    elif not digits.startswith("38") and len(digits) == 10:
-        digits = "38" + digits
-    return digits
+logger = logging.getLogger('backend.mail_lead_importer')
 
 
 def parse_email_body(msg) -> str:
@@ -33,136 +38,48 @@ def parse_email_body(msg) -> str:
 def is_lead_email(text: str, subject: str = "", sender: str = "") -> bool:
     """
     🔍 РОЗУМНА ПЕРЕВІРКА - чи є email справжнім лідом
-    """
-
-    # 1. Перевіряємо наявність ключових слів лідів в темі
-    lead_subject_keywords = [
-        'new lead', 'form submission', 'contact form', 'заявка', 'форма',
-        'lead id', 'form id', 'заявление', 'запрос', 'inquiry'
-    ]
-
-    subject_lower = subject.lower()
-    for keyword in lead_subject_keywords:
-        if keyword in subject_lower:
-            print(f"✅ Знайдено ключове слово в темі: '{keyword}'")
-            return True
-
-    # 2. Перевіряємо структуру ліда в тексті
-    lead_patterns = [
-        r'\*\*form_id:\*\*',  # **form_id:**
-        r'\*form_id:\*',  # *form_id:*
-        r'form_id\s*:',  # form_id:
-        r'\*\*Lead Id:\*\*',  # **Lead Id:**
-        r'Lead Id\s*:',  # Lead Id:
-        r'\*\*Name:\*\*',  # **Name:**
-        r'Name\s*:',  # Name:
-        r'\*\*Phone Number:\*\*',  # **Phone Number:**
-        r'Phone Number\s*:',  # Phone Number:
-    ]
-
-    pattern_matches = 0
-    for pattern in lead_patterns:
-        if re.search(pattern, text, re.IGNORECASE):
-            pattern_matches += 1
-
-    # Якщо знайдено 3+ патернів - це лід
-    if pattern_matches >= 3:
-        print(f"✅ Знайдено {pattern_matches} патернів ліда")
-        return True
-
-    # 3. Перевіряємо виключення - маркетингові листи
-    marketing_keywords = [
-        'unsubscribe', 'відписатися', 'premium video', 'newsletter',
-        'Elliott Wave', 'investment', 'trading', 'market analysis',
-        'promotional', 'discount', 'sale', 'offer expires'
-    ]
-
-    text_lower = text.lower()
-    marketing_found = []
-    for keyword in marketing_keywords:
-        if keyword.lower() in text_lower:
-            marketing_found.append(keyword)
-
-    if marketing_found:
-        print(f"❌ Виявлено маркетинговий контент: {marketing_found}")
-        return False
 
-    # 4. Перевіряємо відправника
-    suspicious_senders = [
-        'noreply', 'no-reply', 'newsletter', 'marketing', 'promo',
-        'elliottwave', 'notifications', 'updates'
-    ]
-
-    sender_lower = sender.lower()
-    for suspicious in suspicious_senders:
-        if suspicious in sender_lower:
-            print(f"❌ Підозрілий відправник: '{suspicious}' в '{sender}'")
-            return False
-
-    print(f"⚠️ Невизначений тип email - не схоже на лід")
-    return False
+    Тема з ключовим словом або 3+ ознаки структури ліда в тексті — лід;
+    маркетинговий текст або відправник-розсилка — ні. Причина рішення —
+    email_classifier.classify().
+    """
+    decision = classify(text, subject, sender)
+    logger.debug("%s Рішення: %s %s", '✅' if decision else '❌', decision.reason, list(decision.matches))
+    return decision.is_lead
 
 
 def extract_lead_data(text: str) -> dict:
     """
     Парсить структуровані дані з email листа лише якщо це справжній лід
     """
-
-    def extract_field(label: str, text: str) -> str:
-        """Витягує значення поля за його назвою"""
-        # Формат з подвійними зірочками: **label:** value
-        pattern = rf'\*\*{re.escape(label)}:\*\*\s*([^*]+?)(?=\*\*|$)'
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-
-        # Формат з одинарними зірочками: *label:* value
-        pattern = rf'\*{re.escape(label)}:\*\s*([^*\n]+?)(?=\*|$|\n)'
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-
-        # Альтернативний формат без зірочок
-        pattern = rf'{re.escape(label)}:\s*([^*\n]+?)(?=\n|\*\*|\*|$)'
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-
-        return ""
-
     # Обов'язкові поля для валідації ліда
-    required_fields = ["form_id", "Lead Id", "Name", "Phone Number"]
-
-    # Перевіряємо наявність всіх обов'язкових полів
-    missing_fields = []
-    for field in required_fields:
-        if not extract_field(field, text):
-            missing_fields.append(field)
-
+    fields = extract_fields(text, REQUIRED_FIELDS)
+    missing_fields = [field for field in REQUIRED_FIELDS if not fields[field]]
     if missing_fields:
-        print(f"❌ Відсутні обов'язкові поля: {', '.join(missing_fields)}")
+        logger.info("❌ Відсутні обов'язкові поля: %s", ', '.join(missing_fields))
         return None
+    fields.update(extract_fields(text, OPTIONAL_FIELDS))
 
     # Витягуємо основні дані
-    lead_id = extract_field("Lead Id", text)
-    form_id = extract_field("form_id", text) or extract_field("Form ID", text)
-    name = extract_field("Name", text)
-    phone_raw = extract_field("Phone Number", text)
+    lead_id = fields["Lead Id"]
+    form_id = fields["form_id"] or fields["Form ID"]
+    name = fields["Name"]
+    phone_raw = fields["Phone Number"]
 
     # Додаткові поля
-    create_time = extract_field("Create Time", text)
-    ad_id = extract_field("Ad Id", text)
-    ad_name = extract_field("Ad Name", text)
-    adgroup_id = extract_field("Adgroup Id", text)
-    adgroup_name = extract_field("Adgroup Name", text)
-    campaign_id = extract_field("Campaign Id", text)
-    campaign_name = extract_field("Campaign Name", text)
-    form_name = extract_field("Form Name", text)
+    create_time = fields["Create Time"]
+    ad_id = fields["Ad Id"]
+    ad_name = fields["Ad Name"]
+    adgroup_id = fields["Adgroup Id"]
+    adgroup_name = fields["Adgroup Name"]
+    campaign_id = fields["Campaign Id"]
+    campaign_name = fields["Campaign Name"]
+    form_name = fields["Form Name"]
 
     # Обробляємо телефон
-    phone = normalize_phone(phone_raw) if phone_raw else ""
+    phone = canonical_phone(phone_raw)
     if not phone:
-        print(f"❌ Неможливо нормалізувати номер телефону: {phone_raw}")
+        logger.info("❌ Неможливо нормалізувати номер телефону: %s", phone_raw)
         return None
 
     # Формуємо опис з усіх даних
@@ -186,191 +103,345 @@ def extract_lead_data(text: str) -> dict:
         "description": "\n".join(filter(None, description_parts)),
         "source": "email",
         "price": 0,
+        # Form ID спільний для всіх лідів з форми — лишається тільки в описі,
+        # унікальним ключем є Lead ID
         "delivery_number": lead_id,
-        "order_number": form_id
     }
 
 
-def fetch_emails_and_create_leads(start_date: datetime = None, settings_obj=None):
-    """Завантажує email листи та створює ліди з розумною фільтрацією"""
-    if not settings_obj:
-        print("❌ Не передано settings_obj")
-        return
+MAX_EMAIL_ATTEMPTS = 3  # скільки разів повторювати лист, обробка якого впала
+FETCH_BATCH = 100       # UID в одному FETCH
+IMAP_TIMEOUT = 60       # сек на операцію з сервером
+HEADER_FIELDS = 'BODY.PEEK[HEADER.FIELDS (FROM SUBJECT MESSAGE-ID)]'
 
-    EMAIL_USER = settings_obj.email
-    EMAIL_PASS = settings_obj.app_password
-    IMAP_HOST = settings_obj.imap_host
-    FOLDER = settings_obj.folder
 
-    print(f"📧 Налаштування:")
-    print(f"   - Email: {EMAIL_USER}")
-    print(f"   - IMAP: {IMAP_HOST}")
-    print(f"   - Папка: {FOLDER}")
-    print(f"   - Розумна фільтрація: ✅ УВІМКНЕНА")
+@dataclass
+class ImportStats:
+    """📊 Підсумок одного проходу по акаунту"""
+    found: int = 0       # нових UID у папці
+    known: int = 0       # вже є в журналі ProcessedEmail
+    filtered: int = 0    # не ліди
+    processed: int = 0   # розпізнано як лід
+    created: int = 0
+    skipped: int = 0     # невірна структура або лід уже існує
+    errors: int = 0
+    last_uid: int = 0
+    bodies: int = 0          # листів, для яких завантажено текст
+    bytes_fetched: int = 0   # байтів у відповідях FETCH
+    elapsed: float = 0.0
 
-    try:
-        mail = imaplib.IMAP4_SSL(IMAP_HOST)
-        mail.login(EMAIL_USER, EMAIL_PASS)
-        mail.select(FOLDER)
-
-        if start_date is None:
-            start_date = datetime.now()
-
-        start_date_str = start_date.strftime("%d-%b-%Y")
-        search_criteria = f'(SINCE "{start_date_str}")'
-        status, messages = mail.search(None, search_criteria)
-
-        if not messages[0]:
-            print("📧 Нових листів не знайдено")
-            return
-
-        email_ids = messages[0].split()
-        print(f"📬 Знайдено листів: {len(email_ids)}")
-
-        processed_count = 0
-        created_count = 0
-        skipped_count = 0
-        filtered_count = 0  # Нова метрика - відфільтровані
-
-        for num in email_ids:
-            try:
-                _, msg_data = mail.fetch(num, '(RFC822)')
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
-
-                # Отримуємо відправника
-                from_raw = msg.get("From", "")
-                from_email = parseaddr(from_raw)[1]
-
-                # Отримуємо тему листа
-                subject_raw, encoding = decode_header(msg["Subject"])[0]
-                subject = subject_raw.decode(encoding or 'utf-8') if isinstance(subject_raw, bytes) else subject_raw
-
-                print(f"\n📨 Обробляємо лист:")
-                print(f"   Від: {from_email}")
-                print(f"   Тема: {subject}")
-
-                # Парсимо тіло листа
-                body = parse_email_body(msg)
-
-                # 🔍 РОЗУМНА ПЕРЕВІРКА - чи є це лідом?
-                if not is_lead_email(body, subject, from_email):
-                    print(f"🚫 Email не є лідом - пропускаємо")
-                    filtered_count += 1
-                    continue
-
-                print(f"✅ Email розпізнано як лід - обробляємо")
-
-                data = extract_lead_data(body)
-
-                if not data:
-                    print(f"⚠️ Лист є лідом, але структура даних невірна")
-                    skipped_count += 1
-                    continue
-
-                processed_count += 1
-
-                # Перевіряємо на дублікати по Lead ID
-                if data.get("delivery_number"):
-                    if Lead.objects.filter(delivery_number=data['delivery_number']).exists():
-                        print(f"⚠️ Lead ID вже існує — {data['delivery_number']} — пропущено")
-                        skipped_count += 1
-                        continue
-
-                # Логіка створення/оновлення клієнта
-                phone = data['phone']
-                name = data['full_name']
-
-                try:
-                    client = Client.objects.get(phone=phone)
-                    print(f"📞 Знайдено існуючого клієнта: {client.full_name} ({phone})")
-
-                    # Оновлюємо ім'я клієнта, якщо воно не заповнене або відрізняється
-                    if not client.full_name or client.full_name != name:
-                        old_name = client.full_name
-                        client.full_name = name
-                        client.save()
-                        print(f"👤 Оновлено ім'я клієнта: '{old_name}' → '{name}'")
-
-                    data['assigned_to'] = client.assigned_to
-
-                except Client.DoesNotExist:
-                    client = Client.objects.create(
-                        phone=phone,
-                        full_name=name,
-                        email=data.get('email', ''),
-                        type='individual',
-                        status='active'
-                    )
-                    print(f"👤 Створено нового клієнта: {name} ({phone})")
-                    data['assigned_to'] = None
-
-                # Створюємо лід
-                lead, context = create_lead_with_logic(data)
-                notify_lead_created(lead)
-                created_count += 1
-
-                print(f"✅ Лід створено: {lead.full_name} — {lead.phone} — Lead ID: {lead.delivery_number}")
-                print(f"   Статус: {context['final_status']}, Менеджер: {context['assigned_to']}")
-
-            except Exception as e:
-                print(f"❌ Помилка обробки листа: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
-
-        mail.logout()
-        print(f"\n📊 Обробка завершена:")
-        print(f"   - Всього листів знайдено: {len(email_ids)}")
-        print(f"   - 🚫 Відфільтровано (не ліди): {filtered_count}")
-        print(f"   - 📋 Листів оброблено як ліди: {processed_count}")
-        print(f"   - ✅ Лідів створено: {created_count}")
-        print(f"   - ⚠️ Пропущено (дублікати/помилки): {skipped_count}")
+    @property
+    def messages_per_sec(self):
+        return self.found / self.elapsed if self.elapsed else 0.0
 
+
+def _decode_subject(msg) -> str:
+    subject_raw, encoding = decode_header(msg.get("Subject", ""))[0]
+    return subject_raw.decode(encoding or 'utf-8', errors='replace') if isinstance(subject_raw, bytes) else subject_raw
+
+
+def _message_key(msg, settings_obj, uid_validity, uid) -> str:
+    """Message-ID листа; якщо заголовка немає — стабільний ключ з акаунта та UID"""
+    message_id = (msg.get("Message-ID") or "").strip()
+    if not message_id:
+        message_id = f"<{settings_obj.pk}.{uid_validity}.{uid}@imap.nashcrm>"
+    return message_id[:255]
+
+
+def _select_folder(mail, folder):
+    """Відкриває папку, повертає її UIDVALIDITY (None, якщо сервер не повідомив)"""
+    status, data = mail.select(folder)
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f"Не вдалося відкрити папку {folder}: {data}")
+    _, values = mail.response('UIDVALIDITY')
+    return int(values[0]) if values and values[0] else None
+
+
+def _new_uids(mail, settings_obj, uid_validity, start_date, resync=False):
+    """
+    UID листів, яких ще не бачили
+
+    Звичайний прохід — UID SEARCH UID <last+1>:* (сервер повертає найбільший
+    UID навіть коли нових немає, тому фільтруємо). Перша синхронізація,
+    --resync або зміна UIDVALIDITY — SINCE start_date, як раніше.
+    """
+    after_uid = settings_obj.last_uid if settings_obj.uid_validity == uid_validity and not resync else 0
+    if after_uid:
+        _, data = mail.uid('SEARCH', None, f'UID {after_uid + 1}:*')
+    else:
+        _, data = mail.uid('SEARCH', None, f'(SINCE "{start_date.strftime("%d-%b-%Y")}")')
+    uids = sorted(int(uid) for uid in (data[0] or b'').split())
+    return [uid for uid in uids if uid > after_uid], after_uid
+
+
+def _import_lead_email(headers, body, stats):
+    """
+    Розбирає один лист (заголовки + текст text/plain) і створює лід
+
+    Повертає (outcome, lead) для журналу ProcessedEmail.
+    """
+    from_email = parseaddr(headers.get("From", ""))[1]
+    subject = _decode_subject(headers)
+    logger.debug("📨 Обробляємо лист від %s: %s", from_email, subject)
+
+    # 🔍 РОЗУМНА ПЕРЕВІРКА - чи є це лідом?
+    decision = classify(body, subject, from_email)
+    if not decision:
+        logger.debug("🚫 Email не є лідом (%s: %s) - пропускаємо", decision.reason, list(decision.matches),
+                     extra={'reason': decision.reason})
+        stats.filtered += 1
+        return 'filtered', None
+
+    logger.debug("✅ Email розпізнано як лід (%s: %s) - обробляємо", decision.reason, list(decision.matches))
+
+    data = extract_lead_data(body)
+
+    if not data:
+        logger.warning("⚠️ Лист є лідом, але структура даних невірна")
+        stats.skipped += 1
+        return 'invalid', None
+
+    stats.processed += 1
+
+    # Перевіряємо на дублікати по Lead ID (унікальний індекс)
+    if data.get("delivery_number"):
+        existing = Lead.objects.filter(delivery_number=data['delivery_number']).first()
+        if existing:
+            logger.warning("⚠️ Lead ID вже існує — %s — пропущено", data['delivery_number'])
+            stats.skipped += 1
+            return 'duplicate', existing
+
+    # Логіка створення/оновлення клієнта
+    phone = data['phone']
+    name = data['full_name']
+
+    client = Client.objects.filter(phone_key=canonical_phone(phone)).first()
+    if client:
+        logger.debug("📞 Знайдено існуючого клієнта: %s (%s)", client.full_name, phone)
+
+        # Оновлюємо ім'я клієнта, якщо воно не заповнене або відрізняється
+        if not client.full_name or client.full_name != name:
+            old_name = client.full_name
+            client.full_name = name
+            client.save()
+            logger.debug("👤 Оновлено ім'я клієнта: '%s' → '%s'", old_name, name)
+
+        data['assigned_to'] = client.assigned_to
+    else:
+        client = Client.objects.create(
+            phone=phone,
+            full_name=name,
+            email=data.get('email', ''),
+            type='individual',
+            status='active'
+        )
+        logger.debug("👤 Створено нового клієнта: %s (%s)", name, phone)
+        data['assigned_to'] = None
+
+    # Створюємо лід (якщо паралельний імпорт встиг першим — отримаємо існуючий)
+    lead, context = create_lead_with_logic(data)
+    if not context.get('created', True):
+        logger.warning("⚠️ Lead ID вже існує — %s — пропущено", data['delivery_number'])
+        stats.skipped += 1
+        return 'duplicate', lead
+    notify_lead_created(lead)
+    stats.created += 1
+
+    logger.info(
+        "✅ Лід створено: %s — %s — Lead ID: %s, статус: %s, менеджер: %s",
+        lead.full_name, lead.phone, lead.delivery_number, context['final_status'], context['assigned_to'],
+        extra={'lead_id': lead.id}
+    )
+    return 'lead', lead
+
+
+def fetch_emails_and_create_leads(start_date: datetime = None, settings_obj=None, resync=False):
+    """
+    Завантажує нові email листи та створює ліди з розумною фільтрацією
+
+    Окреме з'єднання на один прохід (див. sync_mailbox). Помилки
+    логуються, а не кидаються; повертає ImportStats або None.
+    """
+    if not settings_obj:
+        logger.warning("❌ Не передано settings_obj")
+        return None
+
+    logger.debug("📧 Налаштування: %s, IMAP %s, папка %s", settings_obj.email, settings_obj.imap_host, settings_obj.folder)
+
+    try:
+        mail = connect(settings_obj)
+        try:
+            return sync_mailbox(mail, settings_obj, start_date=start_date, resync=resync)
+        finally:
+            mail.logout()
     except Exception as e:
-        print(f"❌ Помилка підключення до email: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Помилка підключення до email: %s", e)
+        return None
 
 
-def fetch_all_emails_and_create_leads(start_date: datetime = None):
-    """Обробляє всі налаштовані email акаунти з розумною фільтрацією"""
-    for settings_obj in EmailIntegrationSettings.objects.all():
-        print(f"\n{'=' * 60}")
-        print(f"📧 Обробляємо акаунт: {settings_obj.name} ({settings_obj.email})")
-        print(f"{'=' * 60}")
-        fetch_emails_and_create_leads(start_date=start_date, settings_obj=settings_obj)
-
-
-# 🔧 ТЕСТОВА ФУНКЦІЯ ДЛЯ ПЕРЕВІРКИ ФІЛЬТРАЦІЇ
-def test_email_filter():
-    """Тестує роботу фільтра email"""
-
-    # Тест 1: Справжній лід
-    lead_text = """
-    **form_id:** 12345
-    **Lead Id:** LEAD_67890
-    **Name:** Іван Петренко
-    **Phone Number:** +38067123456
-    **Create Time:** 2024-06-25 10:30:00
+def connect(settings_obj):
+    """🔌 З'єднання з IMAP акаунта (логін виконано, папку ще не вибрано)"""
+    return open_imap(settings_obj.imap_host, settings_obj.email, settings_obj.app_password, timeout=IMAP_TIMEOUT)
+
+
+def sync_mailbox(mail, settings_obj, start_date: datetime = None, resync=False):
     """
+    🔁 Один прохід по папці акаунта через відкрите з'єднання
+
+    Інкрементально: забираються лише UID, більші за збережений last_uid
+    (start_date — для першої синхронізації, resync=True або зміни
+    UIDVALIDITY). Кожен лист записується в журнал ProcessedEmail за
+    Message-ID в тій самій транзакції, що й лід, — повторний прохід
+    його пропустить. Водяний знак не переходить через лист, обробка якого
+    впала (поки є спроби), щоб наступний прохід повторив його.
+
+    Листи забираються пачками по FETCH_BATCH UID: спершу лише заголовки,
+    текст — тільки для кандидатів (див. _process_batch). Помилки IMAP
+    кидаються далі (з'єднання варто перевідкрити). Повертає ImportStats
+    з кількістю завантажених байтів і швидкістю (листів/с).
+    """
+    if start_date is None:
+        start_date = datetime.now()
+
+    started = time.perf_counter()
+    stats = ImportStats(last_uid=settings_obj.last_uid)
+    uid_validity = _select_folder(mail, settings_obj.folder)
 
-    result1 = is_lead_email(lead_text, "New Lead Submission", "forms@company.com")
-    print(f"Тест 1 (справжній лід): {'✅ ПРОЙШОВ' if result1 else '❌ НЕ ПРОЙШОВ'}")
+    uids, watermark = _new_uids(mail, settings_obj, uid_validity, start_date, resync)
+    stats.found = len(uids)
+    if not uids:
+        logger.debug("📧 Нових листів не знайдено")
+    else:
+        logger.debug("📬 Нових листів: %s (UID > %s)", len(uids), watermark)
 
-    # Тест 2: Маркетинговий лист
-    marketing_text = """
-    We've unlocked a premium video for you for a limited time…
-    Hi Elliott Waver,
-    Most investors would say that oil prices are governed by supply and demand.
-    Unsubscribe from future emails.
+    blocked = False  # лист з помилкою зупиняє водяний знак до наступного проходу
+    try:
+        # Пакет листів — один перерахунок метрик / кешу і одне сповіщення на менеджера
+        with bulk_mode(label='email'):
+            for start in range(0, len(uids), FETCH_BATCH):
+                for uid, done in _process_batch(mail, uids[start:start + FETCH_BATCH], settings_obj,
+                                                uid_validity, stats):
+                    if not done:
+                        blocked = True
+                    elif not blocked:
+                        watermark = uid
+    finally:
+        stats.last_uid = watermark
+        stats.elapsed = time.perf_counter() - started
+        synced_at = timezone.now()
+        EmailIntegrationSettings.objects.filter(pk=settings_obj.pk).update(
+            uid_validity=uid_validity, last_uid=watermark, last_synced_at=synced_at
+        )
+        settings_obj.uid_validity, settings_obj.last_uid, settings_obj.last_synced_at = uid_validity, watermark, synced_at
+
+    log = logger.info if stats.found else logger.debug
+    log(
+        "📊 Обробка завершена: нових листів %s, вже оброблених %s, не ліди %s, оброблено як ліди %s, "
+        "створено %s, пропущено %s, помилок %s; текст завантажено для %s, %.1f КБ, %.1f листів/с",
+        stats.found, stats.known, stats.filtered, stats.processed, stats.created, stats.skipped, stats.errors,
+        stats.bodies, stats.bytes_fetched / 1024, stats.messages_per_sec,
+        extra={'account': settings_obj.name, 'last_uid': watermark, 'bytes': stats.bytes_fetched}
+    )
+    return stats
+
+
+def _fetch(mail, uids, items, stats):
+    status, data = mail.uid('FETCH', uid_set(uids), items)
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f"FETCH {items}: {data}")
+    stats.bytes_fetched += response_size(data)
+    return parse_fetch(data)
+
+
+def _fetch_texts(mail, parts, stats):
     """
+    Тексти text/plain для кандидатів: {uid: (секція, charset, encoding)} → {uid: текст}
 
-    result2 = is_lead_email(marketing_text, "Premium Video Unlocked", "noreply@elliottwave.com")
-    print(f"Тест 2 (маркетинг): {'✅ ПРОЙШОВ' if not result2 else '❌ НЕ ПРОЙШОВ'}")
+    Один FETCH на кожну різну секцію (зазвичай "1" або "1.1") для всієї пачки.
+    """
+    by_section = {}
+    for uid, (section, _, _) in parts.items():
+        by_section.setdefault(section, []).append(uid)
+
+    texts = {}
+    for section, uids in by_section.items():
+        for fields in _fetch(mail, uids, f'(UID BODY.PEEK[{section}])', stats):
+            uid = int(fields.get('UID') or 0)
+            if uid in parts:
+                _, charset, encoding = parts[uid]
+                texts[uid] = decode_part(fetch_item(fields, 'BODY['), encoding, charset)
+    stats.bodies += len(texts)
+    return texts
+
+
+def _process_batch(mail, uids, settings_obj, uid_validity, stats):
+    """
+    Пачка UID: заголовки → журнал → тексти кандидатів → ліди
 
-    return result1 and not result2
+    Спершу одним FETCH лише From / Subject / Message-ID і BODYSTRUCTURE.
+    Вже оброблені (за журналом) листи далі не завантажуються; для решти —
+    лише text/plain частина, без HTML і вкладень. Повертає [(uid, done)]: done=False — лист треба повторити.
+    """
+    headers = {}
+    for fields in _fetch(mail, uids, f'(UID BODYSTRUCTURE {HEADER_FIELDS})', stats):
+        uid = int(fields.get('UID') or 0)
+        headers[uid] = (
+            email.message_from_bytes(fetch_item(fields, 'BODY[HEADER') or b''),
+            fields.get('BODYSTRUCTURE'),
+        )
+
+    keys = {uid: _message_key(msg, settings_obj, uid_validity, uid) for uid, (msg, _) in headers.items()}
+    ledger = {entry.message_id: entry for entry in ProcessedEmail.objects.filter(message_id__in=keys.values())}
+
+    candidates, results = {}, []
+    for uid in uids:
+        if uid not in headers:  # лист видалили між SEARCH і FETCH
+            results.append((uid, True))
+            continue
+        msg, structure = headers[uid]
+        entry = ledger.get(keys[uid])
+        if entry and (entry.outcome != 'error' or entry.attempts >= MAX_EMAIL_ATTEMPTS):
+            stats.known += 1
+            results.append((uid, True))
+        else:
+            candidates[uid] = text_part(structure)
+
+    texts = _fetch_texts(mail, {uid: part for uid, part in candidates.items() if part}, stats)
+    for uid in candidates:
+        results.append((uid, _import_uid(uid, headers[uid][0], texts.get(uid, ''), keys[uid],
+                                         ledger.get(keys[uid]), settings_obj, stats)))
+    return sorted(results)
+
+
+def _record(settings_obj, message_id, uid, entry, outcome, lead=None, error=''):
+    attempts = (entry.attempts + 1) if entry else 1
+    ProcessedEmail.objects.update_or_create(message_id=message_id, defaults={
+        'account': settings_obj, 'uid': uid, 'outcome': outcome, 'lead': lead,
+        'attempts': attempts, 'error': error, 'processed_at': timezone.now(),
+    })
+    return attempts
+
+
+def _import_uid(uid, headers, body, message_id, entry, settings_obj, stats):
+    """
+    Лід + запис у журнал однією транзакцією
+
+    False — обробка впала і лист варто повторити (водяний знак не рухаємо).
+    """
+    try:
+        with transaction.atomic():
+            outcome, lead = _import_lead_email(headers, body, stats)
+            _record(settings_obj, message_id, uid, entry, outcome, lead)
+        return True
+    except Exception as e:
+        logger.exception("❌ Помилка обробки листа %s: %s", message_id, e)
+        stats.errors += 1
+        attempts = _record(settings_obj, message_id, uid, entry, 'error', error=str(e)[:1000])
+        return attempts >= MAX_EMAIL_ATTEMPTS
 
 
-if __name__ == "__main__":
-    test_email_filter()
\ No newline at end of file
+def fetch_all_emails_and_create_leads(start_date: datetime = None, resync=False):
+    """Обробляє всі налаштовані email акаунти з розумною фільтрацією"""
+    for settings_obj in EmailIntegrationSettings.objects.all():
+        logger.debug("📧 Обробляємо акаунт: %s (%s)", settings_obj.name, settings_obj.email)
+        fetch_emails_and_create_leads(start_date=start_date, settings_obj=settings_obj, resync=resync)
@@ -0,0 +1,339 @@
+# backend/services/mail_poller.py
+"""
+📬 Паралельне опитування всіх email акаунтів
+
+    poller = MailPoller(workers=4)
+    poller.run(stop=lambda: stopping)   # python manage.py fetch_leads_from_email --loop
+
+- кожен акаунт EmailIntegrationSettings опитується за власним
+  check_interval у пулі потоків — повільний IMAP-сервер не затримує інших
+- з'єднання тримається між проходами (без логіну щоразу); якщо воно
+  застаріло — одна негайна спроба з новим, далі повтори з експоненційною
+  затримкою (RECONNECT_BASE … RECONNECT_MAX)
+- список акаунтів перечитується з БД кожні RELOAD_INTERVAL секунд
+- lag акаунта — скільки секунд від останньої успішної синхронізації
+  (last_synced_at); статус усіх акаунтів — MailPoller.status()
+
+💤 MailPoller(idle=True) — push замість опитування: кожен акаунт, чий
+сервер підтримує IDLE, отримує власний потік, що тримає IDLE у папці і
+синхронізується одразу після "* N EXISTS" (лід у CRM ~за секунду, без
+періодичних SEARCH). IDLE оновлюється кожні IDLE_RENEW секунд (сервери
+рвуть неактивні з'єднання через 30 хв). Акаунти без IDLE — звичайне
+опитування в пулі.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from backend.models import EmailIntegrationSettings
+from backend.services.mail_lead_importer import connect, sync_mailbox
+from backend.utils.imap import has_capability, idle_wait
+
+logger = logging.getLogger('backend.mail_poller')
+
+RECONNECT_BASE = 5       # сек: 5, 10, 20, 40 ...
+RECONNECT_MAX = 300
+RELOAD_INTERVAL = 60     # як часто перечитувати акаунти з БД
+STATUS_INTERVAL = 300    # як часто писати статус акаунтів у лог
+IDLE_RENEW = 25 * 60     # RFC 2177: перезапускати IDLE частіше ніж раз на 29 хв
+
+# Зміна цих полів — з'єднання треба відкрити заново
+CONNECTION_FIELDS = ('imap_host', 'email', 'app_password', 'folder')
+
+
+def account_lag(settings_obj, now=None):
+    """Секунд від останньої успішної синхронізації акаунта (None — ще не було)"""
+    if settings_obj.last_synced_at is None:
+        return None
+    return ((now or timezone.now()) - settings_obj.last_synced_at).total_seconds()
+
+
+class AccountPoller:
+    """Один акаунт: власне з'єднання, розклад, лічильник помилок"""
+
+    def __init__(self, settings_obj, interval=None, start_date=None, resync=False):
+        self.settings = settings_obj
+        self.interval_override = interval
+        self.start_date = start_date
+        self.resync = resync
+        self.mail = None
+        self.next_run = 0.0          # time.monotonic()
+        self.failures = 0
+        self.last_error = settings_obj.last_error
+        self.last_stats = None
+        self.last_duration = None
+        self.mode = 'poll'
+        self.idle_supported = None    # None — ще не перевіряли
+        self.pending_settings = None  # змінені налаштування для потоку IDLE
+        self.retired = False          # акаунт видалено — потік IDLE завершується
+
+    @property
+    def interval(self):
+        return self.interval_override or self.settings.check_interval or 30
+
+    def backoff(self):
+        delay = min(RECONNECT_BASE * 2 ** max(self.failures - 1, 0), RECONNECT_MAX)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _sync(self):
+        if self.mail is None:
+            self.mail = connect(self.settings)
+        return sync_mailbox(self.mail, self.settings, start_date=self.start_date, resync=self.resync)
+
+    def poll(self):
+        """Один прохід; повертає ImportStats або None, якщо не вдалося"""
+        started = time.monotonic()
+        reused = self.mail is not None
+        try:
+            try:
+                stats = self._sync()
+            except Exception:
+                self.disconnect()
+                if not reused:
+                    raise
+                # Сервер міг закрити давнє з'єднання — одна спроба з новим
+                stats = self._sync()
+        except Exception as e:
+            self.disconnect()
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            delay = self.backoff()
+            self.next_run = time.monotonic() + delay
+            EmailIntegrationSettings.objects.filter(pk=self.settings.pk).update(last_error=self.last_error[:1000])
+            logger.warning(
+                "📭 %s: помилка IMAP (%s підряд), повтор через %.0f с: %s",
+                self.settings.name, self.failures, delay, self.last_error,
+                extra={'account': self.settings.name, 'failures': self.failures},
+            )
+            return None
+        finally:
+            self.last_duration = time.monotonic() - started
+            close_old_connections()
+
+        if self.last_error:
+            EmailIntegrationSettings.objects.filter(pk=self.settings.pk).update(last_error='')
+            logger.info("📬 %s: з'єднання відновлено після %s помилок", self.settings.name, self.failures)
+        self.failures, self.last_error = 0, ''
+        self.resync = False  # повна перевірка — лише на першому проході
+        self.last_stats = stats
+        self.next_run = time.monotonic() + self.interval
+        return stats
+
+    def run_idle(self, stop, renew=IDLE_RENEW):
+        """
+        💤 Синхронізація → IDLE → синхронізація після кожної зміни в папці
+
+        Працює до stop() == True; повертає False одразу, якщо сервер не
+        підтримує IDLE (акаунт переходить на звичайне опитування).
+        """
+        self.mode = 'idle'
+        stop_idle = lambda: stop() or self.retired
+        interrupted = lambda: stop_idle() or self.pending_settings is not None
+        while not stop_idle():
+            if self.pending_settings is not None:
+                self.apply_settings(self.pending_settings)
+            if self.failures and self._sleep_until(self.next_run, interrupted):
+                continue
+            if self.poll() is None:
+                continue
+            if self.idle_supported is None:
+                self.idle_supported = has_capability(self.mail, 'IDLE')
+            if not self.idle_supported:
+                logger.info("📬 %s: сервер не підтримує IDLE — опитування кожні %s с", self.settings.name, self.interval)
+                self.mode = 'poll'
+                return False
+            try:
+                idle_wait(self.mail, renew, stop=interrupted)
+            except Exception as e:
+                # З'єднання перевідкриється на наступній синхронізації
+                logger.warning("📭 %s: IDLE перервано: %s", self.settings.name, e)
+                self.disconnect()
+        return True
+
+    @staticmethod
+    def _sleep_until(deadline, stop):
+        """True — перервано stop()"""
+        while time.monotonic() < deadline:
+            if stop():
+                return True
+            time.sleep(min(max(deadline - time.monotonic(), 0.0), 1.0))
+        return False
+
+    def apply_settings(self, settings_obj):
+        self.pending_settings = None
+        if any(getattr(self.settings, name) != getattr(settings_obj, name) for name in CONNECTION_FIELDS):
+            self.disconnect()
+        self.settings = settings_obj
+
+    def disconnect(self):
+        mail, self.mail = self.mail, None
+        if mail is not None:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
+    def status(self, now=None):
+        stats = self.last_stats
+        return {
+            'account': self.settings.name,
+            'mode': self.mode,
+            'connected': self.mail is not None,
+            'interval': self.interval,
+            'lag': account_lag(self.settings, now),
+            'next_in': max(self.next_run - time.monotonic(), 0.0),
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_duration': self.last_duration,
+            'last_found': stats.found if stats else None,
+            'last_created': stats.created if stats else None,
+        }
+
+
+class MailPoller:
+    """Планувальник: кожен акаунт, чий час настав, — у пул потоків"""
+
+    def __init__(self, accounts=None, workers=4, interval=None, start_date=None, resync=False, idle=False):
+        self.account_names = accounts or None
+        self.workers = workers
+        self.interval = interval
+        self.start_date = start_date
+        self.resync = resync
+        self.idle = idle
+        self.pollers = {}
+        self.in_flight = {}
+        self.idle_threads = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def reload(self):
+        """Нові / видалені / змінені акаунти з БД (ті, що зараз опитуються, — на наступному колі)"""
+        accounts = EmailIntegrationSettings.objects.all()
+        if self.account_names:
+            accounts = accounts.filter(name__in=self.account_names)
+        fresh = {settings_obj.pk: settings_obj for settings_obj in accounts}
+
+        with self._lock:
+            for pk in list(self.pollers):
+                if pk not in fresh and pk in self.idle_threads:
+                    self.pollers[pk].retired = True  # потік IDLE зупиниться і прибере його сам
+                elif pk not in fresh and pk not in self.in_flight:
+                    self.pollers.pop(pk).disconnect()
+            for pk, settings_obj in fresh.items():
+                poller = self.pollers.get(pk)
+                if poller is None:
+                    self.pollers[pk] = AccountPoller(settings_obj, self.interval, self.start_date, self.resync)
+                elif pk in self.idle_threads:
+                    if any(getattr(poller.settings, name) != getattr(settings_obj, name) for name in CONNECTION_FIELDS):
+                        poller.pending_settings = settings_obj  # виходить з IDLE і перепідключається
+                    else:
+                        poller.settings = settings_obj
+                elif pk not in self.in_flight:
+                    poller.apply_settings(settings_obj)
+        return len(fresh)
+
+    def _due(self, now):
+        with self._lock:
+            for pk in [pk for pk, future in self.in_flight.items() if future.done()]:
+                del self.in_flight[pk]
+            for pk in [pk for pk, thread in self.idle_threads.items() if not thread.is_alive()]:
+                del self.idle_threads[pk]
+            return [poller for pk, poller in self.pollers.items()
+                    if pk not in self.in_flight and pk not in self.idle_threads and poller.next_run <= now]
+
+    def _start_idle(self, stop):
+        """Власний потік IDLE для кожного акаунта, крім тих, де сервер його не підтримує"""
+        with self._lock:
+            for pk, poller in self.pollers.items():
+                if pk in self.idle_threads or pk in self.in_flight or poller.idle_supported is False:
+                    continue
+                thread = threading.Thread(
+                    target=self._idle_worker, args=(poller, stop),
+                    name=f'mail-idle-{poller.settings.name}', daemon=True,
+                )
+                self.idle_threads[pk] = thread
+                thread.start()
+
+    def _idle_worker(self, poller, stop):
+        try:
+            poller.run_idle(stop)
+        except Exception:
+            logger.exception("📭 %s: потік IDLE завершився з помилкою — опитування", poller.settings.name)
+            poller.idle_supported, poller.mode = False, 'poll'
+        finally:
+            if poller.retired:
+                poller.disconnect()
+                with self._lock:
+                    self.pollers.pop(poller.settings.pk, None)
+            poller.next_run = time.monotonic() + poller.interval
+            close_old_connections()
+
+    def poll_once(self):
+        """Один прохід по всіх акаунтах паралельно; {назва: ImportStats або None}"""
+        self.reload()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='mail-poll') as pool:
+            futures = {poller.settings.name: pool.submit(poller.poll) for poller in self.pollers.values()}
+        self.close()
+        return {name: future.result() for name, future in futures.items()}
+
+    def run(self, stop=None):
+        """🔁 Цикл до stop() == True"""
+        logger.info(
+            "📬 Опитувач пошти: акаунтів %s, потоків %s%s",
+            self.reload(), self.workers, ', IDLE' if self.idle else '',
+        )
+        last_reload = last_status = time.monotonic()
+        self._stopping.clear()
+        stopped = lambda: self._stopping.is_set() or bool(stop and stop())
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='mail-poll')
+        try:
+            while not (stop and stop()):
+                now = time.monotonic()
+                if now - last_reload > RELOAD_INTERVAL:
+                    self.reload()
+                    last_reload = now
+                if now - last_status > STATUS_INTERVAL:
+                    self.log_status()
+                    last_status = now
+
+                if self.idle:
+                    self._start_idle(stopped)
+                for poller in self._due(now):
+                    self.in_flight[poller.settings.pk] = pool.submit(poller.poll)
+
+                with self._lock:
+                    waiting = [poller.next_run for pk, poller in self.pollers.items() if pk not in self.in_flight]
+                time.sleep(min([max(next_run - time.monotonic(), 0.05) for next_run in waiting] + [1.0]))
+        finally:
+            self._stopping.set()
+            for thread in list(self.idle_threads.values()):
+                thread.join(timeout=5)
+            pool.shutdown(wait=True)
+            self.close()
+
+    def close(self):
+        for poller in self.pollers.values():
+            poller.disconnect()
+
+    def status_for(self, name):
+        now = timezone.now()
+        return next(poller.status(now) for poller in self.pollers.values() if poller.settings.name == name)
+
+    def status(self):
+        now = timezone.now()
+        return [poller.status(now) for poller in self.pollers.values()]
+
+    def log_status(self):
+        for item in self.status():
+            logger.info(
+                "📊 %s: lag %s с, помилок підряд %s, останній прохід %s листів",
+                item['account'], None if item['lag'] is None else round(item['lag']),
+                item['failures'], item['last_found'], extra=item,
+            )
@@ -0,0 +1,232 @@
+# backend/services/manager_availability.py
+"""
+👥 Індекс доступності менеджерів та стратегії призначення
+
+ManagerLoad зберігає для кожного менеджера кількість лідів в роботі (in_work)
+та в черзі (queued). Лічильники оновлюються атомарними F()-UPDATE у сигналах
+при створенні / зміні статусу / перепризначенні / видаленні ліда, тому
+вибір менеджера — один запит по індексу замість exists() на кожного користувача.
+
+Стратегії (settings.LEAD_ASSIGNMENT_STRATEGY, за замовчуванням 'first_free'):
+    first_free    — перший менеджер без ліда в роботі (як раніше)
+    round_robin   — по колу, хто найдавніше отримував лід
+    least_loaded  — мінімум (в роботі, у черзі)
+    weighted      — мінімум навантаження / вага ролі (CustomUser.interface_type)
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from backend.models import CustomUser, Lead, ManagerLoad
+
+logger = logging.getLogger('backend.manager_availability')
+
+# ⚖️ Вага ролі: 0 — роль не отримує лідів. Перевизначається в settings.LEAD_ROLE_WEIGHTS
+# Менеджери з продажу в цьому CRM — interface_type='accountant' (див. ManagerViewSet)
+DEFAULT_ROLE_WEIGHTS = {
+    'accountant': 1.0,
+    'manager': 1.0,
+    'admin': 0.0,
+    'warehouse': 0.0,
+}
+
+ACTIVE_STATUS = 'in_work'
+QUEUED_STATUS = 'queued'
+
+
+def role_weights():
+    return {**DEFAULT_ROLE_WEIGHTS, **getattr(settings, 'LEAD_ROLE_WEIGHTS', {})}
+
+
+def weight_for_role(interface_type):
+    """Користувачі без CustomUser (напр. superuser) лідів не отримують"""
+    return float(role_weights().get(interface_type, 0.0))
+
+
+# 🔢 ПІДТРИМКА ЛІЧИЛЬНИКІВ
+
+def _contribution(status):
+    """(в роботі, у черзі), які лід з цим статусом додає менеджеру"""
+    return int(status == ACTIVE_STATUS), int(status == QUEUED_STATUS)
+
+
+def apply_lead_transition(old_manager_id, old_status, new_manager_id, new_status):
+    """
+    🔄 Оновлює лічильники при зміні (менеджер, статус) ліда
+
+    Для нового ліда old_* = None, для видаленого new_* = None.
+    Кожен менеджер — один UPDATE з F(), безпечний для паралельних процесів.
+    """
+    deltas = {}
+    if old_manager_id:
+        active, queued = _contribution(old_status)
+        deltas[old_manager_id] = (-active, -queued)
+    if new_manager_id:
+        active, queued = _contribution(new_status)
+        old_active, old_queued = deltas.get(new_manager_id, (0, 0))
+        deltas[new_manager_id] = (old_active + active, old_queued + queued)
+
+    for manager_id, (active_delta, queued_delta) in deltas.items():
+        if not active_delta and not queued_delta:
+            continue
+        updated = ManagerLoad.objects.filter(pk=manager_id).update(
+            active_count=Greatest(F('active_count') + Value(active_delta), Value(0)),
+            queued_count=Greatest(F('queued_count') + Value(queued_delta), Value(0)),
+        )
+        if not updated:
+            # Рядка ще немає — рахуємо з нуля (вже з урахуванням поточної зміни)
+            refresh_manager_load(manager_id)
+
+
+def refresh_manager_load(manager_id):
+    """🔁 Точний перерахунок лічильників одного менеджера"""
+    counts = Lead.objects.filter(assigned_to_id=manager_id).aggregate(
+        active=Count('id', filter=Q(status=ACTIVE_STATUS)),
+        queued=Count('id', filter=Q(status=QUEUED_STATUS)),
+    )
+    interface_type = CustomUser.objects.filter(user_id=manager_id).values_list('interface_type', flat=True).first()
+    load, _ = ManagerLoad.objects.update_or_create(
+        manager_id=manager_id,
+        defaults={
+            'active_count': counts['active'],
+            'queued_count': counts['queued'],
+            'weight': weight_for_role(interface_type),
+        }
+    )
+    return load
+
+
+def sync_manager_weight(user_id, interface_type):
+    """⚖️ Оновлює вагу після зміни ролі (створює рядок, якщо його немає)"""
+    if not ManagerLoad.objects.filter(pk=user_id).update(weight=weight_for_role(interface_type)):
+        refresh_manager_load(user_id)
+
+
+def rebuild_manager_load():
+    """
+    🧮 Повний перерахунок індексу одним GROUP BY
+
+    Страховка від розсинхронізації (напр. після QuerySet.update() по лідах,
+    які не викликають сигналів). Повертає кількість рядків індексу.
+    """
+    counts = {
+        row['assigned_to']: row
+        for row in Lead.objects.filter(assigned_to__isnull=False, status__in=[ACTIVE_STATUS, QUEUED_STATUS])
+        .values('assigned_to').annotate(
+            active=Count('id', filter=Q(status=ACTIVE_STATUS)),
+            queued=Count('id', filter=Q(status=QUEUED_STATUS)),
+        )
+    }
+    roles = dict(CustomUser.objects.values_list('user_id', 'interface_type'))
+    existing = {load.pk: load for load in ManagerLoad.objects.all()}
+
+    to_create, to_update = [], []
+    for user_id in User.objects.values_list('id', flat=True):
+        row = counts.get(user_id, {})
+        load = existing.get(user_id) or ManagerLoad(manager_id=user_id)
+        load.active_count = row.get('active', 0)
+        load.queued_count = row.get('queued', 0)
+        load.weight = weight_for_role(roles.get(user_id))
+        (to_update if user_id in existing else to_create).append(load)
+
+    ManagerLoad.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+    ManagerLoad.objects.bulk_update(to_update, ['active_count', 'queued_count', 'weight'], batch_size=500)
+    return len(to_create) + len(to_update)
+
+
+# 🎯 СТРАТЕГІЇ
+
+STRATEGIES = {}
+
+
+def register_strategy(cls):
+    """🔌 Реєстрація стратегії за cls.name (можна додавати власні)"""
+    STRATEGIES[cls.name] = cls()
+    return cls
+
+
+class AssignmentStrategy:
+    """Базова стратегія: order() звужує і сортує кандидатів, перший — переможець"""
+    name = None
+    # Чи оновлювати last_assigned_at після вибору (потрібно для ротації)
+    tracks_assignment = False
+
+    def order(self, candidates):
+        raise NotImplementedError
+
+    def pick(self, candidates):
+        return self.order(candidates).select_related('manager').first()
+
+
+@register_strategy
+class FirstFreeStrategy(AssignmentStrategy):
+    name = 'first_free'
+
+    def order(self, candidates):
+        return candidates.filter(active_count=0).order_by('manager_id')
+
+
+@register_strategy
+class RoundRobinStrategy(AssignmentStrategy):
+    name = 'round_robin'
+    tracks_assignment = True
+
+    def order(self, candidates):
+        return candidates.order_by(F('last_assigned_at').asc(nulls_first=True), 'manager_id')
+
+
+@register_strategy
+class LeastLoadedStrategy(AssignmentStrategy):
+    name = 'least_loaded'
+    tracks_assignment = True
+
+    def order(self, candidates):
+        return candidates.order_by(
+            'active_count', 'queued_count', F('last_assigned_at').asc(nulls_first=True), 'manager_id'
+        )
+
+
+@register_strategy
+class WeightedStrategy(AssignmentStrategy):
+    """Більша вага ролі — більше лідів: сортуємо за (навантаження + 1) / вага"""
+    name = 'weighted'
+    tracks_assignment = True
+
+    def order(self, candidates):
+        return candidates.annotate(
+            weighted_load=(F('active_count') + F('queued_count') + Value(1.0)) / F('weight')
+        ).order_by('weighted_load', F('last_assigned_at').asc(nulls_first=True), 'manager_id')
+
+
+def get_strategy(name=None):
+    name = name or getattr(settings, 'LEAD_ASSIGNMENT_STRATEGY', FirstFreeStrategy.name)
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Невідома стратегія призначення: {name} (доступні: {', '.join(STRATEGIES)})")
+
+
+def eligible_managers():
+    """👥 Кандидати: активні користувачі з вагою ролі > 0"""
+    return ManagerLoad.objects.filter(weight__gt=0, manager__is_active=True)
+
+
+def pick_manager(strategy=None, candidates=None) -> User | None:
+    """
+    🎯 Вибір менеджера за стратегією — один індексований запит
+
+    candidates — звужений queryset ManagerLoad (напр. від правил маршрутизації).
+    """
+    strategy = strategy if isinstance(strategy, AssignmentStrategy) else get_strategy(strategy)
+    load = strategy.pick(eligible_managers() if candidates is None else candidates)
+    if load is None:
+        return None
+
+    if strategy.tracks_assignment:
+        ManagerLoad.objects.filter(pk=load.pk).update(last_assigned_at=timezone.now())
+    return load.manager
@@ -0,0 +1,116 @@
+# backend/services/metrics_coalescer.py
+"""
+⏱️ Злиття перерахунків метрик клієнтів у часовому вікні
+
+У годину пік один клієнт отримує кілька змін за секунди: лід, авто-перехід
+в in_work, платіж, завершення. Замість перерахунку на кожну:
+
+- mark_dirty(phone_key) — рядок у DirtyClient (повторна позначка ігнорується);
+  crm_jobs.enqueue_client_metrics додає одну відкладену задачу
+  client.flush_metrics на всіх
+- flush_dirty() — бере клієнтів, позначених щонайменше CLIENT_METRICS_WINDOW
+  секунд тому, і перераховує їх одним Client.bulk_update_metrics
+
+Тобто кожен клієнт перераховується не частіше одного разу за вікно,
+а дашборди бачать метрики із запізненням у кілька секунд.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from backend.models import Client, DirtyClient
+from backend.services.bulk_mode import bump_data_version
+
+logger = logging.getLogger('backend.metrics_coalescer')
+
+DEFAULT_WINDOW = 5      # сек
+DEFAULT_BATCH = 1000    # клієнтів за один прохід
+
+
+def window_seconds():
+    return getattr(settings, 'CLIENT_METRICS_WINDOW', DEFAULT_WINDOW)
+
+
+@dataclass
+class FlushResult:
+    clients: int = 0
+    max_lag: float = 0.0        # сек від першої позначки до перерахунку
+    remaining: int = 0
+    next_due_in: float = None   # сек до наступного клієнта, чиє вікно ще не минуло
+
+
+def mark_dirty(*phone_keys):
+    """📌 Позначає клієнтів (в поточній транзакції); True, якщо щось позначено"""
+    keys = {key for key in phone_keys if key}
+    if not keys:
+        return False
+    DirtyClient.objects.bulk_create([DirtyClient(phone_key=key) for key in keys], ignore_conflicts=True)
+    return True
+
+
+def flush_dirty(window=None, limit=DEFAULT_BATCH):
+    """
+    🔁 Перераховує клієнтів, позначених не пізніше ніж window секунд тому
+
+    Позначки видаляються перед перерахунком і в тій самій транзакції:
+    нова зміна після цього створить нову позначку, а якщо перерахунок
+    впав — позначки повертаються разом з відкатом.
+    """
+    window = window_seconds() if window is None else window
+    now = timezone.now()
+    result = FlushResult()
+
+    with transaction.atomic():
+        due = DirtyClient.objects.filter(marked_at__lte=now - timedelta(seconds=window)).order_by('marked_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        rows = list(due.values_list('id', 'phone_key', 'marked_at')[:limit])
+
+        if rows:
+            DirtyClient.objects.filter(id__in=[row[0] for row in rows]).delete()
+            clients = list(Client.objects.filter(phone_key__in=[row[1] for row in rows]))
+            old_segments = {client.pk: client.akb_segment for client in clients}
+            Client.bulk_update_metrics(clients)
+
+            result.clients = len(clients)
+            result.max_lag = (timezone.now() - rows[0][2]).total_seconds()
+            for client in clients:
+                if client.akb_segment == 'vip' and old_segments[client.pk] != 'vip':
+                    logger.info("🎉 %s став VIP клієнтом!", client.full_name)
+
+    pending = DirtyClient.objects.aggregate(count=Count('id'), oldest=Min('marked_at'))
+    result.remaining = pending['count']
+    if pending['oldest'] is not None:
+        due_at = pending['oldest'] + timedelta(seconds=window)
+        result.next_due_in = max((due_at - timezone.now()).total_seconds(), 0.0)
+
+    if result.clients:
+        bump_data_version('clients')
+        logger.info(
+            "⏱️ Перераховано метрики %s клієнтів (запізнення до %.1f с, в черзі %s)",
+            result.clients, result.max_lag, result.remaining,
+            extra={'clients': result.clients, 'lag': round(result.max_lag, 3), 'depth': result.remaining},
+        )
+    return result
+
+
+def coalescer_metrics(window=None):
+    """
+    📊 Стан черги: depth — клієнтів чекає, due — з них вікно вже минуло,
+    lag — скільки секунд чекає найстаріша позначка
+    """
+    window = window_seconds() if window is None else window
+    now = timezone.now()
+    stats = DirtyClient.objects.aggregate(depth=Count('id'), oldest=Min('marked_at'))
+    return {
+        'window': window,
+        'depth': stats['depth'],
+        'due': DirtyClient.objects.filter(marked_at__lte=now - timedelta(seconds=window)).count(),
+        'lag': (now - stats['oldest']).total_seconds() if stats['oldest'] else 0.0,
+    }
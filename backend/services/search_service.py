@@ -0,0 +1,284 @@
+# backend/services/search_service.py
+"""
+🔍 Повнотекстовий пошук по лідах та клієнтах (SQLite FTS5)
+
+Індекси — external content FTS5 таблиці поверх backend_lead / backend_client,
+синхронізуються тригерами в самій БД, тому працюють і для .update(),
+bulk_create та змін з адмінки. На інших СУБД (або якщо FTS5 недоступний)
+пошук прозоро падає назад на icontains.
+"""
+
+import logging
+import re
+
+from django.db import connection, connections, DatabaseError
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from backend.models import Lead, Client
+from backend.utils.phones import phone_lookup_q
+
+logger = logging.getLogger('backend.search_service')
+
+# 🗂️ ОПИС ІНДЕКСІВ: таблиця-джерело, колонки та ваги bm25 (чим більше — тим важливіше)
+SEARCH_INDEXES = {
+    'lead': {
+        'model': Lead,
+        'table': 'backend_lead',
+        'fts_table': 'backend_lead_fts',
+        'columns': ['full_name', 'phone', 'email', 'description', 'comment', 'order_number', 'city', 'street'],
+        'weights': [10.0, 8.0, 6.0, 1.0, 1.0, 8.0, 2.0, 2.0],
+    },
+    'client': {
+        'model': Client,
+        'table': 'backend_client',
+        'fts_table': 'backend_client_fts',
+        'columns': ['full_name', 'company_name', 'notes', 'phone', 'email'],
+        'weights': [10.0, 6.0, 1.0, 8.0, 6.0],
+    },
+}
+
+SEARCH_TYPES = ('all', 'leads', 'clients')
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_PHONE_CHARS_RE = re.compile(r'[\s()+\-.]')
+
+_fts_ready = None
+
+
+# 🛠️ СТВОРЕННЯ ТА ОБСЛУГОВУВАННЯ ІНДЕКСУ
+
+def _index_sql(spec):
+    """📜 SQL для FTS5 таблиці та тригерів синхронізації (ідемпотентний)"""
+    fts, table, cols = spec['fts_table'], spec['table'], spec['columns']
+    col_list = ', '.join(cols)
+    new_values = ', '.join(f'new.{c}' for c in cols)
+    old_values = ', '.join(f'old.{c}' for c in cols)
+
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{col_list}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_values}); END",
+
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_values}); END",
+
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col_list} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def install_search_index(schema_connection=None, rebuild=False):
+    """
+    🔧 Створює FTS5 таблиці та тригери (тільки SQLite)
+
+    Викликається з міграції та з post_migrate: SQLite при "перебудові"
+    таблиці (ALTER через копіювання) видаляє тригери — тут вони
+    відновлюються. rebuild=True — повна переіндексація з таблиць-джерел.
+    """
+    global _fts_ready
+    conn = schema_connection or connection
+    if conn.vendor != 'sqlite':
+        return False
+
+    with conn.cursor() as cursor:
+        for spec in SEARCH_INDEXES.values():
+            for sql in _index_sql(spec):
+                cursor.execute(sql)
+            if rebuild:
+                cursor.execute(f"INSERT INTO {spec['fts_table']}({spec['fts_table']}) VALUES ('rebuild')")
+
+    _fts_ready = True
+    return True
+
+
+def restore_search_triggers(sender=None, using='default', **kwargs):
+    """
+    🔄 post_migrate: відновлює тригери, якщо індекс уже встановлено
+
+    Таблиці не створює — інакше відкат міграції 0006 не мав би ефекту.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+
+    tables = set(conn.introspection.table_names())
+    if all(spec['fts_table'] in tables for spec in SEARCH_INDEXES.values()):
+        install_search_index(conn)
+
+
+def remove_search_index(schema_connection=None):
+    """🗑️ Видаляє FTS5 таблиці та тригери"""
+    global _fts_ready
+    conn = schema_connection or connection
+    if conn.vendor != 'sqlite':
+        return
+
+    with conn.cursor() as cursor:
+        for spec in SEARCH_INDEXES.values():
+            fts = spec['fts_table']
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+    _fts_ready = False
+
+
+def fts_available():
+    """✅ Чи можна користуватися FTS5 (SQLite + таблиці існують)"""
+    global _fts_ready
+    if connection.vendor != 'sqlite':
+        return False
+    if _fts_ready is None:
+        tables = set(connection.introspection.table_names())
+        _fts_ready = all(spec['fts_table'] in tables for spec in SEARCH_INDEXES.values())
+    return _fts_ready
+
+
+# 🔤 РОЗБІР ЗАПИТУ
+
+def phone_digits(query):
+    """📞 Якщо запит схожий на телефон — повертає цифри, інакше None"""
+    compact = _PHONE_CHARS_RE.sub('', query or '')
+    if len(compact) >= 5 and compact.isdigit():
+        return compact
+    return None
+
+
+def build_match_query(query):
+    """
+    🔤 Безпечний FTS5 MATCH з довільного тексту
+
+    Кожне слово береться в лапки (ніякого синтаксису FTS від користувача)
+    і шукається як префікс: "іван"* "київ"* — всі слова мають збігтися.
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    if not tokens:
+        return None
+    return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+# 🔍 ПОШУК
+
+def match_ids_sql(kind, match):
+    """🧩 RawSQL з id, що збігаються — для queryset.filter(pk__in=...)"""
+    fts = SEARCH_INDEXES[kind]['fts_table']
+    return RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match])
+
+
+def _fts_search(kind, match, limit):
+    """📊 (id, rank, snippet) у порядку релевантності bm25"""
+    spec = SEARCH_INDEXES[kind]
+    fts = spec['fts_table']
+    weights = ', '.join(str(w) for w in spec['weights'])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({fts}, {weights}) AS rank, "
+            f"snippet({fts}, -1, '<mark>', '</mark>', '…', 12) "
+            f"FROM {fts} WHERE {fts} MATCH %s ORDER BY rank LIMIT %s",
+            [match, limit]
+        )
+        return cursor.fetchall()
+
+
+def _fts_count(kind, match):
+    fts = SEARCH_INDEXES[kind]['fts_table']
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {fts} WHERE {fts} MATCH %s", [match])
+        return cursor.fetchone()[0]
+
+
+def _fallback_queryset(kind, query):
+    """🐢 icontains по тих самих колонках — коли FTS5 недоступний"""
+    spec = SEARCH_INDEXES[kind]
+    condition = Q()
+    for column in spec['columns']:
+        condition |= Q(**{f'{column}__icontains': query})
+    return spec['model'].objects.filter(condition).order_by('-created_at', '-id')
+
+
+def _phone_queryset(kind, digits):
+    """📞 Пошук за фрагментом номера — range scan по phone_key / phone_key_rev"""
+    model = SEARCH_INDEXES[kind]['model']
+    phone_q = phone_lookup_q(digits)
+    if phone_q is None:
+        return model.objects.none()
+    return model.objects.filter(phone_q).order_by('-created_at', '-id')
+
+
+def _serialize_hit(kind, obj, rank, snippet):
+    if kind == 'lead':
+        return {
+            'type': 'lead',
+            'id': obj.id,
+            'title': obj.full_name,
+            'phone': obj.phone,
+            'status': obj.status,
+            'order_number': obj.order_number,
+            'created_at': obj.created_at,
+            'rank': rank,
+            'snippet': snippet,
+        }
+    return {
+        'type': 'client',
+        'id': obj.id,
+        'title': obj.full_name,
+        'phone': obj.phone,
+        'company_name': obj.company_name,
+        'temperature': obj.temperature,
+        'created_at': obj.created_at,
+        'rank': rank,
+        'snippet': snippet,
+    }
+
+
+def search(query, search_type='all', page=1, page_size=20):
+    """
+    🔍 Пошук з ранжуванням та пагінацією
+
+    Повертає (hits, total, engine). Для type=all результати лідів і клієнтів
+    зливаються за bm25-рангом (менше — релевантніше).
+    """
+    kinds = ['lead', 'client'] if search_type == 'all' else [search_type.rstrip('s')]
+    offset = (page - 1) * page_size
+    window = offset + page_size
+
+    digits = phone_digits(query)
+    match = build_match_query(query)
+    use_fts = digits is None and match is not None and fts_available()
+
+    if use_fts:
+        try:
+            rows, total = [], 0
+            for kind in kinds:
+                total += _fts_count(kind, match)
+                rows.extend((rank, kind, pk, snippet) for pk, rank, snippet in _fts_search(kind, match, window))
+            rows.sort(key=lambda row: row[0])
+            rows = rows[offset:window]
+
+            objects = {
+                kind: SEARCH_INDEXES[kind]['model'].objects.in_bulk([pk for _, k, pk, _ in rows if k == kind])
+                for kind in kinds
+            }
+            hits = [
+                _serialize_hit(kind, objects[kind][pk], round(rank, 6), snippet)
+                for rank, kind, pk, snippet in rows
+                if pk in objects[kind]
+            ]
+            return hits, total, 'fts5'
+        except DatabaseError as e:
+            logger.warning("FTS5 пошук не вдався, fallback на icontains: %s", e)
+
+    # 🐢 Fallback: телефон або icontains
+    hits, total = [], 0
+    for kind in kinds:
+        queryset = _phone_queryset(kind, digits) if digits else _fallback_queryset(kind, query)
+        total += queryset.count()
+        hits.extend(_serialize_hit(kind, obj, None, None) for obj in queryset[:window])
+    hits.sort(key=lambda hit: hit['created_at'], reverse=True)
+    return hits[offset:window], total, 'phone' if digits else 'icontains'
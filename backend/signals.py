@@ -4,178 +4,117 @@ Django Signals для автоматизації бізнес-логіки ERP/C
 ЗАХИСТ ВІД ДУБЛЮВАННЯ: використовуємо transaction.on_commit()
 """
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from django.db import models, transaction
 import logging
 
-from .models import Lead, Client, LeadPaymentOperation, CustomUser, ClientInteraction, ClientTask
+from .models import Lead, Client, LeadPaymentOperation, CustomUser, ClientInteraction, ClientTask, LeadRoutingRule
 from .validators.lead_status_validator import LeadStatusValidator
+from .services.manager_availability import apply_lead_transition, sync_manager_weight
+from .services.lead_queue import claim_next_lead, on_lead_released
+from .services.lead_routing import reset_routing_table
+from .services.domain_events import LeadCreated, PaymentReceived, StatusChanged, publish, subscribe
+from .services import crm_jobs
+from .services.job_queue import enqueue
+from .services.bulk_mode import bump_data_version, clear_cache, record_lead
 
 logger = logging.getLogger('backend.signals')
 
-# 🛡️ ГЛОБАЛЬНИЙ ЗАХИСТ ВІД ДУБЛЮВАННЯ
-_processing_leads = set()  # Множина ID лідів, що обробляються
-
-
 @receiver(pre_save, sender=Lead)
 def lead_pre_save(sender, instance, **kwargs):
     """
     Обробка ліда ПЕРЕД збереженням - тільки статус
+
+    Старі значення беруться зі знімка Lead.from_db (без SELECT),
+    status_updated_at виставляє Lead.save()
     """
-    # Оновлення часу зміни статусу для існуючих лідів
-    if instance.pk:
-        try:
-            old_lead = Lead.objects.get(pk=instance.pk)
-            if old_lead.status != instance.status:
-                instance.status_updated_at = timezone.now()
-                print(f"🔄 СИГНАЛ: Статус ліда #{instance.pk} змінено: {old_lead.status} → {instance.status}")
-        except Lead.DoesNotExist:
-            pass
+    # Попередні (менеджер, статус) — для лічильників ManagerLoad
+    instance._load_previous = (None, None)
+    if not instance._state.adding:
+        instance._load_previous = (instance.previous('assigned_to'), instance.previous('status'))
+        if instance.has_changed('status'):
+            logger.debug(
+                "🔄 СИГНАЛ: Статус ліда #%s змінено: %s → %s", instance.pk, instance.previous('status'), instance.status
+            )
 
 
 @receiver(post_save, sender=Lead)
 def lead_post_save(sender, instance, created, **kwargs):
     """
-    Обробка ліда ПІСЛЯ збереження з новою логікою
-    """
-    if created and instance.pk not in _processing_leads:
-        # 🛡️ Додаємо ID в захист від дублювання
-        _processing_leads.add(instance.pk)
-
-        print(f"✅ НОВИЙ ЛІД: #{instance.pk} - {instance.full_name}")
-
-        def process_new_lead():
-            """Обробка нового ліда ПІСЛЯ завершення транзакції"""
-            try:
-                # 1. АВТОМАТИЧНЕ СТВОРЕННЯ/ОНОВЛЕННЯ КЛІЄНТА
-                if instance.phone:
-                    normalized_phone = Client.normalize_phone(instance.phone)
-                    client, created = Client.objects.get_or_create(
-                        phone=normalized_phone,
-                        defaults={
-                            'full_name': instance.full_name or 'Клієнт',
-                            'email': instance.email or '',
-                        }
-                    )
-
-                    if created:
-                        print(f"👤 СТВОРЕНО клієнта: {client.full_name}")
-                    else:
-                        print(f"👤 ЗНАЙДЕНО клієнта: {client.full_name}")
-
-                # 2. АВТОМАТИЧНИЙ ПЕРЕХІД queued → in_work (З ВАЛІДАЦІЄЮ)
-                current_lead = Lead.objects.get(pk=instance.pk)
-                if (current_lead.status == 'queued' and
-                        current_lead.assigned_to and
-                        not Lead.objects.filter(
-                            assigned_to=current_lead.assigned_to,
-                            status='in_work'
-                        ).exclude(pk=current_lead.pk).exists()):
-
-                    # Перевіряємо чи можливий перехід
-                    from backend.validators.lead_status_validator import LeadStatusValidator
-                    can_transition, reason = LeadStatusValidator.can_transition(
-                        'queued', 'in_work', current_lead
-                    )
-
-                    if can_transition:
-                        current_lead.status = 'in_work'
-                        current_lead.status_updated_at = timezone.now()
-                        current_lead.save()
-                        print(f"🚀 Лід #{current_lead.pk} автоматично переведено в роботу")
+    Обробка ліда ПІСЛЯ збереження: публікує доменні події (виконуються
+    пакетом після коміту, див. нижче) і ставить CRM-автоматизацію
+    у фонову чергу в цій самій транзакції (backend/services/crm_jobs.py)
 
-                from django.core.cache import cache
-                cache.clear()
+    В bulk_mode кеш і метрики клієнта перераховуються один раз при виході
+    """
+    record_lead(instance)
+    if created:
+        logger.info("✅ НОВИЙ ЛІД: #%s - %s", instance.pk, instance.full_name, extra={'lead_id': instance.pk})
+        publish(LeadCreated(lead_id=instance.pk))
+        crm_jobs.enqueue_lead_created(instance)
+    else:
+        logger.debug("🔄 ОНОВЛЕНО лід #%s", instance.pk)
+        clear_cache()
+        if instance.has_changed('status'):
+            lead_status_changed(instance, instance.previous('status'))
 
-            except Exception as e:
-                print(f"❌ ПОМИЛКА обробки нового ліда: {e}")
-            finally:
-                _processing_leads.discard(instance.pk)
 
-        transaction.on_commit(process_new_lead)
+def lead_status_changed(lead, old_status):
+    """
+    🔄 Наслідки зміни статусу: доменна подія StatusChanged + перерахунок метрик клієнта
 
-    elif not created:
-        print(f"🔄 ОНОВЛЕНО лід #{instance.pk}")
-        from django.core.cache import cache
-        cache.clear()
+    Окрім lead_post_save, викликається там, де статус змінює UPDATE без
+    сигналів (lead_queue.claim_next_lead)
+    """
+    publish(StatusChanged(lead_id=lead.pk, old_status=old_status, new_status=lead.status))
+    crm_jobs.enqueue_client_metrics(lead.phone)
 
 
 @receiver(post_save, sender=LeadPaymentOperation)
 def payment_operation_created(sender, instance, created, **kwargs):
     """
-    Обробка створення платіжної операції з автозавершенням
+    Обробка створення платіжної операції (автозавершення — обробник PaymentReceived)
     """
     if created:
-        print(f"💰 ПЛАТІЖ: {instance.operation_type} {instance.amount} для ліда #{instance.lead.pk}")
+        logger.info(
+            "💰 ПЛАТІЖ: %s %s для ліда #%s", instance.operation_type, instance.amount, instance.lead_id,
+            extra={'lead_id': instance.lead_id}
+        )
 
         # Очищуємо кеш
-        from django.core.cache import cache
-        cache.clear()
+        clear_cache()
 
-        # 🔥 АВТОЗАВЕРШЕННЯ ПРИ ПОВНІЙ ОПЛАТІ (ТІЛЬКИ ДЛЯ ОТРИМАНИХ КОШТІВ)
         if instance.operation_type == 'received':
-            def check_full_payment():
-                try:
-                    lead = Lead.objects.get(pk=instance.lead.pk)
-
-                    # Перевіряємо чи лід може бути завершений
-                    if lead.status == 'on_the_way' and LeadStatusValidator.is_fully_paid(lead):
-                        can_complete, reason = LeadStatusValidator.can_transition(
-                            lead.status, 'completed', lead
-                        )
-
-                        if can_complete:
-                            lead.status = 'completed'
-                            lead.status_updated_at = timezone.now()
-                            lead.save()  # ← ВИКЛИКАЄ СИГНАЛИ!
-
-                            print(f"✅ Лід #{lead.pk} автозавершено через повну оплату")
-                        else:
-                            print(f"⚠️ Лід #{lead.pk} повністю оплачений, але не може бути завершений: {reason}")
-
-                    # Логуємо поточний статус оплат
-                    payment_info = LeadStatusValidator.get_payment_info(lead)
-                    print(
-                        f"📊 Лід #{lead.pk}: оплачено {payment_info['received']} з {payment_info['price']} грн ({payment_info['payment_percentage']}%)")
-
-                except Exception as e:
-                    print(f"❌ Помилка автозавершення: {e}")
-
-            transaction.on_commit(check_full_payment)
+            publish(PaymentReceived(lead_id=instance.lead_id, payment_id=instance.pk, amount=instance.amount))
+            crm_jobs.enqueue_payment_received(instance)
 
 
 @receiver(pre_save, sender=Lead)
 def lead_status_change_logger(sender, instance, **kwargs):
     """
-    Детальне логування змін статусів з фінансовою інформацією
+    Логування змін статусів (фінансова інформація — тільки при завершенні)
     """
-    if instance.pk:
-        try:
-            old_lead = Lead.objects.get(pk=instance.pk)
-
-            # Якщо статус змінився
-            if old_lead.status != instance.status:
-                instance.status_updated_at = timezone.now()
-
-                # Логуємо зміну з фінансовою інформацією
-                payment_info = LeadStatusValidator.get_payment_info(old_lead)
-
-                print(f"🔄 ЗМІНА СТАТУСУ ліда #{instance.pk}:")
-                print(f"   📊 {old_lead.full_name} ({old_lead.phone})")
-                print(
-                    f"   📈 {LeadStatusValidator.STATUS_NAMES.get(old_lead.status)} → {LeadStatusValidator.STATUS_NAMES.get(instance.status)}")
-                print(
-                    f"   💰 Оплата: {payment_info['received']}/{payment_info['price']} грн ({payment_info['payment_percentage']}%)")
-
-                # Попередження якщо намагаються завершити без повної оплати
-                if instance.status == 'completed' and not LeadStatusValidator.is_fully_paid(old_lead):
-                    print(f"⚠️ УВАГА: Завершення без повної оплати! Не вистачає {payment_info['shortage']} грн")
+    if instance._state.adding or not instance.has_changed('status'):
+        return
 
-        except Lead.DoesNotExist:
-            pass
+    old_status = instance.previous('status')
+    logger.info(
+        "🔄 ЗМІНА СТАТУСУ ліда #%s (%s): %s → %s", instance.pk, instance.phone,
+        LeadStatusValidator.STATUS_NAMES.get(old_status), LeadStatusValidator.STATUS_NAMES.get(instance.status),
+        extra={'lead_id': instance.pk, 'old_status': old_status, 'new_status': instance.status}
+    )
 
+    # Попередження якщо намагаються завершити без повної оплати (запит — тільки якщо WARNING пишеться)
+    if instance.status == 'completed' and logger.isEnabledFor(logging.WARNING):
+        payment_info = LeadStatusValidator.get_payment_info(instance)
+        logger.debug(
+            "   💰 Оплата: %s/%s грн (%s%%)",
+            payment_info['received'], payment_info['price'], payment_info['payment_percentage']
+        )
+        if payment_info['shortage'] > 0:
+            logger.warning("⚠️ УВАГА: Завершення без повної оплати! Не вистачає %s грн", payment_info['shortage'])
 
 
 @receiver(post_save, sender=Client)
@@ -184,9 +123,9 @@ def client_saved(sender, instance, created, **kwargs):
     Логування створення/оновлення клієнта
     """
     if created:
-        print(f"👤 КЛІЄНТ СТВОРЕНО: {instance.full_name} ({instance.phone})")
+        logger.debug("👤 КЛІЄНТ СТВОРЕНО: %s (%s)", instance.full_name, instance.phone)
     else:
-        print(f"👤 КЛІЄНТ ОНОВЛЕНО: {instance.full_name} ({instance.phone})")
+        logger.debug("👤 КЛІЄНТ ОНОВЛЕНО: %s (%s)", instance.full_name, instance.phone)
 
 
 # 🚀 ФУНКЦІЯ ДЛЯ ДІАГНОСТИКИ
@@ -200,95 +139,96 @@ def check_duplicates():
     ).filter(count__gt=1)
 
     if duplicate_clients:
-        print("⚠️ ЗНАЙДЕНІ ДУБЛІКАТИ КЛІЄНТІВ:")
+        logger.warning("⚠️ ЗНАЙДЕНІ ДУБЛІКАТИ КЛІЄНТІВ:")
         for dup in duplicate_clients:
             clients = Client.objects.filter(phone=dup['phone'])
-            print(f"📞 {dup['phone']}: {dup['count']} дублікатів")
+            logger.debug("📞 %s: %s дублікатів", dup['phone'], dup['count'])
             for client in clients:
-                print(f"   - ID: {client.id}, Ім'я: {client.full_name}")
+                logger.debug("   - ID: %s, Ім'я: %s", client.id, client.full_name)
     else:
-        print("✅ Дублікатів клієнтів не знайдено")
-
-
-print("📡 Надійні Django signals зареєстровано (з захистом від дублювання)!")
-
-
-# 🔥 АВТОМАТИЧНЕ ОНОВЛЕННЯ МЕТРИК КЛІЄНТА ПРИ ЗМІНІ ЛІДА
-@receiver(post_save, sender=Lead)
-def update_client_metrics_on_lead_change(sender, instance, created, **kwargs):
-    """
-    Оновлення метрик клієнта при зміні ліда
-    """
-    if instance.phone:
-        def update_metrics():
-            try:
-                client = Client.objects.get(phone=instance.phone)
-                client.update_client_metrics()
-                print(f"📊 Оновлено метрики клієнта: {client.full_name}")
-            except Client.DoesNotExist:
-                print(f"⚠️ Клієнт з телефоном {instance.phone} не знайдений")
-
-        transaction.on_commit(update_metrics)
-
+        logger.debug("✅ Дублікатів клієнтів не знайдено")
+
+
+logger.debug("📡 Надійні Django signals зареєстровано (з захистом від дублювання)!")
+
+
+# 📨 ОБРОБНИКИ ДОМЕННИХ ПОДІЙ — виконуються пакетом після коміту
+# (backend/services/domain_events.py). Тут лишилось те, що має статись
+# одразу після коміту; решта автоматизації — фонові задачі (crm_jobs).
+
+@subscribe(LeadCreated)
+def process_new_leads(events, batch):
+    """Клієнт для кожного нового ліда + перехід queued → in_work"""
+    managers = set()
+    for lead in batch.leads(LeadCreated):
+        # 1. АВТОМАТИЧНЕ СТВОРЕННЯ/ОНОВЛЕННЯ КЛІЄНТА
+        if lead.phone and batch.client_for(lead) is None:
+            client, created = Client.objects.get_or_create(
+                phone=Client.normalize_phone(lead.phone),
+                defaults={
+                    'full_name': lead.full_name or 'Клієнт',
+                    'email': lead.email or '',
+                }
+            )
+            batch.remember_client(client)
+            logger.debug("👤 %s клієнта: %s", 'СТВОРЕНО' if created else 'ЗНАЙДЕНО', client.full_name)
+
+        if lead.assigned_to_id:
+            managers.add(lead.assigned_to_id)
+
+    # 2. АВТОМАТИЧНИЙ ПЕРЕХІД queued → in_work (атомарний claim, найстаріший з черги)
+    for manager_id in managers:
+        claim_next_lead(manager_id)
+
+    clear_cache()
+
+
+@subscribe(PaymentReceived)
+def auto_complete_on_full_payment(events, batch):
+    """🔥 АВТОЗАВЕРШЕННЯ ПРИ ПОВНІЙ ОПЛАТІ (ТІЛЬКИ ДЛЯ ОТРИМАНИХ КОШТІВ)"""
+    for lead in batch.leads(PaymentReceived):
+        if lead.status == 'on_the_way' and LeadStatusValidator.is_fully_paid(lead):
+            can_complete, reason = LeadStatusValidator.can_transition(lead.status, 'completed', lead)
+
+            if can_complete:
+                lead.status = 'completed'
+                lead.save()  # ← StatusChanged потрапить у цей самий пакет
+                logger.debug("✅ Лід #%s автозавершено через повну оплату", lead.pk)
+            else:
+                logger.warning(
+                    "⚠️ Лід #%s повністю оплачений, але не може бути завершений: %s", lead.pk, reason
+                )
 
-# 🔥 АВТОМАТИЧНЕ ОНОВЛЕННЯ МЕТРИК ПРИ ПЛАТЕЖАХ
-@receiver(post_save, sender=LeadPaymentOperation)
-def update_client_metrics_on_payment(sender, instance, created, **kwargs):
-    """
-    Оновлення метрик клієнта при новому платежі
-    """
-    if created and instance.operation_type == 'received':
-        def update_metrics():
-            try:
-                client = Client.objects.get(phone=instance.lead.phone)
-                old_total = float(client.total_spent)
-                client.update_client_metrics()
-                new_total = float(client.total_spent)
 
-                print(f"💰 Платіж {instance.amount} грн від {client.full_name}")
-                print(f"   Загальна сума: {old_total} → {new_total} грн")
+@subscribe(StatusChanged, PaymentReceived)
+def critical_states_monitor(events, batch):
+    """Моніторинг критичних станів лідів"""
+    for lead in batch.leads(StatusChanged, PaymentReceived):
+        payment_info = LeadStatusValidator.get_payment_info(lead)
 
-                # Перевіряємо чи клієнт перейшов в новий сегмент
-                if client.akb_segment == 'vip' and old_total < 50000:
-                    print(f"🎉 {client.full_name} став VIP клієнтом!")
+        # 🚨 Переплата
+        if payment_info['overpaid'] > 0:
+            logger.warning("🚨 ПЕРЕПЛАТА: Лід #%s переплачено на %s грн!", lead.pk, payment_info['overpaid'])
 
-            except Client.DoesNotExist:
-                print(f"⚠️ Клієнт не знайдений для платежу {instance.id}")
+        # ⚠️ Лід в дорозі але не оплачений
+        if lead.status == 'on_the_way' and payment_info['shortage'] > 0:
+            logger.warning(
+                "⚠️ УВАГА: Лід #%s в дорозі, але не доплачено %s грн", lead.pk, payment_info['shortage']
+            )
 
-        transaction.on_commit(update_metrics)
+        # 💰 Лід готовий до завершення
+        if lead.status == 'on_the_way' and payment_info['shortage'] == 0 and lead.price:
+            logger.debug("✅ ГОТОВО: Лід #%s можна завершувати - повністю оплачено!", lead.pk)
 
 
 # 🔥 АВТОМАТИЧНЕ СТВОРЕННЯ ЗАДАЧ ДЛЯ FOLLOW-UP
 @receiver(post_save, sender=ClientInteraction)
 def create_follow_up_task(sender, instance, created, **kwargs):
     """
-    Створення задачі для follow-up якщо потрібно
+    Створення задачі для follow-up якщо потрібно (фонова задача)
     """
     if created and instance.follow_up_date:
-        def create_task():
-            try:
-                # Перевіряємо чи немає вже задачі на цю дату
-                existing_task = ClientTask.objects.filter(
-                    client=instance.client,
-                    due_date__date=instance.follow_up_date.date(),
-                    status__in=['pending', 'in_progress']
-                ).exists()
-
-                if not existing_task:
-                    task = ClientTask.objects.create(
-                        client=instance.client,
-                        title=f"Follow-up по взаємодії: {instance.subject}",
-                        description=f"Наступний контакт по взаємодії від {instance.created_at.strftime('%d.%m.%Y')}",
-                        assigned_to=instance.client.assigned_to or instance.created_by,
-                        priority='medium',
-                        due_date=instance.follow_up_date
-                    )
-                    print(f"📅 Створено задачу follow-up для {instance.client.full_name}")
-
-            except Exception as e:
-                print(f"❌ Помилка створення задачі follow-up: {e}")
-
-        transaction.on_commit(create_task)
+        enqueue(crm_jobs.FOLLOW_UP_TASK, {'interaction_id': instance.pk})
 
 
 # 🔥 АВТОМАТИЧНЕ ОНОВЛЕННЯ ДАТИ ОСТАННЬОГО КОНТАКТУ
@@ -306,15 +246,16 @@ def update_last_contact_date(sender, instance, created, **kwargs):
                 # Також оновлюємо температуру на основі нової взаємодії
                 if client.temperature == 'cold':
                     client.temperature = 'warm'
-                    print(f"🌡️ {client.full_name}: cold → warm (після контакту)")
+                    logger.debug("🌡️ %s: cold → warm (після контакту)", client.full_name)
 
                 Client.objects.filter(id=client.id).update(
                     last_contact_date=client.last_contact_date,
                     temperature=client.temperature
                 )
+                bump_data_version('clients')
 
             except Exception as e:
-                print(f"❌ Помилка оновлення дати контакту: {e}")
+                logger.exception("❌ Помилка оновлення дати контакту: %s", e)
 
         transaction.on_commit(update_contact_date)
 
@@ -333,7 +274,8 @@ def auto_assign_manager_to_client(sender, instance, created, **kwargs):
                 manager = get_free_manager()
                 if manager:
                     Client.objects.filter(id=instance.id).update(assigned_to=manager)
-                    print(f"👤 Призначено менеджера {manager.username} клієнту {instance.full_name}")
+                    bump_data_version('clients')
+                    logger.debug("👤 Призначено менеджера %s клієнту %s", manager.username, instance.full_name)
 
                     # Створюємо початкову задачу для менеджера
                     ClientTask.objects.create(
@@ -345,163 +287,22 @@ def auto_assign_manager_to_client(sender, instance, created, **kwargs):
                         due_date=timezone.now() + timezone.timedelta(hours=24)
                     )
                 else:
-                    print(f"⚠️ Немає вільних менеджерів для клієнта {instance.full_name}")
+                    logger.warning("⚠️ Немає вільних менеджерів для клієнта %s", instance.full_name)
 
             except Exception as e:
-                print(f"❌ Помилка призначення менеджера: {e}")
+                logger.exception("❌ Помилка призначення менеджера: %s", e)
 
         transaction.on_commit(assign_manager)
 
 
-# 🔥 АВТОМАТИЧНЕ СТВОРЕННЯ ПОЧАТКОВОЇ ВЗАЄМОДІЇ
-@receiver(post_save, sender=Lead)
-def create_initial_interaction(sender, instance, created, **kwargs):
-    """
-    Створення початкової взаємодії при створенні ліда
-    """
-    if created:
-        def create_interaction():
-            try:
-                client = Client.objects.get(phone=instance.phone)
-
-                # Створюємо взаємодію тільки якщо це перший лід клієнта
-                existing_interactions = ClientInteraction.objects.filter(client=client).count()
-                if existing_interactions == 0:
-                    ClientInteraction.objects.create(
-                        client=client,
-                        interaction_type='other',
-                        direction='incoming',
-                        subject=f"Створено лід: {instance.full_name}",
-                        description=f"Новий лід від {instance.source or 'невідомого джерела'}. "
-                                    f"Опис: {instance.description or 'Без опису'}",
-                        outcome='follow_up',
-                        created_by=instance.assigned_to or client.assigned_to
-                    )
-                    print(f"📝 Створено початкову взаємодію для {client.full_name}")
-
-            except Client.DoesNotExist:
-                print(f"⚠️ Клієнт не знайдений для ліда {instance.id}")
-            except Exception as e:
-                print(f"❌ Помилка створення взаємодії: {e}")
-
-        transaction.on_commit(create_interaction)
-
-
-# 🔥 АВТОМАТИЧНЕ ПЕРЕВЕДЕННЯ КЛІЄНТА В "ГАРЯЧІ"
-@receiver(post_save, sender=Lead)
-def update_client_temperature_on_repeated_leads(sender, instance, created, **kwargs):
-    """
-    Автоматичне підвищення температури при повторних лідах
-    """
-    if created:
-        def update_temperature():
-            try:
-                client = Client.objects.get(phone=instance.phone)
-                leads_count = Lead.objects.filter(phone=client.phone).count()
-
-                # Якщо це 2-й лід - переводимо в теплі
-                if leads_count == 2 and client.temperature == 'cold':
-                    Client.objects.filter(id=client.id).update(temperature='warm')
-                    print(f"🌡️ {client.full_name}: cold → warm (2-й лід)")
-
-                # Якщо це 3-й лід - переводимо в гарячі
-                elif leads_count >= 3 and client.temperature in ['cold', 'warm']:
-                    Client.objects.filter(id=client.id).update(temperature='hot')
-                    print(f"🔥 {client.full_name}: → hot (3+ лідів)")
-
-                    # Створюємо терміновую задачу для менеджера
-                    ClientTask.objects.create(
-                        client=client,
-                        title=f"🔥 ГАРЯЧИЙ КЛІЄНТ: {client.full_name}",
-                        description=f"Клієнт створив {leads_count} лідів! Терміново зв'язатися!",
-                        assigned_to=client.assigned_to or instance.assigned_to,
-                        priority='urgent',
-                        due_date=timezone.now() + timezone.timedelta(hours=2)
-                    )
-
-            except Client.DoesNotExist:
-                pass
-            except Exception as e:
-                print(f"❌ Помилка оновлення температури: {e}")
-
-        transaction.on_commit(update_temperature)
-
-
 # 🔥 ПОПЕРЕДЖЕННЯ ПРО РИЗИК ВІДТОКУ
 @receiver(post_save, sender=Client)
 def check_churn_risk(sender, instance, created, **kwargs):
     """
-    Перевірка ризику відтоку клієнта
+    Перевірка ризику відтоку клієнта (фонова задача)
     """
     if not created and instance.rfm_recency and instance.rfm_recency > 90:
-        def create_churn_warning():
-            try:
-                # Перевіряємо чи немає вже задачі про ризик відтоку
-                existing_task = ClientTask.objects.filter(
-                    client=instance,
-                    title__icontains='ризик відтоку',
-                    status__in=['pending', 'in_progress']
-                ).exists()
-
-                if not existing_task and instance.total_orders > 0:
-                    priority = 'high' if instance.total_spent > 10000 else 'medium'
-
-                    ClientTask.objects.create(
-                        client=instance,
-                        title=f"⚠️ Ризик відтоку: {instance.full_name}",
-                        description=f"Клієнт не купував {instance.rfm_recency} днів. "
-                                    f"Загальна сума покупок: {instance.total_spent} грн. "
-                                    f"Потрібна реактивація!",
-                        assigned_to=instance.assigned_to,
-                        priority=priority,
-                        due_date=timezone.now() + timezone.timedelta(days=1)
-                    )
-                    print(f"⚠️ Створено попередження про ризик відтоку: {instance.full_name}")
-
-            except Exception as e:
-                print(f"❌ Помилка створення попередження: {e}")
-
-        transaction.on_commit(create_churn_warning)
-
-
-# 🔥 АВТОМАТИЧНЕ ЗАКРИТТЯ ЗАДАЧ ПРИ ПОКУПЦІ
-@receiver(post_save, sender=LeadPaymentOperation)
-def auto_complete_tasks_on_purchase(sender, instance, created, **kwargs):
-    """
-    Автоматичне закриття активних задач при покупці клієнта
-    """
-    if created and instance.operation_type == 'received':
-        def complete_tasks():
-            try:
-                client = Client.objects.get(phone=instance.lead.phone)
-
-                # Закриваємо задачі типу "контакт", "follow-up", "реактивація"
-                tasks_to_complete = ClientTask.objects.filter(
-                    client=client,
-                    status__in=['pending', 'in_progress']
-                ).filter(
-                    Q(title__icontains='контакт') |
-                    Q(title__icontains='follow-up') |
-                    Q(title__icontains='реактивація') |
-                    Q(title__icontains='гарячий')
-                )
-
-                completed_count = 0
-                for task in tasks_to_complete:
-                    task.status = 'completed'
-                    task.completed_at = timezone.now()
-                    task.save()
-                    completed_count += 1
-
-                if completed_count > 0:
-                    print(f"✅ Автоматично закрито {completed_count} задач для {client.full_name} після покупки")
-
-            except Client.DoesNotExist:
-                pass
-            except Exception as e:
-                print(f"❌ Помилка автозакриття задач: {e}")
-
-        transaction.on_commit(complete_tasks)
+        enqueue(crm_jobs.CHURN_WARNING, {'client_id': instance.pk}, dedupe_key=f'client:{instance.pk}')
 
 
 # 🔥 ЗВІТ ПРО ЩОДЕННУ АКТИВНІСТЬ CRM
@@ -521,44 +322,73 @@ def daily_crm_activity_tracking(sender, instance, created, **kwargs):
                 current_count = cache.get(cache_key, 0)
                 cache.set(cache_key, current_count + 1, 86400)  # 24 години
 
-                print(f"📈 Активність {instance.created_by.username}: {current_count + 1} взаємодій сьогодні")
+                logger.debug(
+                    "📈 Активність %s: %s взаємодій сьогодні", instance.created_by.username, current_count + 1
+                )
 
             except Exception as e:
-                print(f"❌ Помилка відстеження активності: {e}")
+                logger.exception("❌ Помилка відстеження активності: %s", e)
 
         transaction.on_commit(track_activity)
 
 
-print("🚀 Розширені CRM сигнали зареєстровано!")
+logger.debug("🚀 Розширені CRM сигнали зареєстровано!")
+
 
+# 🔢 ВЕРСІЇ ДАНИХ ДЛЯ КЕШОВАНОЇ СТАТИСТИКИ СПИСКІВ (?stats=cached)
+@receiver([post_save, post_delete], sender=Lead)
+def bump_leads_data_version(sender, instance, **kwargs):
+    """Будь-яка зміна ліда робить застарілою статистику лідів і клієнтів"""
+    bump_data_version('leads', 'clients')
 
+
+@receiver([post_save, post_delete], sender=Client)
+def bump_clients_data_version(sender, instance, **kwargs):
+    bump_data_version('clients')
+
+
+@receiver([post_save, post_delete], sender=LeadPaymentOperation)
+def bump_payments_data_version(sender, instance, **kwargs):
+    bump_data_version('payments', 'clients')
+
+
+# 👥 ІНДЕКС ДОСТУПНОСТІ МЕНЕДЖЕРІВ (ManagerLoad)
 @receiver(post_save, sender=Lead)
-def critical_states_monitor(sender, instance, created, **kwargs):
-    """
-    Моніторинг критичних станів лідів
-    """
-    if not created:  # Тільки для оновлень
-        def check_critical_states():
-            try:
-                payment_info = LeadStatusValidator.get_payment_info(instance)
+def update_manager_load_on_lead_save(sender, instance, created, **kwargs):
+    """Лічильники в роботі / у черзі — в тій самій транзакції, що й зміна ліда"""
+    old_manager_id, old_status = (None, None) if created else getattr(instance, '_load_previous', (None, None))
+    if (old_manager_id, old_status) != (instance.assigned_to_id, instance.status):
+        # В bulk_mode лічильники ще й перераховуються точно при виході
+        record_lead(instance, old_manager_id, instance.assigned_to_id)
+        apply_lead_transition(old_manager_id, old_status, instance.assigned_to_id, instance.status)
 
-                # 🚨 Переплата
-                if payment_info['overpaid'] > 0:
-                    print(f"🚨 ПЕРЕПЛАТА: Лід #{instance.pk} переплачено на {payment_info['overpaid']} грн!")
+        # Менеджер звільнився — після коміту видаємо йому наступного з черги
+        if old_status == 'in_work' and (instance.status != 'in_work' or instance.assigned_to_id != old_manager_id):
+            on_lead_released(old_manager_id)
 
-                # ⚠️ Лід в дорозі але не оплачений
-                if instance.status == 'on_the_way' and payment_info['shortage'] > 0:
-                    print(f"⚠️ УВАГА: Лід #{instance.pk} в дорозі, але не доплачено {payment_info['shortage']} грн")
 
-                # 💰 Лід готовий до завершення
-                if (instance.status == 'on_the_way' and
-                        LeadStatusValidator.is_fully_paid(instance)):
-                    print(f"✅ ГОТОВО: Лід #{instance.pk} можна завершувати - повністю оплачено!")
+@receiver(post_delete, sender=Lead)
+def update_manager_load_on_lead_delete(sender, instance, **kwargs):
+    apply_lead_transition(instance.assigned_to_id, instance.status, None, None)
+
+
+@receiver(post_save, sender=CustomUser)
+def update_manager_weight(sender, instance, **kwargs):
+    sync_manager_weight(instance.user_id, instance.interface_type)
+
+
+# 🧭 ПРАВИЛА МАРШРУТИЗАЦІЇ — гаряче перезавантаження таблиці рішень
+@receiver([post_save, post_delete], sender=LeadRoutingRule)
+def reload_routing_rules(sender, instance, **kwargs):
+    transaction.on_commit(reset_routing_table)
 
-            except Exception as e:
-                print(f"❌ Помилка моніторингу: {e}")
 
-        transaction.on_commit(check_critical_states)
+@receiver(m2m_changed, sender=LeadRoutingRule.managers.through)
+def reload_routing_rules_on_managers_change(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # Зміна M2M не чіпає updated_at — оновлюємо, щоб побачили інші процеси
+        LeadRoutingRule.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+        transaction.on_commit(reset_routing_table)
 
 
-print("🚀 Оновлені Django signals з фінансовим контролем зареєстровано!")
\ No newline at end of file
+logger.debug("🚀 Оновлені Django signals з фінансовим контролем зареєстровано!")
@@ -1,3 +1,683 @@
-from django.test import TestCase
+import email
+import email.policy
+import imaplib
+import io
+import json
+import re
+import select
+import socketserver
+import threading
+import time
+from datetime import timedelta
+from email.message import EmailMessage
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from backend.consumers import LeadConsumer
+from backend.management.commands.benchmark_email_classifier import (
+    build_corpus, legacy_extract_lead_data, legacy_is_lead_email,
+)
+from backend.models import (
+    BackgroundJob, Client, CustomUser, DirtyClient, EmailIntegrationSettings, Lead, LeadPaymentOperation, ProcessedEmail,
+)
+from backend.services import crm_jobs, domain_events, job_queue, mail_lead_importer, metrics_coalescer
+from backend.services.cache_service import CacheService
+from backend.services.client_merge_service import merge_duplicate_clients
+from backend.services.dedupe_service import create_lead_once
+from backend.services.domain_events import StatusChanged
+from backend.services.email_classifier import classify
+from backend.services.mail_poller import AccountPoller
+from backend.services.lead_creation_service import create_lead_with_logic
+from backend.services.lead_queue import claim_next_lead, queue_positions
+from backend.utils.phones import canonical_phone, phone_lookup_q
 
 # Create your tests here.
+
+
+class LeadQueueConcurrencyTest(TransactionTestCase):
+    """⚛️ Паралельне взяття лідів з черги одного менеджера"""
+
+    THREADS = 8
+    LEADS = 5
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='queue_manager')
+        for number in range(self.LEADS):
+            Lead.objects.create(full_name=f'Лід {number}', phone=f'+38050000000{number}', assigned_to=self.manager)
+        # Сигнал створення вже взяв перший лід — звільняємо, щоб потоки змагались за нього
+        Lead.objects.filter(assigned_to=self.manager).update(status='queued')
+        DirtyClient.objects.all().delete()
+
+    def _claim_in_parallel(self):
+        barrier = threading.Barrier(self.THREADS)
+        results, lock = [], threading.Lock()
+
+        def worker():
+            barrier.wait()
+            lead = None
+            try:
+                for _ in range(50):
+                    try:
+                        lead = claim_next_lead(self.manager.pk)
+                        break
+                    except OperationalError:
+                        # SQLite у тестах: "database table is locked" — пробуємо ще
+                        time.sleep(0.01)
+                with lock:
+                    results.append(lead)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [lead for lead in results if lead is not None]
+
+    def test_one_winner_and_each_lead_claimed_once(self):
+        claimed_ids = []
+        for _ in range(self.LEADS):
+            with mock.patch('backend.signals.publish') as publish:
+                winners = self._claim_in_parallel()
+            # Як при lead.save(): StatusChanged і перерахунок метрик клієнта
+            self.assertEqual(
+                [call.args[0] for call in publish.call_args_list],
+                [StatusChanged(lead_id=winners[0].pk, old_status='queued', new_status='in_work')],
+            )
+            self.assertTrue(DirtyClient.objects.filter(phone_key=winners[0].phone_key).exists())
+            self.assertEqual(len(winners), 1)
+            self.assertEqual(Lead.objects.filter(assigned_to=self.manager, status='in_work').count(), 1)
+            claimed_ids.append(winners[0].pk)
+            Lead.objects.filter(pk=winners[0].pk).update(status='completed')
+
+        expected = list(Lead.objects.filter(assigned_to=self.manager).order_by('created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(claimed_ids, expected)
+        self.assertEqual(self._claim_in_parallel(), [])
+
+
+class CreateLeadOnceConcurrencyTest(TransactionTestCase):
+    """⚛️ Паралельні вебхуки з тим самим номером замовлення — один лід"""
+
+    THREADS = 8
+
+    def _create_in_parallel(self, **keys):
+        barrier = threading.Barrier(self.THREADS)
+        results, errors, lock = [], [], threading.Lock()
+
+        def worker(number):
+            waited = False
+
+            def create():
+                nonlocal waited
+                # Усі потоки вже не знайшли дубліката — вставляють одночасно
+                if not waited:
+                    waited = True
+                    try:
+                        barrier.wait(timeout=5)
+                    except threading.BrokenBarrierError:
+                        pass
+                # Чекаємо на блокування SQLite тут, а не в create_lead_once: інакше
+                # повторна спроба знайде переможця і гонки з IntegrityError не буде
+                for _ in range(100):
+                    try:
+                        with transaction.atomic():
+                            return Lead.objects.create(full_name=f'Вебхук {number}', phone='+380501234567', **keys)
+                    except OperationalError:
+                        if transaction.get_rollback():
+                            # Не вдався й відкат savepoint — зовнішній atomic зламаний,
+                            # повторює зовнішній цикл з новим create_lead_once
+                            raise
+                        time.sleep(0.01)
+                raise OperationalError('database table is locked')
+
+            result = None
+            try:
+                for _ in range(50):
+                    try:
+                        result = create_lead_once(create, **keys)
+                        break
+                    except OperationalError:
+                        # SQLite у тестах: "database table is locked" — пробуємо ще
+                        time.sleep(0.01)
+                with lock:
+                    results.append(result)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), self.THREADS)
+        return results
+
+    def test_one_lead_per_order_number(self):
+        # Обробники після коміту (клієнт, задачі) теж б'ються об блокування SQLite — тут вони не потрібні
+        with mock.patch.object(domain_events.bus, '_dispatch'):
+            results = self._create_in_parallel(order_number='ORD-RACE-1')
+
+        self.assertNotIn(None, results)
+        self.assertEqual(sum(created for _, created, _ in results), 1)
+        self.assertEqual(len({lead.pk for lead, _, _ in results}), 1)
+        self.assertEqual(Lead.objects.filter(order_number='ORD-RACE-1').count(), 1)
+        self.assertEqual({field for _, created, field in results if not created}, {'order_number'})
+
+
+class LeadQueuePositionTest(TestCase):
+    def test_positions_follow_fifo(self):
+        manager = User.objects.create_user(username='position_manager')
+        with self.captureOnCommitCallbacks(execute=True):
+            leads = [
+                Lead.objects.create(full_name=f'Лід {number}', phone=f'+38067000000{number}', assigned_to=manager)
+                for number in range(3)
+            ]
+        for lead in leads:
+            lead.refresh_from_db()
+
+        self.assertEqual(leads[0].status, 'in_work')
+        positions = queue_positions(leads)
+        self.assertEqual(positions, {leads[1].pk: 1, leads[2].pk: 2})
+
+
+class ManagerAssignmentTest(TestCase):
+    """👥 Нові ліди отримують менеджери з продажу (interface_type='accountant', як у ManagerViewSet)"""
+
+    def test_new_lead_assigned_to_accountant(self):
+        warehouse = User.objects.create_user(username='warehouse_user')
+        CustomUser.objects.create(user=warehouse, interface_type='warehouse')
+        sales = User.objects.create_user(username='sales_manager')
+        CustomUser.objects.create(user=sales, interface_type='accountant')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lead, context = create_lead_with_logic({'full_name': 'Новий клієнт', 'phone': '0509998877'})
+        lead.refresh_from_db()
+
+        self.assertEqual(lead.assigned_to, sales)
+        self.assertEqual(lead.status, 'in_work')
+
+
+class PhoneLookupTest(TestCase):
+    """📞 Пошук за фрагментом номера: початок і кінець"""
+
+    def setUp(self):
+        self.tail_zero = Lead.objects.create(full_name='Хвіст з нулем', phone='+380670451234')
+        self.operator = Lead.objects.create(full_name='Оператор 050', phone='0501234567')
+
+    def found(self, partial):
+        return set(Lead.objects.filter(phone_lookup_q(partial)).values_list('pk', flat=True))
+
+    def test_suffix_starting_with_zero(self):
+        self.assertEqual(self.found('0451234'), {self.tail_zero.pk})
+
+    def test_prefix_fragments(self):
+        self.assertEqual(self.found('050123'), {self.operator.pk})
+        self.assertEqual(self.found('+38067'), {self.tail_zero.pk})
+        self.assertEqual(self.found('4567'), {self.operator.pk})
+
+
+    def test_client_found_for_unnormalized_lead_phone(self):
+        client = Client.objects.create(phone='+38 (050) 123-45-67', full_name='Оператор 050', email='')
+        with self.captureOnCommitCallbacks(execute=True):
+            lead, context = create_lead_with_logic({'full_name': 'Повторний', 'phone': '050 123-45-67'})
+
+        self.assertFalse(context['client_created'])
+        self.assertEqual(Client.objects.filter(phone_key='380501234567').count(), 1)
+        self.assertEqual(
+            set(Lead.objects.filter(phone_key=canonical_phone(client.phone)).values_list('pk', flat=True)),
+            {self.operator.pk, lead.pk},
+        )
+
+
+class CrmJobDedupeTest(TestCase):
+    """🤖 Задачі по ліду не зливаються між лідами одного клієнта"""
+
+    def test_each_lead_of_same_phone_gets_its_own_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Lead.objects.create(full_name='Перший', phone='0501112233')
+            second = Lead.objects.create(full_name='Другий', phone='+380501112233')
+
+        for job_type in (crm_jobs.INITIAL_INTERACTION, crm_jobs.REPEAT_LEAD_TEMPERATURE):
+            payloads = BackgroundJob.objects.filter(job_type=job_type, status='pending').values_list('payload', flat=True)
+            self.assertEqual(sorted(payload['lead_id'] for payload in payloads), [first.pk, second.pk])
+
+
+class ClientMetricsCoalescerTest(TestCase):
+    """⏱️ Метрики клієнта перераховуються не частіше раза за вікно"""
+
+    WINDOW = 5
+
+    def setUp(self):
+        self.first = Client.objects.create(phone='0501112233', full_name='Перший')
+        self.second = Client.objects.create(phone='0504445566', full_name='Другий')
+        DirtyClient.objects.all().delete()
+
+    def _age_marks(self, seconds):
+        DirtyClient.objects.update(marked_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_burst_recomputed_once_after_window(self):
+        for _ in range(5):
+            metrics_coalescer.mark_dirty(self.first.phone_key)
+        self.assertEqual(DirtyClient.objects.count(), 1)
+
+        with mock.patch.object(Client, 'bulk_update_metrics') as bulk:
+            early = metrics_coalescer.flush_dirty(self.WINDOW)
+        bulk.assert_not_called()
+        self.assertEqual((early.clients, early.remaining), (0, 1))
+        self.assertTrue(0 < early.next_due_in <= self.WINDOW)
+
+        self._age_marks(self.WINDOW + 1)
+        metrics_coalescer.mark_dirty(self.second.phone_key, self.first.phone_key)
+        with mock.patch.object(Client, 'bulk_update_metrics') as bulk:
+            result = metrics_coalescer.flush_dirty(self.WINDOW)
+
+        bulk.assert_called_once()
+        self.assertEqual([client.pk for client in bulk.call_args.args[0]], [self.first.pk])
+        self.assertEqual((result.clients, result.remaining), (1, 1))
+        self.assertTrue(0 < result.next_due_in <= self.WINDOW)
+        self.assertEqual(list(DirtyClient.objects.values_list('phone_key', flat=True)), [self.second.phone_key])
+
+    def test_flush_job_reschedules_for_next_due_client(self):
+        metrics_coalescer.mark_dirty(self.second.phone_key)
+
+        crm_jobs.flush_client_metrics({})
+
+        job = BackgroundJob.objects.get(job_type=crm_jobs.FLUSH_CLIENT_METRICS, status='pending')
+        delay = (job.run_after - timezone.now()).total_seconds()
+        self.assertTrue(0 < delay <= metrics_coalescer.window_seconds())
+
+    def test_failed_recompute_keeps_marks(self):
+        metrics_coalescer.mark_dirty(self.first.phone_key)
+        self._age_marks(self.WINDOW + 1)
+        marked_at = DirtyClient.objects.get().marked_at
+
+        with mock.patch.object(Client, 'bulk_update_metrics', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                metrics_coalescer.flush_dirty(self.WINDOW)
+
+        self.assertEqual(DirtyClient.objects.get(phone_key=self.first.phone_key).marked_at, marked_at)
+
+
+class ClientMergeTest(TestCase):
+    """🔗 Злиття дублікатів: переможець отримує всі метрики, як після update_client_metrics"""
+
+    def test_survivor_metrics_match_update_client_metrics(self):
+        survivor, duplicate = Client.objects.bulk_create([
+            Client(phone='+380501112233', full_name='Старий запис', email=''),
+            Client(phone='0501112233', full_name='Дубль', email=''),
+        ])
+        lead = Lead.objects.create(full_name='Покупка', phone='0501112233', price=25000, status='completed')
+        LeadPaymentOperation.objects.create(lead=lead, operation_type='received', amount=25000)
+        Client.objects.filter(pk=survivor.pk).update(temperature='cold', akb_segment='new', rfm_score='')
+
+        with mock.patch.object(CacheService, 'bump_data_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                merge_duplicate_clients()
+        bump.assert_any_call('clients')
+
+        self.assertFalse(Client.objects.filter(pk=duplicate.pk).exists())
+        survivor.refresh_from_db()
+        merged = {name: getattr(survivor, name) for name in Client.METRIC_FIELDS}
+        self.assertEqual(merged['akb_segment'], 'premium')
+        self.assertTrue(merged['rfm_score'])
+
+        survivor.update_client_metrics()
+        survivor.refresh_from_db()
+        self.assertEqual(merged, {name: getattr(survivor, name) for name in Client.METRIC_FIELDS})
+
+
+class DataVersionTest(TestCase):
+    """🔢 Версії даних для кешованої статистики змінюються лише після коміту"""
+
+    def test_bump_waits_for_commit(self):
+        with mock.patch.object(CacheService, 'bump_data_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                Client.objects.create(phone='0507770000', full_name='Новий', email='')
+                bump.assert_not_called()
+        bump.assert_any_call('clients')
+
+
+class JobWorkerWatchdogTest(TestCase):
+    """⚠️ Прострочені задачі без воркера — попередження в лозі"""
+
+    def test_warns_only_about_overdue_jobs(self):
+        job_queue.enqueue('test.fresh', {})
+        self.assertEqual(job_queue.warn_if_no_worker(300), 0)
+
+        BackgroundJob.objects.update(run_after=timezone.now() - timedelta(minutes=10))
+        with self.assertLogs('backend.job_queue', 'WARNING') as logs:
+            self.assertEqual(job_queue.warn_if_no_worker(300), 1)
+        self.assertIn('run_jobs', logs.output[0])
+
+
+class RunJobsThreadTest(TransactionTestCase):
+    """⚙️ run_jobs у потоці (як під runserver з apps.py) — без signal.signal"""
+
+    def test_worker_runs_outside_main_thread(self):
+        job = job_queue.enqueue(crm_jobs.FLUSH_CLIENT_METRICS, dedupe_key='dirty_clients')
+        errors = []
+
+        def run():
+            try:
+                call_command('run_jobs', '--max-jobs', '1', '--sleep', '0.01', stdout=io.StringIO())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(errors, [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+
+# 📬 ЛОКАЛЬНИЙ IMAP-СЕРВЕР ДЛЯ ТЕСТІВ ІМПОРТУ ЛИСТІВ
+
+def _bodystructure(part):
+    if part.is_multipart():
+        children = ''.join(_bodystructure(child) for child in part.get_payload())
+        return f'({children} "{part.get_content_subtype().upper()}")'
+    payload = part.get_payload().encode('utf-8', 'surrogateescape')
+    params = ' '.join(f'"{key.upper()}" "{value}"' for key, value in part.get_params()[1:])
+    encoding = part.get('Content-Transfer-Encoding', '7bit').upper()
+    fields = (f'"{part.get_content_maintype().upper()}" "{part.get_content_subtype().upper()}" '
+              f'{f"({params})" if params else "NIL"} NIL NIL "{encoding}" {len(payload)}')
+    if part.get_content_maintype() == 'text':
+        fields += ' %d' % payload.count(b'\n')
+    return f'({fields})'
+
+
+def _section(msg, section):
+    part = msg
+    for number in section.split('.'):
+        if part.is_multipart():
+            part = part.get_payload()[int(number) - 1]
+    return part.get_payload().encode('utf-8', 'surrogateescape')
+
+
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    def send(self, line):
+        self.wfile.write(line if isinstance(line, bytes) else line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        self.send('* OK fake IMAP ready')
+        for raw in self.rfile:
+            tag, command, *rest = raw.decode().rstrip('\r\n').split(' ', 2)
+            command, args = command.upper(), (rest[0] if rest else '')
+            if command == 'UID':
+                command, _, args = args.partition(' ')
+                command = 'UID ' + command.upper()
+            server.commands.append(f'{command} {args}'.strip())
+
+            if command == 'CAPABILITY':
+                self.send('* CAPABILITY IMAP4rev1' + (' IDLE' if server.idle else ''))
+            elif command == 'SELECT':
+                self.send(f'* {len(server.mailbox)} EXISTS')
+                self.send(f'* OK [UIDVALIDITY {server.uid_validity}] UIDs valid')
+            elif command == 'UID SEARCH':
+                uids = sorted(server.mailbox)
+                match = re.match(r'UID (\d+):\*', args)
+                if match:
+                    # Як справжні сервери: "n:*" без нових листів повертає найбільший UID
+                    uids = [uid for uid in uids if uid >= int(match.group(1))] or uids[-1:]
+                self.send('* SEARCH ' + ' '.join(map(str, uids)))
+            elif command == 'UID FETCH':
+                self.fetch(*args.split(' ', 1))
+            elif command == 'IDLE':
+                self.idle()
+            elif command == 'LOGOUT':
+                self.send('* BYE')
+                self.send(f'{tag} OK LOGOUT completed')
+                return
+            self.send(f'{tag} OK {command} completed')
+
+    def idle(self):
+        """Поки клієнт не надіслав DONE — "* N EXISTS" на кожен новий лист"""
+        seen = len(self.server.mailbox)
+        self.send('+ idling')
+        while not select.select([self.connection], [], [], 0.02)[0]:
+            if len(self.server.mailbox) > seen:
+                seen = len(self.server.mailbox)
+                self.send(f'* {seen} EXISTS')
+        self.rfile.readline()  # DONE
+
+    def fetch(self, uid_set, items):
+        server, wanted = self.server, set()
+        for chunk in uid_set.split(','):
+            low, _, high = chunk.partition(':')
+            wanted.update(range(int(low), int(high or low) + 1))
+
+        for seq, uid in enumerate(sorted(server.mailbox), 1):
+            if uid not in wanted:
+                continue
+            raw = server.mailbox[uid]
+            msg = email.message_from_bytes(raw, policy=email.policy.compat32)
+            parts, literals = [f'UID {uid}'], []
+            if 'BODYSTRUCTURE' in items:
+                parts.append('BODYSTRUCTURE ' + _bodystructure(msg))
+            for section in re.findall(r'BODY\.PEEK\[([^\]]*)\]', items):
+                if section.startswith('HEADER.FIELDS'):
+                    names = re.search(r'\((.*)\)', section).group(1).split()
+                    data = ''.join(f'{name}: {msg[name]}\r\n' for name in names if msg[name]).encode() + b'\r\n'
+                else:
+                    data = _section(msg, section)
+                server.fetched.append((uid, section))
+                literals.append((f'BODY[{section}]', data))
+
+            line = f'* {seq} FETCH (' + ' '.join(parts)
+            for name, data in literals:
+                self.send(f'{line} {name} {{{len(data)}}}'.encode() + b'\r\n' + data)
+                line = ''
+            self.send(line + ')')
+
+
+class FakeIMAPServer(socketserver.ThreadingTCPServer):
+    """
+    Мінімальний IMAP4rev1 на 127.0.0.1: SELECT, UID SEARCH, UID FETCH
+    (BODYSTRUCTURE, BODY.PEEK[HEADER.FIELDS ...], BODY.PEEK[секція]), IDLE.
+    commands / fetched — що запитував клієнт.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, uid_validity=1, idle=True):
+        super().__init__(('127.0.0.1', 0), _IMAPHandler)
+        self.mailbox, self.uid_validity, self.idle = {}, uid_validity, idle
+        self.commands, self.fetched = [], []
+
+    @property
+    def host(self):
+        return f'127.0.0.1:{self.server_address[1]}'
+
+    def add(self, raw):
+        uid = max(self.mailbox, default=0) + 1
+        self.mailbox[uid] = raw
+        return uid
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def lead_email(lead_id, sender='forms@site.ua', attachment=b'', phone=None):
+    msg = EmailMessage()
+    msg['From'], msg['Subject'] = sender, f'New lead {lead_id}'
+    msg['Message-ID'] = f'<lead-{lead_id}@site.ua>'
+    msg.set_content(
+        f"**form_id:** 100\n**Lead Id:** EMAIL-{lead_id}\n**Name:** Тест Імпорту\n"
+        f"**Phone Number:** {phone or f'+38067555{lead_id:04d}'}\n"
+    )
+    msg.add_alternative(f'<p>Lead {lead_id}</p>', subtype='html')
+    if attachment:
+        msg.add_attachment(attachment, maintype='application', subtype='pdf', filename='lead.pdf')
+    return msg.as_bytes(policy=email.policy.SMTP)
+
+
+class EmailImportFetchTest(TestCase):
+    """📬 Інкрементальний імпорт: спершу заголовки, текст лише кандидатів"""
+
+    def setUp(self):
+        self.server = FakeIMAPServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.account = EmailIntegrationSettings.objects.create(
+            email='leads@site.ua', app_password='x', imap_host=self.server.host, allowed_sender='forms@site.ua'
+        )
+        patcher = mock.patch.object(mail_lead_importer.imaplib, 'IMAP4_SSL', imaplib.IMAP4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, **kwargs):
+        return mail_lead_importer.fetch_emails_and_create_leads(settings_obj=self.account, **kwargs)
+
+    def test_headers_first_and_text_only_for_candidates(self):
+        raw_lead = lead_email(1, attachment=b'%PDF' * 20000)
+        lead_uid = self.server.add(raw_lead)
+        # allowed_sender акаунта не фільтрує: лід від іншого відправника теж імпортується
+        other_uid = self.server.add(lead_email(2, sender='news@shop.ua'))
+
+        stats = self.fetch()
+
+        self.assertEqual((stats.found, stats.created, stats.filtered, stats.bodies), (2, 2, 0, 2))
+        self.assertTrue(Lead.objects.filter(delivery_number='EMAIL-1').exists())
+        # Текст — лише text/plain (multipart/mixed → alternative → plain), без вкладення
+        bodies = [(uid, section) for uid, section in self.server.fetched if not section.startswith('HEADER')]
+        self.assertEqual(sorted(bodies), [(lead_uid, '1.1'), (other_uid, '1')])
+        self.assertLess(stats.bytes_fetched, len(raw_lead) / 10)
+        self.assertEqual(ProcessedEmail.objects.get(uid=other_uid).outcome, 'lead')
+        self.assertEqual(self.account.last_uid, other_uid)
+
+    def test_next_poll_fetches_only_new_uids(self):
+        self.server.add(lead_email(1))
+        self.fetch()
+
+        self.server.commands.clear()
+        stats = self.fetch()
+        self.assertEqual(stats.found, 0)
+        self.assertEqual([c for c in self.server.commands if c.startswith('UID')], ['UID SEARCH UID 2:*'])
+
+        new_uid = self.server.add(lead_email(2))
+        self.server.fetched.clear()
+        stats = self.fetch()
+        self.assertEqual(stats.created, 1)
+        self.assertEqual({uid for uid, _ in self.server.fetched}, {new_uid})
+
+        # Повна перевірка: журнал за Message-ID — без завантаження текстів і без дублікатів
+        self.server.fetched.clear()
+        stats = self.fetch(resync=True)
+        self.assertEqual((stats.found, stats.known, stats.bodies), (2, 2, 0))
+        self.assertEqual(Lead.objects.filter(delivery_number__startswith='EMAIL-').count(), 2)
+
+    def test_existing_client_found_by_canonical_phone(self):
+        client = Client.objects.create(phone='0501234567', full_name='Клієнт')
+        self.server.add(lead_email(1, phone='00380501234567'))
+        self.server.add(lead_email(2, phone='501234567'))
+
+        stats = self.fetch()
+
+        self.assertEqual((stats.created, stats.errors), (2, 0))
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(set(ProcessedEmail.objects.values_list('outcome', flat=True)), {'lead'})
+        self.assertEqual(Lead.objects.filter(phone_key=client.phone_key).count(), 2)
+
+    def test_idle_imports_new_mail_without_polling(self):
+        self.server.add(lead_email(1))
+        poller = AccountPoller(self.account, interval=3600)
+        threading.Timer(0.3, self.server.add, [lead_email(2)]).start()
+
+        started = time.monotonic()
+        poller.run_idle(stop=lambda: (
+            Lead.objects.filter(delivery_number='EMAIL-2').exists() or time.monotonic() - started > 5
+        ))
+        elapsed = time.monotonic() - started
+        poller.disconnect()
+
+        self.assertTrue(Lead.objects.filter(delivery_number='EMAIL-2').exists())
+        self.assertLess(elapsed, 2)
+        # Один логін; SEARCH лише на старті і після "* 2 EXISTS"
+        self.assertEqual(self.server.commands.count('LOGIN leads@site.ua "x"'), 1)
+        self.assertEqual(len([c for c in self.server.commands if c.startswith('UID SEARCH')]), 2)
+        self.assertEqual(self.server.commands.count('IDLE'), 2)
+
+    def test_idle_falls_back_to_polling(self):
+        self.server.idle = False
+        self.server.add(lead_email(1))
+        poller = AccountPoller(self.account)
+
+        self.assertFalse(poller.run_idle(stop=lambda: False))
+        poller.disconnect()
+        self.assertEqual((poller.mode, poller.idle_supported), ('poll', False))
+        self.assertNotIn('IDLE', self.server.commands)
+        self.assertTrue(Lead.objects.filter(delivery_number='EMAIL-1').exists())
+
+
+class EmailClassifierTest(SimpleTestCase):
+    """📨 Скомпільований класифікатор: точність на корпусі і збіг з попередньою реалізацією"""
+
+    def test_corpus_accuracy(self):
+        for item in build_corpus(500, seed=7):
+            with self.subTest(kind=item.kind, subject=item.subject):
+                decision = classify(item.text, item.subject, item.sender)
+                self.assertEqual(decision.is_lead, item.is_lead)
+                self.assertEqual(decision.is_lead, legacy_is_lead_email(item.text, item.subject, item.sender))
+                if decision:
+                    data = mail_lead_importer.extract_lead_data(item.text)
+                    self.assertEqual(data, legacy_extract_lead_data(item.text))
+                    self.assertEqual((data or {}).get('delivery_number'), item.lead_id)
+
+    def test_decision_reasons(self):
+        lead_text = "**form_id:** 12345\n**Lead Id:** LEAD_67890\n**Name:** Іван Петренко\n**Phone Number:** +38067123456"
+        marketing_text = (
+            "We've unlocked a premium video for you for a limited time…\nHi Elliott Waver,\n"
+            "Unsubscribe from future emails."
+        )
+
+        self.assertEqual(classify(lead_text, "New Lead Submission").reason, 'subject')
+        decision = classify(lead_text, "MyTikTok", "forms@company.com")
+        self.assertEqual(decision.reason, 'fields')
+        self.assertIn('**name:**', decision.matches)
+
+        decision = classify(marketing_text, "Premium Video Unlocked", "noreply@elliottwave.com")
+        self.assertFalse(decision)
+        self.assertEqual(decision.reason, 'marketing')
+        self.assertEqual(set(decision.matches), {'unsubscribe', 'premium video', 'elliott wave'})
+        self.assertEqual(classify("Ваше замовлення відправлено", "Статус", "noreply@nova.ua").reason, 'sender')
+        # Турецька İ: IGNORECASE знаходить "Lead İd", lower() — ні; результат як у попередньої реалізації
+        self.assertEqual(bool(classify("LEAD İD: 1\nName: A\nPhone Number: 1")),
+                         legacy_is_lead_email("LEAD İD: 1\nName: A\nPhone Number: 1"))
+
+
+class LeadConsumerContractTest(SimpleTestCase):
+    """🔌 Пакет нових лідів з bulk_mode доходить до клієнта звичайними кадрами"""
+
+    def test_batch_is_sent_as_per_lead_frames(self):
+        consumer = LeadConsumer()
+        consumer.send = mock.AsyncMock()
+        leads = [{'id': 1, 'full_name': 'А', 'status': 'queued'}, {'id': 2, 'full_name': 'Б', 'status': 'queued'}]
+
+        async_to_sync(consumer.send_new_leads)({'type': 'send_new_leads', 'data': leads})
+        frames = [json.loads(call.kwargs['text_data']) for call in consumer.send.await_args_list]
+        self.assertEqual(frames, leads)
+
+        consumer.send.reset_mock()
+        async_to_sync(consumer.send_new_lead)({'type': 'send_new_lead', 'data': leads[0]})
+        self.assertEqual(json.loads(consumer.send.await_args.kwargs['text_data']), leads[0])
@@ -14,7 +14,8 @@ from backend.views import (
     ClientInteractionViewSet, ClientTaskViewSet,
     crm_dashboard, update_all_client_metrics,
     create_follow_up_tasks, client_segments_for_marketing,
-    CreateLeadView, check_lead_duplicate, map_config_api, lead_statuses, add_lead_payment
+    CreateLeadView, check_lead_duplicate, map_config_api, lead_statuses, add_lead_payment,
+    export_leads, export_clients, export_payments, global_search
 )
 
 # 🚀 Стандартний роутер Django REST Framework
@@ -45,6 +46,14 @@ urlpatterns = [
     path('analytics/payments/', all_payments, name='analytics_payments'),
     path('payments/leads/<int:id_lead>/', add_lead_payment, name='add_lead_payment'),
 
+    # 📤 EXPORT (потоковий CSV / XLSX)
+    path('export/leads/', export_leads, name='export_leads'),
+    path('export/clients/', export_clients, name='export_clients'),
+    path('export/payments/', export_payments, name='export_payments'),
+
+    # 🔍 SEARCH
+    path('search/', global_search, name='global_search'),
+
     # 🌍 UTILITIES
     path('utils/geocode/', geocode_address, name='utils_geocode'),
     path('utils/map-config/', map_config_api, name='utils_map_config'),
@@ -0,0 +1,261 @@
+# backend/utils/imap.py
+"""
+📬 Допоміжні функції IMAP поверх imaplib
+
+imaplib повертає відповіді FETCH "як є" — список рядків і пар
+(заголовок, літерал). Тут мінімальний розбір того, що потрібно імпорту
+лідів: UID, RFC822.SIZE, BODYSTRUCTURE, BODY[...] — без сторонніх бібліотек.
+
+    data = mail.uid('FETCH', uid_set([5, 6, 7, 9]), '(UID BODYSTRUCTURE)')[1]
+    for fields in parse_fetch(data):
+        section = text_part(fields['BODYSTRUCTURE'])
+"""
+
+import base64
+import binascii
+import imaplib
+import quopri
+import re
+import select
+import ssl
+import time
+from itertools import takewhile
+
+_OPEN, _CLOSE = '(', ')'
+_MAILBOX_CHANGED = re.compile(rb'\* \d+ (EXISTS|RECENT)\b', re.IGNORECASE)
+
+
+def open_imap(host, user, password, timeout=None):
+    """
+    🔌 IMAP4_SSL з логіном; host може містити порт: "imap.example.com:993"
+    """
+    host, _, port = host.partition(':')
+    mail = imaplib.IMAP4_SSL(host, int(port) if port else imaplib.IMAP4_SSL_PORT, timeout=timeout)
+    mail.login(user, password)
+    return mail
+
+
+def uid_set(uids):
+    """[1, 2, 3, 7, 9, 10] → "1:3,7,9:10" (UID-діапазони для одного FETCH)"""
+    ranges = []
+    for uid in sorted(uids):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(lo) if lo == hi else f'{lo}:{hi}' for lo, hi in ranges)
+
+
+def response_size(data):
+    """Скільки байтів прийшло у відповіді imaplib (рядки + літерали)"""
+    total = 0
+    for item in data or ():
+        if isinstance(item, tuple):
+            total += sum(len(part) for part in item if isinstance(part, bytes))
+        elif isinstance(item, bytes):
+            total += len(item)
+    return total
+
+
+# 🔍 РОЗБІР ВІДПОВІДІ FETCH
+
+def _scan(chunk):
+    """Токени рядка відповіді: '(' / ')', bytes для атомів і рядків, None для NIL"""
+    i, n = 0, len(chunk)
+    while i < n:
+        c = chunk[i]
+        if c in b' \r\n':
+            i += 1
+        elif c == 0x28:  # (
+            yield _OPEN
+            i += 1
+        elif c == 0x29:  # )
+            yield _CLOSE
+            i += 1
+        elif c == 0x22:  # "
+            i += 1
+            value = bytearray()
+            while i < n and chunk[i] != 0x22:
+                if chunk[i] == 0x5c:  # \
+                    i += 1
+                value.append(chunk[i])
+                i += 1
+            i += 1
+            yield bytes(value)
+        else:
+            start, depth = i, 0
+            # Атом; секція BODY[HEADER.FIELDS (FROM SUBJECT)] — разом з пробілами й дужками
+            while i < n and (depth or chunk[i] not in b' ()"\r\n'):
+                if chunk[i] == 0x5b:  # [
+                    depth += 1
+                elif chunk[i] == 0x5d:  # ]
+                    depth -= 1
+                i += 1
+            atom = chunk[start:i]
+            yield None if atom.upper() == b'NIL' else atom
+
+
+def _tokens(data):
+    for item in data or ():
+        if isinstance(item, tuple):
+            head, literal = item[0], item[1]
+            yield from _scan(head[:head.rindex(b'{')])
+            yield literal
+        elif isinstance(item, bytes):
+            yield from _scan(item)
+
+
+def _value(token, tokens):
+    if token is not _OPEN:
+        return token
+    items = []
+    for token in tokens:
+        if token is _CLOSE:
+            return items
+        items.append(_value(token, tokens))
+    return items
+
+
+def parse_fetch(data):
+    """
+    Відповідь FETCH → список словників по листах
+
+    Ключі — назви елементів у верхньому регістрі ('UID', 'RFC822.SIZE',
+    'BODYSTRUCTURE', 'BODY[1]', ...), значення — bytes / вкладені списки.
+    """
+    tokens = _tokens(data)
+    messages = []
+    for token in tokens:
+        if token is _OPEN or token is _CLOSE or token is None:
+            continue
+        items = _value(next(tokens, None), tokens)  # після номера листа — список елементів
+        if not isinstance(items, list):
+            continue
+        messages.append({
+            (key.decode('ascii', 'replace').upper() if isinstance(key, bytes) else key): value
+            for key, value in zip(items[::2], items[1::2])
+        })
+    return messages
+
+
+def fetch_item(fields, prefix):
+    """Значення елемента, назва якого починається з prefix (сервери по-різному пишуть секції)"""
+    for key, value in fields.items():
+        if key.startswith(prefix):
+            return value
+    return None
+
+
+# 🧩 BODYSTRUCTURE
+
+def text_part(structure, section=''):
+    """
+    Перша text/plain частина (обхід у глибину, як email.Message.walk)
+
+    Повертає (секція для BODY[...], charset, transfer-encoding) або None.
+    Вкладення та HTML не завантажуються взагалі.
+    """
+    if not structure:
+        return None
+    if isinstance(structure[0], list):  # multipart: частини, потім підтип і розширення
+        for number, child in enumerate(takewhile(lambda item: isinstance(item, list), structure), 1):
+            found = text_part(child, f'{section}.{number}' if section else str(number))
+            if found:
+                return found
+        return None
+
+    main_type, sub_type = (structure[0] or b'').lower(), (structure[1] or b'').lower()
+    if (main_type, sub_type) != (b'text', b'plain'):
+        return None
+    params = structure[2] if len(structure) > 2 and isinstance(structure[2], list) else []
+    params = {key.lower(): value for key, value in zip(params[::2], params[1::2]) if isinstance(key, bytes)}
+    charset = (params.get(b'charset') or b'').decode('ascii', 'replace') or None
+    encoding = structure[5] if len(structure) > 5 and structure[5] else b'7bit'
+    return section or '1', charset, encoding.decode('ascii', 'replace').lower()
+
+
+def decode_part(payload, encoding, charset=None):
+    """Тіло частини з BODY[секція] → текст (як get_payload(decode=True).decode(charset))"""
+    payload = payload or b''
+    if encoding == 'base64':
+        try:
+            payload = base64.b64decode(payload + b'==')  # зайві "=" ігноруються, нестача — ні
+        except (binascii.Error, ValueError):
+            payload = b''
+    elif encoding == 'quoted-printable':
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return payload.decode('utf-8', errors='replace')
+
+
+# 💤 IDLE (RFC 2177) — у imaplib до Python 3.14 його немає
+
+def has_capability(mail, name):
+    """Чи підтримує сервер розширення (CAPABILITY після логіну може бути ширшим)"""
+    if name in mail.capabilities:
+        return True
+    status, data = mail.capability()
+    return status == 'OK' and name.encode() in (data[0] or b'').upper().split()
+
+
+def _line_ready(mail):
+    """
+    Чи є що читати без блокування
+
+    Перевіряємо буфер imaplib (peek на неблокуючому сокеті), а не лише
+    select: рядок міг уже прийти разом із попереднім, а SSL тримає
+    розшифровані дані у власному буфері.
+    """
+    sock, timeout = mail.sock, mail.sock.gettimeout()
+    sock.settimeout(0.0)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(timeout)
+
+
+def idle_wait(mail, timeout, stop=None):
+    """
+    💤 IDLE у вибраній папці до першої зміни, timeout секунд або stop()
+
+    True — сервер повідомив про нові листи (EXISTS / RECENT), False — вийшли
+    за часом або по stop(). Після виходу з'єднання знову готове до команд.
+    Розрив з'єднання — imaplib.IMAP4.abort.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b' IDLE\r\n')
+    line = mail.readline()
+    if not line.startswith(b'+'):
+        mail.tagged_commands.pop(tag, None)
+        raise imaplib.IMAP4.error(f"IDLE відхилено: {line!r}")
+
+    changed = False
+    deadline = time.monotonic() + timeout
+    while not changed and not (stop and stop()):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if not _line_ready(mail):
+            select.select([mail.sock], [], [], min(remaining, 1.0))
+            continue
+        line = mail.readline()
+        if not line or line.upper().startswith(b'* BYE'):
+            raise imaplib.IMAP4.abort(f"Сервер закрив з'єднання під час IDLE: {line!r}")
+        changed = bool(_MAILBOX_CHANGED.match(line))
+
+    mail.send(b'DONE\r\n')
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("З'єднання закрито після IDLE")
+        if line.startswith(tag):
+            break
+        changed = changed or bool(_MAILBOX_CHANGED.match(line))
+    mail.tagged_commands.pop(tag, None)
+    if not line[len(tag):].strip().upper().startswith(b'OK'):
+        raise imaplib.IMAP4.error(f"IDLE завершився помилкою: {line!r}")
+    return changed
@@ -0,0 +1,115 @@
+# backend/utils/log_queue.py
+"""
+📝 Неблокуюче логування: QueueHandler → QueueListener → JSON-рядки у logs/
+
+Потік запиту лише кладе запис у чергу (без запису на диск і без
+серіалізації), файл пише фоновий потік QueueListener. Налаштовується в
+settings.LOGGING:
+
+    'json_file': {
+        'class': 'backend.utils.log_queue.QueuedJsonFileHandler',
+        'filename': BASE_DIR / 'logs' / 'app.jsonl',
+    }
+
+Повідомлення — з відкладеним форматуванням:
+
+    logger.debug("Лід #%s: %s → %s", lead.pk, old, new)
+
+Якщо рівень DEBUG вимкнено, рядок навіть не збирається.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+# Стандартні атрибути LogRecord — все інше з extra={...} йде в JSON як поля
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Один запис — один рядок JSON (ensure_ascii=False: українська читається як є)"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class QueuedJsonFileHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler з власним QueueListener і RotatingFileHandler
+
+    Слухач стартує при першому записі в процесі (після fork у gunicorn
+    кожен воркер запускає свій) і зупиняється при виході, дописавши чергу.
+    """
+
+    def __init__(self, filename, max_bytes=20 * 1024 * 1024, backup_count=5, encoding='utf-8'):
+        super().__init__(queue.SimpleQueue())
+        os.makedirs(os.path.dirname(os.fspath(filename)), exist_ok=True)
+        self.target = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True
+        )
+        self.target.setFormatter(JsonLineFormatter())
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._stop_listener)
+
+    def _stop_listener(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def prepare(self, record):
+        """
+        Тільки те, що не можна відкласти: текст повідомлення (аргументи можуть
+        змінитись) і traceback. JSON збирає потік слухача.
+        """
+        if record.exc_info:
+            record = logging.makeLogRecord(vars(record))
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.args:
+            # Той самий текст бачать і інші обробники — копія не потрібна
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        super().enqueue(record)
+
+    def close(self):
+        self._stop_listener()
+        self.target.close()
+        super().close()
@@ -0,0 +1,246 @@
+# backend/utils/pagination.py
+"""
+🚀 Keyset (cursor) пагінація по (created_at, id)
+
+На відміну від OFFSET-пагінації, кожна сторінка — це один запит
+"WHERE (created_at, id) < (cursor) ORDER BY created_at DESC, id DESC LIMIT N",
+який повністю лягає на індекс created_at. Сторінка 10 000 коштує стільки ж,
+скільки і перша, а COUNT(*) по всій таблиці не потрібен.
+
+Режим вмикається явно: ?cursor= (порожній) — перша сторінка,
+далі клієнт передає next_cursor / previous_cursor з meta.pagination.
+
+Для звичайної сторінкової пагінації є ApproximateCountPagination —
+на великих невідфільтрованих таблицях total береться з оцінки СУБД.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connection, DatabaseError
+from django.db.models import Q, Max
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursorError(ValueError):
+    """❌ Пошкоджений або підроблений курсор"""
+
+
+class KeysetPagination:
+    """
+    📄 Курсорна пагінація по парі (created_at, id) у порядку спадання
+
+    Використання у view:
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        meta = {"pagination": paginator.get_pagination_meta()}
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+    max_page_size = 200
+
+    def __init__(self, time_field='created_at'):
+        self.time_field = time_field
+        self.request = None
+        self.items = []
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    # 🔍 ВИЗНАЧЕННЯ РЕЖИМУ
+
+    @classmethod
+    def is_requested(cls, request):
+        """✅ Чи клієнт явно попросив курсорний режим"""
+        return cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        try:
+            size = int(raw)
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    # 🔐 КОДУВАННЯ КУРСОРА
+
+    def encode_cursor(self, obj, reverse=False):
+        payload = {
+            'c': getattr(obj, self.time_field).isoformat(),
+            'i': obj.pk,
+            'r': 1 if reverse else 0,
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, encoded):
+        """🔓 Повертає (created_at, id, reverse) або None для першої сторінки"""
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            created_at = parse_datetime(payload['c'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r', 0))
+        except (ValueError, TypeError, KeyError, UnicodeError):
+            raise InvalidCursorError("Невалідний курсор пагінації")
+
+        if created_at is None:
+            raise InvalidCursorError("Невалідний курсор пагінації")
+        return created_at, pk, reverse
+
+    # 📄 ПАГІНАЦІЯ
+
+    def paginate_queryset(self, queryset, request):
+        """
+        🔄 Повертає список об'єктів поточної сторінки
+
+        Бере page_size + 1 рядок, щоб дізнатися чи є наступна сторінка
+        без окремого COUNT.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        field = self.time_field
+
+        if cursor is None:
+            reverse = False
+            queryset = queryset.order_by(f'-{field}', '-pk')
+        else:
+            created_at, pk, reverse = cursor
+            if reverse:
+                # Назад: беремо новіші записи у зростаючому порядку і потім розвертаємо
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': created_at}) | Q(**{field: created_at, 'pk__gt': pk})
+                ).order_by(field, 'pk')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': created_at}) | Q(**{field: created_at, 'pk__lt': pk})
+                ).order_by(f'-{field}', '-pk')
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        items = rows[:page_size]
+
+        if reverse:
+            items.reverse()
+            has_next = True
+            has_previous = has_more
+        else:
+            has_next = has_more
+            has_previous = cursor is not None
+
+        self.items = items
+        self.next_cursor = self.encode_cursor(items[-1]) if has_next and items else None
+        self.previous_cursor = self.encode_cursor(items[0], reverse=True) if has_previous and items else None
+        return items
+
+    def _build_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_pagination_meta(self):
+        """📊 Блок meta.pagination для APIResponse"""
+        return {
+            "mode": "cursor",
+            "items_on_page": len(self.items),
+            "next_cursor": self.next_cursor,
+            "previous_cursor": self.previous_cursor,
+            "next": self._build_link(self.next_cursor),
+            "previous": self._build_link(self.previous_cursor),
+        }
+
+
+# 📏 НАБЛИЖЕНИЙ COUNT ДЛЯ ВЕЛИКИХ НЕВІДФІЛЬТРОВАНИХ ТАБЛИЦЬ
+
+def estimate_table_rows(model):
+    """
+    ⚡ Дешева оцінка кількості рядків у таблиці моделі
+
+    PostgreSQL — статистика планувальника (pg_class.reltuples),
+    MySQL — information_schema, SQLite — MAX(id) по первинному ключу
+    (верхня межа, один прохід по B-дереву замість повного сканування).
+    """
+    table = model._meta.db_table
+    vendor = connection.vendor
+
+    try:
+        if vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+                row = cursor.fetchone()
+            return int(row[0]) if row and row[0] and row[0] > 0 else None
+
+        if vendor == 'mysql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT table_rows FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = %s", [table]
+                )
+                row = cursor.fetchone()
+            return int(row[0]) if row and row[0] else None
+
+        return model._default_manager.aggregate(max_pk=Max('pk'))['max_pk']
+    except DatabaseError:
+        return None
+
+
+class ApproximateCountPaginator(DjangoPaginator):
+    """
+    🔢 Django Paginator, що для невідфільтрованих великих таблиць
+    бере оцінку кількості рядків замість COUNT(*)
+    """
+
+    approximate_threshold = 100_000
+
+    def __init__(self, object_list, per_page, allow_approximate=True, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.allow_approximate = allow_approximate
+        self.count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if self.allow_approximate and query is not None and not query.where:
+            estimate = estimate_table_rows(self.object_list.model)
+            if estimate is not None and estimate >= self.approximate_threshold:
+                self.count_is_approximate = True
+                return estimate
+        return super().count
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """
+    📄 Звичайна сторінкова пагінація з наближеним total для великих таблиць
+
+    ?count=exact — примусово рахує точний COUNT(*).
+    """
+
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.allow_approximate = request.query_params.get(self.count_query_param) != 'exact'
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page, **kwargs):
+        return ApproximateCountPaginator(
+            object_list, per_page,
+            allow_approximate=getattr(self, 'allow_approximate', True),
+            **kwargs
+        )
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_approximate'] = self.page.paginator.count_is_approximate
+        return response
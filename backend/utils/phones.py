@@ -0,0 +1,156 @@
+# backend/utils/phones.py
+"""
+📞 Канонічний ключ телефону (E.164 цифри) та індексовані пошуки
+
+phone_key     — "380501234567" (тільки цифри, з кодом країни)
+phone_key_rev — "765432105083" (розвернуті цифри) — пошук "за останніми N
+                цифрами" стає префіксним пошуком, тобто звичайним index range scan.
+
+Префіксні пошуки робимо через діапазон (>= prefix AND < prefix + ':'),
+бо LIKE 'x%' у SQLite без case_sensitive_like не використовує індекс.
+"""
+
+import re
+
+from django.db import models
+from django.db.models import Q
+
+_NON_DIGITS_RE = re.compile(r'\D')
+
+DEFAULT_COUNTRY_CODE = '38'
+
+# Мінімальна довжина фрагмента, з якого починаємо пошук (менше — занадто багато збігів)
+MIN_PARTIAL_DIGITS = 4
+
+# Скільки цифр вважаємо "повним" номером без коду країни (0XXXXXXXXX)
+NATIONAL_NUMBER_LENGTH = 10
+FULL_KEY_LENGTH = len(DEFAULT_COUNTRY_CODE) + NATIONAL_NUMBER_LENGTH
+
+# ':' — наступний символ після '9' в ASCII, верхня межа для префіксного діапазону
+_RANGE_SENTINEL = ':'
+
+
+def canonical_phone(phone) -> str:
+    """
+    🔢 Канонічна форма номера — тільки цифри з кодом країни
+
+    '050 123-45-67'     → '380501234567'
+    '+38 (050) 1234567' → '380501234567'
+    '00380501234567'    → '380501234567'
+    '501234567'         → '380501234567'
+    """
+    digits = _NON_DIGITS_RE.sub('', phone or '')
+    if not digits:
+        return ''
+
+    if digits.startswith('00'):
+        # Міжнародний префікс виходу 00
+        digits = digits[2:]
+
+    if digits.startswith('0'):
+        digits = DEFAULT_COUNTRY_CODE + digits
+    elif len(digits) == NATIONAL_NUMBER_LENGTH - 1 and not digits.startswith(DEFAULT_COUNTRY_CODE):
+        # Номер без нуля: 501234567
+        digits = DEFAULT_COUNTRY_CODE + '0' + digits
+    elif not digits.startswith(DEFAULT_COUNTRY_CODE) and len(digits) == NATIONAL_NUMBER_LENGTH:
+        digits = DEFAULT_COUNTRY_CODE + digits
+
+    return digits
+
+
+def phone_keys(phone) -> tuple:
+    """📦 (phone_key, phone_key_rev) для збереження в моделі"""
+    key = canonical_phone(phone)
+    return key, key[::-1]
+
+
+def _prefix_range(field, prefix):
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + _RANGE_SENTINEL})
+
+
+def phone_lookup_q(partial, prefix='') -> Q:
+    """
+    🔍 Q для індексованого пошуку за повним або частковим номером
+
+    - повний номер                      → phone_key = канонічний ключ
+    - явний початок номера ('+38050…',
+      '38050…')                         → діапазон по phone_key
+    - починається з 0 / 38 ('050123',
+      '0451234')                        → початок АБО кінець номера: діапазон по
+                                          phone_key OR діапазон по phone_key_rev
+    - інакше ('1234567')                → діапазон по phone_key_rev (останні цифри)
+
+    prefix — шлях до моделі з ключами, напр. 'lead__' для LeadPaymentOperation.
+    Повертає None, якщо цифр занадто мало для пошуку.
+    """
+    digits = _NON_DIGITS_RE.sub('', partial or '')
+    if len(digits) < MIN_PARTIAL_DIGITS:
+        return None
+
+    key = canonical_phone(digits)
+    if len(key) >= FULL_KEY_LENGTH:
+        return Q(**{f'{prefix}phone_key': key})
+
+    suffix_q = _prefix_range(f'{prefix}phone_key_rev', digits[::-1])
+    if (partial or '').lstrip().startswith('+') or digits.startswith(DEFAULT_COUNTRY_CODE + '0'):
+        # Код країни з нулем оператора — це точно початок номера
+        return _prefix_range(f'{prefix}phone_key', digits)
+    if digits.startswith('0'):
+        # '0451234' може бути і "050…", і останніми цифрами "380670451234"
+        return _prefix_range(f'{prefix}phone_key', DEFAULT_COUNTRY_CODE + digits) | suffix_q
+    if digits.startswith(DEFAULT_COUNTRY_CODE):
+        return _prefix_range(f'{prefix}phone_key', digits) | suffix_q
+
+    return suffix_q
+
+
+class PhoneKeyManager(models.Manager):
+    """📞 bulk_create не викликає save() — заповнюємо phone_key тут"""
+
+    def __init__(self, phone_field='phone'):
+        super().__init__()
+        self.phone_field = phone_field
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.phone_key, obj.phone_key_rev = phone_keys(getattr(obj, self.phone_field))
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+def backfill_phone_keys(model, phone_field='phone', batch_size=2000, only_missing=False):
+    """
+    🔄 Батчеве заповнення phone_key / phone_key_rev
+
+    Ітерує по id (keyset), оновлює тільки рядки, де ключ змінився,
+    через bulk_update — працює і з історичними моделями в міграціях.
+    Повертає (переглянуто, оновлено).
+    """
+    queryset = model._default_manager.order_by('pk')
+    if only_missing:
+        queryset = queryset.filter(phone_key='')
+
+    scanned = updated = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).only('pk', phone_field, 'phone_key', 'phone_key_rev')[:batch_size]
+        )
+        if not batch:
+            break
+
+        changed = []
+        for obj in batch:
+            key, key_rev = phone_keys(getattr(obj, phone_field))
+            if obj.phone_key != key or obj.phone_key_rev != key_rev:
+                obj.phone_key, obj.phone_key_rev = key, key_rev
+                changed.append(obj)
+
+        if changed:
+            model._default_manager.bulk_update(changed, ['phone_key', 'phone_key_rev'])
+
+        scanned += len(batch)
+        updated += len(changed)
+        last_pk = batch[-1].pk
+
+    return scanned, updated
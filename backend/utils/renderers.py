@@ -0,0 +1,73 @@
+# backend/utils/renderers.py
+"""
+🚀 Швидкий JSON рендерер на orjson для APIResponse-конвертів
+
+orjson нативно серіалізує datetime/date/time/UUID, а Decimal віддається
+як float — так само, як робить стандартний JSONRenderer DRF.
+Якщо orjson не встановлено, дані містять непідтримуваний тип або клієнт
+просить indent, рендер прозоро падає назад на стандартний JSONRenderer.
+"""
+
+import logging
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # 🔄 Опційна залежність — працюємо і без неї
+    orjson = None
+
+logger = logging.getLogger('backend.renderers')
+
+# JS-несумісні символи, які DRF екранує (див. JSONRenderer.render)
+_LINE_SEPARATOR = '\u2028'.encode('utf-8')
+_PARAGRAPH_SEPARATOR = '\u2029'.encode('utf-8')
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _orjson_default(obj):
+    """🔧 Типи, яких orjson не знає: Decimal → float, решта — як у DRF"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return _drf_encoder.default(obj)
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else 0
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    ⚡ JSONRenderer з orjson під капотом
+
+    Той самий media_type і формат, що й у стандартного рендерера,
+    тому підміна в REST_FRAMEWORK прозора для фронтенду.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            # orjson вміє тільки indent=2 — для "красивого" виводу лишаємо DRF
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_orjson_default, option=ORJSON_OPTIONS)
+        except TypeError as e:  # orjson.JSONEncodeError — підклас TypeError
+            logger.warning("orjson не зміг серіалізувати відповідь, fallback на JSONRenderer: %s", e)
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Як і DRF — екрануємо U+2028/U+2029 для безпечного вбудовування в JS
+        if _LINE_SEPARATOR in ret or _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b'\\u2028').replace(_PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
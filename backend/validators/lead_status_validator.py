@@ -5,11 +5,15 @@
 Оновлений з новим статусом "Склад - готовий до відгрузки"
 """
 
+import logging
+
 from django.db.models import Sum
 from backend.models import Lead, LeadPaymentOperation
 from decimal import Decimal
 from typing import List, Tuple, Optional
 
+logger = logging.getLogger('backend.lead_status_validator')
+
 
 class LeadStatusValidator:
     """
@@ -250,7 +254,7 @@ class LeadStatusValidator:
                 'payment_percentage': round((received / price * 100), 2) if price > 0 else 100.0
             }
         except Exception as e:
-            print(f"❌ Помилка при отриманні payment_info: {e}")
+            logger.exception("❌ Помилка при отриманні payment_info: %s", e)
             return {
                 'price': 0.0,
                 'expected': 0.0,
@@ -20,6 +20,8 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
+import hashlib
+import logging
 import requests
 from datetime import datetime, timedelta
 
@@ -27,14 +29,26 @@ from NashCRM import settings
 from backend import serializers
 from backend.forms import LeadsReportForm
 from backend.models import CustomUser, Lead, Client, LeadPaymentOperation, LeadFile, ClientInteraction, ClientTask
-from backend.serializers import LeadSerializer, ClientSerializer, ExternalLeadSerializer, MyTokenObtainPairSerializer, \
+from backend.serializers import LeadSerializer, LeadListSerializer, ClientSerializer, ExternalLeadSerializer, MyTokenObtainPairSerializer, \
     ManagerSerializer, ClientTaskSerializer, ClientInteractionSerializer
 from backend.services.lead_creation_service import create_lead_with_logic
+from backend.services.cache_service import CacheService
+from backend.services import search_service
+from backend.services.search_service import SEARCH_TYPES
+from backend.services.export_service import (
+    EXPORT_FORMATS, LEAD_EXPORT_COLUMNS, CLIENT_EXPORT_COLUMNS, PAYMENT_EXPORT_COLUMNS, CLIENT_DISPLAY_MAPS,
+    export_response, xlsx_available, leads_export_queryset, clients_export_queryset, payments_export_queryset
+)
 
 # 🔥 ВИПРАВЛЕННЯ: Правильні імпорти для API responses
 from backend.utils.api_responses import APIResponse, StatusChangeError, ErrorType, LeadStatusResponse
+from backend.utils.phones import canonical_phone, phone_lookup_q
+from backend.services.dedupe_service import find_duplicate_lead, find_near_duplicate_leads, create_lead_once
+from backend.utils.pagination import KeysetPagination, InvalidCursorError, ApproximateCountPagination
 from backend.validators.lead_status_validator import LeadStatusValidator, validate_lead_status_change
 
+logger = logging.getLogger('backend.views')
+
 
 def smart_cache_invalidation(lead_id=None, client_phone=None, manager_id=None):
     """
@@ -71,6 +85,42 @@ def smart_cache_invalidation(lead_id=None, client_phone=None, manager_id=None):
         pass
 
 
+# 📊 РЕЖИМИ СТАТИСТИКИ ДЛЯ СПИСКІВ: ?stats=none|cached|exact
+STATS_MODES = ('none', 'cached', 'exact')
+DATASET_STATS_TIMEOUT = 300
+
+
+def get_dataset_stats_for_request(request, scope, filters, compute, default_mode='cached'):
+    """
+    📊 Статистика датасету з урахуванням ?stats=
+
+    none   — не рахуємо взагалі
+    cached — з кешу за ключем (нормалізовані фільтри + версія даних)
+    exact  — перераховуємо і оновлюємо кеш
+
+    Повертає (stats або None, опис джерела для meta).
+    """
+    mode = request.query_params.get('stats') or default_mode
+    if mode not in STATS_MODES:
+        mode = default_mode
+
+    if mode == 'none':
+        return None, {"mode": "none"}
+
+    normalized = "&".join(
+        f"{key}={value}" for key, value in sorted(filters.items())
+        if value not in (None, '')
+    )
+    filters_hash = hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+    stats, cache_hit = CacheService.get_versioned_data(
+        scope, f"dataset_stats_{filters_hash}", compute,
+        timeout=DATASET_STATS_TIMEOUT,
+        refresh=(mode == 'exact')
+    )
+    return stats, {"mode": mode, "cache_hit": cache_hit}
+
+
 # 🚀 УТИЛІТА ДЛЯ СТАНДАРТИЗАЦІЇ ВІДПОВІДЕЙ
 def api_response(data=None, meta=None, message=None, errors=None, status_code=200):
     """
@@ -364,6 +414,7 @@ class ClientViewSet(viewsets.ModelViewSet):
     queryset = Client.objects.select_related('assigned_to').order_by('-created_at')
     serializer_class = ClientSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ApproximateCountPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -382,54 +433,92 @@ class ClientViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @staticmethod
+    def get_dataset_stats(queryset):
+        """📊 Статистика по всьому відфільтрованому набору клієнтів"""
+        full_stats = queryset.aggregate(
+            total_clients=Count('id'),
+            total_revenue=Sum('total_spent'),
+            avg_ltv=Avg('total_spent'),
+            total_orders=Sum('total_orders')
+        )
+
+        # Розподіл по температурі
+        temp_distribution = queryset.order_by().values('temperature').annotate(
+            count=Count('id')
+        ).order_by('-count')
+
+        return {
+            "total_clients": full_stats['total_clients'],
+            "total_revenue": float(full_stats['total_revenue'] or 0),
+            "avg_ltv": float(full_stats['avg_ltv'] or 0),
+            "total_orders": full_stats['total_orders'] or 0,
+            "temperature_distribution": {
+                item['temperature']: item['count']
+                for item in temp_distribution
+            }
+        }
+
+    def _add_dataset_stats(self, meta, request, queryset, filters_applied, default_mode='cached'):
+        """📊 Додає dataset_stats у meta згідно з ?stats= (кеш по фільтрах + версії даних)"""
+        stats, source = get_dataset_stats_for_request(
+            request, 'clients', filters_applied,
+            lambda: self.get_dataset_stats(queryset),
+            default_mode=default_mode
+        )
+        if stats is not None:
+            meta["dataset_stats"] = stats
+        meta["dataset_stats_source"] = source
+
     def list(self, request, *args, **kwargs):
         """📋 Список клієнтів з фільтрацією та статистикою"""
         queryset = self.filter_queryset(self.get_queryset())
 
+        filters_applied = {
+            "temperature": request.query_params.get('temperature'),
+            "akb_segment": request.query_params.get('akb_segment'),
+            "assigned_to": request.query_params.get('assigned_to')
+        }
+
+        # 🚀 Курсорний режим (?cursor=) — без COUNT і без OFFSET
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination()
+            try:
+                page = paginator.paginate_queryset(queryset, request)
+            except InvalidCursorError as e:
+                return APIResponse.validation_error(field_errors={'cursor': str(e)})
+
+            serializer = self.get_serializer(page, many=True)
+            meta = {
+                "pagination": paginator.get_pagination_meta(),
+                "filters_applied": filters_applied,
+                "generated_at": timezone.now()
+            }
+            self._add_dataset_stats(meta, request, queryset, filters_applied, default_mode='none')
+
+            return APIResponse.success(data=serializer.data, meta=meta)
+
         # Пагінація
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             paginated_response = self.get_paginated_response(serializer.data)
 
-            # Статистика по всьому датасету (не тільки по сторінці)
-            full_stats = queryset.aggregate(
-                total_clients=Count('id'),
-                total_revenue=Sum('total_spent'),
-                avg_ltv=Avg('total_spent'),
-                total_orders=Sum('total_orders')
-            )
-
-            # Розподіл по температурі
-            temp_distribution = queryset.values('temperature').annotate(
-                count=Count('id')
-            ).order_by('-count')
+            meta = {
+                "pagination": {
+                    "count": paginated_response.data['count'],
+                    "count_is_approximate": paginated_response.data.get('count_is_approximate', False),
+                    "next": paginated_response.data['next'],
+                    "previous": paginated_response.data['previous']
+                },
+                "filters_applied": filters_applied,
+                "generated_at": timezone.now()
+            }
+            self._add_dataset_stats(meta, request, queryset, filters_applied)
 
             return APIResponse.success(
                 data=paginated_response.data['results'],
-                meta={
-                    "pagination": {
-                        "count": paginated_response.data['count'],
-                        "next": paginated_response.data['next'],
-                        "previous": paginated_response.data['previous']
-                    },
-                    "filters_applied": {
-                        "temperature": request.query_params.get('temperature'),
-                        "akb_segment": request.query_params.get('akb_segment'),
-                        "assigned_to": request.query_params.get('assigned_to')
-                    },
-                    "dataset_stats": {
-                        "total_clients": full_stats['total_clients'],
-                        "total_revenue": float(full_stats['total_revenue'] or 0),
-                        "avg_ltv": float(full_stats['avg_ltv'] or 0),
-                        "total_orders": full_stats['total_orders'] or 0,
-                        "temperature_distribution": {
-                            item['temperature']: item['count']
-                            for item in temp_distribution
-                        }
-                    },
-                    "generated_at": timezone.now()
-                }
+                meta=meta
             )
 
         # Без пагінації
@@ -471,8 +560,7 @@ class ClientViewSet(viewsets.ModelViewSet):
         # Перевіряємо дублікати по телефону
         phone = serializer.validated_data.get('phone')
         if phone:
-            normalized_phone = Client.normalize_phone(phone)
-            existing_client = Client.objects.filter(phone=normalized_phone).first()
+            existing_client = Client.objects.filter(phone_key=canonical_phone(phone)).first()
 
             if existing_client:
                 return APIResponse.duplicate_error(
@@ -602,7 +690,7 @@ class ClientViewSet(viewsets.ModelViewSet):
         extended_data = serializer.data
 
         # Статистика по лідах клієнта
-        leads_stats = Lead.objects.filter(phone=instance.phone).aggregate(
+        leads_stats = Lead.objects.filter(phone_key=canonical_phone(instance.phone)).aggregate(
             total_leads=Count('id'),
             completed_leads=Count('id', filter=Q(status='completed')),
             in_progress_leads=Count('id', filter=Q(status__in=['queued', 'in_work', 'preparation'])),
@@ -752,7 +840,7 @@ class ClientViewSet(viewsets.ModelViewSet):
         cached_result = cache.get(cache_key)
 
         if cached_result is None:
-            leads = Lead.objects.select_related('assigned_to').filter(phone=client.phone)
+            leads = Lead.objects.select_related('assigned_to').filter(phone_key=canonical_phone(client.phone))
             cached_result = [
                 {
                     "id": lead.id,
@@ -1562,44 +1650,95 @@ def check_duplicate_lead(phone, full_name=None, order_number=None, time_window_m
     from django.utils import timezone
     from datetime import timedelta
 
-    print(f"🔍 Перевірка дублікатів:")
-    print(f"   📞 Телефон: {phone}")
-    print(f"   👤 Ім'я: {full_name}")
-    print(f"   🔢 Номер замовлення: {order_number}")
+    logger.debug("🔍 Перевірка дублікатів: телефон %s, ім'я %s, номер замовлення %s", phone, full_name, order_number)
 
-    # 🔥 ТІЛЬКИ НОМЕР ЗАМОВЛЕННЯ є дублікатом
+    # 🔥 ТІЛЬКИ НОМЕР ЗАМОВЛЕННЯ є дублікатом (унікальний індекс)
     if order_number:
-        existing_by_order = Lead.objects.filter(order_number=order_number).first()
+        _, existing_by_order = find_duplicate_lead(order_number=order_number)
         if existing_by_order:
-            print(f"❌ ДУБЛІКАТ по номеру замовлення: {order_number} (лід #{existing_by_order.id})")
+            logger.warning("❌ ДУБЛІКАТ по номеру замовлення: %s (лід #%s)", order_number, existing_by_order.id)
             return True, existing_by_order
 
-    # 🔥 ТЕЛЕФОН НЕ є ДУБЛІКАТОМ - логуємо для інформації
-    if phone:
+    # 🔥 ТЕЛЕФОН НЕ є ДУБЛІКАТОМ - логуємо для інформації (запити — тільки якщо DEBUG увімкнено)
+    if phone and logger.isEnabledFor(logging.DEBUG):
         normalized_phone = Client.normalize_phone(phone)
-        existing_leads = Lead.objects.filter(phone=normalized_phone)
+        existing_leads = Lead.objects.filter(phone_key=normalized_phone)
 
         if existing_leads.exists():
-            print(f"📞 Знайдено {existing_leads.count()} лідів з таким телефоном - це НОРМАЛЬНО")
-            print(f"   Система використає існуючого клієнта: {normalized_phone}")
+            logger.debug(
+                "📞 Знайдено %s лідів з таким телефоном - це НОРМАЛЬНО, система використає існуючого клієнта: %s",
+                existing_leads.count(), normalized_phone
+            )
         else:
-            print(f"📞 Новий телефон - буде створено нового клієнта: {normalized_phone}")
+            logger.debug("📞 Новий телефон - буде створено нового клієнта: %s", normalized_phone)
 
-    print(f"✅ Дублікатів НЕ ЗНАЙДЕНО - можна створювати лід")
+    logger.debug("✅ Дублікатів НЕ ЗНАЙДЕНО - можна створювати лід")
     return False, None
 
 
+DUPLICATE_FIELD_NAMES = {
+    'order_number': "номер замовлення",
+    'delivery_number': "ТТН",
+}
+
+
+def lead_race_duplicate_response(existing_lead, duplicate_field):
+    """
+    🏁 Відповідь для запиту, що програв гонку за унікальний номер
+
+    Попередня перевірка пройшла, але паралельний запит (повторний вебхук)
+    вставив лід з тим самим номером раніше — повертаємо його як дублікат.
+    """
+    duplicate_value = getattr(existing_lead, duplicate_field)
+    return APIResponse.duplicate_error(
+        resource="Лід",
+        duplicate_field=DUPLICATE_FIELD_NAMES.get(duplicate_field, duplicate_field),
+        duplicate_value=duplicate_value,
+        existing_resource={
+            "id": existing_lead.id,
+            "full_name": existing_lead.full_name,
+            "phone": existing_lead.phone,
+            duplicate_field: duplicate_value,
+            "created_at": existing_lead.created_at,
+            "status": existing_lead.status
+        },
+        meta={
+            "duplicate_check": {
+                duplicate_field: duplicate_value,
+                "check_time": timezone.now(),
+                "concurrent_insert": True
+            }
+        }
+    )
+
+
+def near_duplicates_info(phone, full_name, exclude_id=None):
+    """🔎 Схожі ліди (той самий телефон + схоже ім'я за 30 хв) — тільки для інформації"""
+    if not phone or not full_name:
+        return []
+    return [
+        {
+            "id": lead.id,
+            "full_name": lead.full_name,
+            "similarity": similarity,
+            "created_at": lead.created_at,
+            "status": lead.status,
+        }
+        for lead, similarity in find_near_duplicate_leads(phone, full_name, exclude_id=exclude_id)
+    ]
+
+
 
 class ExternalLeadView(APIView):
     """🌐 ВИПРАВЛЕНА логіка створення лідів з зовнішніх джерел"""
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        print(f"📥 API: Отримано запит на створення ліда: {request.data}")
+        logger.debug("📥 API: Отримано запит на створення ліда: %s", request.data)
 
         serializer = ExternalLeadSerializer(data=request.data)
         if not serializer.is_valid():
-            print(f"❌ ВАЛІДАЦІЯ НЕ ПРОЙШЛА: {serializer.errors}")
+            logger.warning("❌ ВАЛІДАЦІЯ НЕ ПРОЙШЛА: %s", serializer.errors)
 
             # Перевіряємо чи це помилка номера замовлення
             if 'order_number' in serializer.errors:
@@ -1637,7 +1776,9 @@ class ExternalLeadView(APIView):
         )
 
         if is_duplicate:
-            print(f"🚫 ДУБЛІКАТ! Номер замовлення {order_number} вже використовується в ліді #{existing_lead.id}")
+            logger.warning(
+                "🚫 ДУБЛІКАТ! Номер замовлення %s вже використовується в ліді #%s", order_number, existing_lead.id
+            )
             return APIResponse.duplicate_error(
                 resource="Лід",
                 duplicate_field="номер замовлення",
@@ -1659,7 +1800,7 @@ class ExternalLeadView(APIView):
             )
 
         try:
-            print(f"✅ Номер замовлення вільний - створюємо лід")
+            logger.debug("✅ Номер замовлення вільний - створюємо лід")
 
             # Створюємо лід через серіалізатор (він автоматично знайде/створить клієнта)
             lead = serializer.save()
@@ -1676,7 +1817,7 @@ class ExternalLeadView(APIView):
             client_info = None
             if lead.phone:
                 try:
-                    client = Client.objects.filter(phone=lead.phone).first()
+                    client = Client.objects.filter(phone_key=canonical_phone(lead.phone)).first()
                     if client:
                         client_info = {
                             "id": client.id,
@@ -1712,7 +1853,7 @@ class ExternalLeadView(APIView):
                 status_code=201
             )
         except Exception as e:
-            print(f"❌ Помилка створення ліда: {str(e)}")
+            logger.exception("❌ Помилка створення ліда: %s", e)
             return APIResponse.system_error(
                 message=f"Помилка створення ліда: {str(e)}",
                 exception_details={"exception": str(e)},
@@ -2477,6 +2618,13 @@ class LeadViewSet(viewsets.ModelViewSet):
     ).order_by('-created_at')
     serializer_class = LeadSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ApproximateCountPagination
+
+    def get_serializer_class(self):
+        """📋 ?view=compact — компактний LeadListSerializer для канбану / таблиць"""
+        if self.action == 'list' and self.request.query_params.get('view') == 'compact':
+            return LeadListSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         """Фільтрація лідів"""
@@ -2508,67 +2656,111 @@ class LeadViewSet(viewsets.ModelViewSet):
             except:
                 pass
         if phone:
-            normalized_phone = Client.normalize_phone(phone)
-            queryset = queryset.filter(phone=normalized_phone)
+            # 📞 Повний або частковий номер — індексований пошук по phone_key / phone_key_rev
+            phone_q = phone_lookup_q(phone)
+            queryset = queryset.filter(phone_q) if phone_q is not None else queryset.none()
 
         return queryset
 
+    @staticmethod
+    def get_dataset_stats(queryset):
+        """📊 Статистика по всьому відфільтрованому набору лідів (не тільки по сторінці)"""
+        full_stats = queryset.aggregate(
+            total_leads=Count('id'),
+            completed_leads=Count('id', filter=Q(status='completed')),
+            in_work_leads=Count('id', filter=Q(status='in_work')),
+            total_revenue=Sum('price', filter=Q(status='completed')),
+            avg_check=Avg('price', filter=Q(status='completed'))
+        )
+
+        # Розподіл по статусах
+        status_distribution = queryset.order_by().values('status').annotate(
+            count=Count('id')
+        ).order_by('-count')
+
+        return {
+            "total_leads": full_stats['total_leads'],
+            "completed_leads": full_stats['completed_leads'],
+            "in_work_leads": full_stats['in_work_leads'],
+            "total_revenue": float(full_stats['total_revenue'] or 0),
+            "avg_check": float(full_stats['avg_check'] or 0),
+            "conversion_rate": round(
+                (full_stats['completed_leads'] / full_stats['total_leads'] * 100), 1
+            ) if full_stats['total_leads'] > 0 else 0,
+            "status_distribution": {
+                item['status']: item['count']
+                for item in status_distribution
+            }
+        }
+
+    def _add_dataset_stats(self, meta, request, queryset, filters_applied, default_mode='cached'):
+        """📊 Додає dataset_stats у meta згідно з ?stats= (кеш по фільтрах + версії даних)"""
+        cache_filters = dict(filters_applied)
+        if cache_filters.get('phone'):
+            cache_filters['phone'] = Client.normalize_phone(cache_filters['phone'])
+
+        stats, source = get_dataset_stats_for_request(
+            request, 'leads', cache_filters,
+            lambda: self.get_dataset_stats(queryset),
+            default_mode=default_mode
+        )
+        if stats is not None:
+            meta["dataset_stats"] = stats
+        meta["dataset_stats_source"] = source
+
     def list(self, request, *args, **kwargs):
         """📋 Список лідів з фільтрацією та статистикою"""
         queryset = self.filter_queryset(self.get_queryset())
 
+        filters_applied = {
+            "status": request.query_params.get('status'),
+            "assigned_to": request.query_params.get('assigned_to'),
+            "date_from": request.query_params.get('date_from'),
+            "date_to": request.query_params.get('date_to'),
+            "phone": request.query_params.get('phone')
+        }
+
+        # 🚀 Курсорний режим (?cursor=) — без COUNT і без OFFSET
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination()
+            try:
+                page = paginator.paginate_queryset(queryset, request)
+            except InvalidCursorError as e:
+                return APIResponse.validation_error(field_errors={'cursor': str(e)})
+
+            serializer = self.get_serializer(page, many=True)
+            meta = {
+                "pagination": paginator.get_pagination_meta(),
+                "filters_applied": filters_applied,
+                "generated_at": timezone.now()
+            }
+            # Статистика в курсорному режимі — тільки на вимогу (?stats=cached|exact)
+            self._add_dataset_stats(meta, request, queryset, filters_applied, default_mode='none')
+
+            return APIResponse.success(data=serializer.data, meta=meta)
+
         # Пагінація
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             paginated_response = self.get_paginated_response(serializer.data)
 
-            # Статистика по всіх лідах (не тільки по сторінці)
-            full_stats = queryset.aggregate(
-                total_leads=Count('id'),
-                completed_leads=Count('id', filter=Q(status='completed')),
-                in_work_leads=Count('id', filter=Q(status='in_work')),
-                total_revenue=Sum('price', filter=Q(status='completed')),
-                avg_check=Avg('price', filter=Q(status='completed'))
-            )
-
-            # Розподіл по статусах
-            status_distribution = queryset.values('status').annotate(
-                count=Count('id')
-            ).order_by('-count')
+            meta = {
+                "pagination": {
+                    "count": paginated_response.data['count'],
+                    "count_is_approximate": paginated_response.data.get('count_is_approximate', False),
+                    "next": paginated_response.data['next'],
+                    "previous": paginated_response.data['previous']
+                },
+                "filters_applied": filters_applied,
+                "generated_at": timezone.now()
+            }
+            self._add_dataset_stats(meta, request, queryset, filters_applied)
 
             # 🔥 ГОЛОВНЕ ВИПРАВЛЕННЯ: повертаємо НАПРЯМУ масив лідів в data
             return APIResponse.success(
                 data=paginated_response.data['results'],  # ← ЦЕ МАСИВ ЛІДІВ
-                meta={
-                    "pagination": {
-                        "count": paginated_response.data['count'],
-                        "next": paginated_response.data['next'],
-                        "previous": paginated_response.data['previous']
-                    },
-                    "filters_applied": {
-                        "status": request.query_params.get('status'),
-                        "assigned_to": request.query_params.get('assigned_to'),
-                        "date_from": request.query_params.get('date_from'),
-                        "date_to": request.query_params.get('date_to'),
-                        "phone": request.query_params.get('phone')
-                    },
-                    "dataset_stats": {
-                        "total_leads": full_stats['total_leads'],
-                        "completed_leads": full_stats['completed_leads'],
-                        "in_work_leads": full_stats['in_work_leads'],
-                        "total_revenue": float(full_stats['total_revenue'] or 0),
-                        "avg_check": float(full_stats['avg_check'] or 0),
-                        "conversion_rate": round(
-                            (full_stats['completed_leads'] / full_stats['total_leads'] * 100), 1
-                        ) if full_stats['total_leads'] > 0 else 0,
-                        "status_distribution": {
-                            item['status']: item['count']
-                            for item in status_distribution
-                        }
-                    },
-                    "generated_at": timezone.now()
-                }
+                meta=meta
             )
 
         # Без пагінації - теж виправляємо
@@ -2670,7 +2862,14 @@ class LeadViewSet(viewsets.ModelViewSet):
                         }
                     )
 
-            instance = serializer.save()
+            instance, created, duplicate_field = create_lead_once(
+                serializer.save,
+                order_number=order_number,
+                delivery_number=serializer.validated_data.get('delivery_number')
+            )
+            if not created:
+                return lead_race_duplicate_response(instance, duplicate_field)
+
             smart_cache_invalidation(
                 lead_id=instance.id,
                 manager_id=instance.assigned_to.id if instance.assigned_to else None
@@ -2703,9 +2902,7 @@ class LeadViewSet(viewsets.ModelViewSet):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
 
-        print(f"📝 ОНОВЛЕННЯ ЛІДА #{instance.id}")
-        print(f"   Поточний статус: {instance.status}")
-        print(f"   Дані запиту: {request.data}")
+        logger.debug("📝 ОНОВЛЕННЯ ЛІДА #%s (статус %s): %s", instance.id, instance.status, request.data)
 
         old_data = {
             'status': instance.status,
@@ -2717,17 +2914,18 @@ class LeadViewSet(viewsets.ModelViewSet):
 
         try:
             serializer.is_valid(raise_exception=True)
-            print(f"✅ Валідація серіалізатора пройшла")
+            logger.debug("✅ Валідація серіалізатора пройшла")
         except ValidationError as e:
-            print(f"❌ Помилка валідації серіалізатора: {e.detail}")
+            logger.info("❌ Помилка валідації серіалізатора: %s", e.detail)
 
             # 🔥 ПЕРЕВІРЯЄМО ЧИ ЦЕ ПОМИЛКА ПЕРЕХОДУ СТАТУСУ
             if hasattr(serializer, '_status_transition_error'):
                 error_info = serializer._status_transition_error
 
-                print(
-                    f"🔍 Обробляємо помилку статусу: {error_info['current_status']} → {error_info['attempted_status']}")
-                print(f"   Причина: {error_info['reason']}")
+                logger.debug(
+                    "🔍 Обробляємо помилку статусу: %s → %s, причина: %s",
+                    error_info['current_status'], error_info['attempted_status'], error_info['reason']
+                )
 
                 # 🔥 ПОВЕРТАЄМО ПРАВИЛЬНУ СТРУКТУРУ ПОМИЛКИ
                 return Response({
@@ -2820,9 +3018,9 @@ class LeadViewSet(viewsets.ModelViewSet):
             available_statuses = LeadStatusValidator.get_allowed_transitions(updated_instance.status, updated_instance)
             next_action = LeadStatusValidator.get_next_required_action(updated_instance)
 
-            print(f"✅ Лід #{updated_instance.id} успішно оновлено")
+            logger.debug("✅ Лід #%s успішно оновлено", updated_instance.id)
             if changes:
-                print(f"   Зміни: {changes}")
+                logger.debug("   Зміни: %s", changes)
 
             return APIResponse.success(
                 data=LeadSerializer(updated_instance, context={'request': request}).data,
@@ -2853,7 +3051,7 @@ class LeadViewSet(viewsets.ModelViewSet):
             )
 
         except Exception as e:
-            print(f"❌ Помилка оновлення ліда: {str(e)}")
+            logger.exception("❌ Помилка оновлення ліда: %s", e)
             return APIResponse.system_error(
                 message=f"❌ Помилка оновлення ліда: {str(e)}",
                 exception_details={"exception": str(e)},
@@ -2906,7 +3104,7 @@ class LeadViewSet(viewsets.ModelViewSet):
 
         # Клієнт по телефону
         try:
-            client = Client.objects.filter(phone=instance.phone).first()
+            client = Client.objects.filter(phone_key=canonical_phone(instance.phone)).first()
             client_info = {
                 'id': client.id,
                 'full_name': client.full_name,
@@ -3270,8 +3468,8 @@ def all_payments(request):
         if lead_id:
             payments = payments.filter(lead_id=lead_id)
         if client_id:
-            payments = payments.filter(lead__phone__in=
-                                       Client.objects.filter(id=client_id).values_list("phone", flat=True)
+            payments = payments.filter(lead__phone_key__in=
+                                       Client.objects.filter(id=client_id).values_list("phone_key", flat=True)
                                        )
         if op_type:
             payments = payments.filter(operation_type=op_type)
@@ -3337,7 +3535,7 @@ class ExternalLeadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        print(f"📥 API: Отримано запит на створення ліда: {request.data}")
+        logger.debug("📥 API: Отримано запит на створення ліда: %s", request.data)
 
         serializer = ExternalLeadSerializer(data=request.data)
         if not serializer.is_valid():
@@ -3359,7 +3557,7 @@ class ExternalLeadView(APIView):
         )
 
         if is_duplicate:
-            print(f"🚫 ДУБЛІКАТ! Знайдено існуючий лід #{existing_lead.id}")
+            logger.warning("🚫 ДУБЛІКАТ! Знайдено існуючий лід #%s", existing_lead.id)
             return APIResponse.duplicate_error(
                 resource="Лід",
                 duplicate_field="телефон",
@@ -3382,9 +3580,13 @@ class ExternalLeadView(APIView):
             )
 
         try:
-            print(f"✅ Не дублікат - створюємо новий лід")
+            logger.debug("✅ Не дублікат - створюємо новий лід")
             lead, context = create_lead_with_logic(serializer.validated_data)
 
+            if not context['created']:
+                logger.debug("🏁 Паралельний запит уже створив лід #%s", lead.id)
+                return lead_race_duplicate_response(lead, context['duplicate_field'])
+
             smart_cache_invalidation(
                 lead_id=lead.id,
                 manager_id=lead.assigned_to.id if lead.assigned_to else None
@@ -3405,13 +3607,14 @@ class ExternalLeadView(APIView):
                 meta={
                     "created": True,
                     "details": context,
+                    "near_duplicates": near_duplicates_info(lead.phone, lead.full_name, exclude_id=lead.id),
                     "processing_time": timezone.now(),
                     "source": "external_api"
                 },
                 status_code=201
             )
         except Exception as e:
-            print(f"❌ Помилка створення ліда: {str(e)}")
+            logger.exception("❌ Помилка створення ліда: %s", e)
             return APIResponse.system_error(
                 message=f"Помилка створення ліда: {str(e)}",
                 exception_details={"exception": str(e)},
@@ -3427,7 +3630,7 @@ class CreateLeadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        print(f"📥 CREATE API: Отримано запит: {request.data}")
+        logger.debug("📥 CREATE API: Отримано запит: %s", request.data)
 
         serializer = LeadSerializer(data=request.data)
         if not serializer.is_valid():
@@ -3443,7 +3646,7 @@ class CreateLeadView(APIView):
         if order_number:
             existing = Lead.objects.filter(order_number=order_number).first()
             if existing:
-                print(f"🚫 ДУБЛІКАТ! Номер замовлення {order_number} вже є в ліді #{existing.id}")
+                logger.warning("🚫 ДУБЛІКАТ! Номер замовлення %s вже є в ліді #%s", order_number, existing.id)
                 return APIResponse.duplicate_error(
                     resource="Лід",
                     duplicate_field="номер замовлення",
@@ -3467,7 +3670,7 @@ class CreateLeadView(APIView):
 
         try:
             lead = serializer.save()
-            print(f"✅ Створено лід #{lead.id} з номером замовлення {order_number}")
+            logger.debug("✅ Створено лід #%s з номером замовлення %s", lead.id, order_number)
 
             smart_cache_invalidation(
                 lead_id=lead.id,
@@ -3502,7 +3705,7 @@ class CreateLeadView(APIView):
             )
 
         except Exception as e:
-            print(f"❌ Помилка створення ліда: {str(e)}")
+            logger.exception("❌ Помилка створення ліда: %s", e)
             return APIResponse.system_error(
                 message=f"Не вдалося створити лід: {str(e)}",
                 exception_details={"exception": str(e)},
@@ -3808,6 +4011,72 @@ def all_payments(request):
     client_id = request.GET.get("client_id")
     op_type = request.GET.get("type")
 
+    payments = LeadPaymentOperation.objects.select_related('lead')
+
+    if lead_id:
+        payments = payments.filter(lead_id=lead_id)
+    if client_id:
+        payments = payments.filter(lead__phone_key__in=
+                                   Client.objects.filter(id=client_id).values_list("phone_key", flat=True)
+                                   )
+    if op_type:
+        payments = payments.filter(operation_type=op_type)
+
+    filters = {
+        "lead_id": lead_id,
+        "client_id": client_id,
+        "operation_type": op_type
+    }
+
+    # 🚀 Курсорний режим (?cursor=) — сторінка за сторінкою замість повного списку
+    if KeysetPagination.is_requested(request):
+        paginator = KeysetPagination()
+        try:
+            page = paginator.paginate_queryset(payments, request)
+        except InvalidCursorError as e:
+            return APIResponse.validation_error(field_errors={'cursor': str(e)})
+
+        meta = {
+            "pagination": paginator.get_pagination_meta(),
+            "filters": filters,
+            "generated_at": timezone.now()
+        }
+        def compute_summary():
+            totals = payments.aggregate(
+                total_payments=Count('id'),
+                total_expected=Sum('amount', filter=Q(operation_type='expected')),
+                total_received=Sum('amount', filter=Q(operation_type='received'))
+            )
+            total_expected = float(totals['total_expected'] or 0)
+            total_received = float(totals['total_received'] or 0)
+            return {
+                "total_payments": totals['total_payments'],
+                "total_expected": total_expected,
+                "total_received": total_received,
+                "balance": total_received - total_expected
+            }
+
+        summary, source = get_dataset_stats_for_request(
+            request, 'payments', filters, compute_summary, default_mode='none'
+        )
+        if summary is not None:
+            meta["summary"] = summary
+        meta["dataset_stats_source"] = source
+
+        return APIResponse.success(
+            data=[
+                {
+                    "id": p.id,
+                    "lead_id": p.lead_id,
+                    "type": p.operation_type,
+                    "amount": float(p.amount),
+                    "comment": p.comment,
+                    "created_at": p.created_at,
+                } for p in page
+            ],
+            meta=meta
+        )
+
     cache_key = f"payments_{lead_id}_{client_id}_{op_type}"
     cached_result = cache.get(cache_key)
     if cached_result:
@@ -3819,17 +4088,6 @@ def all_payments(request):
             }
         )
 
-    payments = LeadPaymentOperation.objects.select_related('lead')
-
-    if lead_id:
-        payments = payments.filter(lead_id=lead_id)
-    if client_id:
-        payments = payments.filter(lead__phone__in=
-                                   Client.objects.filter(id=client_id).values_list("phone", flat=True)
-                                   )
-    if op_type:
-        payments = payments.filter(operation_type=op_type)
-
     payments_list = [
         {
             "id": p.id,
@@ -3854,11 +4112,7 @@ def all_payments(request):
     return api_response(
         data=result,
         meta={
-            "filters": {
-                "lead_id": lead_id,
-                "client_id": client_id,
-                "operation_type": op_type
-            },
+            "filters": filters,
             "summary": {
                 "total_payments": len(payments_list),
                 "total_expected": total_expected,
@@ -3871,6 +4125,95 @@ def all_payments(request):
     )
 
 
+# 🔍 ПОВНОТЕКСТОВИЙ ПОШУК
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def global_search(request):
+    """🔍 Пошук по лідах і клієнтах: ?q=текст&type=all|leads|clients&page=1&page_size=20"""
+    query = (request.GET.get('q') or '').strip()
+    search_type = request.GET.get('type') or 'all'
+
+    if len(query) < 2:
+        return APIResponse.validation_error(
+            message="Пошуковий запит занадто короткий",
+            field_errors={'q': 'Мінімум 2 символи'}
+        )
+    if search_type not in SEARCH_TYPES:
+        return APIResponse.validation_error(
+            field_errors={'type': f"Доступні значення: {', '.join(SEARCH_TYPES)}"}
+        )
+
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+    except ValueError:
+        return APIResponse.validation_error(field_errors={'page': 'Має бути числом'})
+
+    hits, total, engine = search_service.search(query, search_type, page, page_size)
+
+    return APIResponse.success(
+        data=hits,
+        meta={
+            "query": query,
+            "type": search_type,
+            "engine": engine,
+            "pagination": {
+                "count": total,
+                "page": page,
+                "page_size": page_size,
+                "has_next": page * page_size < total
+            }
+        }
+    )
+
+
+# 📤 ПОТОКОВИЙ ЕКСПОРТ (CSV / XLSX)
+def _export_view(request, name, queryset, columns, display_maps=None):
+    """🔧 Спільна логіка експорту: перевірка формату та віддача потоку"""
+    # ?format= зарезервовано DRF під рендерери, тому використовуємо file_format
+    export_format = (request.GET.get('file_format') or 'csv').lower()
+
+    if export_format not in EXPORT_FORMATS:
+        return APIResponse.validation_error(
+            message="Непідтримуваний формат експорту",
+            field_errors={'file_format': f"Доступні формати: {', '.join(EXPORT_FORMATS)}"}
+        )
+
+    if export_format == 'xlsx' and not xlsx_available():
+        return APIResponse.error(
+            error_type=ErrorType.SYSTEM,
+            message="XLSX експорт недоступний — не встановлено openpyxl",
+            details={'available_formats': ['csv']},
+            status_code=501
+        )
+
+    return export_response(queryset, columns, name, export_format, display_maps)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_leads(request):
+    """📤 Потоковий експорт лідів (фільтри як у /leads/)"""
+    return _export_view(request, 'leads', leads_export_queryset(request.GET), LEAD_EXPORT_COLUMNS)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_clients(request):
+    """📤 Потоковий експорт клієнтів (поля ClientExportSerializer)"""
+    return _export_view(
+        request, 'clients', clients_export_queryset(request.GET),
+        CLIENT_EXPORT_COLUMNS, CLIENT_DISPLAY_MAPS
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_payments(request):
+    """📤 Потоковий експорт платежів (фільтри як у /analytics/payments/)"""
+    return _export_view(request, 'payments', payments_export_queryset(request.GET), PAYMENT_EXPORT_COLUMNS)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_managers(request):
@@ -3964,10 +4307,8 @@ class ManagerViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         """➕ Створення нового менеджера"""
-        # 🔍 ДІАГНОСТИКА: Логуємо що прийшло
-        print(f"📥 ManagerViewSet.create: {request.content_type}")
-        print(f"📊 Data: {request.data}")
-        print(f"🎯 Parser: {type(request._request._stream)}")
+        # 🔍 ДІАГНОСТИКА: тільки назви полів — у значеннях є пароль
+        logger.debug("📥 ManagerViewSet.create: %s, поля: %s", request.content_type, sorted(request.data.keys()))
 
         serializer = self.get_serializer(data=request.data)
 
@@ -4174,7 +4515,7 @@ class CreateLeadView(APIView):
 
     def post(self, request):
         """📝 Створення нового ліда через API"""
-        print(f"📥 CREATE API: Отримано запит: {request.data}")
+        logger.debug("📥 CREATE API: Отримано запит: %s", request.data)
 
         serializer = LeadSerializer(data=request.data)
         if not serializer.is_valid():
@@ -4209,10 +4550,16 @@ class CreateLeadView(APIView):
                     }
                 )
 
-        # Створюємо лід
+        # Створюємо лід (атомарно — повторний вебхук з тим самим номером не створить дубль)
         try:
-            lead = serializer.save()
-            print(f"✅ Створено лід #{lead.id} з номером замовлення {order_number}")
+            lead, created, duplicate_field = create_lead_once(
+                serializer.save,
+                order_number=order_number,
+                delivery_number=serializer.validated_data.get('delivery_number')
+            )
+            if not created:
+                return lead_race_duplicate_response(lead, duplicate_field)
+            logger.debug("✅ Створено лід #%s з номером замовлення %s", lead.id, order_number)
 
             # Очищуємо кеш
             smart_cache_invalidation(
@@ -4286,7 +4633,9 @@ def check_lead_duplicate(request):
             "full_name": full_name,
             "order_number": order_number
         },
-        "existing_lead": None
+        "existing_lead": None,
+        # 🔎 Не блокує створення — підказка менеджеру про можливий повтор заявки
+        "near_duplicates": near_duplicates_info(phone, full_name)
     }
 
     if existing_lead:
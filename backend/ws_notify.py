@@ -1,11 +1,30 @@
 # backend/ws_notify.py
+from collections import defaultdict
+
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
+from backend.services.bulk_mode import current_changes
+
+
+def _lead_data(lead):
+    return {
+        "id": lead.id,
+        "full_name": lead.full_name,
+        "status": lead.status,
+    }
+
+
 def notify_lead_created(lead):
     if not lead.assigned_to:
         return
 
+    # В bulk_mode — одне сповіщення зі списком при виході
+    changes = current_changes()
+    if changes is not None:
+        changes.created_lead_ids.append(lead.id)
+        return
+
     channel_layer = get_channel_layer()
     group = f"manager_{lead.assigned_to.id}"
 
@@ -13,10 +32,30 @@ def notify_lead_created(lead):
         group,
         {
             "type": "send_new_lead",
-            "data": {
-                "id": lead.id,
-                "full_name": lead.full_name,
-                "status": lead.status,
-            }
+            "data": _lead_data(lead),
         }
     )
+
+
+def notify_leads_created(leads):
+    """
+    Одне повідомлення шару каналів на менеджера зі всіма його новими лідами
+
+    Клієнту LeadConsumer.send_new_leads віддає їх окремими кадрами
+    {id, full_name, status} — той самий формат, що й send_new_lead.
+    """
+    by_manager = defaultdict(list)
+    for lead in leads:
+        if lead.assigned_to_id:
+            by_manager[lead.assigned_to_id].append(_lead_data(lead))
+
+    channel_layer = get_channel_layer()
+    for manager_id, items in by_manager.items():
+        async_to_sync(channel_layer.group_send)(
+            f"manager_{manager_id}",
+            {
+                "type": "send_new_leads",
+                "data": items,
+            }
+        )
+    return sum(len(items) for items in by_manager.values())
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+from backend.utils.phones import backfill_phone_keys
+
+
+def fill_phone_keys(apps, schema_editor):
+    backfill_phone_keys(apps.get_model('whatsapp', 'WhatsAppMessage'), 'phone_number')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsappmessage',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='whatsappmessage',
+            name='phone_key_rev',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_phone_keys, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 # whatsapp/models.py
 from django.db import models
 
+from backend.utils.phones import phone_keys, PhoneKeyManager
+
 
 class WhatsAppMessage(models.Model):
     DIRECTION_CHOICES = [('in', 'Incoming'), ('out', 'Outgoing')]
@@ -12,5 +14,18 @@ class WhatsAppMessage(models.Model):
     status = models.CharField(max_length=50, blank=True, null=True)  # sent, delivered, failed
     external_id = models.CharField(max_length=100, blank=True, null=True)  # id від провайдера (якщо є)
 
+    # 📞 Канонічний ключ телефону — той самий формат, що й у Lead / Client
+    phone_key = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True)
+    phone_key_rev = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True)
+
+    objects = PhoneKeyManager(phone_field='phone_number')
+
     def __str__(self):
         return f"{self.get_direction_display()} | {self.phone_number}"
+
+    def save(self, *args, **kwargs):
+        self.phone_key, self.phone_key_rev = phone_keys(self.phone_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone_number' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'phone_key', 'phone_key_rev'}
+        super().save(*args, **kwargs)